@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Attribute, AttributeValue, ProductAttributeTemplate, ProductAttributeTemplateLine
+from .models import Category, CategoryCatalogueVersion, Attribute, AttributeValue, ProductAttributeTemplate, ProductAttributeTemplateLine
 
 
 @admin.register(Category)
@@ -38,7 +38,7 @@ class CategoryAdmin(admin.ModelAdmin):
         return obj.level
     
     level.short_description = 'Level'
-    level.admin_order_field = 'parent'
+    level.admin_order_field = 'depth'
     
     def children_count(self, obj):
         """Display the number of child categories."""
@@ -92,6 +92,16 @@ class CategoryAdmin(admin.ModelAdmin):
         js = ('admin/js/category_admin.js',)
 
 
+@admin.register(CategoryCatalogueVersion)
+class CategoryCatalogueVersionAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the category tree cache versions.
+    """
+    
+    list_display = ['company', 'version', 'updated_at']
+    readonly_fields = ['version', 'updated_at']
+
+
 @admin.register(Attribute)
 class AttributeAdmin(admin.ModelAdmin):
     """
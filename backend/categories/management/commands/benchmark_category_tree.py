@@ -0,0 +1,137 @@
+"""
+Django management command to benchmark category hierarchy reads on a large
+generated tree: full tree, descendants, level filter, subtree product counts
+and a subtree move, against the recursive per-node approach.
+
+The tree is generated inside a transaction that is rolled back.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from categories.models import Category, ProductAttributeTemplate
+from categories.serializers import CategoryTreeSerializer
+from categories.services import hierarchy
+from organization.models import Company
+from products.models import UOM, Item
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated tree."""
+
+
+def _legacy_descendants(category):
+    """The former recursive get_descendants(): one query per node."""
+    found = []
+    for child in category.children.filter(is_active=True):
+        found.append(child)
+        found.extend(_legacy_descendants(child))
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Benchmark category tree, descendants, level and subtree-count queries on a large tree'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=20000, help='Categories to generate')
+        parser.add_argument('--branching', type=int, default=8, help='Children per category')
+        parser.add_argument('--items', type=int, default=5000, help='Items spread over leaf categories')
+        parser.add_argument('--skip-legacy', action='store_true', help='Skip the recursive baselines')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._benchmark(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _benchmark(self, options):
+        company = Company.objects.create(name='Category Benchmark', code='CATBM')
+        start = time.perf_counter()
+        roots, leaves = self._build_tree(company, options['nodes'], options['branching'])
+        self._build_items(company, leaves, options['items'])
+        self.stdout.write(
+            f'Generated {options["nodes"]} categories ({len(roots)} roots, {len(leaves)} leaves) '
+            f'and {options["items"]} items in {time.perf_counter() - start:.1f}s\n'
+        )
+        self.stdout.write(f'{"operation":>24} {"queries":>8} {"ms":>10} {"result":>8}')
+
+        root = Category.objects.get(pk=roots[0])
+        self._report('tree', lambda: self._count_nodes(hierarchy.tree(company.pk)))
+        if not options['skip_legacy']:
+            self._report('tree (recursive)', lambda: self._count_nodes(
+                CategoryTreeSerializer(
+                    Category.objects.filter(company=company, parent__isnull=True, is_active=True),
+                    many=True
+                ).data
+            ))
+        self._report('descendants', lambda: len(root.get_descendants()))
+        if not options['skip_legacy']:
+            self._report('descendants (recursive)', lambda: len(_legacy_descendants(root)))
+        self._report('level = 2', lambda: len(list(Category.objects.filter(company=company, depth=2))))
+        self._report('subtree product counts', lambda: len(hierarchy.subtree_product_counts(company.pk)))
+        self._report('subtree count (1 node)', lambda: Item.objects.filter(
+            hierarchy.subtree_filter(root.tree_path, 'category__tree_path')
+        ).count())
+
+        # Move the first root's subtree under the second root
+        moved = Category.objects.get(pk=roots[0])
+        moved.parent_id = roots[1]
+        self._report('move subtree', lambda: moved.save() or hierarchy.descendants(moved).count())
+        self._report('rebuild (no-op check)', lambda: hierarchy.rebuild(company.pk, all_companies=False))
+
+    def _build_tree(self, company, nodes, branching):
+        rows = []
+        parents = [None]
+        roots = []
+        index = 0
+        while index < nodes:
+            next_parents = []
+            for parent in parents:
+                for _ in range(branching if parent else max(1, branching // 2)):
+                    if index >= nodes:
+                        break
+                    category = Category(company=company, name=f'BM {index}', parent_id=parent)
+                    rows.append(category)
+                    next_parents.append(category.pk)
+                    if parent is None:
+                        roots.append(category.pk)
+                    index += 1
+            parents = next_parents
+        paths = hierarchy.compute_paths([(row.pk, row.parent_id, row.name) for row in rows])
+        for row in rows:
+            row.tree_path, row.depth, row.name_path = paths[row.pk]
+        Category.objects.bulk_create(rows, batch_size=2000)
+        return roots, parents
+
+    def _build_items(self, company, leaves, count):
+        if not count or not leaves:
+            return
+        uom = UOM.objects.create(company=company, code='EA', description='Each')
+        template = ProductAttributeTemplate.objects.create(company=company, template_name='Benchmark')
+        Item.objects.bulk_create([
+            Item(
+                company=company, item_code=f'CATBM{index}', item_name=f'Benchmark {index}',
+                attribute_template=template, category_id=leaves[index % len(leaves)], stock_uom=uom
+            )
+            for index in range(count)
+        ], batch_size=2000)
+
+    def _count_nodes(self, nodes):
+        return sum(1 + self._count_nodes(node['children']) for node in nodes)
+
+    def _report(self, label, runner):
+        # Count with an execute wrapper: the debug query log is capped at 9000 entries
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            result = runner()
+            elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'{label:>24} {len(queries):>8} {elapsed:>10.1f} {result:>8}')
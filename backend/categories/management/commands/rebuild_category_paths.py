@@ -0,0 +1,24 @@
+"""
+Django management command to recompute the materialised category hierarchy
+(tree_path, depth, name_path), e.g. after categories were edited with raw
+SQL or bulk operations that bypass Category.save().
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from categories.services import hierarchy
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialised category hierarchy paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only rebuild this company ID')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['company']:
+                changed = hierarchy.rebuild(options['company'], all_companies=False)
+            else:
+                changed = hierarchy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{changed} categories updated'))
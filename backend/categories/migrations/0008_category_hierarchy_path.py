@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:57
+
+from django.db import migrations, models
+
+
+def fill_hierarchy_paths(apps, schema_editor):
+    """Materialise tree_path/depth/name_path for existing categories, roots first."""
+    Category = apps.get_model('categories', 'Category')
+    nodes = {pk: (parent_id, name) for pk, parent_id, name in Category.objects.values_list('id', 'parent_id', 'name')}
+    paths = {}
+
+    def resolve(pk, seen=()):
+        if pk in paths:
+            return paths[pk]
+        parent_id, name = nodes[pk]
+        if parent_id in nodes and parent_id not in seen:
+            parent = resolve(parent_id, seen + (pk,))
+            paths[pk] = (f'{parent[0]}{pk.hex}/', parent[1] + 1, f'{parent[2]} > {name}')
+        else:
+            paths[pk] = (f'/{pk.hex}/', 0, name)
+        return paths[pk]
+
+    rows = []
+    for pk in nodes:
+        tree_path, depth, name_path = resolve(pk)
+        rows.append(Category(pk=pk, tree_path=tree_path, depth=depth, name_path=name_path))
+    Category.objects.bulk_update(rows, ['tree_path', 'depth', 'name_path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0007_alter_attributevalue_options_and_more'),
+        ('organization', '0003_company_logo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Depth in the hierarchy (0 for root categories)'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='name_path',
+            field=models.CharField(blank=True, default='', editable=False, help_text="Full path of names from the root ('Root > Child > Name')", max_length=2000),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tree_path',
+            field=models.CharField(blank=True, default='', editable=False, help_text="Ancestor IDs from the root down to this category ('/<root>/.../<self>/')", max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tree_path'], name='categories_tree_pa_ab3079_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['company', 'depth'], name='categories_company_9a2705_idx'),
+        ),
+        migrations.RunPython(fill_hierarchy_paths, migrations.RunPython.noop),
+    ]
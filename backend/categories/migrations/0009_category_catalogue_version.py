@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def create_global_version(apps, schema_editor):
+    """The all-company row is created up front; company rows appear on first write."""
+    CategoryCatalogueVersion = apps.get_model('categories', 'CategoryCatalogueVersion')
+    if not CategoryCatalogueVersion.objects.filter(company__isnull=True).exists():
+        CategoryCatalogueVersion.objects.create(company=None, version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0008_category_hierarchy_path'),
+        ('organization', '0003_company_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryCatalogueVersion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=1, help_text='Incremented on every category change')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='category_catalogue_version', to='organization.company')),
+            ],
+            options={
+                'verbose_name': 'Category Catalogue Version',
+                'verbose_name_plural': 'Category Catalogue Versions',
+                'db_table': 'category_catalogue_versions',
+            },
+        ),
+        migrations.RunPython(create_global_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0009_category_catalogue_version'),
+        ('organization', '0003_company_logo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='category',
+            name='categories_tree_pa_ab3079_idx',
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tree_path'], name='categories_tree_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinLengthValidator
 from organization.models import Company
 import uuid
@@ -37,6 +37,27 @@ class Category(models.Model):
         default=0,
         help_text="Order for displaying categories (lower numbers first)"
     )
+    
+    # Materialised hierarchy, maintained by save() (see categories.services.hierarchy)
+    tree_path = models.CharField(
+        max_length=1024,
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Ancestor IDs from the root down to this category ('/<root>/.../<self>/')"
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Depth in the hierarchy (0 for root categories)"
+    )
+    name_path = models.CharField(
+        max_length=2000,
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Full path of names from the root ('Root > Child > Name')"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -46,15 +67,37 @@ class Category(models.Model):
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
         unique_together = ['company', 'name']
+        indexes = [
+            # Pattern ops so PostgreSQL serves subtree prefix matches (LIKE 'path%') under any collation
+            models.Index(fields=['tree_path'], name='categories_tree_path_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['company', 'depth']),
+        ]
     
     def __str__(self):
         if self.parent:
             return f"{self.parent.name} > {self.name}"
         return self.name
     
+    def save(self, *args, **kwargs):
+        """Keep the materialised path of this category and its subtree current."""
+        from .services import hierarchy
+        
+        with transaction.atomic():
+            previous = hierarchy.place(self)
+            # Descendants keep their stored paths until shift_descendants; post_save receivers read these
+            self._previous_paths = previous
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(hierarchy.PATH_FIELDS)
+            super().save(*args, **kwargs)
+            if previous:
+                hierarchy.shift_descendants(previous, self)
+    
     @property
     def full_path(self):
         """Return the full hierarchical path of the category."""
+        if self.name_path:
+            return self.name_path
         if self.parent:
             return f"{self.parent.full_path} > {self.name}"
         return self.name
@@ -62,6 +105,8 @@ class Category(models.Model):
     @property
     def level(self):
         """Return the depth level of the category in the hierarchy."""
+        if self.tree_path:
+            return self.depth
         if self.parent:
             return self.parent.level + 1
         return 0
@@ -71,11 +116,22 @@ class Category(models.Model):
         return self.children.filter(is_active=True)
     
     def get_descendants(self):
-        """Return all descendant categories (children, grandchildren, etc.)."""
+        """
+        Return all descendant categories (children, grandchildren, etc.)
+        reachable through active categories, depth-first, in one query.
+        """
+        from .services import hierarchy
+        
+        children = {}
+        for category in hierarchy.descendants(self).filter(is_active=True):
+            children.setdefault(category.parent_id, []).append(category)
+        
         descendants = []
-        for child in self.get_children():
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
+        stack = list(reversed(children.get(self.pk, [])))
+        while stack:
+            category = stack.pop()
+            descendants.append(category)
+            stack.extend(reversed(children.get(category.pk, [])))
         return descendants
     
     def has_products(self):
@@ -87,6 +143,32 @@ class Category(models.Model):
         return not self.has_products() and not self.get_children().exists()
 
 
+class CategoryCatalogueVersion(models.Model):
+    """
+    Monotonic version of a company's category catalogue, bumped on every
+    Category write. The row without a company versions the all-company view.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.OneToOneField(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='category_catalogue_version',
+        null=True,
+        blank=True
+    )
+    version = models.PositiveBigIntegerField(default=1, help_text="Incremented on every category change")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'category_catalogue_versions'
+        verbose_name = 'Category Catalogue Version'
+        verbose_name_plural = 'Category Catalogue Versions'
+    
+    def __str__(self):
+        return f"{self.company or 'All companies'} v{self.version}"
+
+
 class Attribute(models.Model):
     """
     Attribute model for defining product attributes (e.g., Color, Size, Brand).
@@ -27,8 +27,13 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.get_children().count()
     
     def get_products_count(self, obj):
-        """Return the number of products in this category."""
-        return obj.products.count() if hasattr(obj, 'products') else 0
+        """Return the number of products in this category and its subcategories."""
+        from products.models import Item
+        from .services.hierarchy import subtree_filter
+        
+        if not obj.tree_path:
+            return obj.items.count()
+        return Item.objects.filter(subtree_filter(obj.tree_path, 'category__tree_path')).count()
     
     def validate_name(self, value):
         """Validate category name."""
@@ -88,6 +93,8 @@ class CategoryUpdateSerializer(serializers.ModelSerializer):
         """Validate parent category."""
         if value and value == self.instance:
             raise serializers.ValidationError("A category cannot be its own parent.")
+        if value and self.instance and self.instance.tree_path and value.tree_path.startswith(self.instance.tree_path):
+            raise serializers.ValidationError("A category cannot be moved under one of its own descendants.")
         if value and not value.is_active:
             raise serializers.ValidationError("Parent category must be active.")
         return value
@@ -0,0 +1 @@
+# Categories services
@@ -0,0 +1,226 @@
+"""
+Set-based bulk mutations of the category hierarchy.
+
+``apply`` takes sort orders, parent moves and activation flags for many
+categories at once and writes them set-based (bulk_update's UPDATE ... CASE
+per batch, or one plain UPDATE per distinct value set) instead of a save()
+per row. Moves are validated in memory against the affected companies'
+whole tree (unknown or cross-company parents, cycles, inactive parents), and
+the materialised path columns of every moved subtree are recomputed in the
+same transaction.
+
+bulk_update() sends no model signals, so the tree cache version is bumped
+here and ``categories.signals.category_paths_changed`` is sent for the
+categories whose path changed.
+"""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Category
+from . import hierarchy, tree_cache
+
+
+FIELDS = ('sort_order', 'parent', 'is_active')
+
+# Up to this many distinct value sets are written as plain UPDATEs
+GROUPED_UPDATE_LIMIT = 8
+ID_CHUNK_SIZE = 900
+
+
+def _uuid(value, label):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        raise ValidationError(f'Invalid {label}: {value}')
+
+
+def normalize_changes(changes):
+    """
+    {category_id: {'sort_order': int, 'parent': id|None, 'is_active': bool}}
+    with UUID keys and checked values; only the given fields are kept.
+    """
+    normalized = {}
+    for category_id, values in changes.items():
+        if not isinstance(values, dict):
+            raise ValidationError(f'Changes for {category_id} must be an object')
+        unknown = set(values) - set(FIELDS)
+        if unknown:
+            raise ValidationError(f'Unknown fields for {category_id}: {", ".join(sorted(unknown))}')
+        change = {}
+        if 'sort_order' in values:
+            try:
+                change['sort_order'] = int(values['sort_order'])
+            except (TypeError, ValueError):
+                raise ValidationError(f'Invalid sort_order for {category_id}')
+            if change['sort_order'] < 0:
+                raise ValidationError(f'sort_order for {category_id} must not be negative')
+        if 'parent' in values:
+            change['parent'] = _uuid(values['parent'], 'parent') if values['parent'] else None
+        if 'is_active' in values:
+            if not isinstance(values['is_active'], bool):
+                raise ValidationError(f'Invalid is_active for {category_id}')
+            change['is_active'] = values['is_active']
+        normalized[_uuid(category_id, 'category id')] = change
+    return normalized
+
+
+def _find_cycle(parents, moved):
+    """First moved category that ends up among its own descendants, or None."""
+    for start in moved:
+        seen = {start}
+        node = parents.get(start)
+        while node is not None:
+            if node in seen:
+                return start
+            seen.add(node)
+            node = parents.get(node)
+    return None
+
+
+def apply(changes, batch_size=None):
+    """
+    Apply ``changes`` (see ``normalize_changes``) in one transaction.
+
+    Returns {'updated': rows whose own fields changed, 'moved': categories
+    with a new parent, 'repathed': categories whose stored path changed}.
+    Raises ValidationError without writing anything if a change is invalid.
+    """
+    from ..signals import category_paths_changed
+
+    changes = normalize_changes(changes)
+    if not changes:
+        return {'updated': 0, 'moved': 0, 'repathed': 0}
+
+    with transaction.atomic():
+        columns = ('id', 'company_id', 'parent_id', 'name', 'sort_order', 'is_active', *hierarchy.PATH_FIELDS)
+        targets = {
+            row[0]: dict(zip(columns, row))
+            for row in Category.objects.select_for_update().filter(pk__in=changes).values_list(*columns)
+        }
+        missing = set(changes) - set(targets)
+        if missing:
+            raise ValidationError(f'Categories not found: {", ".join(sorted(str(pk) for pk in missing))}')
+
+        moved = {
+            pk: change['parent'] for pk, change in changes.items()
+            if 'parent' in change and change['parent'] != targets[pk]['parent_id']
+        }
+        rows = targets
+        if moved:
+            # Moves need the whole tree of every company involved: one query
+            companies = {row['company_id'] for row in targets.values()}
+            company_filter = Q(company_id__in=[pk for pk in companies if pk])
+            if None in companies:
+                company_filter |= Q(company__isnull=True)
+            rows = {
+                row[0]: dict(zip(columns, row))
+                for row in Category.objects.filter(company_filter).values_list(*columns)
+            }
+            _validate_moves(rows, changes, moved)
+
+        now = timezone.now()
+        pending = {}
+        for pk, change in changes.items():
+            row = rows[pk]
+            values = {}
+            if 'sort_order' in change and change['sort_order'] != row['sort_order']:
+                values['sort_order'] = change['sort_order']
+            if pk in moved:
+                values['parent_id'] = moved[pk]
+            if 'is_active' in change and change['is_active'] != row['is_active']:
+                values['is_active'] = change['is_active']
+            if values:
+                pending[pk] = values
+        updated = len(pending)
+
+        repathed = []
+        if moved:
+            for pk in moved:
+                rows[pk]['parent_id'] = moved[pk]
+            paths = hierarchy.compute_paths([(pk, row['parent_id'], row['name']) for pk, row in rows.items()])
+            for pk, row in rows.items():
+                new_paths = paths[pk]
+                if new_paths != tuple(row[field] for field in hierarchy.PATH_FIELDS):
+                    pending.setdefault(pk, {}).update(zip(hierarchy.PATH_FIELDS, new_paths))
+                    repathed.append(pk)
+
+        if pending:
+            _write(pending, now, batch_size)
+            tree_cache.bump({rows[pk]['company_id'] for pk in pending})
+            if repathed:
+                category_paths_changed.send(sender=Category, category_ids=repathed)
+
+    return {'updated': updated, 'moved': len(moved), 'repathed': len(repathed)}
+
+
+def _write(pending, now, batch_size):
+    """
+    Write ``pending`` ({pk: {field: value}}): one UPDATE per distinct set of
+    values when there are few (e.g. activate/deactivate), otherwise
+    bulk_update()'s CASE statements, one call per distinct set of fields.
+    Each row only writes the fields it changes, so descendants that are just
+    re-pathed never write back the unlocked sort_order/is_active they were
+    read with. ``updated_at`` is the same for every row, so it is set with a
+    plain UPDATE rather than a CASE.
+    """
+    groups = {}
+    for pk, values in pending.items():
+        groups.setdefault(tuple(sorted(values.items())), []).append(pk)
+
+    chunk = batch_size or ID_CHUNK_SIZE
+    if len(groups) <= GROUPED_UPDATE_LIMIT:
+        for key, ids in groups.items():
+            for start in range(0, len(ids), chunk):
+                Category.objects.filter(pk__in=ids[start:start + chunk]).update(updated_at=now, **dict(key))
+        return
+
+    by_fields = {}
+    for key, ids in groups.items():
+        for pk in ids:
+            category = Category(pk=pk)
+            for field, value in key:
+                setattr(category, field, value)
+            by_fields.setdefault(tuple(field for field, _ in key), []).append(category)
+    for field_names, objects in by_fields.items():
+        fields = ['parent' if field == 'parent_id' else field for field in field_names]
+        Category.objects.bulk_update(objects, fields, batch_size=batch_size)
+    ids = list(pending)
+    for start in range(0, len(ids), chunk):
+        Category.objects.filter(pk__in=ids[start:start + chunk]).update(updated_at=now)
+
+
+def _validate_moves(rows, changes, moved):
+    """Check new parents exist, share the company, stay active and form no cycle."""
+    errors = []
+    for pk, parent_id in moved.items():
+        if parent_id is None:
+            continue
+        if parent_id == pk:
+            errors.append(f'{pk}: a category cannot be its own parent')
+            continue
+        parent = rows.get(parent_id)
+        if parent is None:
+            exists = Category.objects.filter(pk=parent_id).exists()
+            errors.append(
+                f'{pk}: parent {parent_id} belongs to another company' if exists
+                else f'{pk}: parent {parent_id} not found'
+            )
+            continue
+        if parent['company_id'] != rows[pk]['company_id']:
+            errors.append(f'{pk}: parent {parent_id} belongs to another company')
+            continue
+        parent_active = changes.get(parent_id, {}).get('is_active', parent['is_active'])
+        if not parent_active:
+            errors.append(f'{pk}: parent category must be active')
+    if errors:
+        raise ValidationError(errors)
+
+    parents = {pk: row['parent_id'] for pk, row in rows.items()}
+    parents.update(moved)
+    cycle = _find_cycle(parents, moved)
+    if cycle is not None:
+        raise ValidationError(f'{cycle}: a category cannot be moved under one of its own descendants')
@@ -0,0 +1,233 @@
+"""
+Materialised category hierarchy.
+
+Every Category stores its ancestry as ``tree_path`` ("/<root>/.../<self>/",
+IDs as 32-character hex), its ``depth`` (0 for roots) and its ``name_path``
+("Root > ... > Name"). With those columns:
+
+* descendants are one indexed prefix match on ``tree_path`` (``subtree_filter``),
+* the level filter is ``depth = n``,
+* the whole tree is one ordered query nested in Python (``tree``),
+* subtree product counts are one GROUP BY rolled up through the paths.
+
+Category.save() keeps the columns current: a rename or move rewrites the
+whole subtree with a single UPDATE (``shift_descendants``), and a move under
+the category's own subtree is rejected.
+"""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import CharField, Count, F, Q, Value
+from django.db.models.functions import Concat, Substr
+
+from ..models import Category
+
+
+SEPARATOR = '/'
+NAME_SEPARATOR = ' > '
+PATH_FIELDS = ('tree_path', 'depth', 'name_path')
+
+
+def node_key(pk):
+    return uuid.UUID(str(pk)).hex
+
+
+def child_path(parent_path, pk):
+    return (parent_path or SEPARATOR) + node_key(pk) + SEPARATOR
+
+
+def path_ids(tree_path):
+    """Category IDs along a path, root first."""
+    return [uuid.UUID(key) for key in tree_path.strip(SEPARATOR).split(SEPARATOR) if key]
+
+
+def subtree_filter(tree_path, field='tree_path'):
+    """
+    Q matching a node and all of its descendants: a ``tree_path`` prefix match.
+
+    SQLite only uses an index for ``LIKE 'prefix%'`` with case-sensitive
+    LIKE, so there the prefix is written as a range instead. That is exact
+    under its default BINARY collation, where '0' sorts right after '/'
+    (paths only contain hex digits and '/'). Other backends get
+    ``startswith``, which does not depend on the collation's ordering and
+    which PostgreSQL serves from the varchar_pattern_ops index on
+    ``tree_path``.
+    """
+    if connection.vendor == 'sqlite':
+        return Q(**{f'{field}__gte': tree_path, f'{field}__lt': tree_path[:-1] + '0'})
+    return Q(**{f'{field}__startswith': tree_path})
+
+
+def place(category):
+    """
+    Set ``category``'s path columns from its parent before a save.
+
+    Returns the stored (pre-save) path columns if the category already
+    existed and its position or name changed, so the caller can shift its
+    descendants; otherwise None.
+    """
+    previous = None
+    if not category._state.adding:
+        previous = Category.objects.filter(pk=category.pk).values(*PATH_FIELDS).first()
+
+    parent = None
+    if category.parent_id:
+        if category.parent_id == category.pk:
+            raise ValidationError({'parent': 'A category cannot be its own parent.'})
+        parent = Category.objects.filter(pk=category.parent_id).values(*PATH_FIELDS).first()
+        if parent and previous and previous['tree_path'] and parent['tree_path'].startswith(previous['tree_path']):
+            raise ValidationError({'parent': 'A category cannot be moved under one of its own descendants.'})
+
+    if parent:
+        category.tree_path = child_path(parent['tree_path'], category.pk)
+        category.depth = parent['depth'] + 1
+        category.name_path = f"{parent['name_path']}{NAME_SEPARATOR}{category.name}"
+    else:
+        category.tree_path = child_path(None, category.pk)
+        category.depth = 0
+        category.name_path = category.name
+
+    if previous and any(previous[field] != getattr(category, field) for field in PATH_FIELDS):
+        return previous
+    return None
+
+
+def shift_descendants(previous, category):
+    """
+    Rewrite the path columns of ``category``'s descendants after it moved or
+    was renamed: one UPDATE for the whole subtree. Returns rows updated.
+    """
+    old_path = previous['tree_path']
+    if not old_path:
+        return 0
+    return Category.objects.filter(subtree_filter(old_path)).exclude(pk=category.pk).update(
+        tree_path=Concat(
+            Value(category.tree_path), Substr('tree_path', len(old_path) + 1),
+            output_field=CharField()
+        ),
+        depth=F('depth') + (category.depth - previous['depth']),
+        name_path=Concat(
+            Value(category.name_path), Substr('name_path', len(previous['name_path']) + 1),
+            output_field=CharField()
+        ),
+    )
+
+
+def compute_paths(rows):
+    """
+    {pk: (tree_path, depth, name_path)} for (pk, parent_id, name) rows.
+
+    Nodes whose parent is missing from ``rows`` are treated as roots; cycles
+    are broken at the node where they are detected.
+    """
+    nodes = {pk: (parent_id, name) for pk, parent_id, name in rows}
+    paths = {}
+
+    def resolve(pk):
+        chain = []
+        node = pk
+        while node in nodes and node not in paths and node not in chain:
+            chain.append(node)
+            node = nodes[node][0]
+        base = paths.get(node) if node in paths else None
+        for pk_in_chain in reversed(chain):
+            name = nodes[pk_in_chain][1]
+            if base is None:
+                base = (child_path(None, pk_in_chain), 0, name)
+            else:
+                base = (child_path(base[0], pk_in_chain), base[1] + 1, f'{base[2]}{NAME_SEPARATOR}{name}')
+            paths[pk_in_chain] = base
+
+    for pk in nodes:
+        if pk not in paths:
+            resolve(pk)
+    return paths
+
+
+def rebuild(company_id=None, all_companies=True, batch_size=1000):
+    """Recompute every stored path (e.g. after raw SQL edits); returns rows changed."""
+    categories = Category.objects.all()
+    if not all_companies:
+        categories = categories.filter(company_id=company_id)
+    stored = {}
+    rows = []
+    for pk, parent_id, name, tree_path, depth, name_path in categories.values_list(
+        'id', 'parent_id', 'name', *PATH_FIELDS
+    ):
+        rows.append((pk, parent_id, name))
+        stored[pk] = (tree_path, depth, name_path)
+
+    changed = []
+    for pk, values in compute_paths(rows).items():
+        if stored[pk] != values:
+            changed.append(Category(pk=pk, tree_path=values[0], depth=values[1], name_path=values[2]))
+    Category.objects.bulk_update(changed, list(PATH_FIELDS), batch_size=batch_size)
+    return len(changed)
+
+
+def descendants(category, include_self=False):
+    """Queryset of every category under ``category`` (one indexed range scan)."""
+    queryset = Category.objects.filter(subtree_filter(category.tree_path))
+    if not include_self:
+        queryset = queryset.exclude(pk=category.pk)
+    return queryset
+
+
+def subtree_product_counts(company_id=None):
+    """
+    {category_id: items in the category and all of its descendants}, from a
+    single GROUP BY over items rolled up through each category's path.
+    """
+    from products.models import Item
+
+    items = Item.objects.filter(category__isnull=False)
+    if company_id:
+        items = items.filter(category__company_id=company_id)
+    counts = {}
+    for tree_path, count in items.order_by().values('category__tree_path').annotate(
+        count=Count('id')
+    ).values_list('category__tree_path', 'count'):
+        for ancestor_id in path_ids(tree_path):
+            counts[ancestor_id] = counts.get(ancestor_id, 0) + count
+    return counts
+
+
+def tree(company_id=None, active_only=True, product_counts=None):
+    """
+    Nested category tree from one query, roots and children ordered by
+    (sort_order, name). With ``active_only``, an inactive category hides its
+    whole subtree. ``product_counts`` ({id: count}) adds ``products_count``.
+    """
+    categories = Category.objects.all()
+    if company_id:
+        categories = categories.filter(company_id=company_id)
+    if active_only:
+        categories = categories.filter(is_active=True)
+    rows = categories.order_by('depth', 'sort_order', 'name').values(
+        'id', 'company_id', 'name', 'description', 'is_active', 'sort_order',
+        'parent_id', 'name_path', 'depth'
+    )
+
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = {
+            'id': str(row['id']),
+            'company': str(row['company_id']) if row['company_id'] else None,
+            'name': row['name'],
+            'description': row['description'],
+            'is_active': row['is_active'],
+            'sort_order': row['sort_order'],
+            'full_path': row['name_path'],
+            'level': row['depth'],
+            'children': [],
+        }
+        if product_counts is not None:
+            node['products_count'] = product_counts.get(row['id'], 0)
+        nodes[row['id']] = node
+        if row['parent_id'] is None:
+            roots.append(node)
+        elif row['parent_id'] in nodes:
+            nodes[row['parent_id']]['children'].append(node)
+    return roots
@@ -0,0 +1,154 @@
+"""
+Cached, version-stamped category tree for the POS navigator.
+
+Every Category write bumps the CategoryCatalogueVersion of its company and
+of the all-company view (``bump``; wired to post_save/post_delete in
+``categories.signals`` and called directly by bulk updates). The rendered
+tree JSON is cached under the current version, so a write never needs to
+find and delete cached trees: the next request simply misses.
+
+The current version itself is cached too. Readers only ``add`` it, and a
+bump writes the committed version once its transaction commits, so a reader
+that loaded the old version just before the commit cannot overwrite the new
+one. Version entries live ``CATEGORY_TREE_VERSION_TTL`` seconds, which bounds
+what is left (two bumps committing at once) without costing a warm request
+more than one query per TTL. The version doubles as a strong ETag.
+
+Hit, miss and not-modified counters are kept in the shared cache
+(``stats``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from rest_framework.renderers import JSONRenderer
+
+from ..models import CategoryCatalogueVersion
+from . import hierarchy
+
+
+CACHE_PREFIX = 'categories:tree'
+COUNTERS = ('hits', 'misses', 'not_modified')
+ALL = 'all'
+
+
+def _scope(company_id):
+    return str(company_id) if company_id else ALL
+
+
+def _version_key(company_id):
+    return f'{CACHE_PREFIX}:version:{_scope(company_id)}'
+
+
+def _tree_key(company_id, version):
+    return f'{CACHE_PREFIX}:body:{_scope(company_id)}:{version}'
+
+
+def _counter_key(name):
+    return f'{CACHE_PREFIX}:stats:{name}'
+
+
+def _ttl():
+    return getattr(settings, 'CATEGORY_TREE_CACHE_TTL', 3600)
+
+
+def _version_ttl():
+    return getattr(settings, 'CATEGORY_TREE_VERSION_TTL', 10)
+
+
+def _stored_versions(company_ids):
+    """{company_id: version} from the database (0 for scopes never bumped)."""
+    stored = dict(
+        CategoryCatalogueVersion.objects.filter(
+            Q(company_id__in=[company_id for company_id in company_ids if company_id]) |
+            Q(company__isnull=True)
+        ).values_list('company_id', 'version')
+    )
+    return {company_id: stored.get(company_id or None, 0) for company_id in company_ids}
+
+
+def current_version(company_id=None):
+    """The company's (or the all-company view's) catalogue version."""
+    key = _version_key(company_id)
+    version = cache.get(key)
+    if version is None:
+        version = _stored_versions([company_id])[company_id]
+        # add, not set: never overwrite a version a committed bump just wrote
+        cache.add(key, version, _version_ttl())
+    return version
+
+
+def bump(company_ids):
+    """
+    Increment the catalogue version of each company and of the all-company
+    view. Runs inside the caller's transaction; the committed versions are
+    written to the cache once it commits.
+    """
+    companies = {company_id for company_id in company_ids if company_id}
+    rows = CategoryCatalogueVersion.objects.filter(Q(company_id__in=companies) | Q(company__isnull=True))
+    missing = (companies | {None}) - set(rows.values_list('company_id', flat=True))
+    if missing:
+        # Created at 0 and bumped below with the rest, so concurrent first writes both count
+        CategoryCatalogueVersion.objects.bulk_create(
+            [CategoryCatalogueVersion(company_id=company_id, version=0) for company_id in missing],
+            ignore_conflicts=True
+        )
+    rows.update(version=F('version') + 1)
+
+    scopes = list(companies | {None})
+    transaction.on_commit(lambda: cache.set_many(
+        {_version_key(company_id): version for company_id, version in _stored_versions(scopes).items()},
+        _version_ttl()
+    ))
+
+
+def etag(company_id, version):
+    return f'"category-tree-{_scope(company_id)}-{version}"'
+
+
+def _count(name):
+    key = _counter_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing key: start the counter (add() is a no-op if another process won the race)
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def record_not_modified():
+    _count('not_modified')
+
+
+def rendered_tree(company_id=None, version=None):
+    """
+    (json_bytes, cache_status) for the active category tree of a company.
+
+    ``cache_status`` is 'HIT' or 'MISS'. The body is the same document
+    CategoryTreeView has always returned: {'categories': [...], 'total': n}.
+    """
+    version = current_version(company_id) if version is None else version
+    key = _tree_key(company_id, version)
+    body = cache.get(key)
+    if body is not None:
+        _count('hits')
+        return body, 'HIT'
+
+    _count('misses')
+    categories = hierarchy.tree(company_id)
+    body = JSONRenderer().render({'categories': categories, 'total': len(categories)})
+    cache.set(key, body, _ttl())
+    return body, 'MISS'
+
+
+def stats():
+    """Cache counters plus the hit ratio."""
+    values = cache.get_many([_counter_key(name) for name in COUNTERS])
+    counters = {name: values.get(_counter_key(name), 0) for name in COUNTERS}
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else None
+    return counters
+
+
+def reset_stats():
+    cache.delete_many([_counter_key(name) for name in COUNTERS])
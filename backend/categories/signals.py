@@ -0,0 +1,30 @@
+"""
+Bump the category catalogue version on every Category write so cached trees
+(``categories.services.tree_cache``) are never served stale.
+
+Queryset ``update()`` calls send no signals; code that uses them (e.g.
+CategoryBulkUpdateView) calls ``tree_cache.bump`` itself.
+
+``category_paths_changed`` is sent by set-based writes that change stored
+category paths without saving each row (``categories.services.bulk``), with
+the IDs of the re-pathed categories as ``category_ids``.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from .models import Category
+
+
+category_paths_changed = Signal()
+
+
+def bump_tree_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services import tree_cache
+    tree_cache.bump([instance.company_id])
+
+
+def connect_tree_cache():
+    post_save.connect(bump_tree_version, sender=Category, dispatch_uid='categories.tree_cache.category_save')
+    post_delete.connect(bump_tree_version, sender=Category, dispatch_uid='categories.tree_cache.category_delete')
@@ -2,7 +2,9 @@ from django.urls import path
 from .views import (
     CategoryListCreateView,
     CategoryDetailView,
+    CategoryDescendantsView,
     CategoryTreeView,
+    CategoryTreeCacheStatsView,
     CategorySearchView,
     CategoryBulkUpdateView,
     CategoryStatsView,
@@ -21,9 +23,11 @@ urlpatterns = [
     # Basic CRUD operations
     path('', CategoryListCreateView.as_view(), name='category-list-create'),
     path('<uuid:pk>/', CategoryDetailView.as_view(), name='category-detail'),
+    path('<uuid:pk>/descendants/', CategoryDescendantsView.as_view(), name='category-descendants'),
     
     # Specialized views
     path('tree/', CategoryTreeView.as_view(), name='category-tree'),
+    path('tree/stats/', CategoryTreeCacheStatsView.as_view(), name='category-tree-stats'),
     path('search/', CategorySearchView.as_view(), name='category-search'),
     path('bulk-update/', CategoryBulkUpdateView.as_view(), name='category-bulk-update'),
     path('stats/', CategoryStatsView.as_view(), name='category-stats'),
@@ -2,9 +2,13 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 from .models import Category, Attribute, AttributeValue, ProductAttributeTemplate
+from .services import bulk, hierarchy, tree_cache
 from .serializers import (
     CategorySerializer,
     CategoryCreateSerializer,
@@ -57,6 +61,11 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         root_only = self.request.query_params.get('root_only')
         if root_only and root_only.lower() == 'true':
             queryset = queryset.filter(parent__isnull=True)
+        
+        # Filter by level (depth in hierarchy)
+        level = self.request.query_params.get('level')
+        if level and level.isdigit():
+            queryset = queryset.filter(depth=int(level))
             
         # Filter by company if present in query params (or could be from user context)
         company_id = self.request.query_params.get('company')
@@ -130,22 +139,81 @@ class CategoryTreeView(APIView):
     permission_classes = [permissions.IsAuthenticated] if not settings.DEBUG else []
     
     def get(self, request):
-        """Return categories in tree structure."""
-        # Get root categories (no parent)
-        root_categories = Category.objects.filter(
-            parent__isnull=True,
-            is_active=True
-        ).order_by('sort_order', 'name')
+        """
+        Return categories in tree structure.
         
-        # Filter by company if provided
+        The plain tree is served from the cache, stamped with the company's
+        catalogue version (ETag / If-None-Match); with_counts=true is
+        computed per request.
+        """
         company_id = request.query_params.get('company')
-        if company_id:
-            root_categories = root_categories.filter(company_id=company_id)
         
-        serializer = CategoryTreeSerializer(root_categories, many=True)
+        # Optional subtree product counts (one more query, not cached)
+        if request.query_params.get('with_counts', '').lower() == 'true':
+            product_counts = hierarchy.subtree_product_counts(company_id)
+            categories = hierarchy.tree(company_id, product_counts=product_counts)
+            return Response({
+                'categories': categories,
+                'total': len(categories)
+            })
+        
+        version = tree_cache.current_version(company_id)
+        etag = tree_cache.etag(company_id, version)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            tree_cache.record_not_modified()
+            response = HttpResponseNotModified()
+        else:
+            body, cache_status = tree_cache.rendered_tree(company_id, version)
+            response = HttpResponse(body, content_type='application/json')
+            response['X-Cache'] = cache_status
+        response['ETag'] = etag
+        response['X-Catalogue-Version'] = str(version)
+        return response
+
+
+class CategoryTreeCacheStatsView(APIView):
+    """
+    Category tree cache counters.
+    
+    GET: Returns hits, misses, 304s, hit ratio and the current catalogue version
+    """
+    permission_classes = [permissions.IsAuthenticated] if not settings.DEBUG else []
+    
+    def get(self, request):
+        """Return tree cache statistics."""
+        company_id = request.query_params.get('company')
+        return Response({
+            **tree_cache.stats(),
+            'company': company_id,
+            'catalogue_version': tree_cache.current_version(company_id)
+        })
+
+
+class CategoryDescendantsView(APIView):
+    """
+    Get every category below a category.
+    
+    GET: Returns the subtree (without the category itself unless include_self=true)
+    """
+    serializer_class = CategoryListSerializer
+    
+    permission_classes = [permissions.IsAuthenticated] if not settings.DEBUG else []
+    
+    def get(self, request, pk):
+        """Return descendants in tree order."""
+        category = generics.get_object_or_404(Category, pk=pk)
+        include_self = request.query_params.get('include_self', '').lower() == 'true'
+        queryset = hierarchy.descendants(category, include_self=include_self)
+        
+        is_active = request.query_params.get('is_active')
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        
+        serializer = CategoryListSerializer(queryset.order_by('tree_path'), many=True)
         return Response({
+            'category': str(category.pk),
             'categories': serializer.data,
-            'total': root_categories.count()
+            'total': len(serializer.data)
         })
 
 
@@ -191,12 +259,7 @@ class CategorySearchView(APIView):
         # Filter by level (depth in hierarchy)
         if level is not None:
             try:
-                level = int(level)
-                if level == 0:
-                    queryset = queryset.filter(parent__isnull=True)
-                else:
-                    # This is a simplified approach - in a real app you might want to use a more efficient method
-                    queryset = queryset.filter(parent__isnull=False)
+                queryset = queryset.filter(depth=int(level))
             except ValueError:
                 pass
         
@@ -213,49 +276,90 @@ class CategorySearchView(APIView):
 
 class CategoryBulkUpdateView(APIView):
     """
-    Bulk update categories (activate/deactivate, reorder).
+    Bulk update categories (activate/deactivate, reorder, move).
+    
+    POST: Bulk update multiple categories in one transaction
     
-    POST: Bulk update multiple categories
+    Actions:
+      activate / deactivate  {"category_ids": [...]}
+      reorder                {"sort_orders": {id: sort_order}}
+      move                   {"parents": {id: parent_id or null}}
+      update                 {"changes": {id: {"sort_order", "parent", "is_active"}}}
     """
     serializer_class = CategoryUpdateSerializer
     
     permission_classes = [permissions.IsAuthenticated] if not settings.DEBUG else []
     
     def post(self, request):
-        """Bulk update categories."""
+        """Bulk update categories with set-based writes (no per-row save())."""
         action = request.data.get('action')
         category_ids = request.data.get('category_ids', [])
-        
-        if not action or not category_ids:
+        if not isinstance(category_ids, list):
             return Response(
-                {'error': 'Action and category_ids are required'},
+                {'error': 'category_ids must be a list'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        categories = Category.objects.filter(id__in=category_ids)
-        
-        if action == 'activate':
-            categories.update(is_active=True)
-            message = f'{categories.count()} categories activated'
-        elif action == 'deactivate':
-            categories.update(is_active=False)
-            message = f'{categories.count()} categories deactivated'
+        if action in ('activate', 'deactivate'):
+            if not category_ids:
+                return Response(
+                    {'error': 'Action and category_ids are required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            changes = {str(category_id): {'is_active': action == 'activate'} for category_id in category_ids}
         elif action == 'reorder':
             sort_orders = request.data.get('sort_orders', {})
-            for category in categories:
-                if str(category.id) in sort_orders:
-                    category.sort_order = sort_orders[str(category.id)]
-                    category.save()
-            message = f'{categories.count()} categories reordered'
+            if not isinstance(sort_orders, dict):
+                return Response(
+                    {'error': 'sort_orders must be an object'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if category_ids:
+                sort_orders = {
+                    category_id: order for category_id, order in sort_orders.items()
+                    if category_id in {str(pk) for pk in category_ids}
+                }
+            changes = {category_id: {'sort_order': order} for category_id, order in sort_orders.items()}
+        elif action == 'move':
+            parents = request.data.get('parents', {})
+            if not isinstance(parents, dict):
+                return Response(
+                    {'error': 'parents must be an object'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            changes = {category_id: {'parent': parent_id} for category_id, parent_id in parents.items()}
+        elif action == 'update':
+            changes = request.data.get('changes', {})
         else:
             return Response(
-                {'error': 'Invalid action. Use: activate, deactivate, or reorder'},
+                {'error': 'Invalid action. Use: activate, deactivate, reorder, move or update'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not isinstance(changes, dict) or not changes:
+            return Response(
+                {'error': 'No categories to update'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            result = bulk.apply(changes)
+        except DjangoValidationError as e:
+            return Response(
+                {'error': e.messages if len(e.messages) > 1 else e.messages[0]},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        verb = {
+            'activate': 'activated', 'deactivate': 'deactivated', 'reorder': 'reordered',
+            'move': 'moved', 'update': 'updated'
+        }[action]
         return Response({
-            'message': message,
-            'updated_count': categories.count()
+            'message': f'{len(changes)} categories {verb}',
+            'updated_count': len(changes),
+            'changed_count': result['updated'],
+            'moved_count': result['moved'],
+            'repathed_count': result['repathed']
         })
 
 
@@ -234,3 +234,77 @@ WEB_CONSOLE_PROXY_ALLOWLIST = [
     '0.0.0.0',
 ]
 WEB_CONSOLE_PROXY_TIMEOUT = 10
+
+# POS document numbering
+# Numbers each terminal reserves per round-trip to the document sequence
+# counter (1 = allocate every number individually, gap-free)
+DOCUMENT_SEQUENCE_BLOCK_SIZE = config('DOCUMENT_SEQUENCE_BLOCK_SIZE', default=1, cast=int)
+
+# Seconds dashboard tender breakdowns (payment method totals) stay cached
+TENDER_BREAKDOWN_CACHE_TTL = config('TENDER_BREAKDOWN_CACHE_TTL', default=5, cast=int)
+
+# Sale-to-stock posting: 'sync' posts inside the completing transaction,
+# 'queue' leaves completed sales for `manage.py post_sale_stock`, 'off' disables
+# (sales completed while off are stamped settled and never replayed)
+SALE_STOCK_POSTING = config('SALE_STOCK_POSTING', default='sync')
+
+# Minutes a stock reservation holds units before the expiry sweep releases it
+# (`manage.py expire_stock_reservations`); 0 = reservations never expire
+STOCK_RESERVATION_TTL_MINUTES = config('STOCK_RESERVATION_TTL_MINUTES', default=30, cast=int)
+
+# Seconds of recent changes the terminal delta-sync feed holds back, so rows
+# from transactions that commit late are not skipped by a client's cursor
+TERMINAL_SYNC_SETTLE_SECONDS = config('TERMINAL_SYNC_SETTLE_SECONDS', default=5, cast=int)
+
+# Offline sale upload (`POST /api/sales/batch/`): largest accepted batch,
+# sales inserted per transaction, and the oldest `client_sold_at` accepted in
+# days (0 = no limit)
+SALE_BATCH_MAX_SIZE = config('SALE_BATCH_MAX_SIZE', default=500, cast=int)
+SALE_BATCH_CHUNK_SIZE = config('SALE_BATCH_CHUNK_SIZE', default=50, cast=int)
+SALE_OFFLINE_MAX_AGE_DAYS = config('SALE_OFFLINE_MAX_AGE_DAYS', default=7, cast=int)
+
+# Barcode scan lookup (`/api/products/scan/`): seconds results stay in the
+# shared cache, plus size and seconds of each process's in-memory LRU
+PRODUCT_SCAN_CACHE_TTL = config('PRODUCT_SCAN_CACHE_TTL', default=300, cast=int)
+PRODUCT_SCAN_LRU_SIZE = config('PRODUCT_SCAN_LRU_SIZE', default=10000, cast=int)
+PRODUCT_SCAN_LOCAL_TTL = config('PRODUCT_SCAN_LOCAL_TTL', default=30, cast=int)
+
+# POS catalogue snapshot exports (`/api/products/catalogue-snapshot/`), one
+# gzipped JSON-lines file per company and snapshot version
+CATALOGUE_SNAPSHOT_DIR = config('CATALOGUE_SNAPSHOT_DIR', default=str(MEDIA_ROOT / 'catalogue_snapshots'))
+
+# Cached category tree (`/api/categories/tree/`): seconds a rendered tree
+# stays cached, and seconds a cached catalogue version is trusted (writes
+# store the new version on commit; this bounds concurrent-write races)
+CATEGORY_TREE_CACHE_TTL = config('CATEGORY_TREE_CACHE_TTL', default=3600, cast=int)
+CATEGORY_TREE_VERSION_TTL = config('CATEGORY_TREE_VERSION_TTL', default=10, cast=int)
+
+# Customer lookup (`/api/customers/search/`): lowest trigram similarity (0-1)
+# a fuzzy match needs when no customer matches by prefix
+CUSTOMER_SEARCH_FUZZY_THRESHOLD = config('CUSTOMER_SEARCH_FUZZY_THRESHOLD', default=0.3, cast=float)
+
+# Admin dashboard statistics (customers/suppliers/companies/locations
+# `stats/` endpoints): seconds cached values live; writes invalidate them
+# immediately, this only bounds time-relative counters such as "this month"
+DASHBOARD_STATS_TTL = config('DASHBOARD_STATS_TTL', default=300, cast=int)
+
+# Customer/supplier exports (`export/` actions): files of background export
+# jobs, how they run ('thread' after the request, or 'queue' for
+# `manage.py run_export_jobs`) and the row counts above which a CSV or Excel
+# export is always queued instead of streamed (0 = never)
+EXPORT_DIR = config('EXPORT_DIR', default=str(MEDIA_ROOT / 'exports'))
+EXPORT_JOB_RUNNER = config('EXPORT_JOB_RUNNER', default='thread')
+EXPORT_SYNC_MAX_ROWS = config('EXPORT_SYNC_MAX_ROWS', default=200000, cast=int)
+EXPORT_XLSX_SYNC_MAX_ROWS = config('EXPORT_XLSX_SYNC_MAX_ROWS', default=50000, cast=int)
+
+# Generated spreadsheets (master data upload templates): one file per template
+# and layout version, rebuilt when the template definition changes
+SPREADSHEET_CACHE_DIR = config('SPREADSHEET_CACHE_DIR', default=str(MEDIA_ROOT / 'spreadsheet_cache'))
+
+# Compiled per-user menu permissions (`users.services.menu_permissions`) and
+# accessible locations (`users.services.location_access`): seconds a compiled
+# map stays cached, and seconds a process may keep using a cached permissions
+# or locations version after another process bumps it (bumps in the same
+# process, or with a shared cache backend, are seen immediately)
+PERMISSION_CACHE_TTL = config('PERMISSION_CACHE_TTL', default=3600, cast=int)
+PERMISSION_VERSION_TTL = config('PERMISSION_VERSION_TTL', default=10, cast=int)
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from utils import stats as dashboard_stats
 from .models import Customer
 
 
@@ -147,7 +148,7 @@ class CustomerAdmin(admin.ModelAdmin):
     vip_badge.admin_order_field = 'is_vip'
     
     def total_purchases_display(self, obj):
-        """Display total purchases (placeholder)."""
+        """Display total purchases from the purchase rollup."""
         total = obj.get_total_purchases()
         count = obj.get_purchase_count()
         if count > 0:
@@ -162,42 +163,48 @@ class CustomerAdmin(admin.ModelAdmin):
     def activate_customers(self, request, queryset):
         """Activate selected customers."""
         updated = queryset.update(is_active=True)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'{updated} customers were successfully activated.')
     activate_customers.short_description = 'Activate selected customers'
     
     def deactivate_customers(self, request, queryset):
         """Deactivate selected customers."""
         updated = queryset.update(is_active=False)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'{updated} customers were successfully deactivated.')
     deactivate_customers.short_description = 'Deactivate selected customers'
     
     def make_vip(self, request, queryset):
         """Make selected customers VIP."""
         updated = queryset.update(is_vip=True)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'{updated} customers were granted VIP status.')
     make_vip.short_description = 'Grant VIP status'
     
     def remove_vip(self, request, queryset):
         """Remove VIP status from selected customers."""
         updated = queryset.update(is_vip=False)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'VIP status removed from {updated} customers.')
     remove_vip.short_description = 'Remove VIP status'
     
     def enable_credit(self, request, queryset):
         """Enable credit for selected customers."""
         updated = queryset.update(allow_credit=True)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'Credit enabled for {updated} customers.')
     enable_credit.short_description = 'Enable credit'
     
     def disable_credit(self, request, queryset):
         """Disable credit for selected customers."""
         updated = queryset.update(allow_credit=False)
+        dashboard_stats.invalidate('customers')
         self.message_user(request, f'Credit disabled for {updated} customers.')
     disable_credit.short_description = 'Disable credit'
     
     def get_queryset(self, request):
         """Optimize queryset for admin list view."""
-        return super().get_queryset(request).select_related()
+        return super().get_queryset(request).select_related('purchase_rollup')
     
     def save_model(self, request, obj, form, change):
         """Custom save logic for admin."""
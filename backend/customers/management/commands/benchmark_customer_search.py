@@ -0,0 +1,163 @@
+"""
+Django management command to benchmark the POS customer lookup on a large
+synthetic customer table: the token-index search (prefix and fuzzy) against
+the former OR of seven ``icontains`` predicates.
+
+The customers are generated inside a transaction that is rolled back.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from customers.models import Customer
+from customers.services import search
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated customers."""
+
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Amit', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gaurav', 'Ishaan',
+    'Kavya', 'Kiran', 'Lakshmi', 'Meera', 'Mohan', 'Neha', 'Nikhil', 'Pooja', 'Priya', 'Rahul',
+    'Ravi', 'Rohan', 'Sanjay', 'Sneha', 'Suresh', 'Tanvi', 'Varun', 'Vijay', 'Yash', 'Zara',
+    'John', 'Mary', 'James', 'Linda', 'Robert', 'Maria', 'David', 'Sarah', 'Michael', 'Emma',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Iyer', 'Nair', 'Reddy', 'Patel', 'Shah', 'Mehta', 'Gupta', 'Singh',
+    'Kumar', 'Rao', 'Das', 'Bose', 'Menon', 'Pillai', 'Joshi', 'Kulkarni', 'Desai', 'Chopra',
+    'Smith', 'Johnson', 'Brown', 'Garcia', "O'Brien", 'Fernandes', 'DSouza', 'Mathew', 'Thomas', 'George',
+]
+
+
+def _legacy_search(query):
+    """The former CustomerViewSet.search query."""
+    return list(Customer.objects.filter(
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(company_name__icontains=query) |
+        Q(customer_code__icontains=query) |
+        Q(email__icontains=query) |
+        Q(phone__icontains=query) |
+        Q(mobile__icontains=query)
+    ).filter(is_active=True)[:20])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark customer search on a large synthetic customer table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Customers to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (median reported)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Customers inserted per batch')
+        parser.add_argument('--skip-legacy', action='store_true', help='Skip the icontains baseline')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._benchmark(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _benchmark(self, options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        sample = self._generate(rng, options['rows'], options['batch_size'])
+        self.stdout.write(
+            f'Generated {options["rows"]} customers and '
+            f'{search.CustomerSearchToken.objects.count()} tokens in {time.perf_counter() - start:.1f}s '
+            f'(fuzzy index: {"yes" if search.fts_available() or connection.vendor == "postgresql" else "no"})\n'
+        )
+
+        queries = [
+            ('last name prefix', sample['last_name'][:3]),
+            ('first + last', f'{sample["first_name"]} {sample["last_name"]}'),
+            ('phone fragment', sample['phone'][-10:-4]),
+            ('phone formatted', f'{sample["phone"][-10:-5]} {sample["phone"][-5:]}'),
+            ('customer code', sample['customer_code']),
+            ('email prefix', sample['email'].split('@')[0]),
+            ('typo (fuzzy)', self._typo(sample['last_name'])),
+            ('no match', 'zzqxv'),
+        ]
+        self.stdout.write(f'{"query":>18} {"match":>7} {"rows":>5} {"queries":>8} {"ms":>9} {"legacy ms":>10}')
+        for label, query in queries:
+            (results, match), queries_run, elapsed = self._measure(
+                lambda: search.search(query), options['repeat']
+            )
+            legacy = '-'
+            if not options['skip_legacy']:
+                _, _, legacy_elapsed = self._measure(lambda: (_legacy_search(query), None), options['repeat'])
+                legacy = f'{legacy_elapsed:.1f}'
+            self.stdout.write(
+                f'{label:>18} {match or "-":>7} {len(results):>5} {queries_run:>8} {elapsed:>9.1f} {legacy:>10}'
+            )
+
+    def _typo(self, word):
+        # Replace the last vowel: a one-letter slip that breaks every prefix match
+        for index in range(len(word) - 1, 0, -1):
+            if word[index] in 'aeiou':
+                return word[:index] + ('e' if word[index] != 'e' else 'a') + word[index + 1:]
+        return word + 'x'
+
+    def _generate(self, rng, rows, batch_size):
+        sample = None
+        for start in range(0, rows, batch_size):
+            customers = []
+            for index in range(start, min(start + batch_size, rows)):
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                customers.append(Customer(
+                    customer_code=f'BM-{index:08d}',
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=f'{first_name}.{last_name}{index}@example.com'.lower().replace("'", ''),
+                    phone=f'+91{rng.randint(6000000000, 9999999999)}',
+                    mobile=f'+91{rng.randint(6000000000, 9999999999)}' if index % 3 == 0 else None,
+                    is_active=index % 20 != 0,
+                ))
+            Customer.objects.bulk_create(customers, batch_size=batch_size)
+            self._insert_tokens(customers)
+            if sample is None:
+                sample = {field: getattr(customers[1], field) for field in search.TOKEN_FIELDS}
+            done = start + len(customers)
+            if done % 100000 < batch_size:
+                self.stdout.write(f'  {done} customers generated')
+        return sample
+
+    def _insert_tokens(self, customers):
+        # Same rows as search.sync() would write, inserted without the ORM overhead
+        pk_field = Customer._meta.pk
+        rows = [
+            (pk_field.get_db_prep_value(customer.pk, connection), token, field)
+            for customer in customers
+            for token, field in search.tokens_for({name: getattr(customer, name) for name in search.TOKEN_FIELDS})
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {search.CustomerSearchToken._meta.db_table} (customer_id, token, field) '
+                'VALUES (%s, %s, %s)',
+                rows
+            )
+
+    def _measure(self, runner, repeat):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        timings = []
+        result = None
+        for run in range(repeat):
+            queries.clear()
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                result = runner()
+                timings.append((time.perf_counter() - start) * 1000)
+        return result, len(queries), statistics.median(timings)
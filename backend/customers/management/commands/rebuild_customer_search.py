@@ -0,0 +1,29 @@
+"""
+Django management command to re-tokenise every customer for the POS search
+index, e.g. after customers were imported with bulk operations that bypass
+Customer.save(). On SQLite the FTS5 trigram table can be rebuilt from the
+token table as well.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from customers.services import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer search tokens (and the SQLite trigram table)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=search.BATCH_SIZE, help='Customers per chunk')
+        parser.add_argument('--fts', action='store_true', help='Also rebuild the SQLite FTS5 trigram table')
+
+    def handle(self, *args, **options):
+        def progress(done):
+            if done % 100000 < options['batch_size']:
+                self.stdout.write(f'  {done} customers indexed')
+
+        total, added, removed = search.rebuild(options['batch_size'], progress=progress)
+        if options['fts'] and search.fts_available():
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('rebuild')")
+        self.stdout.write(self.style.SUCCESS(f'{total} customers indexed: {added} tokens added, {removed} removed'))
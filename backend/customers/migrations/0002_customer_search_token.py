@@ -0,0 +1,106 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SQLITE_FTS = [
+    # External-content FTS5 table over the token column, kept in step by triggers
+    "CREATE VIRTUAL TABLE customer_search_fts USING fts5("
+    "token, content='customer_search_tokens', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER customer_search_fts_insert AFTER INSERT ON customer_search_tokens BEGIN "
+    "INSERT INTO customer_search_fts(rowid, token) VALUES (new.id, new.token); END",
+    "CREATE TRIGGER customer_search_fts_delete AFTER DELETE ON customer_search_tokens BEGIN "
+    "INSERT INTO customer_search_fts(customer_search_fts, rowid, token) VALUES ('delete', old.id, old.token); END",
+    "CREATE TRIGGER customer_search_fts_update AFTER UPDATE ON customer_search_tokens BEGIN "
+    "INSERT INTO customer_search_fts(customer_search_fts, rowid, token) VALUES ('delete', old.id, old.token); "
+    "INSERT INTO customer_search_fts(rowid, token) VALUES (new.id, new.token); END",
+]
+
+SQLITE_FTS_DROP = [
+    'DROP TRIGGER IF EXISTS customer_search_fts_update',
+    'DROP TRIGGER IF EXISTS customer_search_fts_delete',
+    'DROP TRIGGER IF EXISTS customer_search_fts_insert',
+    'DROP TABLE IF EXISTS customer_search_fts',
+]
+
+POSTGRES_TRIGRAM = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS customer_search_token_trgm '
+    'ON customer_search_tokens USING gin (token gin_trgm_ops)',
+]
+
+
+def create_trigram_index(apps, schema_editor):
+    """Fuzzy-match index: FTS5 trigram table on SQLite, pg_trgm GIN index on PostgreSQL."""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+                # Fuzzy search is skipped without FTS5; prefix search still works
+                return
+        statements = SQLITE_FTS
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_TRIGRAM
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS customer_search_token_trgm')
+
+
+def index_existing_customers(apps, schema_editor):
+    """Tokenise every existing customer."""
+    from customers.services.search import TOKEN_FIELDS, tokens_for
+
+    Customer = apps.get_model('customers', 'Customer')
+    CustomerSearchToken = apps.get_model('customers', 'CustomerSearchToken')
+    rows = []
+    for values in Customer.objects.values('id', *TOKEN_FIELDS).iterator(chunk_size=2000):
+        rows.extend(
+            CustomerSearchToken(customer_id=values['id'], token=token, field=field)
+            for token, field in tokens_for(values)
+        )
+        if len(rows) >= 5000:
+            CustomerSearchToken.objects.bulk_create(rows)
+            rows = []
+    CustomerSearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(help_text='Normalised token (lowercase, accents and punctuation removed)', max_length=100)),
+                ('field', models.CharField(choices=[('name', 'Name'), ('code', 'Customer code'), ('email', 'Email'), ('phone', 'Phone')], help_text='Customer field the token was taken from', max_length=10)),
+                ('customer', models.ForeignKey(help_text='Customer this token belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='customers.customer')),
+            ],
+            options={
+                'verbose_name': 'Customer Search Token',
+                'verbose_name_plural': 'Customer Search Tokens',
+                'db_table': 'customer_search_tokens',
+                'indexes': [models.Index(fields=['token'], name='customer_se_token_82d02a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='customersearchtoken',
+            constraint=models.UniqueConstraint(fields=('customer', 'token', 'field'), name='uniq_customer_search_token'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(index_existing_customers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinLengthValidator, RegexValidator
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from decimal import Decimal
 import uuid
 import re
 
@@ -277,27 +278,44 @@ class Customer(models.Model):
             if not cls.objects.filter(customer_code=code).exists():
                 return code
     
+    def _purchase_rollup(self):
+        """The customer's purchase rollup (kept by the sales app), or None before the first sale."""
+        try:
+            return self.purchase_rollup
+        except ObjectDoesNotExist:
+            return None
+    
     def get_total_purchases(self):
         """Get total purchase amount for this customer."""
-        # This will be implemented when Sales module is ready
-        return 0.00
+        rollup = self._purchase_rollup()
+        return rollup.lifetime_spend if rollup else Decimal('0.00')
     
     def get_purchase_count(self):
         """Get total number of purchases for this customer."""
-        # This will be implemented when Sales module is ready
-        return 0
+        rollup = self._purchase_rollup()
+        return rollup.purchase_count if rollup else 0
     
     def get_average_purchase_amount(self):
         """Get average purchase amount for this customer."""
         count = self.get_purchase_count()
         if count > 0:
-            return self.get_total_purchases() / count
-        return 0.00
+            return (self.get_total_purchases() / count).quantize(Decimal('0.01'))
+        return Decimal('0.00')
     
     def get_last_purchase_date(self):
         """Get the date of the last purchase."""
         return self.last_purchase_date
     
+    def get_first_purchase_date(self):
+        """Get the date of the first purchase."""
+        rollup = self._purchase_rollup()
+        return rollup.first_purchase_at if rollup else None
+    
+    def get_outstanding_credit(self):
+        """Credit-tender amount charged to this customer's account and not yet settled."""
+        rollup = self._purchase_rollup()
+        return rollup.credit_outstanding if rollup else Decimal('0.00')
+    
     def is_new_customer(self):
         """Check if this is a new customer (no purchases yet)."""
         return self.get_purchase_count() == 0
@@ -311,10 +329,11 @@ class Customer(models.Model):
         elif self.is_new_customer():
             return 'new'
         elif self.last_purchase_date:
-            from datetime import datetime, timedelta
-            if self.last_purchase_date < datetime.now().date() - timedelta(days=365):
+            from datetime import timedelta
+            from django.utils import timezone
+            if self.last_purchase_date < timezone.now() - timedelta(days=365):
                 return 'inactive_long'
-            elif self.last_purchase_date < datetime.now().date() - timedelta(days=90):
+            elif self.last_purchase_date < timezone.now() - timedelta(days=90):
                 return 'inactive_recent'
         return 'active'
     
@@ -322,18 +341,63 @@ class Customer(models.Model):
         """Check if customer can make a credit purchase of given amount."""
         if not self.allow_credit:
             return False
-        
-        # This will be enhanced when we implement credit tracking
-        return amount <= self.credit_limit
+        return amount <= self.get_available_credit()
     
     def get_available_credit(self):
         """Get available credit amount."""
         if not self.allow_credit:
-            return 0.00
-        
-        # This will be enhanced when we implement credit tracking
-        return self.credit_limit
+            return Decimal('0.00')
+        return max(Decimal(str(self.credit_limit)) - self.get_outstanding_credit(), Decimal('0.00'))
     
     def get_display_customer_type(self):
         """Get formatted customer type for display."""
-        return dict(self.CUSTOMER_TYPES).get(self.customer_type, self.customer_type)
\ No newline at end of file
+        return dict(self.CUSTOMER_TYPES).get(self.customer_type, self.customer_type)
+
+
+class CustomerSearchToken(models.Model):
+    """
+    Normalised search token of a customer (see customers.services.search).
+    
+    One row per token: folded name words, compacted code and email, and
+    digits-only phone numbers. Prefix lookups are index range scans on
+    ``token``. The integer key doubles as the rowid of the trigram index
+    used for fuzzy matching.
+    """
+    
+    FIELD_CHOICES = [
+        ('name', 'Name'),
+        ('code', 'Customer code'),
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        help_text="Customer this token belongs to"
+    )
+    token = models.CharField(
+        max_length=100,
+        help_text="Normalised token (lowercase, accents and punctuation removed)"
+    )
+    field = models.CharField(
+        max_length=10,
+        choices=FIELD_CHOICES,
+        help_text="Customer field the token was taken from"
+    )
+    
+    class Meta:
+        db_table = 'customer_search_tokens'
+        verbose_name = 'Customer Search Token'
+        verbose_name_plural = 'Customer Search Tokens'
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'token', 'field'], name='uniq_customer_search_token'),
+        ]
+        indexes = [
+            models.Index(fields=['token']),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} ({self.field})"
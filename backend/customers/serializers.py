@@ -48,6 +48,7 @@ class CustomerDetailSerializer(serializers.ModelSerializer):
     purchase_count = serializers.SerializerMethodField()
     average_purchase_amount = serializers.SerializerMethodField()
     available_credit = serializers.SerializerMethodField()
+    outstanding_credit = serializers.SerializerMethodField()
     
     class Meta:
         model = Customer
@@ -73,6 +74,10 @@ class CustomerDetailSerializer(serializers.ModelSerializer):
     def get_available_credit(self, obj):
         """Get available credit."""
         return obj.get_available_credit()
+    
+    def get_outstanding_credit(self, obj):
+        """Get credit charged to the customer's account."""
+        return obj.get_outstanding_credit()
 
 
 class CustomerCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1 @@
+# Customers services
@@ -0,0 +1,284 @@
+"""
+Customer lookup index for the POS search box.
+
+Every customer has a set of normalised tokens in CustomerSearchToken:
+
+* name words from first/last/company name, folded (lowercase, accents
+  removed) and compacted ("O'Brien" -> "obrien", plus "o" and "brien"),
+* the compacted customer code and its digits ("CUST-004211" -> "cust004211",
+  "004211"),
+* the compacted email ("jo.smith@shop.in" -> "josmithshopin"),
+* digits-only phone and mobile numbers, plus their last 10 digits so
+  national numbers match without the country code.
+
+A query is split into terms normalised the same way; a customer matches when
+every term is a prefix of one of its tokens. Each term is one range scan on
+the token index (``prefix_filter``), so a keystroke never scans customers.
+
+When nothing matches by prefix, names and emails are matched fuzzily with
+trigrams: through the FTS5 ``customer_search_fts`` table on SQLite, or the
+pg_trgm GIN index on PostgreSQL (both created by the customers migrations).
+Candidates are re-ranked with pg_trgm-style trigram similarity.
+
+Tokens are kept current by the Customer post_save handler
+(``customers.signals``); ``rebuild`` re-indexes everything. Queryset
+``update()`` and bulk writes send no signals: code that uses them on
+TOKEN_FIELDS calls ``sync_queryset`` (or ``sync``) afterwards.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from ..models import Customer, CustomerSearchToken
+
+
+FTS_TABLE = 'customer_search_fts'
+TOKEN_FIELDS = ('first_name', 'last_name', 'company_name', 'customer_code', 'email', 'phone', 'mobile')
+FUZZY_FIELDS = ('name', 'email')
+MAX_TOKEN_LENGTH = 100
+NATIONAL_DIGITS = 10
+FUZZY_MIN_LENGTH = 3
+FUZZY_CANDIDATES = 200
+BATCH_SIZE = 2000
+
+# A query made only of these is a phone number typed with separators
+PHONE_QUERY = re.compile(r'^[\d\s+\-().]+$')
+
+
+def fold(text):
+    """Lowercase with accents removed."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def compact(text):
+    """Folded text with everything but letters and digits removed."""
+    return re.sub(r'[\W_]+', '', fold(text))
+
+
+def digits(text):
+    return re.sub(r'[^0-9]+', '', str(text or ''))
+
+
+def tokens_for(values):
+    """
+    {(token, field)} for a customer's field values (a dict keyed by
+    ``TOKEN_FIELDS``; missing or empty values are skipped).
+    """
+    tokens = set()
+    for name_field in ('first_name', 'last_name', 'company_name'):
+        for word in fold(values.get(name_field)).split():
+            tokens.add((compact(word), 'name'))
+            parts = [part for part in re.split(r'[\W_]+', word) if part]
+            if len(parts) > 1:
+                tokens.update((part, 'name') for part in parts)
+
+    code = values.get('customer_code')
+    if code:
+        tokens.add((compact(code), 'code'))
+        tokens.add((digits(code), 'code'))
+
+    if values.get('email'):
+        tokens.add((compact(values['email']), 'email'))
+
+    for phone_field in ('phone', 'mobile'):
+        number = digits(values.get(phone_field))
+        tokens.add((number, 'phone'))
+        if len(number) > NATIONAL_DIGITS:
+            tokens.add((number[-NATIONAL_DIGITS:], 'phone'))
+
+    return {(token[:MAX_TOKEN_LENGTH], field) for token, field in tokens if token}
+
+
+def query_terms(query):
+    """Normalised terms of a search query (a phone-like query is one term)."""
+    query = str(query or '').strip()
+    if PHONE_QUERY.match(query) and digits(query):
+        return [digits(query)]
+    terms = []
+    for raw in query.split():
+        term = compact(raw)[:MAX_TOKEN_LENGTH]
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def prefix_filter(term, field='token'):
+    """
+    Q matching values that start with ``term``, written as a range so it is
+    served by the B-tree index on every backend (``startswith`` becomes a
+    case-insensitive LIKE on SQLite, which cannot use it).
+    """
+    return Q(**{f'{field}__gte': term, f'{field}__lt': term[:-1] + chr(ord(term[-1]) + 1)})
+
+
+def sync(customers):
+    """
+    Bring the tokens of ``customers`` (instances or value dicts with ``id``)
+    up to date, touching only tokens that changed. Returns (added, removed).
+    """
+    wanted = {}
+    for customer in customers:
+        values = customer if isinstance(customer, dict) else {
+            field: getattr(customer, field) for field in TOKEN_FIELDS
+        }
+        pk = values['id'] if isinstance(customer, dict) else customer.pk
+        wanted[pk] = tokens_for(values)
+    if not wanted:
+        return 0, 0
+
+    existing = {}
+    for pk, customer_id, token, field in CustomerSearchToken.objects.filter(
+        customer_id__in=list(wanted)
+    ).values_list('id', 'customer_id', 'token', 'field'):
+        existing.setdefault(customer_id, {})[(token, field)] = pk
+
+    stale = [
+        pk
+        for customer_id, tokens in existing.items()
+        for key, pk in tokens.items()
+        if key not in wanted[customer_id]
+    ]
+    added = [
+        CustomerSearchToken(customer_id=customer_id, token=token, field=field)
+        for customer_id, tokens in wanted.items()
+        for token, field in tokens
+        if (token, field) not in existing.get(customer_id, {})
+    ]
+    for start in range(0, len(stale), BATCH_SIZE):
+        CustomerSearchToken.objects.filter(pk__in=stale[start:start + BATCH_SIZE]).delete()
+    CustomerSearchToken.objects.bulk_create(added, batch_size=BATCH_SIZE)
+    return len(added), len(stale)
+
+
+def sync_queryset(queryset):
+    """``sync`` the customers of a queryset, e.g. after ``queryset.update()``."""
+    return sync(list(queryset.order_by().values('id', *TOKEN_FIELDS)))
+
+
+def rebuild(batch_size=BATCH_SIZE, progress=None):
+    """Re-index every customer in primary-key chunks; returns (customers, added, removed)."""
+    total = added = removed = 0
+    last_pk = None
+    while True:
+        chunk = Customer.objects.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values('id', *TOKEN_FIELDS)[:batch_size])
+        if not rows:
+            break
+        chunk_added, chunk_removed = sync(rows)
+        total += len(rows)
+        added += chunk_added
+        removed += chunk_removed
+        last_pk = rows[-1]['id']
+        if progress:
+            progress(total)
+    return total, added, removed
+
+
+def fts_available():
+    """Whether the SQLite trigram table exists (created by the migrations)."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams: the word padded with two spaces in front, one behind."""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def similarity(left, right):
+    """Share of trigrams two words have in common (0..1), as pg_trgm's similarity()."""
+    left, right = trigrams(left), trigrams(right)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _fuzzy_candidates(term, limit):
+    """(customer_id, token) pairs whose name/email token resembles ``term``."""
+    if connection.vendor == 'postgresql':
+        return list(
+            CustomerSearchToken.objects.filter(field__in=FUZZY_FIELDS).alias(
+                similar=RawSQL('"customer_search_tokens"."token" %% %s', (term,), output_field=BooleanField())
+            ).filter(similar=True).annotate(
+                score=RawSQL('similarity("customer_search_tokens"."token", %s)', (term,), output_field=FloatField())
+            ).order_by('-score').values_list('customer_id', 'token')[:limit]
+        )
+    if not fts_available():
+        return []
+
+    # Any shared trigram is a candidate; FTS5's bm25 rank puts the closest first
+    grams = {term[index:index + 3] for index in range(len(term) - 2)}
+    match = ' OR '.join('"{}"'.format(gram.replace('"', '""')) for gram in sorted(grams))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT t.customer_id, t.token FROM {FTS_TABLE} f '
+            f'JOIN {CustomerSearchToken._meta.db_table} t ON t.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND t.field IN (%s, %s) ORDER BY f.rank LIMIT %s',
+            [match, *FUZZY_FIELDS, limit]
+        )
+        return [(Customer._meta.pk.to_python(customer_id), token) for customer_id, token in cursor.fetchall()]
+
+
+def fuzzy_ids(terms, limit=20):
+    """Customer IDs ranked by trigram similarity of their tokens to ``terms``."""
+    terms = [term for term in terms if len(term) >= FUZZY_MIN_LENGTH]
+    if not terms:
+        return []
+    threshold = getattr(settings, 'CUSTOMER_SEARCH_FUZZY_THRESHOLD', 0.3)
+
+    scores = {}
+    for term in terms:
+        best = {}
+        for customer_id, token in _fuzzy_candidates(term, FUZZY_CANDIDATES):
+            best[customer_id] = max(best.get(customer_id, 0.0), similarity(term, token))
+        for customer_id, score in best.items():
+            scores[customer_id] = scores.get(customer_id, 0.0) + score
+
+    ranked = sorted(
+        ((score / len(terms), customer_id) for customer_id, score in scores.items()),
+        key=lambda pair: -pair[0]
+    )
+    return [customer_id for score, customer_id in ranked if score >= threshold][:limit * 2]
+
+
+def search(query, limit=20, active_only=True, mode='auto'):
+    """
+    (customers, match) for a POS lookup.
+
+    ``mode`` is 'prefix', 'fuzzy' or 'auto' (prefix, then fuzzy when nothing
+    matched). ``match`` says which one produced the results.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], None
+
+    customers = Customer.objects.all()
+    if active_only:
+        customers = customers.filter(is_active=True)
+
+    if mode in ('auto', 'prefix'):
+        matched = customers
+        for term in terms:
+            matched = matched.filter(
+                pk__in=CustomerSearchToken.objects.filter(prefix_filter(term)).values('customer_id')
+            )
+        results = list(matched.order_by('last_name', 'first_name')[:limit])
+        if results or mode == 'prefix':
+            return results, 'prefix'
+
+    ids = fuzzy_ids(terms, limit)
+    if not ids:
+        return [], 'fuzzy'
+    found = customers.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found][:limit], 'fuzzy'
@@ -0,0 +1,35 @@
+"""Customer dashboard counters (``/api/customers/stats/``), see utils.stats."""
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from utils import stats
+
+from ..models import Customer
+
+
+def _aggregates():
+    first_day_of_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'total_customers': Count('id'),
+        'active_customers': Count('id', filter=Q(is_active=True)),
+        'new_customers_this_month': Count('id', filter=Q(created_at__gte=first_day_of_month)),
+        'vip_customers': Count('id', filter=Q(is_vip=True)),
+        'business_customers': Count('id', filter=Q(customer_type='business')),
+        'individual_customers': Count('id', filter=Q(customer_type='individual')),
+        'customers_with_credit': Count('id', filter=Q(allow_credit=True)),
+        'total_credit_limit': Sum('credit_limit', filter=Q(allow_credit=True)),
+        'average_discount_percentage': Avg('discount_percentage'),
+    }
+
+
+def _build(values, extra):
+    return {
+        **values,
+        'inactive_customers': values['total_customers'] - values['active_customers'],
+        'total_credit_limit': values['total_credit_limit'] or 0,
+        'average_discount_percentage': round(values['average_discount_percentage'] or 0, 2),
+    }
+
+
+def register_dashboards():
+    stats.register(stats.Dashboard('customers', Customer, _aggregates, _build))
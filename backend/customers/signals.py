@@ -0,0 +1,18 @@
+"""
+Keep the customer search tokens (``customers.services.search``) in step with
+Customer saves. Deleting a customer cascades to its tokens.
+"""
+from django.db.models.signals import post_save
+
+from .models import Customer
+
+
+def index_customer(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services import search
+    search.sync([instance])
+
+
+def connect_search_index():
+    post_save.connect(index_customer, sender=Customer, dispatch_uid='customers.search.customer_save')
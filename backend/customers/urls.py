@@ -20,7 +20,7 @@ urlpatterns = [
 
 # Custom endpoints:
 # GET    /api/customers/stats/              - Customer statistics
-# GET    /api/customers/search/?q=query     - Search customers
+# GET    /api/customers/search/?q=query     - Search customers (prefix, fuzzy fallback; &mode=prefix|fuzzy)
 # GET    /api/customers/{id}/history/       - Customer purchase history
 # POST   /api/customers/bulk_update/        - Bulk update customers
 # GET    /api/customers/export/             - Export customers data
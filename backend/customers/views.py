@@ -4,10 +4,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Customer
+from .services import search as search_index
+from utils import stats as dashboard_stats
+from masters.services import exports
+from masters.services.exports import Column
 from .serializers import (
     CustomerListSerializer,
     CustomerDetailSerializer,
@@ -54,6 +57,36 @@ class CustomerViewSet(viewsets.ModelViewSet):
     ]
     ordering = ['last_name', 'first_name']
     
+    # Export columns (``export`` action)
+    export_name = 'customers'
+    export_columns = [
+        Column('Customer Code', 'customer_code'),
+        Column('First Name', 'first_name'),
+        Column('Last Name', 'last_name'),
+        Column('Company Name', 'company_name'),
+        Column('Customer Type', 'customer_type'),
+        Column('Email', 'email'),
+        Column('Phone', 'phone'),
+        Column('Mobile', 'mobile'),
+        Column('Address Line 1', 'address_line_1'),
+        Column('Address Line 2', 'address_line_2'),
+        Column('City', 'city'),
+        Column('State', 'state'),
+        Column('Postal Code', 'postal_code'),
+        Column('Country', 'country'),
+        Column('Tax ID', 'tax_id'),
+        Column('Credit Limit', 'credit_limit'),
+        Column('Discount %', 'discount_percentage'),
+        Column('Active', 'is_active'),
+        Column('VIP', 'is_vip'),
+        Column('Allow Credit', 'allow_credit'),
+        Column('Purchase Count', 'purchase_rollup__purchase_count'),
+        Column('Total Purchases', 'purchase_rollup__lifetime_spend'),
+        Column('Outstanding Credit', 'purchase_rollup__credit_outstanding'),
+        Column('Last Purchase', 'last_purchase_date'),
+        Column('Created At', 'created_at'),
+    ]
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
         if self.action == 'list':
@@ -68,7 +101,8 @@ class CustomerViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter queryset based on query parameters."""
-        queryset = Customer.objects.all()
+        # Purchase totals and status read the rollup: join it rather than one query per row
+        queryset = Customer.objects.select_related('purchase_rollup')
         
         # Filter by status
         status_filter = self.request.query_params.get('status', None)
@@ -119,47 +153,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def stats(self, request):
         """Get customer statistics."""
         try:
-            # Calculate statistics
-            total_customers = Customer.objects.count()
-            active_customers = Customer.objects.filter(is_active=True).count()
-            inactive_customers = total_customers - active_customers
-            
-            # New customers this month
-            first_day_of_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            new_customers_this_month = Customer.objects.filter(
-                created_at__gte=first_day_of_month
-            ).count()
-            
-            # Customer type breakdown
-            vip_customers = Customer.objects.filter(is_vip=True).count()
-            business_customers = Customer.objects.filter(customer_type='business').count()
-            individual_customers = Customer.objects.filter(customer_type='individual').count()
-            
-            # Credit information
-            customers_with_credit = Customer.objects.filter(allow_credit=True).count()
-            total_credit_limit = Customer.objects.filter(
-                allow_credit=True
-            ).aggregate(
-                total=Sum('credit_limit')
-            )['total'] or 0
-            
-            # Average discount
-            avg_discount = Customer.objects.aggregate(
-                avg=Avg('discount_percentage')
-            )['avg'] or 0
-            
-            stats_data = {
-                'total_customers': total_customers,
-                'active_customers': active_customers,
-                'inactive_customers': inactive_customers,
-                'new_customers_this_month': new_customers_this_month,
-                'vip_customers': vip_customers,
-                'business_customers': business_customers,
-                'individual_customers': individual_customers,
-                'customers_with_credit': customers_with_credit,
-                'total_credit_limit': total_credit_limit,
-                'average_discount_percentage': round(avg_discount, 2)
-            }
+            # All counters from one conditional-aggregation query, cached until
+            # the next customer write (see customers.services.stats)
+            stats_data = dashboard_stats.get('customers')
             
             serializer = CustomerStatsSerializer(stats_data)
             return Response(serializer.data)
@@ -181,20 +177,24 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Perform search across multiple fields
-        customers = Customer.objects.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(company_name__icontains=query) |
-            Q(customer_code__icontains=query) |
-            Q(email__icontains=query) |
-            Q(phone__icontains=query) |
-            Q(mobile__icontains=query)
-        ).filter(is_active=True)[:20]  # Limit to 20 results
+        mode = request.query_params.get('mode', 'auto')
+        if mode not in ('auto', 'prefix', 'fuzzy'):
+            return Response(
+                {'error': 'Invalid mode. Use: auto, prefix or fuzzy'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            limit = 20
+        
+        # Prefix match on the normalised token index, fuzzy trigram fallback
+        customers, match = search_index.search(query, limit=limit, mode=mode)
         
         serializer = CustomerSearchSerializer(customers, many=True)
         return Response({
-            'count': customers.count(),
+            'count': len(customers),
+            'match': match,
             'results': serializer.data
         })
     
@@ -203,14 +203,13 @@ class CustomerViewSet(viewsets.ModelViewSet):
         """Get customer purchase history."""
         customer = self.get_object()
         
-        # This will be enhanced when Sales module is implemented
         history_data = {
             'customer_id': customer.id,
             'total_purchases': customer.get_total_purchases(),
             'purchase_count': customer.get_purchase_count(),
             'average_purchase_amount': customer.get_average_purchase_amount(),
             'last_purchase_date': customer.get_last_purchase_date(),
-            'first_purchase_date': None,  # Will be implemented with Sales
+            'first_purchase_date': customer.get_first_purchase_date(),
             'favorite_products': [],  # Will be implemented with Sales
             'purchase_frequency': 'new' if customer.is_new_customer() else 'unknown'
         }
@@ -244,6 +243,10 @@ class CustomerViewSet(viewsets.ModelViewSet):
             
             # Apply updates
             updated_count = customers.update(**updates)
+            # update() sends no signals
+            dashboard_stats.invalidate('customers')
+            if set(updates) & set(search_index.TOKEN_FIELDS):
+                search_index.sync_queryset(customers)
             
             return Response({
                 'message': f'Successfully updated {updated_count} customers',
@@ -259,16 +262,24 @@ class CustomerViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """Export customers data (placeholder for future implementation)."""
-        # This can be enhanced to export to CSV, Excel, etc.
-        customers = self.filter_queryset(self.get_queryset())
-        serializer = CustomerListSerializer(customers, many=True)
+        """
+        Export the filtered customers as CSV (streamed) or Excel.
         
-        return Response({
-            'message': 'Export functionality will be implemented in future version',
-            'count': customers.count(),
-            'sample_data': serializer.data[:5]  # Return first 5 as sample
-        })
+        ``file_format`` is 'csv' (default) or 'xlsx'; ``background=true``
+        (or a very large result) queues an export job instead, answered with
+        202 and polled at ``export/jobs/<job_id>/``.
+        """
+        return exports.export_response(self, request)
+    
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[^/.]+)')
+    def export_job(self, request, job_id=None):
+        """Status of a background customer export."""
+        return exports.job_status_response(self, request, job_id)
+    
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[^/.]+)/download')
+    def export_download(self, request, job_id=None):
+        """Download the file of a completed customer export."""
+        return exports.job_download_response(self, request, job_id)
     
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
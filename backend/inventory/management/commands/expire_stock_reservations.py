@@ -0,0 +1,31 @@
+"""
+Django management command to sweep expired stock reservations back into
+available stock. Run it from cron, or with --loop as a long-lived worker.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.services import reservations
+
+
+class Command(BaseCommand):
+    help = 'Release stock reservations whose TTL has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reservations released per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping instead of exiting')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds to wait between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            expired = reservations.expire_due(batch_size=options['batch_size'])
+            total += expired
+            if expired:
+                self.stdout.write(f'Expired {expired} reservations')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Expired {total} reservations in total'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_alter_inventory_product_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reference_number',
+            field=models.CharField(blank=True, help_text='PO/SO/sale number', max_length=50),
+        ),
+    ]
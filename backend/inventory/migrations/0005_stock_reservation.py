@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:43
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_widen_movement_reference'),
+        ('organization', '0003_company_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField(help_text='Units held by this reservation')),
+                ('reference', models.CharField(blank=True, help_text='Order / cart reference the hold belongs to', max_length=50)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('released', 'Released'), ('expired', 'Expired')], default='active', max_length=20)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Released automatically after this time (empty = never)', null=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='organization.company')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.inventory')),
+            ],
+            options={
+                'verbose_name_plural': 'Stock Reservations',
+                'db_table': 'stock_reservations',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='stock_reser_status_da6fe9_idx'), models.Index(fields=['reference', 'status'], name='stock_reser_referen_14718e_idx')],
+            },
+        ),
+    ]
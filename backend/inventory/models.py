@@ -57,20 +57,34 @@ class Inventory(models.Model):
         """Check if we can fulfill an order with given quantity"""
         return self.available_stock >= quantity
 
-    def reserve_stock(self, quantity):
-        """Reserve stock for an order"""
-        if self.available_stock >= quantity:
-            self.reserved_stock += quantity
-            self.update_available_stock()
-            self.save(update_fields=['reserved_stock', 'available_stock', 'updated_at'])
-            return True
-        return False
+    def reserve_stock(self, quantity, reference='', ttl_minutes=None, created_by=None):
+        """
+        Reserve stock for an order.
+
+        Takes an expiring StockReservation hold (see
+        inventory.services.reservations); returns the reservation, or None
+        when not enough stock is available.
+        """
+        from inventory.services import reservations
+        
+        try:
+            created = reservations.reserve(
+                [(self.product_id, quantity)],
+                reference=reference,
+                ttl_minutes=ttl_minutes,
+                created_by=created_by
+            )
+        except reservations.InsufficientStock:
+            created = []
+        self.refresh_from_db(fields=['reserved_stock', 'available_stock', 'updated_at'])
+        return created[0] if created else None
 
     def release_reserved_stock(self, quantity):
-        """Release reserved stock (for cancelled orders)"""
-        self.reserved_stock = max(0, self.reserved_stock - quantity)
-        self.update_available_stock()
-        self.save(update_fields=['reserved_stock', 'available_stock', 'updated_at'])
+        """Release reserved stock (for cancelled orders), oldest holds first"""
+        from inventory.services.reservations import release_inventory_quantity
+        
+        release_inventory_quantity(self.pk, quantity)
+        self.refresh_from_db(fields=['reserved_stock', 'available_stock', 'updated_at'])
 
     def stock_level_status(self):
         """Determine stock level status"""
@@ -119,7 +133,7 @@ class StockMovement(models.Model):
     quantity_after = models.PositiveIntegerField(help_text="Stock level after this movement")
     unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     total_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    reference_number = models.CharField(max_length=10, blank=True, help_text="PO/SO number")
+    reference_number = models.CharField(max_length=50, blank=True, help_text="PO/SO/sale number")
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
     reason = models.TextField(blank=True, help_text="Reason for adjustment")
     notes = models.TextField(blank=True)
@@ -138,7 +152,7 @@ class StockMovement(models.Model):
 
     def save(self, *args, **kwargs):
         """Ensure stock levels are updated when movement is created"""
-        if not self.pk:  # Only on creation
+        if self._state.adding:  # Only on creation (pk is pre-filled by the UUID default)
             self.quantity_before = self.inventory.current_stock
             self.quantity_after = self.quantity_before + self.quantity_change
             
@@ -150,6 +164,40 @@ class StockMovement(models.Model):
         super().save(*args, **kwargs)
 
 
+class StockReservation(models.Model):
+    """Time-limited hold on stock for an order (layaway, online order, cart)"""
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='stock_reservations', null=True, blank=True)
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(help_text="Units held by this reservation")
+    reference = models.CharField(max_length=50, blank=True, help_text="Order / cart reference the hold belongs to")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Released automatically after this time (empty = never)")
+    released_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'stock_reservations'
+        verbose_name_plural = 'Stock Reservations'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['reference', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id} x{self.quantity} ({self.status})"
+
+
 class PurchaseOrder(models.Model):
     """Purchase orders for buying inventory from suppliers"""
     
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.db import transaction
-from .models import Inventory, StockMovement, PurchaseOrder, PurchaseOrderItem, StockAlert
+from .models import Inventory, StockMovement, StockReservation, PurchaseOrder, PurchaseOrderItem, StockAlert
 from products.models import ItemVariant
 from suppliers.models import Supplier
 
@@ -104,6 +104,55 @@ class StockMovementSerializer(serializers.ModelSerializer):
         return data
 
 
+class StockReservationSerializer(serializers.ModelSerializer):
+    """Serializer for stock reservations"""
+    
+    product = serializers.UUIDField(source='inventory.product_id', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = StockReservation
+        fields = [
+            'id', 'company', 'inventory', 'product', 'quantity', 'reference',
+            'status', 'status_display', 'expires_at', 'released_at',
+            'created_by', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class ReservationLineSerializer(serializers.Serializer):
+    """One cart line of a bulk reservation"""
+    
+    product = serializers.UUIDField(help_text="ItemVariant ID")
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class BulkReservationSerializer(serializers.Serializer):
+    """Serializer for reserving a whole cart in one call"""
+    
+    items = ReservationLineSerializer(many=True, allow_empty=False)
+    reference = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    ttl_minutes = serializers.IntegerField(
+        min_value=0,
+        required=False,
+        allow_null=True,
+        help_text="Minutes before the hold expires (default from settings, 0 = never)"
+    )
+
+
+class BulkReleaseSerializer(serializers.Serializer):
+    """Serializer for releasing reservations by ID and/or order reference"""
+    
+    reservation_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    reference = serializers.CharField(max_length=50, required=False, allow_blank=False)
+    
+    def validate(self, data):
+        """Require at least one selector"""
+        if not data.get('reservation_ids') and not data.get('reference'):
+            raise serializers.ValidationError("Provide reservation_ids or reference")
+        return data
+
+
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
     """Serializer for purchase order items"""
     
@@ -0,0 +1 @@
+# Inventory services
@@ -0,0 +1,256 @@
+"""
+Race-free stock reservations.
+
+Every availability check is folded into the UPDATE that takes the stock
+(``WHERE available_stock >= quantity``), so two orders racing for the last
+units cannot both win. A multi-SKU request is one UPDATE over all of its
+rows inside a savepoint: if fewer rows matched than were requested, the
+savepoint is rolled back and nothing is reserved.
+
+Reservations expire after ``settings.STOCK_RESERVATION_TTL_MINUTES`` unless
+the caller passes its own TTL; ``manage.py expire_stock_reservations`` sweeps
+expired holds back into available stock.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Inventory, StockReservation
+
+
+class InsufficientStock(Exception):
+    """Raised when a reservation request cannot be met in full."""
+
+    def __init__(self, shortages):
+        super().__init__('Not enough stock available')
+        self.shortages = shortages
+
+
+class _Rollback(Exception):
+    """Raised to undo a partially applied multi-SKU reservation."""
+
+
+def reservation_ttl(ttl_minutes=None):
+    """Reservation lifetime as a timedelta, or None for holds that never expire."""
+    if ttl_minutes is None:
+        ttl_minutes = getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 30)
+    return timedelta(minutes=ttl_minutes) if ttl_minutes else None
+
+
+def _group_by_quantity(quantities):
+    """{quantity: [key, ...]} so rows sharing a quantity share one WHEN branch."""
+    grouped = {}
+    for key, quantity in quantities.items():
+        grouped.setdefault(quantity, []).append(key)
+    return grouped
+
+
+def _shortages(quantities):
+    available = dict(
+        Inventory.objects.filter(product_id__in=quantities, is_active=True).values_list('product_id', 'available_stock')
+    )
+    return [
+        {'product': product_id, 'requested': quantity, 'available': available.get(product_id, 0)}
+        for product_id, quantity in quantities.items()
+        if available.get(product_id, 0) < quantity
+    ]
+
+
+def reserve(lines, reference='', ttl_minutes=None, created_by=None):
+    """
+    Reserve every line of a cart, or nothing.
+
+    ``lines`` is an iterable of (variant_id, quantity) pairs; repeated
+    variants are summed. Returns the created StockReservation rows or raises
+    InsufficientStock listing every line that could not be met.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + int(quantity)
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+
+    ttl = reservation_ttl(ttl_minutes)
+    try:
+        with transaction.atomic():
+            inventories = {
+                product_id: (inventory_id, company_id)
+                for inventory_id, product_id, company_id in Inventory.objects.filter(
+                    product_id__in=quantities,
+                    is_active=True
+                ).values_list('id', 'product_id', 'company_id')
+            }
+            if len(inventories) != len(quantities):
+                raise _Rollback()
+
+            by_inventory = {inventories[product_id][0]: quantity for product_id, quantity in quantities.items()}
+            condition = Q()
+            for inventory_id, quantity in by_inventory.items():
+                condition |= Q(pk=inventory_id, available_stock__gte=quantity)
+
+            grouped = _group_by_quantity(by_inventory)
+            updated = Inventory.objects.filter(condition).update(
+                reserved_stock=Case(
+                    *[When(pk__in=pks, then=F('reserved_stock') + Value(quantity)) for quantity, pks in grouped.items()],
+                    default=F('reserved_stock'),
+                    output_field=IntegerField()
+                ),
+                available_stock=Case(
+                    *[When(pk__in=pks, then=F('available_stock') - Value(quantity)) for quantity, pks in grouped.items()],
+                    default=F('available_stock'),
+                    output_field=IntegerField()
+                ),
+                updated_at=timezone.now()
+            )
+            if updated != len(by_inventory):
+                raise _Rollback()
+
+            expires_at = timezone.now() + ttl if ttl else None
+            return StockReservation.objects.bulk_create([
+                StockReservation(
+                    inventory_id=inventories[product_id][0],
+                    company_id=inventories[product_id][1],
+                    quantity=quantity,
+                    reference=reference,
+                    expires_at=expires_at,
+                    created_by=created_by
+                )
+                for product_id, quantity in quantities.items()
+            ])
+    except _Rollback:
+        pass
+    raise InsufficientStock(_shortages(quantities))
+
+
+def release_quantities(quantities):
+    """
+    Return reserved units to available stock, {inventory_id: quantity}.
+
+    One UPDATE for all rows; reserved stock never drops below zero.
+    """
+    quantities = {inventory_id: quantity for inventory_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return 0
+
+    def remaining(quantity):
+        return Greatest(F('reserved_stock') - Value(quantity), Value(0))
+
+    grouped = _group_by_quantity(quantities)
+    return Inventory.objects.filter(pk__in=quantities).update(
+        reserved_stock=Case(
+            *[When(pk__in=pks, then=remaining(quantity)) for quantity, pks in grouped.items()],
+            default=F('reserved_stock'),
+            output_field=IntegerField()
+        ),
+        available_stock=Case(
+            *[
+                When(pk__in=pks, then=Greatest(F('current_stock') - remaining(quantity), Value(0)))
+                for quantity, pks in grouped.items()
+            ],
+            default=F('available_stock'),
+            output_field=IntegerField()
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def release(reservation_ids=None, reference=None, status='released'):
+    """
+    Release active reservations by ID and/or order reference.
+
+    The reservations are locked and flipped out of ``active`` before their
+    units are returned, so a hold is never released twice (e.g. by the
+    expiry sweep and an explicit release at the same time). Returns the
+    number of reservations released.
+    """
+    if reservation_ids is None and not reference:
+        return 0
+
+    with transaction.atomic():
+        reservations = StockReservation.objects.select_for_update().filter(status='active')
+        if reservation_ids is not None:
+            reservations = reservations.filter(pk__in=list(reservation_ids))
+        if reference:
+            reservations = reservations.filter(reference=reference)
+        rows = list(reservations.values_list('id', 'inventory_id', 'quantity'))
+        if not rows:
+            return 0
+
+        now = timezone.now()
+        StockReservation.objects.filter(pk__in=[row[0] for row in rows]).update(
+            status=status,
+            released_at=now,
+            updated_at=now
+        )
+        quantities = {}
+        for _, inventory_id, quantity in rows:
+            quantities[inventory_id] = quantities.get(inventory_id, 0) + quantity
+        release_quantities(quantities)
+    return len(rows)
+
+
+def release_inventory_quantity(inventory_id, quantity):
+    """
+    Release ``quantity`` held units of one inventory row, oldest holds first.
+
+    For callers that release by count rather than by reservation (the
+    per-item release endpoint). Whole reservations are released and the last
+    one is reduced when it holds more than is left to release, so the expiry
+    sweep never hands the same units back again. Units beyond every active
+    hold (reserved before holds were tracked) are released as they are.
+    Returns the number of reservations fully released.
+    """
+    if quantity <= 0:
+        return 0
+
+    with transaction.atomic():
+        holds = list(
+            StockReservation.objects.select_for_update().filter(
+                inventory_id=inventory_id,
+                status='active'
+            ).order_by('created_at').values_list('id', 'quantity')
+        )
+        remaining = quantity
+        released_ids = []
+        for reservation_id, held in holds:
+            if remaining <= 0:
+                break
+            if held <= remaining:
+                released_ids.append(reservation_id)
+            else:
+                StockReservation.objects.filter(pk=reservation_id).update(
+                    quantity=held - remaining,
+                    updated_at=timezone.now()
+                )
+            remaining -= min(held, remaining)
+
+        if released_ids:
+            now = timezone.now()
+            StockReservation.objects.filter(pk__in=released_ids).update(
+                status='released',
+                released_at=now,
+                updated_at=now
+            )
+        release_quantities({inventory_id: quantity})
+    return len(released_ids)
+
+
+def expire_due(batch_size=500, now=None):
+    """Expire every active reservation past its TTL; returns the count."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        due = list(
+            StockReservation.objects.filter(
+                status='active',
+                expires_at__lte=now
+            ).order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not due:
+            return expired
+        expired += release(reservation_ids=due, status='expired')
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import InventoryViewSet, StockMovementViewSet, PurchaseOrderViewSet, StockAlertViewSet
+from .views import InventoryViewSet, StockMovementViewSet, StockReservationViewSet, PurchaseOrderViewSet, StockAlertViewSet
 
 router = DefaultRouter()
 router.register(r'inventory', InventoryViewSet)
 router.register(r'movements', StockMovementViewSet)
+router.register(r'reservations', StockReservationViewSet)
 router.register(r'purchase-orders', PurchaseOrderViewSet)
 router.register(r'alerts', StockAlertViewSet)
 
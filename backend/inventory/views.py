@@ -1,16 +1,32 @@
+import uuid
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction, models
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
-from .models import Inventory, StockMovement, PurchaseOrder, PurchaseOrderItem, StockAlert
+from .models import Inventory, StockMovement, StockReservation, PurchaseOrder, PurchaseOrderItem, StockAlert
 from .serializers import (
     InventorySerializer, InventoryListSerializer, StockMovementSerializer,
     PurchaseOrderSerializer, PurchaseOrderCreateSerializer, StockAlertSerializer,
-    StockAdjustmentSerializer, InventoryStatsSerializer
+    StockAdjustmentSerializer, InventoryStatsSerializer, StockReservationSerializer,
+    BulkReservationSerializer, BulkReleaseSerializer
 )
+from .services import reservations
+
+
+def _product_id_param(request):
+    """Optional ``product_id`` (ItemVariant id) query parameter; 400 when malformed."""
+    product_id = request.query_params.get('product_id') or None
+    if product_id is None:
+        return None
+    try:
+        return uuid.UUID(product_id)
+    except ValueError:
+        raise ValidationError({'product_id': 'Invalid product id'}) from None
 
 
 class InventoryViewSet(viewsets.ModelViewSet):
@@ -29,7 +45,7 @@ class InventoryViewSet(viewsets.ModelViewSet):
         queryset = Inventory.objects.select_related('product').all()
         
         # Filter by product (ItemVariant id)
-        product_id = self.request.query_params.get('product_id')
+        product_id = _product_id_param(self.request)
         if product_id:
             queryset = queryset.filter(product_id=product_id)
             
@@ -102,13 +118,29 @@ class InventoryViewSet(viewsets.ModelViewSet):
     def reserve_stock(self, request, pk=None):
         """Reserve stock for an order"""
         inventory = self.get_object()
-        quantity = request.data.get('quantity', 0)
+        try:
+            quantity = int(request.data.get('quantity', 0))
+            ttl_minutes = request.data.get('ttl_minutes')
+            ttl_minutes = int(ttl_minutes) if ttl_minutes is not None else None
+        except (TypeError, ValueError):
+            return Response({'error': 'Quantity and ttl_minutes must be whole numbers'}, status=status.HTTP_400_BAD_REQUEST)
         
         if quantity <= 0:
             return Response({'error': 'Quantity must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
+        if ttl_minutes is not None and ttl_minutes < 0:
+            return Response({'error': 'ttl_minutes must not be negative (0 = never expires)'}, status=status.HTTP_400_BAD_REQUEST)
             
-        if inventory.reserve_stock(quantity):
-            return Response({'message': f'Reserved {quantity} units of {inventory.product.variant_name}'})
+        reservation = inventory.reserve_stock(
+            quantity,
+            reference=str(request.data.get('reference', ''))[:50],
+            ttl_minutes=ttl_minutes,
+            created_by=request.user
+        )
+        if reservation:
+            return Response({
+                'message': f'Reserved {quantity} units of {inventory.product.variant_name}',
+                'reservation': StockReservationSerializer(reservation).data
+            })
         else:
             return Response({'error': 'Not enough stock available'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -116,11 +148,52 @@ class InventoryViewSet(viewsets.ModelViewSet):
     def release_stock(self, request, pk=None):
         """Release reserved stock"""
         inventory = self.get_object()  
-        quantity = request.data.get('quantity', 0)
+        try:
+            quantity = int(request.data.get('quantity', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'Quantity must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
         
         inventory.release_reserved_stock(quantity)
         return Response({'message': f'Released {quantity} units of {inventory.product.variant_name}'})
 
+    @action(detail=False, methods=['post'], url_path='reserve-bulk')
+    def reserve_bulk(self, request):
+        """Reserve every line of a cart, or nothing if any line is short"""
+        serializer = BulkReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            created = reservations.reserve(
+                [(line['product'], line['quantity']) for line in data['items']],
+                reference=data['reference'],
+                ttl_minutes=data.get('ttl_minutes'),
+                created_by=request.user
+            )
+        except reservations.InsufficientStock as e:
+            return Response(
+                {'error': str(e), 'shortages': e.shortages},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'reference': data['reference'],
+            'reservations': StockReservationSerializer(created, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='release-bulk')
+    def release_bulk(self, request):
+        """Release active reservations by ID and/or order reference"""
+        serializer = BulkReleaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        released = reservations.release(
+            reservation_ids=data.get('reservation_ids'),
+            reference=data.get('reference')
+        )
+        return Response({'released': released})
+
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
         """Get low stock items"""
@@ -197,6 +270,32 @@ class StockMovementViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+class StockReservationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for stock reservations"""
+    
+    queryset = StockReservation.objects.all()
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Filter reservations by status, reference or product"""
+        queryset = StockReservation.objects.select_related('inventory').all()
+        
+        reservation_status = self.request.query_params.get('status')
+        if reservation_status:
+            queryset = queryset.filter(status=reservation_status)
+            
+        reference = self.request.query_params.get('reference')
+        if reference:
+            queryset = queryset.filter(reference=reference)
+            
+        product_id = _product_id_param(self.request)
+        if product_id:
+            queryset = queryset.filter(inventory__product_id=product_id)
+            
+        return queryset
+
+
 class PurchaseOrderViewSet(viewsets.ModelViewSet):
     """ViewSet for purchase order management"""
     
@@ -2,17 +2,18 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.shortcuts import render
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponseRedirect
 from django.contrib import messages
 from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
 import openpyxl
-import io
 import zipfile
 from datetime import datetime
 
+from utils import spreadsheets
+
 from .models import UploadSession, MasterDataTemplate, ImportLog, ValidationRule, MasterDataCache
-from .services.excel_template_generator import generate_template_file, save_template_to_file
+from .services.excel_template_generator import template_path
 
 
 # Custom admin site actions (commented out - not needed for simplified interface)
@@ -103,12 +104,7 @@ class UploadSessionAdmin(admin.ModelAdmin):
         """Download Excel template"""
         try:
             include_sample_data = request.GET.get('sample_data', 'false').lower() == 'true'
-            workbook = generate_template_file(include_sample_data)
-            
-            # Create response
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            path = template_path(include_sample_data)
             
             # Set filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -117,13 +113,7 @@ class UploadSessionAdmin(admin.ModelAdmin):
             else:
                 filename = f'Master_Data_Template_{timestamp}.xlsx'
             
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            # Save workbook to response
-            virtual_workbook = io.BytesIO()
-            workbook.save(virtual_workbook)
-            virtual_workbook.seek(0)
-            response.write(virtual_workbook.read())
+            response = spreadsheets.file_response(path, filename)
             
             messages.success(request, f'Template {"with sample data" if include_sample_data else ""} downloaded successfully!')
             return response
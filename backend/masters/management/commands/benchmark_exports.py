@@ -0,0 +1,94 @@
+"""
+Django management command to benchmark the customer export on a large
+synthetic customer table: time and peak Python memory of the streamed CSV
+and write-only Excel exports, against serialising the whole list at once.
+
+The customers are generated inside a transaction that is rolled back.
+"""
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from customers.models import Customer
+from customers.serializers import CustomerListSerializer
+from customers.views import CustomerViewSet
+from masters.services import exports
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated customers."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark streamed CSV/XLSX customer exports on a large synthetic table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Customers to generate')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Customers inserted per batch')
+        parser.add_argument('--skip-legacy', action='store_true', help='Skip the serialise-everything baseline')
+        parser.add_argument(
+            '--trace-memory', action='store_true',
+            help='Also report peak Python memory (tracemalloc; makes every run several times slower)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._benchmark(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _benchmark(self, options):
+        start = time.perf_counter()
+        self._generate(options['rows'], options['batch_size'])
+        self.stdout.write(f'Generated {options["rows"]} customers in {time.perf_counter() - start:.1f}s\n')
+        self.stdout.write(f'{"export":>22} {"rows":>9} {"seconds":>9} {"peak MB":>9}')
+
+        trace = options['trace_memory']
+        queryset = Customer.objects.select_related('purchase_rollup')
+        columns = CustomerViewSet.export_columns
+        self._report('csv (streamed)', lambda: self._drain_csv(queryset, columns), trace)
+        self._report('xlsx (write-only)', lambda: self._write_xlsx(queryset, columns), trace)
+        if not options['skip_legacy']:
+            self._report('serialise whole list', lambda: len(CustomerListSerializer(queryset, many=True).data), trace)
+
+    def _generate(self, rows, batch_size):
+        for start in range(0, rows, batch_size):
+            Customer.objects.bulk_create([
+                Customer(
+                    customer_code=f'EXP-{index:08d}',
+                    first_name=f'First{index}',
+                    last_name=f'Last{index}',
+                    email=f'customer{index}@example.com',
+                    phone=f'9{index:09d}',
+                    city='Chennai',
+                    country='India',
+                )
+                for index in range(start, min(start + batch_size, rows))
+            ])
+
+    def _drain_csv(self, queryset, columns):
+        rows = 0
+        for chunk in exports.csv_chunks(queryset, columns):
+            rows += chunk.count('\n')
+        return rows - 1
+
+    def _write_xlsx(self, queryset, columns):
+        with tempfile.TemporaryFile(suffix='.xlsx') as handle:
+            return exports.write_xlsx(queryset, columns, handle, title='Customers')
+
+    def _report(self, label, runner, trace):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        rows = runner()
+        elapsed = time.perf_counter() - start
+        peak = '-'
+        if trace:
+            peak = f'{tracemalloc.get_traced_memory()[1] / 1048576:.1f}'
+            tracemalloc.stop()
+        self.stdout.write(f'{label:>22} {rows:>9} {elapsed:>9.2f} {peak:>9}')
@@ -0,0 +1,99 @@
+"""
+Django management command to benchmark the master-data importer on a large
+synthetic Customers workbook: rows per second, queries per batch and,
+optionally, peak Python memory. Memory is bounded by one batch plus the
+workbook's shared-string table, which openpyxl loads even in read-only mode.
+
+The workbook is written to a temporary file; the import runs inside a
+transaction that is rolled back.
+"""
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from openpyxl import Workbook
+
+from masters.models import UploadSession
+from masters.services import importer
+
+
+class _Rollback(Exception):
+    """Raised to discard the imported rows."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming master-data import on a large synthetic workbook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Customer rows in the workbook')
+        parser.add_argument('--invalid-every', type=int, default=50, help='Make every Nth row invalid (0: none)')
+        parser.add_argument(
+            '--trace-memory', action='store_true',
+            help='Also report peak Python memory (tracemalloc; makes the run several times slower)'
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as handle:
+            start = time.perf_counter()
+            self._write_workbook(handle.name, options['rows'], options['invalid_every'])
+            self.stdout.write(f'Wrote {options["rows"]} rows in {time.perf_counter() - start:.1f}s')
+            try:
+                with transaction.atomic():
+                    self._benchmark(handle.name, options)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def _write_workbook(self, path, rows, invalid_every):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Customers')
+        sheet.append([
+            'customer_code', 'first_name*', 'last_name*', 'customer_type*', 'email', 'phone*',
+            'city', 'country', 'credit_limit', 'is_vip',
+        ])
+        for index in range(rows):
+            invalid = invalid_every and index % invalid_every == invalid_every - 1
+            sheet.append([
+                f'IMP-{index:08d}', f'First{index}', f'Last{index}', 'individual',
+                f'customer{index}@example.com', 'bad' if invalid else f'9{index:09d}',
+                'Chennai', 'India', 1000, index % 10 == 0,
+            ])
+        workbook.save(path)
+
+    def _benchmark(self, path, options):
+        session = UploadSession.objects.create(
+            session_name='Import benchmark', excel_file=path, file_name=path, file_size=0
+        )
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        if options['trace_memory']:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            result = importer.import_workbook(path, session)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if options['trace_memory']:
+            peak = tracemalloc.get_traced_memory()[1] / 1048576
+            tracemalloc.stop()
+
+        if not result['success']:
+            self.stdout.write(self.style.ERROR(result['error']))
+            return
+        rows = result['total_records']
+        batches = max(1, -(-rows // importer.BATCH_SIZE))
+        self.stdout.write(
+            f'Imported {rows} rows: {result["successful_records"]} written, {result["failed_records"]} failed, '
+            f'{result["skipped_records"]} skipped'
+        )
+        self.stdout.write(f'{elapsed:.1f}s ({rows / elapsed:.0f} rows/s), {queries[0]} queries '
+                          f'({queries[0] / batches:.1f} per {importer.BATCH_SIZE}-row batch)')
+        if peak is not None:
+            self.stdout.write(f'Peak Python memory: {peak:.1f} MB')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,49 @@
+"""
+Django management command to run queued export jobs (EXPORT_JOB_RUNNER =
+'queue') and to purge old export files.
+
+Jobs are claimed with a conditional UPDATE, so several workers may run at
+once and each job is written exactly once.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from masters.models import ExportJob
+from masters.services import exports
+
+
+class Command(BaseCommand):
+    help = 'Run pending customer/supplier export jobs and purge old export files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls with --loop')
+        parser.add_argument('--purge-days', type=int, default=0, help='Delete finished jobs and files older than this many days')
+
+    def handle(self, *args, **options):
+        if options['purge_days']:
+            removed = exports.purge(timezone.now() - timedelta(days=options['purge_days']))
+            self.stdout.write(f'Purged {removed} export jobs')
+
+        completed = failed = 0
+        while True:
+            for job_id in list(ExportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)):
+                try:
+                    job = exports.run(job_id)
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'{job_id}: {e}'))
+                    continue
+                if job is None:
+                    # Claimed by another worker in the meantime
+                    continue
+                completed += 1
+                self.stdout.write(f'{job.export_name} {job.file_format}: {job.row_count} rows, {job.file_size} bytes')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {completed} export jobs ({failed} failed)'))
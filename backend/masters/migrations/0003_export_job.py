@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0002_uploadsession_error_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('export_name', models.CharField(help_text='Exported list (e.g. customers)', max_length=50)),
+                ('view_path', models.CharField(help_text='Dotted path of the viewset whose filters apply', max_length=200)),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel')], default='csv', max_length=10)),
+                ('query_string', models.TextField(blank=True, help_text='Filter query parameters of the export request')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('row_count', models.PositiveIntegerField(default=0, help_text='Rows written so far')),
+                ('file_name', models.CharField(blank=True, help_text='Exported file, relative to EXPORT_DIR', max_length=255)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, help_text='Error message if the export failed', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+                'db_table': 'masters_export_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='masters_exp_status_d84a6a_idx')],
+            },
+        ),
+    ]
@@ -99,6 +99,56 @@ class UploadSession(models.Model):
         return self.status in ['completed', 'failed', 'cancelled']
 
 
+class ExportJob(models.Model):
+    """
+    Background export of a list endpoint (customers, suppliers) to a CSV or
+    Excel file, written by masters.services.exports and downloaded once done.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    export_name = models.CharField(max_length=50, help_text="Exported list (e.g. customers)")
+    view_path = models.CharField(max_length=200, help_text="Dotted path of the viewset whose filters apply")
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    query_string = models.TextField(blank=True, help_text="Filter query parameters of the export request")
+    
+    # Status and results
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    row_count = models.PositiveIntegerField(default=0, help_text="Rows written so far")
+    file_name = models.CharField(max_length=255, blank=True, help_text="Exported file, relative to EXPORT_DIR")
+    file_size = models.PositiveBigIntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True, help_text="Error message if the export failed")
+    
+    # Timestamps and user
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    
+    class Meta:
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+        ordering = ['-created_at']
+        db_table = 'masters_export_job'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.export_name} ({self.file_format}) - {self.get_status_display()}"
+
+
 class MasterDataTemplate(models.Model):
     """
     Define master data templates and sheet configurations
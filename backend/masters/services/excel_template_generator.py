@@ -1,90 +1,46 @@
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.hyperlink import Hyperlink
-from django.apps import apps
-from django.db import models
-from django.contrib.contenttypes.models import ContentType
-import uuid
-from datetime import datetime
-import os
+import hashlib
+
+from utils import spreadsheets
+
+
+# Shown on the instructions sheet; part of the cache key with the module source
+TEMPLATE_VERSION = '1.0'
+
+# Widths of the Field Name / Required / Description / Sample Data / Notes columns
+COLUMN_WIDTHS = [25, 15, 40, 20, 30]
+
+_schema_version = None
+
+
+def schema_version():
+    """
+    Version of the template layout: ``TEMPLATE_VERSION`` plus a digest of
+    this module, so editing a field list or a sheet invalidates cached files.
+    """
+    global _schema_version
+    if _schema_version is None:
+        with open(__file__, 'rb') as source:
+            digest = hashlib.sha1(source.read()).hexdigest()[:12]
+        _schema_version = f'{TEMPLATE_VERSION}-{digest}'
+    return _schema_version
 
 
 class ExcelTemplateGenerator:
     """
     Generate Excel templates for master data upload
+    
+    Sheets are written top to bottom into a write-only workbook using the
+    named styles of ``utils.spreadsheets``.
     """
     
     def __init__(self):
         self.workbook = None
-        self.styles = {}
-        self._setup_styles()
-    
-    def _setup_styles(self):
-        """Setup styles for the Excel template"""
-        # Header style
-        self.styles['header'] = Font(
-            name='Calibri',
-            size=12,
-            bold=True,
-            color='FFFFFF'
-        )
-        self.styles['header_fill'] = PatternFill(
-            start_color='366092',
-            end_color='366092',
-            fill_type='solid'
-        )
-        
-        # Title style
-        self.styles['title'] = Font(
-            name='Calibri',
-            size=16,
-            bold=True,
-            color='366092'
-        )
-        
-        # Instruction style
-        self.styles['instruction'] = Font(
-            name='Calibri',
-            size=11,
-            color='333333'
-        )
-        
-        # Hyperlink style
-        self.styles['hyperlink'] = Font(
-            name='Calibri',
-            size=11,
-            color='0563C1',
-            underline='single'
-        )
-        
-        # Border style
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        self.styles['border'] = thin_border
-        
-        # Alignment
-        self.styles['center_alignment'] = Alignment(
-            horizontal='center',
-            vertical='center'
-        )
-        self.styles['left_alignment'] = Alignment(
-            horizontal='left',
-            vertical='center'
-        )
     
     def generate_master_data_template(self, include_sample_data=False):
         """
         Generate the complete master data template with all sheets
         """
-        self.workbook = openpyxl.Workbook()
-        
-        # Remove default sheet
-        self.workbook.remove(self.workbook.active)
+        self.workbook = spreadsheets.workbook()
         
         # Create all sheets
         self._create_instructions_sheet()
@@ -104,23 +60,19 @@ class ExcelTemplateGenerator:
         """
         Create the instructions sheet with hyperlinks to all other sheets
         """
-        ws = self.workbook.create_sheet('Instructions & Navigation')
+        ws = spreadsheets.Sheet(self.workbook, 'Instructions & Navigation', widths=[30, 50])
         
         # Title
-        ws['A1'] = 'Master Data Upload Template'
-        ws['A1'].font = self.styles['title']
-        ws.merge_cells('A1:B1')
-        
-        # Generation info
-        ws['A3'] = f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-        ws['A3'].font = self.styles['instruction']
+        ws.row(['Master Data Upload Template', None], style='banner')
+        ws.merge(1, 1, 2)
         
-        ws['A4'] = 'Version: 1.0'
-        ws['A4'].font = self.styles['instruction']
+        # Template version (the file is cached, so no generation time)
+        ws.skip_to(3)
+        ws.row([f'Version: {TEMPLATE_VERSION}'], style='instruction')
         
         # Instructions
-        ws['A6'] = 'Instructions:'
-        ws['A6'].font = Font(name='Calibri', size=12, bold=True)
+        ws.skip_to(6)
+        ws.row(['Instructions:'], style='subtitle')
         
         instructions = [
             '1. This Excel template contains multiple sheets for different master data types.',
@@ -141,17 +93,13 @@ class ExcelTemplateGenerator:
             'Navigate to Master Data Sheets:'
         ]
         
-        row = 8
+        ws.skip_to(8)
         for instruction in instructions:
-            ws[f'A{row}'] = instruction
-            ws[f'A{row}'].font = self.styles['instruction']
-            ws[f'A{row}'].alignment = self.styles['left_alignment']
-            row += 1
+            ws.row([instruction], style='instruction')
         
         # Hyperlinks to sheets
-        ws[f'A{row}'] = 'Master Data Sheets:'
-        ws[f'A{row}'].font = Font(name='Calibri', size=12, bold=True)
-        row += 2
+        ws.row(['Master Data Sheets:'], style='subtitle')
+        ws.row()
         
         sheet_links = [
             ('Organization Setup', 'Company and Location information'),
@@ -166,40 +114,18 @@ class ExcelTemplateGenerator:
         ]
         
         for sheet_name, description in sheet_links:
-            # Create hyperlink
-            ws[f'A{row}'] = sheet_name
-            ws[f'A{row}'].font = self.styles['hyperlink']
-            ws[f'A{row}'].hyperlink = Hyperlink(
-                ref=f'A{row}',
-                location=f"'{sheet_name}'!A1",
-                tooltip=f'Go to {sheet_name} sheet'
-            )
-            
-            ws[f'B{row}'] = f"- {description}"
-            ws[f'B{row}'].font = self.styles['instruction']
-            ws[f'B{row}'].alignment = self.styles['left_alignment']
-            
-            row += 1
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 30
-        ws.column_dimensions['B'].width = 50
-        
-        # Add some styling to the header row
-        for col in ['A', 'B']:
-            cell = ws[f'{col}1']
-            cell.fill = self.styles['header_fill']
-            cell.font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-            cell.alignment = self.styles['center_alignment']
+            ws.row([
+                ws.link(sheet_name, f"'{sheet_name}'!A1", tooltip=f'Go to {sheet_name} sheet'),
+                ws.cell(f"- {description}", 'instruction'),
+            ])
     
     def _create_organization_setup_sheet(self, include_sample_data=False):
         """Create Organization Setup sheet"""
-        ws = self.workbook.create_sheet('Organization Setup')
+        ws = self._create_sheet('Organization Setup', 4)
         
         # Company section
-        ws['A1'] = 'Company Information'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:D1')
+        ws.row(['Company Information'], style='section')
+        ws.merge(1, 1, 4)
         
         company_headers = ['Field Name', 'Required', 'Description', 'Sample Data']
         company_fields = [
@@ -224,9 +150,9 @@ class ExcelTemplateGenerator:
         
         # Location section
         current_row = len(company_fields) + 4
-        ws[f'A{current_row}'] = 'Location Information'
-        ws[f'A{current_row}'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells(f'A{current_row}:D{current_row}')
+        ws.skip_to(current_row)
+        ws.row(['Location Information'], style='section')
+        ws.merge(current_row, 1, 4)
         
         location_headers = ['Field Name', 'Required', 'Description', 'Sample Data']
         location_fields = [
@@ -251,11 +177,10 @@ class ExcelTemplateGenerator:
     
     def _create_general_masters_sheet(self, include_sample_data=False):
         """Create General Masters sheet"""
-        ws = self.workbook.create_sheet('General Masters')
+        ws = self._create_sheet('General Masters', 5)
         
-        ws['A1'] = 'General Masters - Categories, UOM, Payment Modes'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['General Masters - Categories, UOM, Payment Modes'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Master Type', 'Field Name', 'Required', 'Description', 'Sample Data']
         
@@ -293,11 +218,10 @@ class ExcelTemplateGenerator:
     
     def _create_item_data_sheet(self, include_sample_data=False):
         """Create Item Data sheet"""
-        ws = self.workbook.create_sheet('Item Data')
+        ws = self._create_sheet('Item Data', 6)
         
-        ws['A1'] = 'Item Data - Products and Item Master'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:F1')
+        ws.row(['Item Data - Products and Item Master'], style='section')
+        ws.merge(1, 1, 6)
         
         headers = ['Item Type', 'Field Name', 'Required', 'Description', 'Sample Data', 'Notes']
         
@@ -342,11 +266,10 @@ class ExcelTemplateGenerator:
     
     def _create_attributes_sheet(self, include_sample_data=False):
         """Create Attributes sheet"""
-        ws = self.workbook.create_sheet('Attributes')
+        ws = self._create_sheet('Attributes', 5)
         
-        ws['A1'] = 'Product Attributes'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Product Attributes'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Field Name', 'Required', 'Description', 'Sample Data', 'Data Type Options']
         
@@ -362,11 +285,10 @@ class ExcelTemplateGenerator:
     
     def _create_attribute_values_sheet(self, include_sample_data=False):
         """Create Attribute Values sheet"""
-        ws = self.workbook.create_sheet('Attribute Values')
+        ws = self._create_sheet('Attribute Values', 5)
         
-        ws['A1'] = 'Attribute Values'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Attribute Values'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Field Name', 'Required', 'Description', 'Sample Data', 'Notes']
         
@@ -382,11 +304,10 @@ class ExcelTemplateGenerator:
     
     def _create_customers_sheet(self, include_sample_data=False):
         """Create Customers sheet"""
-        ws = self.workbook.create_sheet('Customers')
+        ws = self._create_sheet('Customers', 5)
         
-        ws['A1'] = 'Customer Information'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Customer Information'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Field Name', 'Required', 'Description', 'Sample Data', 'Notes']
         
@@ -415,11 +336,10 @@ class ExcelTemplateGenerator:
     
     def _create_vendors_sheet(self, include_sample_data=False):
         """Create Vendors sheet"""
-        ws = self.workbook.create_sheet('Vendors')
+        ws = self._create_sheet('Vendors', 5)
         
-        ws['A1'] = 'Vendor/Supplier Information'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Vendor/Supplier Information'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Field Name', 'Required', 'Description', 'Sample Data', 'Notes']
         
@@ -447,11 +367,10 @@ class ExcelTemplateGenerator:
     
     def _create_tax_configuration_sheet(self, include_sample_data=False):
         """Create Tax Configuration sheet"""
-        ws = self.workbook.create_sheet('Tax Configuration')
+        ws = self._create_sheet('Tax Configuration', 5)
         
-        ws['A1'] = 'Tax Configuration'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Tax Configuration'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Field Name', 'Required', 'Description', 'Sample Data', 'Notes']
         
@@ -472,11 +391,10 @@ class ExcelTemplateGenerator:
     
     def _create_additional_masters_sheet(self, include_sample_data=False):
         """Create Additional Masters sheet"""
-        ws = self.workbook.create_sheet('Additional Masters')
+        ws = self._create_sheet('Additional Masters', 5)
         
-        ws['A1'] = 'Additional Masters - Brands, Departments, Divisions'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='366092')
-        ws.merge_cells('A1:E1')
+        ws.row(['Additional Masters - Brands, Departments, Divisions'], style='section')
+        ws.merge(1, 1, 5)
         
         headers = ['Master Type', 'Field Name', 'Required', 'Description', 'Sample Data']
         
@@ -508,60 +426,46 @@ class ExcelTemplateGenerator:
         all_fields = brand_fields + department_fields + division_fields
         self._write_sheet_section(ws, headers, all_fields, 2, include_sample_data)
     
+    def _create_sheet(self, title, columns):
+        """A sheet whose first ``columns`` columns get the template widths"""
+        return spreadsheets.Sheet(self.workbook, title, widths=COLUMN_WIDTHS[:columns])
+    
     def _write_sheet_section(self, worksheet, headers, fields, start_row, include_sample_data=False):
         """
         Write a section to the worksheet with headers and fields
         """
-        # Write headers
-        for col_idx, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=start_row, column=col_idx, value=header)
-            cell.font = self.styles['header']
-            cell.fill = self.styles['header_fill']
-            cell.alignment = self.styles['center_alignment']
-            cell.border = self.styles['border']
-        
-        # Write field data
-        for row_idx, field_data in enumerate(fields, start_row + 1):
-            for col_idx, value in enumerate(field_data, 1):
-                cell = worksheet.cell(row=row_idx, column=col_idx, value=value)
-                cell.font = self.styles['instruction']
-                cell.alignment = self.styles['left_alignment']
-                cell.border = self.styles['border']
-                
-                # Add styling for required fields
-                if col_idx == 1 and '*' in str(value):
-                    cell.font = Font(name='Calibri', size=11, bold=True, color='FF0000')
-        
-        # Adjust column widths
-        column_widths = [25, 15, 40, 20, 30]
-        for col_idx, width in enumerate(column_widths, 1):
-            if col_idx <= len(headers):
-                worksheet.column_dimensions[get_column_letter(col_idx)].width = width
+        worksheet.skip_to(start_row)
+        worksheet.row(headers, style='header')
+        
+        # Required fields (marked with *) are shown in bold red
+        for field_data in fields:
+            first_style = 'required' if '*' in str(field_data[0]) else 'cell'
+            worksheet.row(field_data, style='cell', styles=[first_style])
         
         # Add sample data separator if needed
         if include_sample_data and fields:
-            separator_row = start_row + len(fields) + 1
-            worksheet.cell(row=separator_row, column=1, value='--- Sample Data Above ---')
-            worksheet.cell(row=separator_row, column=1).font = Font(
-                name='Calibri', 
-                size=10, 
-                italic=True, 
-                color='666666'
-            )
-            # Only merge if we have valid columns
+            separator_row = worksheet.row(['--- Sample Data Above ---'], style='note')
             if len(headers) > 0:
-                end_col = get_column_letter(len(headers))
-                worksheet.merge_cells(f'{separator_row}A:{separator_row}{end_col}')
+                worksheet.merge(separator_row, 1, len(headers))
 
 
 def generate_template_file(include_sample_data=False):
     """
-    Generate the Excel template file and return the workbook
+    Generate the Excel template file and return the (write-only) workbook
     """
     generator = ExcelTemplateGenerator()
     return generator.generate_master_data_template(include_sample_data)
 
 
+def template_path(include_sample_data=False):
+    """
+    Path of the generated template on disk, rebuilt only when
+    ``schema_version`` changes
+    """
+    name = 'master_data_template_sample' if include_sample_data else 'master_data_template'
+    return spreadsheets.cached_file(name, schema_version(), lambda: generate_template_file(include_sample_data))
+
+
 def save_template_to_file(workbook, file_path):
     """
     Save the workbook to a file
@@ -0,0 +1,375 @@
+"""
+Streaming CSV and Excel exports of list endpoints.
+
+An export takes the viewset's own filtered queryset (``filter_queryset``
+over ``get_queryset``, so search, filter and ordering parameters apply) and
+reads it with ``values_list(...).iterator(chunk_size=...)``: rows are never
+held in memory as a list or as model instances.
+
+* CSV is streamed to the client with StreamingHttpResponse as it is read.
+* Excel uses openpyxl's write-only workbook, which spools rows to a
+  temporary file instead of keeping cells in memory; the finished file is
+  streamed with FileResponse.
+
+Very large exports (``background=true``, or more rows than
+``settings.EXPORT_SYNC_MAX_ROWS`` / ``EXPORT_XLSX_SYNC_MAX_ROWS``) become an
+ExportJob. The job re-applies the request's query string to the same
+viewset, writes the file under ``settings.EXPORT_DIR`` and is downloaded
+once completed. Jobs run in a thread after the request commits, or with
+``EXPORT_JOB_RUNNER = 'queue'`` are left for ``manage.py run_export_jobs``.
+"""
+import csv
+import datetime
+import os
+import tempfile
+import threading
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections, transaction
+from django.http import FileResponse, HttpRequest, QueryDict, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from ..models import ExportJob
+
+
+# header -- column title; field -- values_list() lookup (may span relations)
+Column = namedtuple('Column', 'header field')
+
+FORMATS = ('csv', 'xlsx')
+CHUNK_SIZE = 2000
+CSV_FLUSH_ROWS = 500
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+RUNNERS = ('thread', 'queue')
+
+# Request parameters that control the export rather than filter the list
+CONTROL_PARAMS = ('file_format', 'background')
+
+
+def export_dir():
+    return str(getattr(settings, 'EXPORT_DIR', os.path.join(settings.MEDIA_ROOT, 'exports')))
+
+
+def runner():
+    """Configured job runner, defaulting to a background thread."""
+    mode = getattr(settings, 'EXPORT_JOB_RUNNER', 'thread')
+    return mode if mode in RUNNERS else 'thread'
+
+
+def _rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    return queryset.values_list(*[column.field for column in columns]).iterator(chunk_size=chunk_size)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    # Excel cells cannot hold time zones or UUIDs
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(queryset, columns, chunk_size=CHUNK_SIZE):
+    """The CSV header line, then one line per row."""
+    writer = csv.writer(_Echo())
+    # The BOM makes Excel open the file as UTF-8
+    yield '\ufeff' + writer.writerow([column.header for column in columns])
+    for row in _rows(queryset, columns, chunk_size):
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def csv_chunks(queryset, columns, chunk_size=CHUNK_SIZE):
+    """CSV text in chunks of ``CSV_FLUSH_ROWS`` lines, for streaming."""
+    lines = []
+    for line in _csv_lines(queryset, columns, chunk_size):
+        lines.append(line)
+        if len(lines) >= CSV_FLUSH_ROWS:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def write_csv(queryset, columns, handle, progress=None):
+    """Write the export to a text file handle; returns the row count."""
+    count = -1
+    for line in _csv_lines(queryset, columns):
+        handle.write(line)
+        count += 1
+        if progress and count and count % CHUNK_SIZE == 0:
+            progress(count)
+    return count
+
+
+def write_xlsx(queryset, columns, handle, title='Export', progress=None):
+    """Write the export as a write-only workbook to ``handle``; returns the row count."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.freeze_panes = 'A2'
+    header_font = Font(bold=True)
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column.header)
+        cell.font = header_font
+        header.append(cell)
+    sheet.append(header)
+
+    count = 0
+    for row in _rows(queryset, columns):
+        sheet.append([_xlsx_value(value) for value in row])
+        count += 1
+        if progress and count % CHUNK_SIZE == 0:
+            progress(count)
+    workbook.save(handle)
+    return count
+
+
+def _file_name(name, file_format):
+    return f'{name}_{timezone.localtime():%Y%m%d_%H%M%S}.{file_format}'
+
+
+def stream(queryset, columns, name, file_format):
+    """HTTP response streaming the export in ``file_format``."""
+    filename = _file_name(name, file_format)
+    if file_format == 'csv':
+        response = StreamingHttpResponse(
+            csv_chunks(queryset, columns),
+            content_type=f'{CONTENT_TYPES["csv"]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # Removed from disk as soon as FileResponse closes it
+    handle = tempfile.TemporaryFile(suffix='.xlsx')
+    write_xlsx(queryset, columns, handle, title=name.title())
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=filename, content_type=CONTENT_TYPES['xlsx'])
+
+
+def sync_limit(file_format):
+    """Rows above which an export is queued; Excel is written several times slower than CSV."""
+    if file_format == 'xlsx':
+        return getattr(settings, 'EXPORT_XLSX_SYNC_MAX_ROWS', 50000)
+    return getattr(settings, 'EXPORT_SYNC_MAX_ROWS', 200000)
+
+
+def _truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def export_response(view, request):
+    """
+    Answer a viewset's ``export`` action: stream its filtered list (columns
+    from ``view.export_columns``), or queue a job and return 202 with its
+    status for background or oversized exports.
+    """
+    name, columns = view.export_name, view.export_columns
+    file_format = request.query_params.get('file_format', 'csv').lower()
+    if file_format not in FORMATS:
+        return Response(
+            {'error': f'file_format must be one of: {", ".join(FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    queryset = view.filter_queryset(view.get_queryset())
+    background = _truthy(request.query_params.get('background', ''))
+    if not background:
+        limit = sync_limit(file_format)
+        background = bool(limit) and queryset.count() > limit
+    if not background:
+        return stream(queryset, columns, name, file_format)
+
+    params = request.query_params.copy()
+    for param in CONTROL_PARAMS:
+        params.pop(param, None)
+    job = ExportJob.objects.create(
+        export_name=name,
+        view_path=f'{type(view).__module__}.{type(view).__name__}',
+        file_format=file_format,
+        query_string=params.urlencode(),
+        created_by=request.user if request.user.is_authenticated else None
+    )
+    start(job)
+    return Response(job_data(job), status=status.HTTP_202_ACCEPTED)
+
+
+def job_data(job):
+    return {
+        'job_id': str(job.pk),
+        'export': job.export_name,
+        'file_format': job.file_format,
+        'status': job.status,
+        'row_count': job.row_count,
+        'file_size': job.file_size,
+        'error': job.error_message,
+        'created_at': job.created_at,
+        'completed_at': job.completed_at,
+        'download_ready': job.status == 'completed',
+    }
+
+
+def find_job(view, request, job_id):
+    """The caller's job for the view's export, or None (staff see every job)."""
+    jobs = ExportJob.objects.filter(export_name=view.export_name)
+    if request.user.is_authenticated and not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    try:
+        return jobs.filter(pk=uuid.UUID(str(job_id))).first()
+    except ValueError:
+        return None
+
+
+def job_status_response(view, request, job_id):
+    job = find_job(view, request, job_id)
+    if job is None:
+        return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_data(job))
+
+
+def job_download_response(view, request, job_id):
+    job = find_job(view, request, job_id)
+    if job is None:
+        return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != 'completed':
+        return Response(
+            {'error': f'Export is {job.status}', **job_data(job)},
+            status=status.HTTP_409_CONFLICT
+        )
+    path = os.path.join(export_dir(), job.file_name)
+    if not os.path.exists(path):
+        return Response({'error': 'Export file is no longer available'}, status=status.HTTP_410_GONE)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.file_name),
+        content_type=CONTENT_TYPES[job.file_format]
+    )
+
+
+def job_queryset(job):
+    """Rebuild the filtered queryset of the request that queued ``job``."""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(job.query_string)
+    request = Request(http_request)
+    request.user = job.created_by or AnonymousUser()
+
+    view = import_string(job.view_path)()
+    view.request = request
+    view.args = ()
+    view.kwargs = {}
+    view.action = 'export'
+    view.format_kwarg = None
+    return view.filter_queryset(view.get_queryset()), view
+
+
+def start(job):
+    """Run ``job`` once the current transaction commits (see ``runner``)."""
+    if runner() == 'queue':
+        return
+    job_id = job.pk
+
+    def launch():
+        threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+    transaction.on_commit(launch)
+
+
+def _run_in_thread(job_id):
+    try:
+        run(job_id)
+    finally:
+        connections.close_all()
+
+
+def run(job_id):
+    """
+    Write a pending job's file. Returns the job, or None when another
+    worker claimed it first.
+    """
+    claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(
+        status='processing',
+        started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = ExportJob.objects.select_related('created_by').get(pk=job_id)
+
+    def progress(count):
+        ExportJob.objects.filter(pk=job_id).update(row_count=count)
+
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f'{job.export_name}_{job.pk.hex}.{job.file_format}'
+    path = os.path.join(directory, name)
+    temp_path = f'{path}.tmp'
+    try:
+        queryset, view = job_queryset(job)
+        columns = view.export_columns
+        if job.file_format == 'csv':
+            with open(temp_path, 'w', encoding='utf-8', newline='') as handle:
+                count = write_csv(queryset, columns, handle, progress=progress)
+        else:
+            with open(temp_path, 'wb') as handle:
+                count = write_xlsx(queryset, columns, handle, title=job.export_name.title(), progress=progress)
+        os.replace(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        ExportJob.objects.filter(pk=job_id).update(
+            status='failed',
+            error_message=str(e),
+            completed_at=timezone.now()
+        )
+        raise
+
+    ExportJob.objects.filter(pk=job_id).update(
+        status='completed',
+        row_count=count,
+        file_name=name,
+        file_size=os.path.getsize(path),
+        completed_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
+
+
+def purge(older_than):
+    """Delete finished jobs created before ``older_than`` and their files; returns the count."""
+    jobs = ExportJob.objects.filter(created_at__lt=older_than, status__in=['completed', 'failed'])
+    removed = 0
+    for job in jobs.only('pk', 'file_name').iterator():
+        if job.file_name:
+            try:
+                os.remove(os.path.join(export_dir(), job.file_name))
+            except OSError:
+                pass
+        removed += 1
+    jobs.delete()
+    return removed
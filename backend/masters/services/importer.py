@@ -0,0 +1,856 @@
+"""
+Streaming import of master data from an uploaded Excel workbook.
+
+A data sheet is a plain table: a header row of field names (a trailing
+``*`` as in the template is ignored), then one record per row. Sheets are
+matched by name to a ``Target`` and imported in ``_targets()`` order, so
+variants can refer to items from the same workbook; other sheets
+(instructions, field dictionaries) are skipped and reported.
+
+The workbook is opened read-only and rows come from
+``iter_rows(values_only=True)``, so neither the sheet nor its cells are
+kept in memory. Rows are taken ``BATCH_SIZE`` at a time and each batch:
+
+1. resolves its foreign-key columns (company, category, UOM, item codes)
+   with one query per column, and loads the stored row of every record
+   whose natural key already exists (one query), so an update only needs
+   the key and the columns it changes,
+2. builds and validates model instances (``clean_fields``, plus ``clean``
+   where it runs no queries; checks that need the database run once for the
+   batch),
+3. upserts the valid rows with ``bulk_create(update_conflicts=True)`` on
+   the model's natural key, overwriting only the columns the sheet has,
+4. runs the target's ``after`` hook, which does what the skipped save
+   signals would (search tokens, scan caches, catalogue snapshot,
+   dashboards),
+
+in its own transaction. If the upsert fails the batch is retried row by
+row, so only the offending rows fail. Progress is saved on the
+UploadSession after every batch; failed and skipped rows are written to
+ImportLog and to a write-only error workbook attached to the session.
+
+Blank cells take the field's default. Customers and suppliers without a
+code get a generated one, so such rows are always created.
+"""
+import datetime
+import re
+import tempfile
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.files import File
+from django.db import DatabaseError, models, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from ..models import ImportLog, UploadSession
+
+
+BATCH_SIZE = 1000
+HEADER_ROWS = 10  # Rows searched for the header row
+MAX_SESSION_ERRORS = 100  # Row errors kept on the session; all of them go to ImportLog
+TRUE_VALUES = ('true', 'yes', 'y', 't', '1')
+FALSE_VALUES = ('false', 'no', 'n', 'f', '0')
+
+# Set by the import, never read from a sheet
+MANAGED_FIELDS = ('id', 'created_at', 'updated_at', 'created_by', 'updated_by')
+
+AMBIGUOUS = object()
+
+
+def slug(value):
+    """Normalised header or choice text: 'Item Code*' -> 'item_code'."""
+    if value is None:
+        return ''
+    return re.sub(r'[\s\-]+', '_', str(value).strip().rstrip('*').strip().lower())
+
+
+class Related:
+    """
+    A foreign-key column.
+
+    field   -- foreign key set on the instance
+    headers -- accepted column names
+    model   -- referenced model
+    lookup  -- field of ``model`` the cell value is matched on
+    scoped  -- match within the row's company; rows of ``model`` without a
+               company are shared and match any company
+    """
+
+    def __init__(self, field, headers, model, lookup, scoped=False):
+        self.field = field
+        self.headers = headers
+        self.model = model
+        self.lookup = lookup
+        self.scoped = scoped
+
+    def resolve(self, wanted):
+        """
+        {(company_id, value): pk} for ``wanted`` (company_id, value) pairs,
+        in one query. A value matching several rows maps to AMBIGUOUS.
+        """
+        values = {value for _, value in wanted}
+        if not values:
+            return {}
+        rows = self.model.objects.filter(**{f'{self.lookup}__in': values})
+        if not self.scoped:
+            found = {}
+            for value, pk in rows.values_list(self.lookup, 'pk'):
+                found[value] = AMBIGUOUS if value in found else pk
+            return {(company_id, value): found[value] for company_id, value in wanted if value in found}
+
+        company_ids = {company_id for company_id, _ in wanted if company_id}
+        rows = rows.filter(Q(company_id__in=company_ids) | Q(company__isnull=True))
+        found = {}
+        for value, company_id, pk in rows.values_list(self.lookup, 'company_id', 'pk'):
+            key = (company_id, value)
+            found[key] = AMBIGUOUS if key in found else pk
+        resolved = {}
+        for company_id, value in wanted:
+            # The company's own row first, then a shared one
+            pk = found.get((company_id, value)) if company_id else None
+            resolved[(company_id, value)] = pk or found.get((None, value))
+        return {key: pk for key, pk in resolved.items() if pk}
+
+
+class Target:
+    """
+    A model a sheet can be imported into.
+
+    model    -- model upserted
+    sheets   -- accepted sheet names (compared with ``slug``)
+    key      -- natural key the upsert matches existing rows on (a unique
+                constraint of the model)
+    columns  -- columns the header row must have
+    aliases  -- {header: field} for template column names
+    related  -- Related columns; ``company`` must come first
+    code     -- (field, generate) for rows without a code: ``generate()`` is
+                the model's own code generator
+    clean    -- whether the model's ``clean`` runs (False when it queries)
+    prepare  -- optional callable(instances) filling defaults that depend on
+                other rows (one query per batch)
+    validate -- optional callable(instances, state) returning {instance:
+                error} for checks against the database or across the sheet;
+                ``state`` is a dict kept for the whole sheet
+    after    -- callable(instances) run in the batch's transaction once the
+                batch is written
+    """
+
+    def __init__(self, name, model, sheets, key, columns, aliases=None, related=(), code=None,
+                 clean=True, prepare=None, validate=None, after=None):
+        self.name = name
+        self.model = model
+        self.sheets = sheets
+        self.key = key
+        self.columns = columns
+        self.aliases = aliases or {}
+        self.related = related
+        self.code = code
+        self.clean = clean
+        self.prepare = prepare
+        self.validate = validate
+        self.after = after
+
+    def matches(self, sheet_name):
+        return slug(sheet_name) in self.sheets
+
+    def field_map(self):
+        """{header: field name} for every plain column of the model."""
+        fields = {
+            field.name: field.name
+            for field in self.model._meta.concrete_fields
+            if not field.is_relation and field.editable and field.name not in MANAGED_FIELDS
+        }
+        fields.update(self.aliases)
+        return fields
+
+    def key_attnames(self):
+        return [self.model._meta.get_field(name).attname for name in self.key]
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _scoped_pairs(instances, field):
+    """Q matching the (company, field) natural keys of ``instances``."""
+    company_ids = {instance.company_id for instance in instances}
+    values = {getattr(instance, field) for instance in instances}
+    return Q(company_id__in=company_ids, **{f'{field}__in': values})
+
+
+def _after_locations(instances):
+    from utils import stats
+    stats.invalidate('locations')
+    stats.invalidate('companies')
+
+
+def _after_customers(instances):
+    from customers.models import Customer
+    from customers.services import search
+    from utils import stats
+
+    codes = [instance.customer_code for instance in instances]
+    search.sync(list(Customer.objects.filter(customer_code__in=codes).values('id', *search.TOKEN_FIELDS)))
+    stats.invalidate('customers')
+
+
+def _after_suppliers(instances):
+    from utils import stats
+    stats.invalidate('suppliers')
+
+
+def _after_items(instances):
+    from products.models import Item, ItemVariant
+    from products.services import scan, snapshot
+
+    item_ids = list(Item.objects.filter(_scoped_pairs(instances, 'item_code')).values_list('pk', flat=True))
+    snapshot.queue_refresh(ItemVariant.objects.filter(item_id__in=item_ids).values_list('pk', flat=True))
+    scan.invalidate_variants(Q(variant__item_id__in=item_ids))
+
+
+def _after_variants(instances):
+    from products.models import ItemVariant
+    from products.services import scan, snapshot
+
+    variants = list(ItemVariant.objects.filter(_scoped_pairs(instances, 'sku_code')).only('pk', 'company_id', 'barcode'))
+    scan.mirror_primary_barcodes(variants)
+    snapshot.queue_refresh([variant.pk for variant in variants])
+
+
+def _variant_defaults(instances):
+    """Variants without UOMs take the item's stock UOM."""
+    from products.models import Item
+
+    missing = {instance.item_id for instance in instances if instance.item_id and not (
+        instance.stock_uom_id and instance.sales_uom_id
+    )}
+    if not missing:
+        return
+    uoms = dict(Item.objects.filter(pk__in=missing).values_list('pk', 'stock_uom_id'))
+    for instance in instances:
+        uom_id = uoms.get(instance.item_id)
+        if not instance.stock_uom_id:
+            instance.stock_uom_id = uom_id
+        if not instance.sales_uom_id:
+            instance.sales_uom_id = uom_id
+
+
+def _validate_locations(instances, state):
+    """
+    Location codes are unique across companies, and each company has one
+    active headquarters (``Location.clean``, checked here for the batch).
+    """
+    from organization.models import Location
+
+    errors = {}
+    owners = dict(Location.objects.filter(code__in={instance.code for instance in instances}).values_list('code', 'company_id'))
+    for instance in instances:
+        owner = owners.get(instance.code)
+        if owner and owner != instance.company_id:
+            errors[instance] = f'code: Location code {instance.code} belongs to another company'
+
+    headquarters = state.setdefault('headquarters', {})
+    companies = {instance.company_id for instance in instances} - set(headquarters)
+    for company_id, code in Location.objects.filter(
+        company_id__in=companies, location_type='headquarters', is_active=True
+    ).values_list('company_id', 'code'):
+        headquarters[company_id] = code
+    for instance in instances:
+        if instance in errors or instance.location_type != 'headquarters' or not instance.is_active:
+            continue
+        current = headquarters.setdefault(instance.company_id, instance.code)
+        if current != instance.code:
+            errors[instance] = 'location_type: Only one headquarters location is allowed per company.'
+    return errors
+
+
+def _targets():
+    from categories.models import Category, ProductAttributeTemplate
+    from customers.models import Customer
+    from organization.models import Company, Location
+    from products.models import UOM, Brand, Item, ItemVariant
+    from suppliers.models import Supplier
+
+    company = Related('company', ('company_code', 'company'), Company, 'code')
+    return [
+        Target(
+            'locations', Location,
+            sheets=('locations', 'location', 'organization'),
+            key=('company', 'code'),
+            columns=('name', 'code'),
+            aliases={'location_name': 'name', 'location_code': 'code'},
+            related=(company,),
+            clean=False,
+            validate=_validate_locations,
+            after=_after_locations
+        ),
+        Target(
+            'customers', Customer,
+            sheets=('customers', 'customer'),
+            key=('customer_code',),
+            columns=('first_name', 'last_name'),
+            aliases={'code': 'customer_code'},
+            code=('customer_code', Customer.generate_customer_code),
+            after=_after_customers
+        ),
+        Target(
+            'suppliers', Supplier,
+            sheets=('suppliers', 'supplier', 'vendors', 'vendor'),
+            key=('supplier_code',),
+            columns=('company_name',),
+            aliases={'code': 'supplier_code', 'name': 'company_name'},
+            code=('supplier_code', Supplier.generate_supplier_code),
+            after=_after_suppliers
+        ),
+        Target(
+            'items', Item,
+            sheets=('items', 'item', 'products'),
+            key=('company', 'item_code'),
+            columns=('item_code', 'item_name'),
+            aliases={'code': 'item_code', 'name': 'item_name'},
+            related=(
+                company,
+                Related('attribute_template', ('attribute_template', 'template_code'),
+                        ProductAttributeTemplate, 'template_code', scoped=True),
+                Related('category', ('category', 'category_name'), Category, 'name', scoped=True),
+                Related('brand', ('brand', 'brand_code'), Brand, 'code', scoped=True),
+                Related('stock_uom', ('stock_uom', 'base_uom_code', 'uom'), UOM, 'code', scoped=True),
+            ),
+            after=_after_items
+        ),
+        Target(
+            'item_variants', ItemVariant,
+            sheets=('item_variants', 'variants', 'skus'),
+            key=('company', 'sku_code'),
+            columns=('item_code', 'sku_code'),
+            aliases={'sku': 'sku_code', 'name': 'variant_name', 'price': 'default_price', 'cost': 'default_cost'},
+            related=(
+                company,
+                Related('item', ('item_code', 'item'), Item, 'item_code', scoped=True),
+                Related('sales_uom', ('sales_uom',), UOM, 'code', scoped=True),
+                Related('purchase_uom', ('purchase_uom',), UOM, 'code', scoped=True),
+                Related('stock_uom', ('stock_uom',), UOM, 'code', scoped=True),
+            ),
+            prepare=_variant_defaults,
+            after=_after_variants
+        ),
+    ]
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _error_text(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f'{field}: {" ".join(messages)}' if field != '__all__' else ' '.join(messages)
+            for field, messages in error.message_dict.items()
+        )
+    return ' '.join(getattr(error, 'messages', [str(error)]))
+
+
+class _Row:
+    """One data row on its way through a batch."""
+
+    __slots__ = ('number', 'values', 'instance', 'error', 'result')
+
+    def __init__(self, number, values):
+        self.number = number
+        self.values = values
+        self.instance = None
+        self.error = None
+        self.result = None
+
+
+class SheetImport:
+    """Import one worksheet into one Target, batch by batch."""
+
+    def __init__(self, workbook_import, target, sheet_name):
+        self.workbook_import = workbook_import
+        self.target = target
+        self.sheet_name = sheet_name
+        self.model = target.model
+        self.state = {}
+        self.summary = {
+            'target': target.name, 'rows': 0, 'successful': 0, 'failed': 0, 'skipped': 0,
+            'ignored_columns': [],
+        }
+
+    def run(self, rows):
+        """Import ``rows`` ((row number, values) pairs); returns the summary."""
+        header = None
+        batch = []
+        for number, values in rows:
+            if header is None:
+                if number > HEADER_ROWS:
+                    break
+                if self._read_header(values):
+                    header = values
+                    self.header = [str(value) if value is not None else '' for value in values]
+                continue
+            if all(value is None or value == '' for value in values):
+                continue
+            batch.append(_Row(number, values))
+            if len(batch) >= BATCH_SIZE:
+                self._process(batch)
+                batch = []
+        if header is None:
+            self.summary['error'] = f'No header row with columns: {", ".join(self.target.columns)}'
+            return self.summary
+        if batch:
+            self._process(batch)
+        return self.summary
+
+    def _read_header(self, values):
+        """Map the columns of a candidate header row; False if it is not the header."""
+        names = [slug(value) for value in values]
+        fields = self.target.field_map()
+        related = {header: rel for rel in self.target.related for header in rel.headers}
+        present = set(names) | {fields[name] for name in names if name in fields}
+        if not all(column in present for column in self.target.columns):
+            return False
+
+        self.fields, self.related, ignored = {}, {}, []
+        for index, name in enumerate(names):
+            if not name:
+                continue
+            if name in related and related[name] not in self.related.values():
+                self.related[index] = related[name]
+            elif name in fields and fields[name] not in self.fields.values():
+                self.fields[index] = fields[name]
+            else:
+                ignored.append(str(values[index]))
+        self.summary['ignored_columns'] = ignored
+        self.update_fields = [
+            name for name in list(self.fields.values()) + [rel.field for rel in self.related.values()]
+            if name not in self.target.key
+        ]
+        for name in ('updated_at', 'updated_by'):
+            if _model_field(self.model, name):
+                self.update_fields.append(name)
+        return True
+
+    # Building and validating instances
+
+    def _convert(self, field, value):
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            return field.get_default()
+        if isinstance(field, models.BooleanField) and isinstance(value, (str, int)):
+            text = str(value).lower()
+            if text in TRUE_VALUES:
+                return True
+            if text in FALSE_VALUES:
+                return False
+            return value
+        if field.choices:
+            choices = self.workbook_import.choice_map(field)
+            return choices.get(slug(value), value)
+        if isinstance(field, (models.CharField, models.TextField)):
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            return str(value)
+        if isinstance(field, models.DecimalField) and isinstance(value, float):
+            return Decimal(str(value))
+        return value
+
+    def _build(self, batch):
+        created_by_id = self.workbook_import.session.created_by_id
+        for row in batch:
+            instance = self.model()
+            for index, name in self.fields.items():
+                field = self.model._meta.get_field(name)
+                value = row.values[index] if index < len(row.values) else None
+                setattr(instance, field.attname, self._convert(field, value))
+            if _model_field(self.model, 'created_by'):
+                instance.created_by_id = created_by_id
+            if _model_field(self.model, 'updated_by'):
+                instance.updated_by_id = created_by_id
+            row.instance = instance
+
+    def _cell(self, row, index):
+        value = row.values[index] if index < len(row.values) else None
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip() if value is not None else ''
+
+    def _resolve(self, batch):
+        """Set the foreign keys of the batch, one query per column."""
+        default_company = self.workbook_import.default_company()
+        for related in self.target.related:
+            indexes = [index for index, rel in self.related.items() if rel is related]
+            scoped = related.scoped
+            wanted = {}
+            for row in batch:
+                value = self._cell(row, indexes[0]) if indexes else ''
+                if value:
+                    wanted[row] = (row.instance.company_id if scoped else None, value)
+            found = related.resolve(set(wanted.values()))
+            for row in batch:
+                if row.error:
+                    continue
+                if row in wanted:
+                    pk = found.get(wanted[row])
+                    if pk is AMBIGUOUS:
+                        row.error = f'{related.field}: "{wanted[row][1]}" matches more than one {related.model._meta.verbose_name}'
+                    elif pk is None:
+                        row.error = f'{related.field}: no {related.model._meta.verbose_name} "{wanted[row][1]}"'
+                    else:
+                        setattr(row.instance, f'{related.field}_id', pk)
+                elif related.field == 'company' and default_company:
+                    row.instance.company_id = default_company
+                if related.field == 'company' and 'company' in self.target.key and not row.error \
+                        and not row.instance.company_id:
+                    row.error = 'company_code: This field is required when there is more than one company.'
+
+    def _load_existing(self, batch):
+        """
+        Give rows whose natural key is already stored that row's values for
+        the columns the sheet does not write, so validation sees the record
+        as it will be after the upsert. One query per batch (one condition
+        per leading key value, e.g. per company).
+        """
+        attnames = self.target.key_attnames()
+        keyed = {}
+        for row in batch:
+            if row.error:
+                continue
+            key = tuple(getattr(row.instance, attname) for attname in attnames)
+            if all(value not in (None, '') for value in key):
+                keyed.setdefault(key, []).append(row)
+        if not keyed:
+            return
+
+        written = set(self.update_fields) | set(self.fields.values()) | set(self.target.key)
+        fill = [
+            field.attname for field in self.model._meta.concrete_fields
+            if not field.primary_key and field.name not in written
+        ]
+        *leading, last = attnames
+        groups = {}
+        for key in keyed:
+            groups.setdefault(key[:-1], []).append(key[-1])
+        condition = Q()
+        for prefix, values in groups.items():
+            condition |= Q(**dict(zip(leading, prefix)), **{f'{last}__in': values})
+        for stored in self.model.objects.filter(condition).values(*attnames, *fill):
+            for row in keyed.get(tuple(stored[attname] for attname in attnames), ()):
+                for attname in fill:
+                    setattr(row.instance, attname, stored[attname])
+
+    def _assign_codes(self, batch):
+        field, generate = self.target.code
+        # Codes already in the batch are not saved yet, so generate() cannot see them
+        taken = {getattr(row.instance, field) for row in batch}
+        for row in batch:
+            if row.error or getattr(row.instance, field):
+                continue
+            code = generate()
+            while code in taken:
+                code = generate()
+            taken.add(code)
+            setattr(row.instance, field, code)
+
+    def _validate(self, batch):
+        foreign_keys = [field for field in self.model._meta.concrete_fields if field.is_relation]
+        exclude = [field.name for field in foreign_keys]
+        for row in batch:
+            if row.error:
+                continue
+            instance = row.instance
+            missing = [
+                field.name for field in foreign_keys
+                if not field.null and field.name not in MANAGED_FIELDS and getattr(instance, field.attname) is None
+            ]
+            if missing:
+                row.error = '; '.join(f'{name}: This field is required.' for name in missing)
+                continue
+            try:
+                instance.clean_fields(exclude=exclude)
+                if self.target.clean:
+                    instance.clean()
+            except ValidationError as e:
+                row.error = _error_text(e)
+
+        if self.target.validate:
+            valid = {row.instance: row for row in batch if not row.error}
+            for instance, error in self.target.validate(list(valid), self.state).items():
+                valid[instance].error = error
+
+    def _deduplicate(self, batch):
+        """The last row with a natural key wins; earlier ones are skipped."""
+        attnames = self.target.key_attnames()
+        last = {}
+        for row in batch:
+            if not row.error:
+                key = tuple(getattr(row.instance, attname) for attname in attnames)
+                previous = last.get(key)
+                if previous:
+                    previous.result = 'skipped'
+                    previous.error = f'Superseded by row {row.number} with the same {", ".join(self.target.key)}'
+                last[key] = row
+
+    # Writing
+
+    def _write(self, rows):
+        instances = [row.instance for row in rows]
+        self.model.objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=list(self.target.key),
+            update_fields=self.update_fields
+        )
+        if self.target.after:
+            self.target.after(instances)
+
+    def _process(self, batch):
+        self._build(batch)
+        self._resolve(batch)
+        self._load_existing(batch)
+        if self.target.prepare:
+            self.target.prepare([row.instance for row in batch if not row.error])
+        if self.target.code:
+            self._assign_codes(batch)
+        self._validate(batch)
+        self._deduplicate(batch)
+
+        valid = [row for row in batch if not row.error]
+        try:
+            with transaction.atomic():
+                self._write(valid)
+        except DatabaseError:
+            # Find the rows the database refuses
+            for row in valid:
+                try:
+                    with transaction.atomic():
+                        self._write([row])
+                except DatabaseError as e:
+                    row.error = str(e)
+
+        for row in batch:
+            if row.error:
+                row.result = row.result or 'failed'
+            else:
+                row.result = 'success'
+        self._record(batch)
+
+    def _record(self, batch):
+        counts = {'success': 0, 'failed': 0, 'skipped': 0}
+        for row in batch:
+            counts[row.result] += 1
+        self.summary['rows'] += len(batch)
+        self.summary['successful'] += counts['success']
+        self.summary['failed'] += counts['failed']
+        self.summary['skipped'] += counts['skipped']
+        self.workbook_import.record(self, batch, counts)
+
+    def identifier(self, row):
+        values = [getattr(row.instance, attname, None) for attname in self.target.key_attnames() if attname != 'company_id']
+        return ' '.join(str(value) for value in values if value) or f'row {row.number}'
+
+
+class _ErrorWorkbook:
+    """Failed rows, sheet by sheet, in a write-only workbook spooled to disk."""
+
+    def __init__(self):
+        self.workbook = None
+        self.sheets = {}
+
+    def add(self, sheet_name, header, rows):
+        if self.workbook is None:
+            self.workbook = Workbook(write_only=True)
+        sheet = self.sheets.get(sheet_name)
+        if sheet is None:
+            sheet = self.sheets[sheet_name] = self.workbook.create_sheet(title=sheet_name[:31])
+            sheet.append(['Row'] + header + ['ERROR_STATUS'])
+        for row in rows:
+            sheet.append([row.number] + [_json_value(value) for value in row.values] + [row.error])
+
+    def save(self, session):
+        if self.workbook is None:
+            return None
+        with tempfile.TemporaryFile(suffix='.xlsx') as handle:
+            self.workbook.save(handle)
+            handle.seek(0)
+            session.error_file.save(f'Master_Data_Upload_Errors_{session.session_name}.xlsx', File(handle))
+        return reverse('masters:download_error_file', args=[session.id])
+
+
+class WorkbookImport:
+    """Import every recognised sheet of a workbook for an UploadSession."""
+
+    def __init__(self, session):
+        self.session = session
+        self.targets = _targets()
+        self.totals = {'processed': 0, 'success': 0, 'failed': 0, 'skipped': 0}
+        self.expected = 0
+        self.errors = []
+        self.sheets = {}
+        self.error_workbook = _ErrorWorkbook()
+        self._choices = {}
+        self._default_company = None
+
+    def default_company(self):
+        """The company rows without a company code belong to, when there is exactly one."""
+        if self._default_company is None:
+            from organization.models import Company
+            companies = list(Company.objects.values_list('pk', flat=True)[:2])
+            self._default_company = companies[0] if len(companies) == 1 else False
+        return self._default_company or None
+
+    def choice_map(self, field):
+        """{slug: stored value} accepting a choice's value or its label."""
+        key = (field.model, field.name)
+        if key not in self._choices:
+            choices = {}
+            for value, label in field.flatchoices:
+                choices[slug(label)] = value
+                choices[slug(value)] = value
+            self._choices[key] = choices
+        return self._choices[key]
+
+    def plan(self, workbook):
+        """(target, sheet name) pairs in import order, and the unrecognised sheets."""
+        plan = []
+        for target in self.targets:
+            plan.extend((target, name) for name in workbook.sheetnames if target.matches(name))
+        planned = {name for _, name in plan}
+        unmatched = [name for name in workbook.sheetnames if name not in planned]
+        return plan, unmatched
+
+    def run(self, source):
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            plan, unmatched = self.plan(workbook)
+            for name in unmatched:
+                self.sheets[name] = {'skipped': 'Not a master data sheet'}
+            for _, name in plan:
+                # Read from the sheet's dimension record, so it costs no parsing
+                self.expected += max((workbook[name].max_row or 1) - 1, 0)
+            self._save_progress(current_step='Reading workbook')
+
+            for target, name in plan:
+                sheet = workbook[name]
+                rows = enumerate(sheet.iter_rows(values_only=True), start=1)
+                self.sheets[name] = SheetImport(self, target, name).run(rows)
+                self._save_progress(
+                    current_step=f'{name}: done',
+                    error_details={'sheets': self.sheets, 'errors': self.errors}
+                )
+        finally:
+            workbook.close()
+
+        return self.error_workbook.save(self.session)
+
+    def record(self, sheet_import, batch, counts):
+        """Account for a processed batch: counters, ImportLog, error file and session progress."""
+        self.totals['processed'] += len(batch)
+        self.totals['success'] += counts['success']
+        self.totals['failed'] += counts['failed']
+        self.totals['skipped'] += counts['skipped']
+
+        problems = [row for row in batch if row.result != 'success']
+        if problems:
+            header = sheet_import.header
+            ImportLog.objects.bulk_create([
+                ImportLog(
+                    upload_session=self.session,
+                    sheet_name=sheet_import.sheet_name,
+                    row_number=row.number,
+                    model_name=sheet_import.model.__name__,
+                    record_identifier=sheet_import.identifier(row)[:200],
+                    result=row.result,
+                    message=row.error,
+                    original_data={
+                        name: _json_value(value) for name, value in zip(header, row.values) if name
+                    }
+                )
+                for row in problems
+            ])
+            self.error_workbook.add(sheet_import.sheet_name, header, [row for row in problems if row.result == 'failed'])
+            for row in problems:
+                if len(self.errors) >= MAX_SESSION_ERRORS:
+                    break
+                self.errors.append({'sheet': sheet_import.sheet_name, 'row': row.number, 'error': row.error})
+
+        self._save_progress(current_step=f'{sheet_import.sheet_name}: {sheet_import.summary["rows"]} rows')
+
+    def _save_progress(self, **fields):
+        processed = self.totals['processed']
+        total = max(self.expected, processed)
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            total_records=total,
+            processed_records=processed,
+            successful_records=self.totals['success'],
+            failed_records=self.totals['failed'],
+            skipped_records=self.totals['skipped'],
+            progress_percentage=min(99, processed * 100 // total) if total else 0,
+            updated_at=timezone.now(),
+            **fields
+        )
+
+
+def import_workbook(source, session):
+    """
+    Import the workbook ``source`` (a path or file object) for ``session``
+    and record the outcome on it. Returns the result summary.
+    """
+    UploadSession.objects.filter(pk=session.pk).update(
+        status='processing',
+        started_at=timezone.now(),
+        progress_percentage=0
+    )
+    workbook_import = WorkbookImport(session)
+    try:
+        error_file_url = workbook_import.run(source)
+    except Exception as e:
+        UploadSession.objects.filter(pk=session.pk).update(
+            status='failed',
+            error_message=str(e),
+            completed_at=timezone.now()
+        )
+        return {
+            'success': False,
+            'error': f'Error processing Excel file: {str(e)}',
+            'total_records': workbook_import.totals['processed'],
+            'successful_records': workbook_import.totals['success'],
+            'failed_records': workbook_import.totals['failed'],
+            'session_id': str(session.id)
+        }
+
+    totals = workbook_import.totals
+    UploadSession.objects.filter(pk=session.pk).update(
+        status='completed',
+        total_records=totals['processed'],
+        processed_records=totals['processed'],
+        successful_records=totals['success'],
+        failed_records=totals['failed'],
+        skipped_records=totals['skipped'],
+        progress_percentage=100,
+        current_step='Completed',
+        error_details={'sheets': workbook_import.sheets, 'errors': workbook_import.errors},
+        completed_at=timezone.now()
+    )
+    session.refresh_from_db()
+    return {
+        'success': True,
+        'total_records': totals['processed'],
+        'successful_records': totals['success'],
+        'failed_records': totals['failed'],
+        'skipped_records': totals['skipped'],
+        'sheets': workbook_import.sheets,
+        'error_file_url': error_file_url,
+        'session_id': str(session.id)
+    }
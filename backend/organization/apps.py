@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OrganizationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organization'
+
+    def ready(self):
+        from .services.stats import register_dashboards
+        register_dashboards()
@@ -0,0 +1,33 @@
+"""
+Django management command to precompute the admin dashboard statistics
+(customers, suppliers, companies, locations) into the cache, e.g. from cron
+every few minutes so dashboard requests never compute them.
+
+Only useful with a shared cache backend; with the default local-memory
+cache the values stay in this process.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils import stats
+
+
+class Command(BaseCommand):
+    help = 'Precompute and cache the admin dashboard statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dashboards', nargs='*', help='Dashboards to refresh (default: all)')
+
+    def handle(self, *args, **options):
+        registered = stats.dashboards()
+        unknown = set(options['dashboards']) - set(registered)
+        if unknown:
+            raise CommandError(
+                f'Unknown dashboards: {", ".join(sorted(unknown))} (available: {", ".join(sorted(registered))})'
+            )
+        for name in options['dashboards'] or sorted(registered):
+            start = time.perf_counter()
+            stats.refresh([name])
+            self.stdout.write(f'  {name}: {(time.perf_counter() - start) * 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS('Dashboard statistics refreshed'))
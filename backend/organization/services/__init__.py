@@ -0,0 +1 @@
+# Organization services
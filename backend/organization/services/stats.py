@@ -0,0 +1,64 @@
+"""Company and location dashboard counters (``/api/.../stats/``), see utils.stats."""
+from django.db.models import Count, Exists, OuterRef, Q
+
+from utils import stats
+
+from ..models import Company, Location
+
+
+def _company_aggregates():
+    return {
+        'total_companies': Count('id'),
+        'active_companies': Count('id', filter=Q(is_active=True)),
+        'companies_with_locations': Count(
+            'id', filter=Q(Exists(Location.objects.filter(company_id=OuterRef('pk'))))
+        ),
+    }
+
+
+def _company_build(values, extra):
+    return {
+        'total_companies': values['total_companies'],
+        'active_companies': values['active_companies'],
+        'inactive_companies': values['total_companies'] - values['active_companies'],
+        'companies_with_locations': values['companies_with_locations'],
+    }
+
+
+def _location_aggregates():
+    aggregates = {
+        'total_locations': Count('id'),
+        'active_locations': Count('id', filter=Q(is_active=True)),
+    }
+    for location_type, _ in Location.LOCATION_TYPE_CHOICES:
+        aggregates[f'type:{location_type}'] = Count('id', filter=Q(location_type=location_type))
+    return aggregates
+
+
+def _location_extra():
+    # One GROUP BY instead of a count per company
+    return {
+        'by_company': dict(
+            Company.objects.order_by().annotate(count=Count('locations')).values_list('name', 'count')
+        )
+    }
+
+
+def _location_build(values, extra):
+    return {
+        'total_locations': values['total_locations'],
+        'active_locations': values['active_locations'],
+        'inactive_locations': values['total_locations'] - values['active_locations'],
+        'by_type': {
+            location_type: values[f'type:{location_type}']
+            for location_type, _ in Location.LOCATION_TYPE_CHOICES
+        },
+        'by_company': extra['by_company'],
+    }
+
+
+def register_dashboards():
+    stats.register(stats.Dashboard('companies', Company, _company_aggregates, _company_build,
+                                   depends_on=(Company, Location)))
+    stats.register(stats.Dashboard('locations', Location, _location_aggregates, _location_build,
+                                   extra=_location_extra, depends_on=(Location, Company)))
@@ -7,6 +7,7 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Q
 from django.conf import settings
 from .models import Company, Location, OperatingHours
+from utils import stats as dashboard_stats
 from .serializers import (
     CompanySerializer, CompanyListSerializer, CompanyDetailSerializer,
     LocationSerializer, LocationListSerializer, LocationDetailSerializer,
@@ -59,17 +60,8 @@ class CompanyViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get company statistics"""
-        total_companies = Company.objects.count()
-        active_companies = Company.objects.filter(is_active=True).count()
-        companies_with_locations = Company.objects.filter(locations__isnull=False).distinct().count()
-        
-        return Response({
-            'total_companies': total_companies,
-            'active_companies': active_companies,
-            'inactive_companies': total_companies - active_companies,
-            'companies_with_locations': companies_with_locations,
-        })
+        """Get company statistics (one query, cached until the next company/location write)"""
+        return Response(dashboard_stats.get('companies'))
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def public(self, request):
@@ -189,28 +181,8 @@ class LocationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get location statistics"""
-        total_locations = Location.objects.count()
-        active_locations = Location.objects.filter(is_active=True).count()
-        
-        # Count by type
-        type_counts = {}
-        for location_type, _ in Location.LOCATION_TYPE_CHOICES:
-            type_counts[location_type] = Location.objects.filter(location_type=location_type).count()
-        
-        # Count by company
-        company_counts = {}
-        companies = Company.objects.all()
-        for company in companies:
-            company_counts[company.name] = company.locations.count()
-        
-        return Response({
-            'total_locations': total_locations,
-            'active_locations': active_locations,
-            'inactive_locations': total_locations - active_locations,
-            'by_type': type_counts,
-            'by_company': company_counts,
-        })
+        """Get location statistics (two queries, cached until the next location/company write)"""
+        return Response(dashboard_stats.get('locations'))
 
 
 class OperatingHoursViewSet(viewsets.ModelViewSet):
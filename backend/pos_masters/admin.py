@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     POSMaster, POSMasterSettings, POSMasterHistory, POSMasterMapping, 
     CurrencyDenomination, Terminal, PrinterTemplate, TerminalTransactionSetting,
-    TerminalTenderMapping, TerminalDepartmentMapping, SettlementReason
+    TerminalTenderMapping, TerminalDepartmentMapping, SettlementReason, SyncTombstone
 )
 
 @admin.register(POSMaster)
@@ -177,6 +177,14 @@ class SettlementReasonAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('entity', 'object_id', 'company', 'terminal', 'deleted_at')
+    list_filter = ('entity', 'company')
+    search_fields = ('object_id', 'terminal__terminal_code')
+    readonly_fields = ('entity', 'object_id', 'company', 'terminal', 'deleted_at')
+
+
 @admin.register(Terminal)
 class TerminalAdmin(admin.ModelAdmin):
     list_display = ('name', 'terminal_code', 'terminal_type', 'company', 'location', 'status', 'is_active', 'last_sync', 'updated_at')
@@ -4,3 +4,7 @@ class PosMastersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pos_masters'
     verbose_name = 'POS Masters'
+    
+    def ready(self):
+        from .signals import connect_sync_tombstones
+        connect_sync_tombstones()
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:45
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('pos_masters', '0009_alter_terminaldepartmentmapping_department'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entity', models.CharField(help_text="Delta-sync entity name (e.g. 'item_variants')", max_length=50)),
+                ('object_id', models.UUIDField(help_text='Primary key of the deleted row')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(blank=True, help_text='Company the row belonged to (empty = visible to every terminal)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to='organization.company')),
+                ('terminal', models.ForeignKey(blank=True, help_text='Terminal the row belonged to, for per-terminal mappings', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to='pos_masters.terminal')),
+            ],
+            options={
+                'verbose_name': 'Sync Tombstone',
+                'verbose_name_plural': 'Sync Tombstones',
+                'db_table': 'pos_sync_tombstones',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['entity', 'deleted_at', 'id'], name='pos_sync_to_entity_09d227_idx')],
+            },
+        ),
+    ]
@@ -607,4 +607,44 @@ class SettlementReason(models.Model):
     def save(self, *args, **kwargs):
         if self.code:
             self.code = self.code.upper()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class SyncTombstone(models.Model):
+    """
+    Record of a deleted master row, served to terminals by the delta-sync
+    feed so offline tills can drop rows they cached.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    entity = models.CharField(max_length=50, help_text="Delta-sync entity name (e.g. 'item_variants')")
+    object_id = models.UUIDField(help_text="Primary key of the deleted row")
+    company = models.ForeignKey(
+        'organization.Company',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='sync_tombstones',
+        help_text="Company the row belonged to (empty = visible to every terminal)"
+    )
+    terminal = models.ForeignKey(
+        Terminal,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='sync_tombstones',
+        help_text="Terminal the row belonged to, for per-terminal mappings"
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'pos_sync_tombstones'
+        verbose_name = 'Sync Tombstone'
+        verbose_name_plural = 'Sync Tombstones'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['entity', 'deleted_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entity} {self.object_id} deleted {self.deleted_at}"
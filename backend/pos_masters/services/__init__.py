@@ -0,0 +1 @@
+# POS masters services
@@ -0,0 +1,226 @@
+"""
+Delta-sync feed for offline-capable terminals.
+
+Each synced entity is read in ``(updated_at, id)`` order from a per-entity
+high-water mark, so a till only downloads rows that changed since its last
+sync. Deleted rows are served from SyncTombstone (written by the post_delete
+handlers in ``pos_masters.signals``). Rows are returned column-wise — one
+``fields`` header and a list of value arrays — to keep payloads small.
+
+Cursors are opaque, URL-safe strings encoding the last (timestamp, id) seen
+for both rows and tombstones. Rows changed in the last
+``settings.TERMINAL_SYNC_SETTLE_SECONDS`` are held back so a transaction that
+committed late with an earlier ``updated_at`` is not skipped.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pay_modes.models import PayMode
+from products.models import ItemBarcode, ItemTaxDetail, ItemVariant
+
+from ..models import (
+    CurrencyDenomination, SettlementReason, SyncTombstone,
+    TerminalDepartmentMapping, TerminalTenderMapping
+)
+
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor this server did not issue."""
+
+
+class SyncEntity:
+    """One synced table: how to scope it to a terminal and which columns to send."""
+
+    def __init__(self, model, fields, scope='global', queryset=None):
+        self.model = model
+        self.fields = fields
+        self.scope = scope
+        self._queryset = queryset
+
+    def rows(self, terminal):
+        queryset = self._queryset(terminal) if self._queryset else self.model.objects.all()
+        if self.scope == 'company' and self._queryset is None:
+            queryset = queryset.filter(_company_filter(terminal, 'company_id'))
+        elif self.scope == 'terminal':
+            queryset = queryset.filter(terminal=terminal)
+        return queryset
+
+    def tombstones(self, terminal, name):
+        queryset = SyncTombstone.objects.filter(entity=name)
+        if self.scope == 'company':
+            queryset = queryset.filter(_company_filter(terminal, 'company_id'))
+        elif self.scope == 'terminal':
+            queryset = queryset.filter(terminal_id=terminal.pk)
+        return queryset
+
+    def tombstone_scope(self, instance):
+        """Scope columns stored on the tombstone of a deleted instance."""
+        if self.scope == 'company':
+            return {'company_id': getattr(instance, 'company_id', None)}
+        if self.scope == 'terminal':
+            return {'terminal_id': instance.terminal_id}
+        return {}
+
+
+def _company_filter(terminal, field):
+    """Rows of the terminal's company plus rows shared by all companies."""
+    if not terminal.company_id:
+        return Q()
+    return Q(**{field: terminal.company_id}) | Q(**{f'{field}__isnull': True})
+
+
+ENTITIES = {
+    'item_variants': SyncEntity(
+        ItemVariant,
+        ('id', 'item_id', 'sku_code', 'variant_name', 'barcode', 'default_price',
+         'sales_uom__code', 'is_active'),
+        scope='company',
+    ),
+    'item_barcodes': SyncEntity(
+        ItemBarcode,
+        ('id', 'variant_id', 'barcode', 'is_primary', 'is_active'),
+        scope='company',
+    ),
+    'item_tax_details': SyncEntity(
+        ItemTaxDetail,
+        ('id', 'item_id', 'tax_code', 'tax_rate', 'tax_inclusive', 'applicable_from', 'is_active'),
+        scope='company',
+        # Tax rows carry no company; scope them through the parent item
+        queryset=lambda terminal: ItemTaxDetail.objects.filter(_company_filter(terminal, 'item__company_id')),
+    ),
+    'pay_modes': SyncEntity(
+        PayMode,
+        ('id', 'code', 'name', 'payment_type', 'is_active', 'requires_authorization',
+         'min_amount', 'max_amount', 'display_order', 'allow_refund', 'allow_partial_refund',
+         'requires_receipt'),
+    ),
+    'currency_denominations': SyncEntity(
+        CurrencyDenomination,
+        ('id', 'currency_id', 'currency__code', 'denomination_type', 'value', 'display_name',
+         'display_order', 'is_active'),
+    ),
+    'settlement_reasons': SyncEntity(
+        SettlementReason,
+        ('id', 'code', 'name', 'reason_type', 'module_ref', 'is_active'),
+    ),
+    'tender_mappings': SyncEntity(
+        TerminalTenderMapping,
+        ('id', 'tender_type', 'minimum_value', 'maximum_value', 'allow_tender', 'allow_refund'),
+        scope='terminal',
+    ),
+    'department_mappings': SyncEntity(
+        TerminalDepartmentMapping,
+        ('id', 'department_id', 'allow'),
+        scope='terminal',
+    ),
+}
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into {'u': [ts, id], 'd': [ts, id]}; None means cold start."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        for key in ('u', 'd'):
+            mark = position.get(key)
+            if mark is not None and (not isinstance(mark, list) or parse_datetime(mark[0]) is None):
+                raise ValueError(key)
+        return position
+    except (binascii.Error, ValueError, TypeError, AttributeError, IndexError):
+        raise InvalidCursor('Invalid sync cursor')
+
+
+def _after(queryset, field, mark):
+    """Keyset filter: strictly after the (timestamp, id) high-water mark."""
+    if not mark:
+        return queryset
+    timestamp = parse_datetime(mark[0])
+    if mark[1] is None:
+        return queryset.filter(**{f'{field}__gt': timestamp})
+    return queryset.filter(
+        Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': mark[1]})
+    )
+
+
+def _mark(row):
+    return [row[0].isoformat(), str(row[1])]
+
+
+def entity_page(name, terminal, cursor=None, limit=DEFAULT_PAGE_SIZE, now=None):
+    """
+    One page of changes for one entity.
+
+    Returns {'fields', 'rows', 'deleted', 'cursor', 'has_more'}. A cold start
+    (no cursor) sends every current row and no tombstones.
+    """
+    entity = ENTITIES[name]
+    now = now or timezone.now()
+    settled = now - timedelta(seconds=getattr(settings, 'TERMINAL_SYNC_SETTLE_SECONDS', 5))
+    position = decode_cursor(cursor) or {'u': None, 'd': [settled.isoformat(), None]}
+
+    rows = list(
+        _after(entity.rows(terminal), 'updated_at', position['u']).filter(
+            updated_at__lte=settled
+        ).order_by('updated_at', 'pk').values_list('updated_at', 'pk', *entity.fields)[:limit + 1]
+    )
+    deleted = list(
+        _after(entity.tombstones(terminal, name), 'deleted_at', position['d']).filter(
+            deleted_at__lte=settled
+        ).order_by('deleted_at', 'pk').values_list('deleted_at', 'pk', 'object_id')[:limit + 1]
+    )
+
+    has_more = len(rows) > limit or len(deleted) > limit
+    rows = rows[:limit]
+    deleted = deleted[:limit]
+    if rows:
+        position['u'] = _mark(rows[-1])
+    if deleted:
+        position['d'] = _mark(deleted[-1])
+
+    return {
+        'fields': list(entity.fields),
+        'rows': [list(row[2:]) for row in rows],
+        'deleted': [row[2] for row in deleted],
+        'cursor': encode_cursor(position),
+        'has_more': has_more,
+    }
+
+
+def delta(terminal, cursors=None, entities=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Changes for several entities at once.
+
+    ``cursors`` maps entity names to the cursor returned by the previous
+    call; ``entities`` limits the entities returned (default: all).
+    """
+    cursors = cursors or {}
+    names = entities or list(ENTITIES)
+    unknown = [name for name in names if name not in ENTITIES]
+    if unknown:
+        raise KeyError(', '.join(unknown))
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    now = timezone.now()
+    pages = {name: entity_page(name, terminal, cursors.get(name), limit, now=now) for name in names}
+    return {
+        'entities': pages,
+        'has_more': any(page['has_more'] for page in pages.values()),
+    }
@@ -0,0 +1,27 @@
+"""
+Tombstones for the terminal delta-sync feed.
+
+Every entity served by ``pos_masters.services.sync`` gets a post_delete
+handler that records the deleted primary key, so tills can drop it.
+"""
+from django.db.models.signals import post_delete
+
+from .models import SyncTombstone
+
+
+def _tombstone_handler(name, entity):
+    def record_tombstone(sender, instance, **kwargs):
+        SyncTombstone.objects.create(entity=name, object_id=instance.pk, **entity.tombstone_scope(instance))
+    return record_tombstone
+
+
+def connect_sync_tombstones():
+    from .services.sync import ENTITIES
+
+    for name, entity in ENTITIES.items():
+        post_delete.connect(
+            _tombstone_handler(name, entity),
+            sender=entity.model,
+            weak=False,
+            dispatch_uid=f'pos_masters.sync_tombstone.{name}'
+        )
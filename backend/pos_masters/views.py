@@ -16,6 +16,7 @@ from .serializers import (
     TerminalTenderMappingSerializer, TerminalDepartmentMappingSerializer,
     SettlementReasonSerializer
 )
+from .services import sync
 
 class POSMasterViewSet(viewsets.ModelViewSet):
     queryset = POSMaster.objects.all()
@@ -417,6 +418,49 @@ class TerminalViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(terminal)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'], url_path='delta-sync')
+    def delta_sync(self, request, pk=None):
+        """
+        Return master rows changed or deleted since the terminal's last sync
+        
+        Body:
+        - cursors: {entity: cursor} from the previous response (omit an
+          entity, or send an empty cursor, for a cold start)
+        - entities: Optional list of entities to sync (default: all)
+        - limit: Optional rows per entity per page (default 500)
+        
+        Call again with the returned cursors while has_more is true. The
+        terminal's last_sync is stamped once it is fully caught up.
+        """
+        terminal = self.get_object()
+        cursors = request.data.get('cursors') or {}
+        entities = request.data.get('entities') or None
+        limit = request.data.get('limit', sync.DEFAULT_PAGE_SIZE)
+        
+        if not isinstance(cursors, dict) or (entities is not None and not isinstance(entities, list)):
+            return Response(
+                {'error': 'cursors must be an object and entities a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = sync.delta(terminal, cursors=cursors, entities=entities, limit=limit)
+        except KeyError as e:
+            return Response(
+                {'error': f'Unknown sync entities: {e.args[0]}', 'available': list(sync.ENTITIES)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except sync.InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not result['has_more']:
+            terminal.update_last_sync()
+        return Response(result)
+    
     @action(detail=False, methods=['get', 'post'])
     def identify_by_hostname(self, request):
         """
@@ -1,10 +1,15 @@
 from django.contrib import admin
-from .models import Item, ItemVariant, UOM, UOMConversion, Brand
+from .models import Item, ItemVariant, ItemBarcode, UOM, UOMConversion, Brand, CatalogueSnapshot
 
 class ItemVariantInline(admin.TabularInline):
     model = ItemVariant
     extra = 1
 
+class ItemBarcodeInline(admin.TabularInline):
+    model = ItemBarcode
+    extra = 0
+    readonly_fields = ['is_primary']
+
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
     list_display = ['item_name', 'item_code', 'item_type', 'brand', 'category', 'status', 'company']
@@ -16,7 +21,14 @@ class ItemAdmin(admin.ModelAdmin):
 class ItemVariantAdmin(admin.ModelAdmin):
     list_display = ['variant_name', 'sku_code', 'item', 'default_price', 'company']
     list_filter = ['company', 'is_active']
-    search_fields = ['variant_name', 'sku_code']
+    search_fields = ['variant_name', 'sku_code', 'barcode']
+    inlines = [ItemBarcodeInline]
+
+@admin.register(ItemBarcode)
+class ItemBarcodeAdmin(admin.ModelAdmin):
+    list_display = ['barcode', 'variant', 'is_primary', 'is_active', 'company']
+    list_filter = ['company', 'is_primary', 'is_active']
+    search_fields = ['barcode', 'variant__sku_code']
 
 @admin.register(UOM)
 class UOMAdmin(admin.ModelAdmin):
@@ -31,4 +43,9 @@ class UOMConversionAdmin(admin.ModelAdmin):
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ['name', 'code', 'company']
-    list_filter = ['company']
\ No newline at end of file
+    list_filter = ['company']
+
+@admin.register(CatalogueSnapshot)
+class CatalogueSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['company', 'version', 'file_version', 'row_count', 'file_size', 'exported_at']
+    readonly_fields = ['version', 'file_version', 'file_name', 'file_size', 'row_count', 'exported_at', 'updated_at']
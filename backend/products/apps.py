@@ -5,61 +5,7 @@ class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def ready(self):
+        from .signals import connect_catalogue_snapshot, connect_scan_cache
+        connect_scan_cache()
+        connect_catalogue_snapshot()
@@ -0,0 +1,79 @@
+"""
+Django management command to measure barcode scan latency per cache tier:
+database, shared cache, in-process LRU, and a batched basket lookup.
+
+Only reads are made; the caches are cleared of the sampled barcodes before
+and after the run.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from products.models import ItemBarcode
+from products.services import scan
+
+
+class Command(BaseCommand):
+    help = 'Benchmark barcode scan resolution latency (DB, shared cache, local LRU, basket)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--barcodes', type=int, default=200, help='Distinct barcodes to sample')
+        parser.add_argument('--basket', type=int, default=30, help='Barcodes per batched lookup')
+        parser.add_argument('--company', default=None, help='Company ID to scope lookups to')
+
+    def handle(self, *args, **options):
+        rows = ItemBarcode.objects.filter(is_active=True, variant__is_active=True)
+        if options['company']:
+            rows = rows.filter(company_id=options['company'])
+        barcodes = list(rows.values_list('company_id', 'barcode')[:options['barcodes']])
+        if not barcodes:
+            raise CommandError('Benchmark needs at least one active item barcode')
+        company_id = options['company']
+        codes = [barcode for _, barcode in barcodes]
+
+        self.stdout.write(f'Resolving {len(codes)} barcodes, basket size {options["basket"]}\n')
+        self.stdout.write(f'{"tier":>12} {"queries":>8} {"median us":>10} {"p95 us":>8}')
+
+        scan.invalidate(barcodes)
+        self._report('database', *self._time_each(codes, company_id, use_cache=False))
+
+        # First cached pass fills both tiers; drop the LRU to time the shared cache alone
+        self._time_each(codes, company_id)
+        scan.local_cache.clear()
+        self._report('shared cache', *self._time_each(codes, company_id))
+        self._report('local LRU', *self._time_each(codes, company_id))
+
+        basket = codes[:options['basket']]
+        scan.invalidate(barcodes)
+        queries, timings = self._time(lambda: scan.resolve_many(basket, company_id))
+        self._report(f'basket x{len(basket)}', queries, [timings])
+        queries, timings = self._time(lambda: scan.resolve_many(basket, company_id))
+        self._report('basket hit', queries, [timings])
+
+        scan.invalidate(barcodes)
+        self.stdout.write(self.style.SUCCESS('Scan benchmark complete'))
+
+    def _time(self, runner):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            runner()
+            elapsed = (time.perf_counter() - start) * 1000000
+        return len(context.captured_queries), elapsed
+
+    def _time_each(self, codes, company_id, use_cache=True):
+        """Resolve every barcode once; return (max queries per scan, microseconds per scan)."""
+        queries = 0
+        timings = []
+        for code in codes:
+            count, elapsed = self._time(lambda: scan.resolve(code, company_id, use_cache=use_cache))
+            queries = max(queries, count)
+            timings.append(elapsed)
+        return queries, timings
+
+    def _report(self, tier, queries, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(round(len(timings) * 0.95)) - 1)]
+        self.stdout.write(f'{tier:>12} {queries:>8} {statistics.median(timings):>10.1f} {p95:>8.1f}')
@@ -0,0 +1,124 @@
+"""
+Django management command guarding the product catalogue endpoints against
+N+1 regressions.
+
+Each endpoint is requested against a small and a large generated catalogue
+(items with several variants and attributes each); the query count must be
+the same for both and stay within ``--max-queries``. The generated rows are
+created inside a transaction that is rolled back.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from categories.models import Attribute, AttributeValue, Category, ProductAttributeTemplate
+from organization.models import Company
+from products import views
+from products.models import UOM, Brand, Item, ItemVariant, VariantAttribute
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated catalogue."""
+
+
+# (label, view, query string, detail?)
+CHECKS = [
+    ('items', views.ItemListCreateView, {}, False),
+    ('items catalogue', views.ItemListCreateView, {'view': 'catalogue'}, False),
+    ('items fields', views.ItemListCreateView, {'fields': 'id,item_name,brand_name,variants'}, False),
+    ('item detail', views.ItemDetailView, {}, True),
+    ('variants', views.ItemVariantListCreateView, {}, False),
+]
+
+
+class Command(BaseCommand):
+    help = 'Check that product list/detail endpoints run a constant number of queries per page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=2, help='Items in the small catalogue')
+        parser.add_argument('--large', type=int, default=40, help='Items in the large catalogue')
+        parser.add_argument('--variants', type=int, default=3, help='Variants per item')
+        parser.add_argument('--max-queries', type=int, default=6, help='Most queries allowed per request')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by('username').first()
+        if not user:
+            raise CommandError('Query check needs an active user')
+
+        counts = {}
+        for size in (options['small'], options['large']):
+            counts[size] = self._measure(user, size, options['variants'])
+
+        self.stdout.write(f'{"endpoint":>16} {options["small"]:>7} {options["large"]:>7}')
+        failures = []
+        for label, *_ in CHECKS:
+            small, large = counts[options['small']][label], counts[options['large']][label]
+            self.stdout.write(f'{label:>16} {small:>7} {large:>7}')
+            if small != large:
+                failures.append(f'{label}: {small} -> {large} queries as the page grows')
+            elif large > options['max_queries']:
+                failures.append(f'{label}: {large} queries (max {options["max_queries"]})')
+
+        if failures:
+            raise CommandError('Query count regression:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Catalogue endpoints run a constant number of queries'))
+
+    def _measure(self, user, size, variants_per_item):
+        counts = {}
+        try:
+            with transaction.atomic():
+                company, item_pk = self._build_catalogue(size, variants_per_item)
+                factory = APIRequestFactory()
+                for label, view, params, detail in CHECKS:
+                    params = dict(params, company=str(company.pk))
+                    request = factory.get('/', params)
+                    force_authenticate(request, user=user)
+                    kwargs = {'pk': item_pk} if detail else {}
+                    with CaptureQueriesContext(connection) as context:
+                        response = view.as_view()(request, **kwargs)
+                        response.render()
+                    if response.status_code != 200:
+                        raise CommandError(f'{label} returned HTTP {response.status_code}')
+                    counts[label] = len(context.captured_queries)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return counts
+
+    def _build_catalogue(self, size, variants_per_item):
+        company = Company.objects.create(name='Query Check', code='QCHK')
+        uom = UOM.objects.create(company=company, code='EA', description='Each')
+        template = ProductAttributeTemplate.objects.create(company=company, template_name='Query Check')
+        category = Category.objects.create(company=company, name='Query Check')
+        brand = Brand.objects.create(company=company, name='Query Check', code='QCHK')
+        attributes = [Attribute.objects.create(company=company, name=name) for name in ('Colour', 'Size')]
+        values = [
+            AttributeValue.objects.create(company=company, attribute=attribute, value_label=f'{attribute.name} 1')
+            for attribute in attributes
+        ]
+
+        items = Item.objects.bulk_create([
+            Item(
+                company=company, item_code=f'QC{index}', item_name=f'Query Check {index}',
+                attribute_template=template, category=category, brand=brand, stock_uom=uom
+            )
+            for index in range(size)
+        ])
+        variants = ItemVariant.objects.bulk_create([
+            ItemVariant(
+                company=company, item=item, sku_code=f'QC{index}-{number}', variant_name=f'{index}/{number}',
+                sales_uom=uom, stock_uom=uom, barcode=f'QC{index:05d}{number:02d}'
+            )
+            for index, item in enumerate(items)
+            for number in range(variants_per_item)
+        ])
+        VariantAttribute.objects.bulk_create([
+            VariantAttribute(item_variant=variant, attribute=attribute, attribute_value=value)
+            for variant in variants
+            for attribute, value in zip(attributes, values)
+        ])
+        return company, items[0].pk
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('products', '0012_delete_itemmaster_delete_itempackage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemtaxdetail',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='itemtaxdetail',
+            index=models.Index(fields=['updated_at'], name='products_it_updated_1d8718_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemvariant',
+            index=models.Index(fields=['company', 'updated_at'], name='products_it_company_c75f45_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def copy_variant_barcodes(apps, schema_editor):
+    """
+    Seed ItemBarcode with each variant's existing barcode as its primary row.
+    Where two variants of a company share a barcode, the first one keeps it.
+    """
+    ItemVariant = apps.get_model('products', 'ItemVariant')
+    ItemBarcode = apps.get_model('products', 'ItemBarcode')
+    seen = set()
+    rows = []
+    for variant_id, company_id, barcode in ItemVariant.objects.exclude(
+        barcode__isnull=True
+    ).order_by('created_at').values_list('id', 'company_id', 'barcode').iterator():
+        barcode = barcode.strip()
+        if not barcode or (company_id, barcode) in seen:
+            continue
+        seen.add((company_id, barcode))
+        rows.append(ItemBarcode(company_id=company_id, variant_id=variant_id, barcode=barcode, is_primary=True))
+    ItemBarcode.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('products', '0013_sync_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itemvariant',
+            name='barcode',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='ItemBarcode',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('barcode', models.CharField(help_text='Scanned code (EAN/UPC/internal)', max_length=100)),
+                ('is_primary', models.BooleanField(default=False, help_text="Mirrors the variant's own barcode field")),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='item_barcodes', to='organization.company')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='barcodes', to='products.itemvariant')),
+            ],
+            options={
+                'verbose_name': 'Item Barcode',
+                'verbose_name_plural': 'Item Barcodes',
+                'db_table': 'products_item_barcode',
+                'ordering': ['-is_primary', 'barcode'],
+                'indexes': [models.Index(fields=['company', 'updated_at'], name='products_it_company_0af39b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='itembarcode',
+            constraint=models.UniqueConstraint(fields=('company', 'barcode'), name='uniq_item_barcode_company'),
+        ),
+        migrations.AddConstraint(
+            model_name='itembarcode',
+            constraint=models.UniqueConstraint(condition=models.Q(('company__isnull', True)), fields=('barcode',), name='uniq_item_barcode_shared'),
+        ),
+        migrations.RunPython(copy_variant_barcodes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:56
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('products', '0014_item_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=1, help_text='Bumped on every change to the snapshot rows')),
+                ('file_version', models.PositiveBigIntegerField(default=0, help_text='Version the exported file was written at')),
+                ('file_name', models.CharField(blank=True, help_text='Exported file, relative to CATALOGUE_SNAPSHOT_DIR', max_length=255)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('exported_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='catalogue_snapshot', to='organization.company')),
+            ],
+            options={
+                'verbose_name': 'Catalogue Snapshot',
+                'verbose_name_plural': 'Catalogue Snapshots',
+                'db_table': 'products_catalogue_snapshot',
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogueSnapshotRow',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('item_id', models.UUIDField()),
+                ('category_id', models.UUIDField(blank=True, null=True)),
+                ('brand_id', models.UUIDField(blank=True, null=True)),
+                ('sku_code', models.CharField(max_length=80)),
+                ('variant_name', models.CharField(max_length=200)),
+                ('item_name', models.CharField(max_length=200)),
+                ('item_status', models.CharField(max_length=20)),
+                ('barcodes', models.JSONField(blank=True, default=list, help_text='Active barcodes, primary first')),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('is_taxable', models.BooleanField(default=True)),
+                ('tax_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('tax_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('tax_inclusive', models.BooleanField(default=False)),
+                ('uom', models.CharField(max_length=20)),
+                ('uom_decimals', models.IntegerField(default=2)),
+                ('category_path', models.CharField(blank=True, max_length=500)),
+                ('brand_name', models.CharField(blank=True, max_length=200)),
+                ('is_active', models.BooleanField(default=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='catalogue_rows', to='organization.company')),
+                ('variant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='catalogue_row', to='products.itemvariant')),
+            ],
+            options={
+                'verbose_name': 'Catalogue Snapshot Row',
+                'verbose_name_plural': 'Catalogue Snapshot Rows',
+                'db_table': 'products_catalogue_snapshot_row',
+                'ordering': ['sku_code'],
+                'indexes': [models.Index(fields=['company', 'sku_code'], name='products_ca_company_0dac24_idx'), models.Index(fields=['category_id'], name='products_ca_categor_174482_idx'), models.Index(fields=['brand_id'], name='products_ca_brand_i_163225_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+def drop_duplicate_shared_snapshots(apps, schema_editor):
+    """Keep the newest shared (company-less) snapshot row; later ones were created by a race."""
+    CatalogueSnapshot = apps.get_model('products', 'CatalogueSnapshot')
+    shared = list(CatalogueSnapshot.objects.filter(company__isnull=True).order_by('-version').values_list('pk', flat=True))
+    if len(shared) > 1:
+        CatalogueSnapshot.objects.filter(pk__in=shared[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('products', '0015_catalogue_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_shared_snapshots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cataloguesnapshot',
+            constraint=models.UniqueConstraint(models.Value(True), condition=models.Q(('company__isnull', True)), name='products_catalogue_snapshot_one_shared'),
+        ),
+    ]
@@ -193,7 +193,7 @@ class ItemVariant(models.Model):
     purchase_uom = models.ForeignKey(UOM, on_delete=models.SET_NULL, null=True, blank=True, related_name='variant_purchases')
     stock_uom = models.ForeignKey(UOM, on_delete=models.PROTECT, related_name='variant_stocks') # Usually same as parent, but explicit here
     
-    barcode = models.CharField(max_length=100, blank=True, null=True) # Per SKU barcode
+    barcode = models.CharField(max_length=100, blank=True, null=True, db_index=True) # Primary barcode, mirrored in ItemBarcode
     
     # Pricing defaults (can be overridden by Price List)
     default_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -209,11 +209,52 @@ class ItemVariant(models.Model):
         db_table = 'products_item_variant'
         unique_together = ['company', 'sku_code']
         ordering = ['variant_name']
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.variant_name} ({self.sku_code})"
 
 
+class ItemBarcode(models.Model):
+    """
+    Barcodes that resolve to an Item Variant at the till.
+
+    A variant can carry several barcodes (supplier EANs, inner/outer packs);
+    the one in ItemVariant.barcode is kept here as the primary row.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='item_barcodes', null=True, blank=True)
+    variant = models.ForeignKey(ItemVariant, on_delete=models.CASCADE, related_name='barcodes')
+    barcode = models.CharField(max_length=100, help_text="Scanned code (EAN/UPC/internal)")
+    is_primary = models.BooleanField(default=False, help_text="Mirrors the variant's own barcode field")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Item Barcode"
+        verbose_name_plural = "Item Barcodes"
+        db_table = 'products_item_barcode'
+        ordering = ['-is_primary', 'barcode']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'barcode'], name='uniq_item_barcode_company'),
+            models.UniqueConstraint(
+                fields=['barcode'],
+                condition=models.Q(company__isnull=True),
+                name='uniq_item_barcode_shared'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.barcode} -> {self.variant_id}"
+
+
 class VariantAttribute(models.Model):
     """
     Links an Item Variant to specific Attribute Values (e.g. Color=Red).
@@ -245,7 +286,91 @@ class ItemTaxDetail(models.Model):
     state = models.CharField(max_length=100, blank=True, null=True)
     applicable_from = models.DateField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Item Tax Detail"
         db_table = 'products_item_tax_detail'
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+
+class CatalogueSnapshot(models.Model):
+    """
+    Version counter and exported file of a company's POS catalogue snapshot.
+
+    The version is bumped whenever any of the company's snapshot rows (or a
+    shared, company-less row) change; terminals compare it via ETag.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, related_name='catalogue_snapshot', null=True, blank=True)
+    version = models.PositiveBigIntegerField(default=1, help_text="Bumped on every change to the snapshot rows")
+    file_version = models.PositiveBigIntegerField(default=0, help_text="Version the exported file was written at")
+    file_name = models.CharField(max_length=255, blank=True, help_text="Exported file, relative to CATALOGUE_SNAPSHOT_DIR")
+    file_size = models.PositiveBigIntegerField(default=0)
+    row_count = models.PositiveIntegerField(default=0)
+    exported_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Catalogue Snapshot"
+        verbose_name_plural = "Catalogue Snapshots"
+        db_table = 'products_catalogue_snapshot'
+        constraints = [
+            # company is unique, but NULLs are distinct: allow one shared row
+            models.UniqueConstraint(
+                models.Value(True),
+                condition=models.Q(company__isnull=True),
+                name='products_catalogue_snapshot_one_shared'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.company or 'Shared'} v{self.version}"
+
+
+class CatalogueSnapshotRow(models.Model):
+    """
+    One sellable SKU, flattened for tills: variant, barcodes, price, tax,
+    UOM, category path and brand. Maintained by products.services.snapshot.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='catalogue_rows', null=True, blank=True)
+    variant = models.OneToOneField(ItemVariant, on_delete=models.CASCADE, related_name='catalogue_row')
+    item_id = models.UUIDField()
+    category_id = models.UUIDField(null=True, blank=True)
+    brand_id = models.UUIDField(null=True, blank=True)
+    sku_code = models.CharField(max_length=80)
+    variant_name = models.CharField(max_length=200)
+    item_name = models.CharField(max_length=200)
+    item_status = models.CharField(max_length=20)
+    barcodes = models.JSONField(default=list, blank=True, help_text="Active barcodes, primary first")
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    is_taxable = models.BooleanField(default=True)
+    tax_code = models.CharField(max_length=50, blank=True, null=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    tax_inclusive = models.BooleanField(default=False)
+    uom = models.CharField(max_length=20)
+    uom_decimals = models.IntegerField(default=2)
+    category_path = models.CharField(max_length=500, blank=True)
+    brand_name = models.CharField(max_length=200, blank=True)
+    is_active = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Catalogue Snapshot Row"
+        verbose_name_plural = "Catalogue Snapshot Rows"
+        db_table = 'products_catalogue_snapshot_row'
+        ordering = ['sku_code']
+        indexes = [
+            models.Index(fields=['company', 'sku_code']),
+            models.Index(fields=['category_id']),
+            models.Index(fields=['brand_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.sku_code} ({self.company_id})"
+
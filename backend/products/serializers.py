@@ -1,7 +1,17 @@
 from rest_framework import serializers
-from .models import Item, ItemVariant, VariantAttribute, UOM, UOMConversion, Brand, ItemTaxDetail
+from .models import Item, ItemVariant, ItemBarcode, VariantAttribute, UOM, UOMConversion, Brand, ItemTaxDetail
 from categories.serializers import ProductAttributeTemplateSerializer
 
+class RequestedFieldsMixin:
+    """Limit output to context['fields'] (from ``?fields=``) when given"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
 class UOMSerializer(serializers.ModelSerializer):
     """Serializer for UOM model"""
     
@@ -68,7 +78,7 @@ class VariantAttributeSerializer(serializers.ModelSerializer):
         model = VariantAttribute
         fields = ['id', 'attribute', 'attribute_value', 'attribute_name', 'value_label']
 
-class ItemVariantSerializer(serializers.ModelSerializer):
+class ItemVariantSerializer(RequestedFieldsMixin, serializers.ModelSerializer):
     """Serializer for Item Variant (SKU)"""
     attributes = VariantAttributeSerializer(many=True, read_only=True)
     sales_uom_code = serializers.CharField(source='sales_uom.code', read_only=True)
@@ -83,7 +93,45 @@ class ItemVariantSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemBarcodeSerializer(serializers.ModelSerializer):
+    """Serializer for the barcodes a variant can be scanned by"""
+    sku_code = serializers.CharField(source='variant.sku_code', read_only=True)
+
+    class Meta:
+        model = ItemBarcode
+        fields = [
+            'id', 'company', 'variant', 'sku_code', 'barcode', 'is_primary',
+            'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'is_primary', 'created_at', 'updated_at']
+
+    def validate_barcode(self, value):
+        """Validate barcode"""
+        if not value.strip():
+            raise serializers.ValidationError("Barcode is required")
+        return value.strip()
+
+    def validate(self, attrs):
+        """A barcode scans to one variant per company"""
+        company = attrs.get('company', getattr(self.instance, 'company', None))
+        barcode = attrs.get('barcode', getattr(self.instance, 'barcode', None))
+        duplicates = ItemBarcode.objects.filter(company=company, barcode=barcode)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError({'barcode': "This barcode is already assigned"})
+        return attrs
+
+class ScanResolveSerializer(serializers.Serializer):
+    """Batched barcode lookup for a basket"""
+    company = serializers.UUIDField(required=False, allow_null=True)
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=100, trim_whitespace=True),
+        allow_empty=False,
+        max_length=500
+    )
+
+class ItemSerializer(RequestedFieldsMixin, serializers.ModelSerializer):
     """Serializer for Item (Parent)"""
     variants = ItemVariantSerializer(many=True, read_only=True)
     stock_uom_code = serializers.CharField(source='stock_uom.code', read_only=True)
@@ -101,6 +149,31 @@ class ItemSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'variants']
 
+class CatalogueVariantSerializer(serializers.ModelSerializer):
+    """Sellable fields of a variant for catalogue browsing"""
+    sales_uom_code = serializers.CharField(source='sales_uom.code', read_only=True)
+
+    class Meta:
+        model = ItemVariant
+        fields = ['id', 'sku_code', 'variant_name', 'barcode', 'default_price', 'is_active', 'sales_uom_code']
+        read_only_fields = fields
+
+class ItemCatalogueSerializer(RequestedFieldsMixin, serializers.ModelSerializer):
+    """Lightweight read-only Item representation (``?view=catalogue``)"""
+    variants = CatalogueVariantSerializer(many=True, read_only=True)
+    stock_uom_code = serializers.CharField(source='stock_uom.code', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    brand_name = serializers.CharField(source='brand.name', read_only=True)
+
+    class Meta:
+        model = Item
+        fields = [
+            'id', 'item_code', 'item_name', 'short_name', 'item_type', 'status',
+            'is_taxable', 'category', 'category_name', 'brand_name', 'stock_uom_code',
+            'variants'
+        ]
+        read_only_fields = fields
+
 class ItemTaxDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = ItemTaxDetail
@@ -0,0 +1 @@
+# Products services
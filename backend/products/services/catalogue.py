@@ -0,0 +1,73 @@
+"""
+Querysets for the product catalogue endpoints.
+
+ItemSerializer nests variants, their attributes and several related names
+(UOM codes, category, brand). Read lazily, each of those is a query per row;
+these builders join or prefetch exactly what the requested representation
+reads, so a page of items costs the same number of queries at any size.
+
+``fields`` is the set of top-level fields a client asked for (``?fields=``);
+None means all of them.
+"""
+from django.db.models import Prefetch
+
+from ..models import Item, ItemVariant, VariantAttribute
+
+
+# Serializer field -> relation it reads through
+ITEM_RELATIONS = {
+    'stock_uom_code': 'stock_uom',
+    'category_name': 'category',
+    'brand_name': 'brand',
+}
+
+CATALOGUE_VARIANT_FIELDS = (
+    'id', 'item_id', 'sku_code', 'variant_name', 'barcode', 'default_price',
+    'is_active', 'sales_uom__code',
+)
+
+
+def requested_fields(request):
+    """Top-level fields named in ``?fields=a,b``, or None for all fields."""
+    raw = request.query_params.get('fields') if request is not None else None
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+def _wants(fields, name):
+    return fields is None or name in fields
+
+
+def variant_queryset(fields=None):
+    """Variants joined to their sales UOM, with attributes prefetched if shown."""
+    queryset = ItemVariant.objects.all()
+    if _wants(fields, 'sales_uom_code'):
+        queryset = queryset.select_related('sales_uom')
+    if _wants(fields, 'attributes'):
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'attributes',
+                queryset=VariantAttribute.objects.select_related('attribute', 'attribute_value')
+            )
+        )
+    return queryset
+
+
+def item_queryset(fields=None, representation='full'):
+    """
+    Items for ItemSerializer (``full``) or ItemCatalogueSerializer
+    (``catalogue``), with only the joins and prefetches the output reads.
+    """
+    queryset = Item.objects.all()
+    related = [relation for name, relation in ITEM_RELATIONS.items() if _wants(fields, name)]
+    if related:
+        queryset = queryset.select_related(*related)
+
+    if not _wants(fields, 'variants'):
+        return queryset
+    if representation == 'catalogue':
+        variants = ItemVariant.objects.select_related('sales_uom').only(*CATALOGUE_VARIANT_FIELDS)
+    else:
+        variants = variant_queryset()
+    return queryset.prefetch_related(Prefetch('variants', queryset=variants))
@@ -0,0 +1,278 @@
+"""
+Barcode resolution for the till's scan hot path.
+
+A scan is answered from, in order:
+
+1. an in-process LRU (``settings.PRODUCT_SCAN_LRU_SIZE`` entries, each kept
+   for ``settings.PRODUCT_SCAN_LOCAL_TTL`` seconds),
+2. the shared Django cache (``settings.PRODUCT_SCAN_CACHE_TTL`` seconds),
+3. one query over ItemBarcode (unique per company + barcode) joining the
+   variant, item and sales UOM, with the current tax row as a subquery.
+
+Results are flat dicts with price, tax and UOM, so the till needs nothing
+else to ring the line up. Unknown barcodes are cached too, which keeps a
+repeatedly scanned bad label off the database.
+
+Model saves and deletes that change a payload (barcodes, variants, items,
+tax rows, UOMs) invalidate the affected keys through the handlers in
+``products.signals``. Queryset ``update()`` calls bypass those handlers;
+other processes' LRUs also only see changes once their local TTL lapses.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from ..models import ItemBarcode, ItemTaxDetail
+
+
+CACHE_PREFIX = 'products:scan'
+MISSING = {}  # Cached marker for barcodes that resolve to nothing
+
+
+class LocalLRU:
+    """Small thread-safe LRU with per-entry expiry, local to this process."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalLRU(
+    getattr(settings, 'PRODUCT_SCAN_LRU_SIZE', 10000),
+    getattr(settings, 'PRODUCT_SCAN_LOCAL_TTL', 30)
+)
+
+
+def normalize(barcode):
+    """Scanners often append CR/LF or pad codes; compare the bare code."""
+    return str(barcode or '').strip()
+
+
+def cache_key(company_id, barcode):
+    return f'{CACHE_PREFIX}:{company_id or "*"}:{barcode}'
+
+
+def current_tax(field, today, item_ref='variant__item_id'):
+    """The item's current tax row: active, already applicable, latest first."""
+    return Subquery(
+        ItemTaxDetail.objects.filter(
+            item_id=OuterRef(item_ref),
+            is_active=True
+        ).filter(
+            Q(applicable_from__isnull=True) | Q(applicable_from__lte=today)
+        ).order_by(F('applicable_from').desc(nulls_last=True)).values(field)[:1]
+    )
+
+
+def _fetch(company_id, barcodes):
+    """{barcode: payload} for the given barcodes, in one query."""
+    today = timezone.localdate()
+    rows = ItemBarcode.objects.filter(
+        barcode__in=barcodes,
+        is_active=True,
+        variant__is_active=True
+    )
+    if company_id:
+        rows = rows.filter(Q(company_id=company_id) | Q(company__isnull=True))
+    rows = rows.annotate(
+        tax_code=current_tax('tax_code', today),
+        tax_rate=current_tax('tax_rate', today),
+        tax_inclusive=current_tax('tax_inclusive', today),
+    ).order_by(
+        # A company's own barcode wins over a shared (company-less) one
+        F('company_id').asc(nulls_last=True)
+    ).values(
+        'barcode', 'company_id', 'variant_id', 'variant__item_id', 'variant__sku_code',
+        'variant__variant_name', 'variant__item__item_name', 'variant__item__status',
+        'variant__item__is_taxable', 'variant__default_price', 'variant__sales_uom__code',
+        'variant__sales_uom__decimals', 'tax_code', 'tax_rate', 'tax_inclusive'
+    )
+
+    found = {}
+    for row in rows:
+        if row['barcode'] in found:
+            continue
+        found[row['barcode']] = {
+            'barcode': row['barcode'],
+            'variant_id': str(row['variant_id']),
+            'item_id': str(row['variant__item_id']),
+            'sku_code': row['variant__sku_code'],
+            'variant_name': row['variant__variant_name'],
+            'item_name': row['variant__item__item_name'],
+            'item_status': row['variant__item__status'],
+            'price': row['variant__default_price'],
+            'uom': row['variant__sales_uom__code'],
+            'uom_decimals': row['variant__sales_uom__decimals'],
+            'is_taxable': row['variant__item__is_taxable'],
+            'tax_code': row['tax_code'],
+            'tax_rate': row['tax_rate'],
+            'tax_inclusive': bool(row['tax_inclusive']),
+        }
+    return found
+
+
+def resolve_many(barcodes, company_id=None, use_cache=True):
+    """
+    Resolve a basket of barcodes at once.
+
+    Returns {barcode: payload} for every barcode that matched; unknown
+    barcodes are left out. Payloads are shared with the caches and must not
+    be mutated by callers.
+    """
+    company_id = str(company_id) if company_id else None
+    wanted = []
+    for barcode in barcodes:
+        barcode = normalize(barcode)
+        if barcode and barcode not in wanted:
+            wanted.append(barcode)
+    if not wanted:
+        return {}
+    if not use_cache:
+        return _fetch(company_id, wanted)
+
+    resolved = {}
+    remaining = []
+    for barcode in wanted:
+        payload = local_cache.get(cache_key(company_id, barcode))
+        if payload is None:
+            remaining.append(barcode)
+        elif payload:
+            resolved[barcode] = payload
+
+    if remaining:
+        keys = {cache_key(company_id, barcode): barcode for barcode in remaining}
+        shared = cache.get_many(list(keys))
+        for key, payload in shared.items():
+            local_cache.set(key, payload)
+            if payload:
+                resolved[keys[key]] = payload
+        remaining = [barcode for key, barcode in keys.items() if key not in shared]
+
+    if remaining:
+        fetched = _fetch(company_id, remaining)
+        ttl = getattr(settings, 'PRODUCT_SCAN_CACHE_TTL', 300)
+        to_share = {}
+        for barcode in remaining:
+            payload = fetched.get(barcode, MISSING)
+            key = cache_key(company_id, barcode)
+            local_cache.set(key, payload)
+            to_share[key] = payload
+            if payload:
+                resolved[barcode] = payload
+        if ttl > 0:
+            cache.set_many(to_share, ttl)
+    return resolved
+
+
+def resolve(barcode, company_id=None, use_cache=True):
+    """Payload for one scanned barcode, or None if nothing matches."""
+    barcode = normalize(barcode)
+    return resolve_many([barcode], company_id, use_cache).get(barcode)
+
+
+def invalidate(barcodes):
+    """
+    Drop cached payloads for ``(company_id, barcode)`` pairs.
+
+    Entries for the company-less lookup ("*") are dropped as well, since
+    unscoped scans can resolve to any company's barcode; a shared barcode
+    (no company) drops the entry of every company.
+    """
+    from organization.models import Company
+
+    keys = set()
+    company_ids = None
+    for company_id, barcode in barcodes:
+        barcode = normalize(barcode)
+        if not barcode:
+            continue
+        keys.add(cache_key(None, barcode))
+        if company_id:
+            keys.add(cache_key(company_id, barcode))
+            continue
+        if company_ids is None:
+            company_ids = list(Company.objects.values_list('id', flat=True))
+        keys.update(cache_key(other_id, barcode) for other_id in company_ids)
+    if not keys:
+        return
+    for key in keys:
+        local_cache.delete(key)
+    cache.delete_many(list(keys))
+
+
+def invalidate_variants(variant_filter):
+    """Invalidate every barcode of the variants matched by ``variant_filter`` (a Q on ItemBarcode)."""
+    invalidate(ItemBarcode.objects.filter(variant_filter).values_list('company_id', 'barcode'))
+
+
+def mirror_primary_barcodes(variants):
+    """
+    Bulk form of the ``products.signals.sync_primary_barcode`` handler, for
+    writes that send no signals (bulk upserts): mirror each variant's
+    ``barcode`` into its primary ItemBarcode row and drop the cached scans
+    of every barcode involved. ``variants`` need ``pk``, ``company_id`` and
+    ``barcode``. A constant number of queries per call.
+    """
+    wanted = {variant.pk: (variant.company_id, normalize(variant.barcode)) for variant in variants}
+    if not wanted:
+        return
+    stale = [
+        (pk, company_id, barcode)
+        for pk, variant_id, company_id, barcode in ItemBarcode.objects.filter(
+            variant_id__in=list(wanted), is_primary=True
+        ).values_list('pk', 'variant_id', 'company_id', 'barcode')
+        if barcode != wanted[variant_id][1]
+    ]
+    if stale:
+        ItemBarcode.objects.filter(pk__in=[pk for pk, _, _ in stale]).delete()
+
+    barcodes = {barcode for _, barcode in wanted.values() if barcode}
+    taken = set(ItemBarcode.objects.filter(barcode__in=barcodes).values_list('company_id', 'barcode'))
+    added = []
+    for variant_id, (company_id, barcode) in wanted.items():
+        # A barcode already owned by another variant is left where it is
+        if barcode and (company_id, barcode) not in taken:
+            taken.add((company_id, barcode))
+            added.append(ItemBarcode(company_id=company_id, variant_id=variant_id, barcode=barcode, is_primary=True))
+    ItemBarcode.objects.bulk_create(added, ignore_conflicts=True)
+
+    invalidate_variants(Q(variant_id__in=list(wanted)))
+    invalidate([(company_id, barcode) for _, company_id, barcode in stale])
@@ -0,0 +1,298 @@
+"""
+Materialised POS catalogue snapshot.
+
+Tills need one flat row per sellable SKU (variant, barcodes, price, tax,
+sales UOM, category path, brand). Assembling that from Item, ItemVariant,
+ItemTaxDetail, ItemBarcode, Category, Brand and UOM per request is costly,
+so the rows are kept in CatalogueSnapshotRow and refreshed incrementally:
+the handlers in ``products.signals`` queue the IDs of variants whose row a
+save or delete affects, and the rows are rebuilt once the transaction
+commits (set-based: a few queries per refresh, not per row).
+
+Every refresh bumps the CatalogueSnapshot version of the companies touched.
+``export_file`` writes the company's rows (plus shared, company-less rows)
+as gzipped JSON lines under ``settings.CATALOGUE_SNAPSHOT_DIR`` the first
+time a version is requested; terminals fetch it with If-None-Match.
+
+The tree has no location-specific prices or assortments, so every location
+of a company shares the company's snapshot.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import CatalogueSnapshot, CatalogueSnapshotRow, ItemBarcode, ItemVariant
+from .scan import current_tax
+
+
+REFRESH_CHUNK_SIZE = 2000
+
+# Columns of each exported line, in order
+EXPORT_FIELDS = (
+    'variant_id', 'item_id', 'sku_code', 'variant_name', 'item_name', 'item_status',
+    'barcodes', 'price', 'is_taxable', 'tax_code', 'tax_rate', 'tax_inclusive',
+    'uom', 'uom_decimals', 'category_id', 'category_path', 'brand_name', 'is_active',
+)
+
+# Export file names: v<version>.jsonl.gz
+EXPORT_NAME = re.compile(r'^v(?P<version>\d+)\.jsonl\.gz$')
+
+ROW_FIELDS = (
+    'company_id', 'item_id', 'category_id', 'brand_id', 'sku_code', 'variant_name',
+    'item_name', 'item_status', 'barcodes', 'price', 'is_taxable', 'tax_code', 'tax_rate',
+    'tax_inclusive', 'uom', 'uom_decimals', 'category_path', 'brand_name', 'is_active',
+    'refreshed_at',
+)
+
+
+def snapshot_dir():
+    return str(getattr(settings, 'CATALOGUE_SNAPSHOT_DIR', os.path.join(settings.MEDIA_ROOT, 'catalogue_snapshots')))
+
+
+def _build_rows(variant_ids):
+    """Unsaved CatalogueSnapshotRow objects for the given variants."""
+    today = timezone.localdate()
+    variants = list(
+        ItemVariant.objects.filter(pk__in=variant_ids).annotate(
+            tax_code=current_tax('tax_code', today, 'item_id'),
+            tax_rate=current_tax('tax_rate', today, 'item_id'),
+            tax_inclusive=current_tax('tax_inclusive', today, 'item_id'),
+        ).values(
+            'id', 'company_id', 'item_id', 'sku_code', 'variant_name', 'barcode', 'default_price',
+            'is_active', 'item__item_name', 'item__status', 'item__is_taxable', 'item__category_id',
+            'item__category__name_path',
+            'item__brand_id', 'item__brand__name', 'sales_uom__code', 'sales_uom__decimals',
+            'tax_code', 'tax_rate', 'tax_inclusive'
+        )
+    )
+
+    barcodes = {}
+    for variant_id, barcode in ItemBarcode.objects.filter(
+        variant_id__in=[variant['id'] for variant in variants],
+        is_active=True
+    ).order_by('-is_primary', 'barcode').values_list('variant_id', 'barcode'):
+        barcodes.setdefault(variant_id, []).append(barcode)
+
+    now = timezone.now()
+    return [
+        CatalogueSnapshotRow(
+            company_id=variant['company_id'],
+            variant_id=variant['id'],
+            item_id=variant['item_id'],
+            category_id=variant['item__category_id'],
+            brand_id=variant['item__brand_id'],
+            sku_code=variant['sku_code'],
+            variant_name=variant['variant_name'],
+            item_name=variant['item__item_name'],
+            item_status=variant['item__status'],
+            barcodes=barcodes.get(variant['id'], []),
+            price=variant['default_price'],
+            is_taxable=variant['item__is_taxable'],
+            tax_code=variant['tax_code'],
+            tax_rate=variant['tax_rate'],
+            tax_inclusive=bool(variant['tax_inclusive']),
+            uom=variant['sales_uom__code'],
+            uom_decimals=variant['sales_uom__decimals'],
+            category_path=variant['item__category__name_path'] or '',
+            brand_name=variant['item__brand__name'] or '',
+            is_active=variant['is_active'],
+            refreshed_at=now,
+        )
+        for variant in variants
+    ]
+
+
+def bump_versions(company_ids):
+    """
+    Bump the snapshot version of each company. Shared rows (no company) are
+    part of every company's export, so a ``None`` bumps every snapshot.
+    """
+    company_ids = set(company_ids)
+    if not company_ids:
+        return
+    if None in company_ids:
+        CatalogueSnapshot.objects.update(version=F('version') + 1)
+    else:
+        CatalogueSnapshot.objects.filter(company_id__in=company_ids).update(version=F('version') + 1)
+    existing = set(CatalogueSnapshot.objects.values_list('company_id', flat=True))
+    # A concurrent writer may create the same rows (one per company, one shared)
+    CatalogueSnapshot.objects.bulk_create([
+        CatalogueSnapshot(company_id=company_id)
+        for company_id in company_ids - existing
+    ], ignore_conflicts=True)
+
+
+def refresh(variant_ids):
+    """
+    Rebuild the snapshot rows of the given variants and bump the affected
+    company versions. Rows of deleted variants go with them (CASCADE).
+    Returns the number of rows written.
+    """
+    variant_ids = list(dict.fromkeys(variant_ids))
+    written = 0
+    companies = set()
+    for start in range(0, len(variant_ids), REFRESH_CHUNK_SIZE):
+        chunk = variant_ids[start:start + REFRESH_CHUNK_SIZE]
+        rows = _build_rows(chunk)
+        if not rows:
+            continue
+        # A variant moved between companies changes both snapshots
+        companies.update(
+            CatalogueSnapshotRow.objects.filter(variant_id__in=chunk).values_list('company_id', flat=True).distinct()
+        )
+        with transaction.atomic():
+            CatalogueSnapshotRow.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['variant'],
+                update_fields=list(ROW_FIELDS)
+            )
+        written += len(rows)
+        companies.update(row.company_id for row in rows)
+    bump_versions(companies)
+    return written
+
+
+def rebuild(company_id=None, all_companies=False):
+    """Full rebuild of one company's snapshot (or every company's)."""
+    variants = ItemVariant.objects.all()
+    if not all_companies:
+        variants = variants.filter(company_id=company_id)
+    written = refresh(variants.values_list('id', flat=True))
+    if not written:
+        bump_versions([company_id] if not all_companies else [None])
+    return written
+
+
+# The current transaction's refresh batch, per thread
+_pending = threading.local()
+
+
+class _RefreshBatch:
+    """Variants queued by one transaction; refreshed by its on_commit callback."""
+
+    def __init__(self):
+        self.variant_ids = set()
+
+    def __call__(self):
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        variant_ids, self.variant_ids = self.variant_ids, set()
+        if variant_ids:
+            refresh(variant_ids)
+
+
+def _registered(batch):
+    """Whether the batch's callback is still pending on this connection (not rolled back)."""
+    return any(entry[1] is batch for entry in transaction.get_connection().run_on_commit)
+
+
+def queue_refresh(variant_ids):
+    """
+    Refresh these variants' rows once the current transaction commits.
+
+    IDs queued by one transaction share one callback. A batch whose callback
+    was discarded by a rollback is dropped, so its IDs never leak into the
+    next transaction on the thread.
+    """
+    variant_ids = set(variant_ids)
+    if not variant_ids:
+        return
+    batch = getattr(_pending, 'batch', None)
+    if batch is not None and _registered(batch):
+        batch.variant_ids.update(variant_ids)
+        return
+    batch = _pending.batch = _RefreshBatch()
+    batch.variant_ids.update(variant_ids)
+    # robust: the master data is already committed, a failed refresh must not fail the request
+    transaction.on_commit(batch, robust=True)
+
+
+def queue_version_bump(company_ids):
+    """Bump versions after commit (e.g. when a variant and its row were deleted)."""
+    company_ids = set(company_ids)
+    transaction.on_commit(lambda: bump_versions(company_ids), robust=True)
+
+
+def snapshot_for(company_id):
+    snapshot = CatalogueSnapshot.objects.filter(company_id=company_id).first()
+    if snapshot is None:
+        rebuild(company_id)
+        snapshot = CatalogueSnapshot.objects.filter(company_id=company_id).first()
+    return snapshot
+
+
+def etag(snapshot):
+    return f'"catalogue-{snapshot.company_id or "shared"}-{snapshot.version}"'
+
+
+def _rows_for(company_id):
+    rows = CatalogueSnapshotRow.objects.filter(Q(company_id=company_id) | Q(company__isnull=True))
+    return rows.order_by('sku_code').values_list(
+        'variant_id', 'item_id', 'sku_code', 'variant_name', 'item_name', 'item_status',
+        'barcodes', 'price', 'is_taxable', 'tax_code', 'tax_rate', 'tax_inclusive',
+        'uom', 'uom_decimals', 'category_id', 'category_path', 'brand_name', 'is_active'
+    )
+
+
+def export_file(snapshot):
+    """
+    Path of the gzipped JSON-lines export for ``snapshot``'s current
+    version, writing it first if needed.
+
+    Line 1 is a header (version, company, fields, row count); every other
+    line is one row's values in ``EXPORT_FIELDS`` order.
+    """
+    directory = os.path.join(snapshot_dir(), str(snapshot.company_id or 'shared'))
+    if snapshot.file_version == snapshot.version and snapshot.file_name:
+        path = os.path.join(snapshot_dir(), snapshot.file_name)
+        if os.path.exists(path):
+            return path
+
+    version = snapshot.version
+    os.makedirs(directory, exist_ok=True)
+    name = f'v{version}.jsonl.gz'
+    path = os.path.join(directory, name)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    rows = _rows_for(snapshot.company_id)
+    row_count = rows.count()
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as handle:
+        header = {
+            'version': version,
+            'company': str(snapshot.company_id) if snapshot.company_id else None,
+            'exported_at': timezone.now().isoformat(),
+            'fields': list(EXPORT_FIELDS),
+            'rows': row_count,
+        }
+        handle.write(json.dumps(header, separators=(',', ':')) + '\n')
+        for row in rows.iterator(chunk_size=REFRESH_CHUNK_SIZE):
+            handle.write(json.dumps(row, separators=(',', ':'), default=str) + '\n')
+    os.replace(temp_path, path)
+
+    # Exports older than this version are no longer served; newer ones may
+    # be in progress in another process and are left alone
+    for other in os.listdir(directory):
+        match = EXPORT_NAME.match(other)
+        if match and int(match['version']) < version:
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+    # A slower export of an older version must not replace a newer file
+    CatalogueSnapshot.objects.filter(pk=snapshot.pk, file_version__lt=version).update(
+        file_version=version,
+        file_name=os.path.join(str(snapshot.company_id or 'shared'), name),
+        file_size=os.path.getsize(path),
+        row_count=row_count,
+        exported_at=timezone.now()
+    )
+    return path
@@ -0,0 +1,187 @@
+"""
+Keep the barcode scan caches, ItemBarcode and the POS catalogue snapshot in
+step with master data.
+
+``ItemVariant.barcode`` stays the variant's primary barcode; saving a
+variant mirrors it into ItemBarcode so scans only ever read that table.
+Every save or delete that changes a scan payload drops the cached entries
+of the barcodes involved (see ``products.services.scan``); deleting a
+variant cascades to its ItemBarcode rows, whose handlers do the same.
+
+The catalogue snapshot handlers queue the variants whose snapshot row a
+change affects; ``products.services.snapshot`` rebuilds them on commit.
+"""
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from categories.models import Category
+from categories.signals import category_paths_changed
+
+from .models import UOM, Brand, CatalogueSnapshotRow, Item, ItemBarcode, ItemTaxDetail, ItemVariant
+
+
+def _scan():
+    from .services import scan
+    return scan
+
+
+def _snapshot():
+    from .services import snapshot
+    return snapshot
+
+
+def sync_primary_barcode(sender, instance, raw=False, **kwargs):
+    """Mirror ItemVariant.barcode into the variant's primary ItemBarcode row."""
+    if raw:
+        return
+    barcode = _scan().normalize(instance.barcode)
+    stale = ItemBarcode.objects.filter(variant=instance, is_primary=True)
+    if barcode:
+        stale = stale.exclude(barcode=barcode)
+    stale_rows = list(stale.values_list('company_id', 'barcode'))
+    if stale_rows:
+        stale.delete()
+    if barcode and not ItemBarcode.objects.filter(company_id=instance.company_id, barcode=barcode).exists():
+        # A barcode already owned by another variant is left where it is
+        ItemBarcode.objects.create(
+            company_id=instance.company_id,
+            variant=instance,
+            barcode=barcode,
+            is_primary=True
+        )
+    _scan().invalidate_variants(Q(variant_id=instance.pk))
+    _scan().invalidate(stale_rows)
+
+
+def remember_barcode(sender, instance, raw=False, **kwargs):
+    """Note the stored barcode before a change so its old cache key is dropped too."""
+    if raw or instance._state.adding:
+        instance._previous_scan_key = None
+        return
+    instance._previous_scan_key = ItemBarcode.objects.filter(pk=instance.pk).values_list(
+        'company_id', 'barcode'
+    ).first()
+
+
+def invalidate_barcode(sender, instance, **kwargs):
+    keys = [(instance.company_id, instance.barcode)]
+    previous = getattr(instance, '_previous_scan_key', None)
+    if previous:
+        keys.append(previous)
+    _scan().invalidate(keys)
+
+
+def invalidate_item(sender, instance, **kwargs):
+    _scan().invalidate_variants(Q(variant__item_id=instance.pk))
+
+
+def invalidate_tax_detail(sender, instance, **kwargs):
+    _scan().invalidate_variants(Q(variant__item_id=instance.item_id))
+
+
+def invalidate_uom(sender, instance, **kwargs):
+    _scan().invalidate_variants(Q(variant__sales_uom_id=instance.pk))
+
+
+def connect_scan_cache():
+    post_save.connect(sync_primary_barcode, sender=ItemVariant, dispatch_uid='products.scan.variant_save')
+    pre_save.connect(remember_barcode, sender=ItemBarcode, dispatch_uid='products.scan.barcode_pre_save')
+    post_save.connect(invalidate_barcode, sender=ItemBarcode, dispatch_uid='products.scan.barcode_save')
+    post_delete.connect(invalidate_barcode, sender=ItemBarcode, dispatch_uid='products.scan.barcode_delete')
+    post_save.connect(invalidate_item, sender=Item, dispatch_uid='products.scan.item_save')
+    post_save.connect(invalidate_tax_detail, sender=ItemTaxDetail, dispatch_uid='products.scan.tax_save')
+    post_delete.connect(invalidate_tax_detail, sender=ItemTaxDetail, dispatch_uid='products.scan.tax_delete')
+    post_save.connect(invalidate_uom, sender=UOM, dispatch_uid='products.scan.uom_save')
+
+
+def _variants(*conditions, **filters):
+    return ItemVariant.objects.filter(*conditions, **filters).values_list('id', flat=True)
+
+
+def _snapshot_variants(**filters):
+    return CatalogueSnapshotRow.objects.filter(**filters).values_list('variant_id', flat=True)
+
+
+def snapshot_variant_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _snapshot().queue_refresh([instance.pk])
+
+
+def snapshot_variant_deleted(sender, instance, **kwargs):
+    # The row went with the variant (CASCADE); only the version changes
+    _snapshot().queue_version_bump([instance.company_id])
+
+
+def snapshot_item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _snapshot().queue_refresh(_variants(item_id=instance.pk))
+
+
+def snapshot_item_child_changed(sender, instance, raw=False, **kwargs):
+    """Tax rows and barcodes: refresh the variant(s) they belong to."""
+    if raw:
+        return
+    if sender is ItemBarcode:
+        _snapshot().queue_refresh([instance.variant_id])
+    else:
+        _snapshot().queue_refresh(_variants(item_id=instance.item_id))
+
+
+def snapshot_uom_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _snapshot().queue_refresh(_variants(sales_uom_id=instance.pk))
+
+
+def snapshot_category_saved(sender, instance, raw=False, **kwargs):
+    # Renaming or moving a category changes the path of every descendant.
+    # Descendants are re-pathed after this signal, so match them by the
+    # node's stored (pre-save) path prefix, and the node itself by id.
+    if not raw:
+        from categories.services.hierarchy import subtree_filter
+        previous = getattr(instance, '_previous_paths', None)
+        tree_path = previous['tree_path'] if previous and previous['tree_path'] else instance.tree_path
+        _snapshot().queue_refresh(_variants(
+            Q(item__category_id=instance.pk) | subtree_filter(tree_path, 'item__category__tree_path')
+        ))
+
+
+def snapshot_category_paths_changed(sender, category_ids, **kwargs):
+    # Bulk moves re-path whole subtrees at once; every re-pathed ID is listed
+    _snapshot().queue_refresh(_variants(item__category_id__in=category_ids))
+
+
+def snapshot_category_deleted(sender, instance, **kwargs):
+    # Items are detached with a bulk SET NULL, so find them through the rows
+    _snapshot().queue_refresh(_snapshot_variants(category_id=instance.pk))
+
+
+def snapshot_brand_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _snapshot().queue_refresh(_variants(item__brand_id=instance.pk))
+
+
+def snapshot_brand_deleted(sender, instance, **kwargs):
+    _snapshot().queue_refresh(_snapshot_variants(brand_id=instance.pk))
+
+
+def connect_catalogue_snapshot():
+    post_save.connect(snapshot_variant_saved, sender=ItemVariant, dispatch_uid='products.snapshot.variant_save')
+    post_delete.connect(snapshot_variant_deleted, sender=ItemVariant, dispatch_uid='products.snapshot.variant_delete')
+    post_save.connect(snapshot_item_changed, sender=Item, dispatch_uid='products.snapshot.item_save')
+    for model in (ItemTaxDetail, ItemBarcode):
+        post_save.connect(
+            snapshot_item_child_changed, sender=model,
+            dispatch_uid=f'products.snapshot.{model._meta.model_name}_save'
+        )
+        post_delete.connect(
+            snapshot_item_child_changed, sender=model,
+            dispatch_uid=f'products.snapshot.{model._meta.model_name}_delete'
+        )
+    post_save.connect(snapshot_uom_saved, sender=UOM, dispatch_uid='products.snapshot.uom_save')
+    post_save.connect(snapshot_category_saved, sender=Category, dispatch_uid='products.snapshot.category_save')
+    post_delete.connect(snapshot_category_deleted, sender=Category, dispatch_uid='products.snapshot.category_delete')
+    category_paths_changed.connect(
+        snapshot_category_paths_changed, sender=Category, dispatch_uid='products.snapshot.category_paths'
+    )
+    post_save.connect(snapshot_brand_saved, sender=Brand, dispatch_uid='products.snapshot.brand_save')
+    post_delete.connect(snapshot_brand_deleted, sender=Brand, dispatch_uid='products.snapshot.brand_delete')
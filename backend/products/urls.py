@@ -12,6 +12,12 @@ urlpatterns = [
     path('variants/', views.ItemVariantListCreateView.as_view(), name='variant-list-create'),
     path('variants/<uuid:pk>/', views.ItemVariantDetailView.as_view(), name='variant-detail'),
     
+    # Item Barcodes and scan lookup
+    path('barcodes/', views.ItemBarcodeListCreateView.as_view(), name='barcode-list-create'),
+    path('barcodes/<uuid:pk>/', views.ItemBarcodeDetailView.as_view(), name='barcode-detail'),
+    path('scan/', views.ScanResolveView.as_view(), name='scan-resolve'),
+    path('catalogue-snapshot/', views.CatalogueSnapshotView.as_view(), name='catalogue-snapshot'),
+    
     # UOM
     path('uom/', views.UOMListCreateView.as_view(), name='uom-list-create'),
     path('uom/<uuid:pk>/', views.UOMDetailView.as_view(), name='uom-detail'),
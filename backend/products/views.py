@@ -1,13 +1,18 @@
 from rest_framework import generics, status, filters
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Item, ItemVariant, UOM, UOMConversion, Brand
+import uuid
+from .models import Item, ItemVariant, ItemBarcode, UOM, UOMConversion, Brand
 from .serializers import (
-    ItemSerializer, ItemVariantSerializer, UOMSerializer,
-    UOMConversionSerializer, BrandSerializer
+    ItemSerializer, ItemCatalogueSerializer, ItemVariantSerializer, ItemBarcodeSerializer,
+    UOMSerializer, UOMConversionSerializer, BrandSerializer, ScanResolveSerializer
 )
+from .services import catalogue, scan, snapshot
 
 class UOMListCreateView(generics.ListCreateAPIView):
     """List all UOMs or create a new UOM"""
@@ -53,7 +58,33 @@ class BrandDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
 
-class ItemListCreateView(generics.ListCreateAPIView):
+class CatalogueQueryMixin:
+    """
+    Build the Item queryset and serializer from the requested representation:
+    ``?view=catalogue`` for the lightweight read-only shape and
+    ``?fields=a,b`` to limit the output (and the joins behind it).
+    """
+
+    def representation(self):
+        if self.request.method == 'GET' and self.request.query_params.get('view') == 'catalogue':
+            return 'catalogue'
+        return 'full'
+
+    def get_queryset(self):
+        return catalogue.item_queryset(catalogue.requested_fields(self.request), self.representation())
+
+    def get_serializer_class(self):
+        if self.representation() == 'catalogue':
+            return ItemCatalogueSerializer
+        return ItemSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['fields'] = catalogue.requested_fields(self.request)
+        return context
+
+class ItemListCreateView(CatalogueQueryMixin, generics.ListCreateAPIView):
     """List all Items (Parent) or create a new Item"""
     permission_classes = [IsAuthenticated] if not settings.DEBUG else []
     queryset = Item.objects.all()
@@ -64,7 +95,7 @@ class ItemListCreateView(generics.ListCreateAPIView):
     ordering_fields = ['item_name', 'item_code', 'created_at']
     ordering = ['item_name']
 
-class ItemDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ItemDetailView(CatalogueQueryMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an Item instance"""
     permission_classes = [IsAuthenticated] if not settings.DEBUG else []
     queryset = Item.objects.all()
@@ -77,12 +108,127 @@ class ItemVariantListCreateView(generics.ListCreateAPIView):
     serializer_class = ItemVariantSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['company', 'item', 'is_active', 'sku_code']
-    search_fields = ['variant_name', 'sku_code', 'barcode']
+    search_fields = ['variant_name', 'sku_code', 'barcode', 'barcodes__barcode']
     ordering_fields = ['variant_name', 'sku_code']
     ordering = ['variant_name']
 
+    def get_queryset(self):
+        return catalogue.variant_queryset(catalogue.requested_fields(self.request))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['fields'] = catalogue.requested_fields(self.request)
+        return context
+
 class ItemVariantDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an Item Variant instance"""
     permission_classes = [IsAuthenticated] if not settings.DEBUG else []
     queryset = ItemVariant.objects.all()
     serializer_class = ItemVariantSerializer
+
+    def get_queryset(self):
+        return catalogue.variant_queryset()
+
+class ItemBarcodeListCreateView(generics.ListCreateAPIView):
+    """List all Item Barcodes or add a barcode to a variant"""
+    permission_classes = [IsAuthenticated] if not settings.DEBUG else []
+    queryset = ItemBarcode.objects.select_related('variant')
+    serializer_class = ItemBarcodeSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ['company', 'variant', 'is_active', 'is_primary']
+    search_fields = ['barcode']
+
+class ItemBarcodeDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update or delete an Item Barcode instance"""
+    permission_classes = [IsAuthenticated] if not settings.DEBUG else []
+    queryset = ItemBarcode.objects.select_related('variant')
+    serializer_class = ItemBarcodeSerializer
+
+class ScanResolveView(APIView):
+    """
+    Resolve scanned barcodes to a flat price/tax/UOM payload.
+
+    GET ?barcode=<code>&company=<id> resolves one scan;
+    POST {"company": <id>, "barcodes": [...]} resolves a basket at once.
+    """
+    permission_classes = [IsAuthenticated] if not settings.DEBUG else []
+
+    def get(self, request):
+        barcode = scan.normalize(request.query_params.get('barcode'))
+        if not barcode:
+            return Response({'error': 'barcode is required'}, status=status.HTTP_400_BAD_REQUEST)
+        company = request.query_params.get('company') or None
+        if company:
+            try:
+                company = uuid.UUID(company)
+            except ValueError:
+                return Response({'error': 'Invalid company'}, status=status.HTTP_400_BAD_REQUEST)
+        payload = scan.resolve(barcode, company_id=company)
+        if payload is None:
+            return Response({'error': 'Barcode not found', 'barcode': barcode}, status=status.HTTP_404_NOT_FOUND)
+        return Response(payload)
+
+    def post(self, request):
+        serializer = ScanResolveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        barcodes = serializer.validated_data['barcodes']
+        resolved = scan.resolve_many(barcodes, company_id=serializer.validated_data.get('company'))
+        return Response({
+            'results': resolved,
+            'missing': [barcode for barcode in dict.fromkeys(map(scan.normalize, barcodes)) if barcode not in resolved],
+        })
+
+class CatalogueSnapshotView(APIView):
+    """
+    Download the POS catalogue snapshot as gzipped JSON lines.
+
+    GET ?location=<id> (or ?company=<id>). Send the last ETag back in
+    If-None-Match to get 304 Not Modified while the snapshot is unchanged.
+    """
+    permission_classes = [IsAuthenticated] if not settings.DEBUG else []
+
+    def get(self, request):
+        from organization.models import Location
+
+        location_id = request.query_params.get('location')
+        company_id = request.query_params.get('company') or None
+        try:
+            if location_id:
+                companies = list(Location.objects.filter(pk=uuid.UUID(location_id)).values_list('company_id', flat=True))
+                if not companies:
+                    return Response({'error': 'Location not found'}, status=status.HTTP_404_NOT_FOUND)
+                company_id = companies[0]
+            elif company_id:
+                company_id = uuid.UUID(company_id)
+        except ValueError:
+            return Response({'error': 'Invalid location or company'}, status=status.HTTP_400_BAD_REQUEST)
+
+        current = snapshot.snapshot_for(company_id)
+        etag = snapshot.etag(current)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        path = snapshot.export_file(current)
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            # Pruned by a concurrent export of a newer version; the till retries
+            response = Response(
+                {'error': 'Catalogue export is being replaced, retry shortly'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '1'
+            return response
+        response = FileResponse(
+            handle,
+            as_attachment=True,
+            filename=f'catalogue-v{current.version}.jsonl.gz',
+            content_type='application/gzip'
+        )
+        response['ETag'] = etag
+        response['X-Catalogue-Version'] = str(current.version)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Sale, SaleItem, Payment, POSSession, DayOpen, DayClose
+from .models import Sale, SaleItem, Payment, POSSession, DayOpen, DayClose, DocumentSequence, DocumentNumberBlock, POSSessionLedger, CustomerPurchaseRollup, CreditSettlement
 
 
 class SaleItemInline(admin.TabularInline):
@@ -32,7 +32,7 @@ class SaleAdmin(admin.ModelAdmin):
     search_fields = ['sale_number', 'customer__first_name', 'customer__last_name']
     readonly_fields = [
         'sale_number', 'subtotal', 'tax_amount', 'total_amount',
-        'sale_date', 'completed_at', 'created_at', 'updated_at'
+        'sale_date', 'completed_at', 'stock_posted_at', 'created_at', 'updated_at'
     ]
     
     fieldsets = (
@@ -55,7 +55,7 @@ class SaleAdmin(admin.ModelAdmin):
             )
         }),
         ('Timestamps', {
-            'fields': ('sale_date', 'completed_at', 'created_at', 'updated_at'),
+            'fields': ('sale_date', 'completed_at', 'stock_posted_at', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
         ('Additional', {
@@ -182,7 +182,9 @@ class DayCloseAdmin(admin.ModelAdmin):
         ('Consolidation', {
             'fields': (
                 'total_transactions', 'total_sales_amount',
-                'total_sessions', 'total_items_sold'
+                'total_sessions', 'total_items_sold',
+                'tender_breakdown', 'terminal_breakdown',
+                'cashier_breakdown', 'hourly_breakdown'
             )
         }),
         ('Document Sequences', {
@@ -200,3 +202,64 @@ class DayCloseAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    """Admin configuration for DocumentSequence model."""
+    
+    list_display = ['location', 'business_date', 'document_type', 'last_value', 'updated_at']
+    list_filter = ['document_type', 'business_date', 'location']
+    search_fields = ['location__name', 'location__code']
+    readonly_fields = ['last_value', 'updated_at']
+
+
+@admin.register(DocumentNumberBlock)
+class DocumentNumberBlockAdmin(admin.ModelAdmin):
+    """Admin configuration for DocumentNumberBlock model (reserved through the Day Open API)."""
+    
+    list_display = ['day_open', 'terminal', 'document_type', 'first_value', 'last_value', 'reserved_by', 'reserved_at']
+    list_filter = ['document_type', 'day_open__business_date']
+    search_fields = ['day_open__location__code', 'terminal__terminal_code']
+    readonly_fields = [
+        'day_open', 'terminal', 'document_type', 'first_value', 'last_value', 'reserved_by', 'reserved_at'
+    ]
+
+
+@admin.register(POSSessionLedger)
+class POSSessionLedgerAdmin(admin.ModelAdmin):
+    """Admin configuration for POSSessionLedger model (maintained automatically)."""
+    
+    list_display = ['session', 'sale_count', 'gross_amount', 'tax_amount', 'discount_amount', 'updated_at']
+    search_fields = ['session__session_number']
+    readonly_fields = [
+        'session', 'sale_count', 'subtotal_amount', 'tax_amount',
+        'discount_amount', 'gross_amount', 'tender_totals', 'updated_at'
+    ]
+
+
+@admin.register(CustomerPurchaseRollup)
+class CustomerPurchaseRollupAdmin(admin.ModelAdmin):
+    """Admin configuration for CustomerPurchaseRollup model (maintained automatically)."""
+    
+    list_display = ['customer', 'purchase_count', 'lifetime_spend', 'credit_outstanding', 'last_purchase_at', 'updated_at']
+    search_fields = ['customer__customer_code', 'customer__first_name', 'customer__last_name']
+    readonly_fields = [
+        'customer', 'purchase_count', 'lifetime_spend', 'refund_count', 'refunded_amount',
+        'credit_outstanding', 'first_purchase_at', 'last_purchase_at', 'updated_at'
+    ]
+
+
+@admin.register(CreditSettlement)
+class CreditSettlementAdmin(admin.ModelAdmin):
+    """Admin configuration for CreditSettlement model (recorded through the API)."""
+    
+    list_display = ['customer', 'amount', 'payment_method', 'reference_number', 'received_by', 'settled_at']
+    list_filter = ['payment_method', 'settled_at']
+    search_fields = ['customer__customer_code', 'customer__first_name', 'customer__last_name', 'reference_number']
+    readonly_fields = [
+        'customer', 'amount', 'payment_method', 'reference_number', 'notes', 'received_by', 'settled_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,98 @@
+"""
+Django management command to build customer purchase rollups from sales
+history, in customer-ID chunks, or to verify existing rollups against the
+raw sale and payment rows.
+"""
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from customers.models import Customer
+from sales.models import CustomerPurchaseRollup
+from sales.services import customer_rollup
+
+
+class Command(BaseCommand):
+    help = 'Build or verify customer purchase rollups from sales history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer', help='Customer code or ID to process (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Customers processed per transaction')
+        parser.add_argument('--check', action='store_true', help='Only report rollups that differ from the raw rows')
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.order_by('pk')
+        if options['customer']:
+            lookup = Q(customer_code=options['customer'])
+            if self._is_uuid(options['customer']):
+                lookup |= Q(pk=options['customer'])
+            customers = customers.filter(lookup)
+
+        processed = written = drifted = 0
+        last_pk = None
+        while True:
+            chunk = customers if last_pk is None else customers.filter(pk__gt=last_pk)
+            customer_ids = list(chunk.values_list('pk', flat=True)[:options['batch_size']])
+            if not customer_ids:
+                break
+            last_pk = customer_ids[-1]
+            processed += len(customer_ids)
+
+            with transaction.atomic():
+                # Lock existing rows first so live sales wait instead of racing the recount
+                rollups = {
+                    rollup.customer_id: rollup
+                    for rollup in CustomerPurchaseRollup.objects.select_for_update().filter(customer_id__in=customer_ids)
+                }
+                expected = customer_rollup.raw_totals(customer_ids)
+                stale = []
+                for customer_id in customer_ids:
+                    values = expected[customer_id]
+                    rollup = rollups.get(customer_id)
+                    if rollup is None and not values['purchase_count'] and not values['refund_count']:
+                        continue
+                    differences = self._compare(rollup, values)
+                    if not differences:
+                        continue
+                    drifted += 1
+                    if options['check']:
+                        self.stdout.write(self.style.WARNING(f'{customer_id}: ' + '; '.join(differences)))
+                        continue
+                    stale.append(CustomerPurchaseRollup(customer_id=customer_id, **values))
+
+                if stale:
+                    CustomerPurchaseRollup.objects.bulk_create(
+                        stale,
+                        update_conflicts=True,
+                        unique_fields=['customer'],
+                        update_fields=customer_rollup.ROLLUP_FIELDS + ['updated_at']
+                    )
+                    customer_rollup.sync_last_purchase(stale)
+                    written += len(stale)
+            self.stdout.write(f'{processed} customers processed, {written} rollups written')
+
+        if options['check']:
+            style = self.style.ERROR if drifted else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {processed} customers: {drifted} rollups missing or out of date'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} customers: {written} rollups written'))
+
+    def _compare(self, rollup, expected):
+        if rollup is None:
+            return ['rollup missing']
+        differences = []
+        for field in customer_rollup.ROLLUP_FIELDS:
+            actual = getattr(rollup, field)
+            if actual != expected[field]:
+                differences.append(f'{field} rollup={actual} raw={expected[field]}')
+        return differences
+
+    @staticmethod
+    def _is_uuid(value):
+        try:
+            uuid.UUID(str(value))
+            return True
+        except ValueError:
+            return False
@@ -0,0 +1,121 @@
+"""
+Django management command to benchmark checkout (sale creation) cost
+against basket size.
+
+Every checkout runs inside a transaction that is rolled back, so the command
+can be pointed at a development database without leaving sales behind.
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from organization.models import Location
+from products.models import ItemVariant
+from sales.serializers import SaleCreateSerializer
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark sale after timing it."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-checkout query count and latency against basket size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,40,80,150',
+            help='Comma-separated basket sizes (line count) to benchmark'
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Checkouts per basket size')
+        parser.add_argument('--payments', type=int, default=2, help='Tenders per checkout')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        user = User.objects.filter(is_active=True).order_by('username').first()
+        location = Location.objects.filter(is_active=True).first()
+        variants = list(ItemVariant.objects.filter(is_active=True)[:max(sizes)])
+        if not user or not location or not variants:
+            raise CommandError('Benchmark needs an active user, location and at least one item variant')
+
+        self.stdout.write(
+            f'Benchmarking checkout with {len(variants)} distinct variants, '
+            f'{options["runs"]} runs per size, {options["payments"]} tenders\n'
+        )
+        self.stdout.write(
+            f'{"lines":>6} {"queries":>8} {"save q":>7} {"median ms":>10} {"p95 ms":>8}'
+        )
+
+        for size in sizes:
+            payload = self._build_payload(user, location, variants, size, options['payments'])
+            query_counts = []
+            save_counts = []
+            timings = []
+            for _ in range(options['runs']):
+                queries, save_queries, elapsed = self._run_checkout(payload)
+                query_counts.append(queries)
+                save_counts.append(save_queries)
+                timings.append(elapsed)
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(round(len(timings) * 0.95)) - 1)]
+            self.stdout.write(
+                f'{size:>6} {max(query_counts):>8} {max(save_counts):>7} '
+                f'{statistics.median(timings):>10.2f} {p95:>8.2f}'
+            )
+
+    def _build_payload(self, user, location, variants, size, tender_count):
+        items = []
+        for index in range(size):
+            variant = variants[index % len(variants)]
+            items.append({
+                'product': variant.id,
+                'quantity': Decimal('1.000'),
+                'unit_price': variant.default_price or Decimal('10.00'),
+                'discount_amount': Decimal('0.00'),
+                'tax_rate': Decimal('5.00'),
+            })
+
+        tender_count = max(tender_count, 1)
+        payments = [
+            {'payment_method': 'cash', 'amount': Decimal('1.00'), 'status': 'completed'}
+            for _ in range(tender_count)
+        ]
+        return {
+            'company': location.company_id,
+            'sale_type': 'cash',
+            'cashier': user.id,
+            'location': location.id,
+            'status': 'completed',
+            'items': items,
+            'payments': payments,
+        }
+
+    def _run_checkout(self, payload):
+        """Validate and save one checkout; return (queries, save queries, ms)."""
+        elapsed = 0.0
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    serializer = SaleCreateSerializer(data=payload)
+                    serializer.is_valid(raise_exception=True)
+                    validate_queries = len(context.captured_queries)
+                    serializer.save()
+                    elapsed = (time.perf_counter() - start) * 1000
+                raise _Rollback()
+        except _Rollback:
+            pass
+        total_queries = len(context.captured_queries)
+        return total_queries, total_queries - validate_queries, elapsed
@@ -0,0 +1,132 @@
+"""
+Django management command to measure offline sale upload throughput
+(sales ingested per second), comparing one checkout per sale with the
+batch ingestion path.
+
+Every run happens inside a transaction that is rolled back, so the command
+can be pointed at a development database without leaving sales behind.
+"""
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from organization.models import Location
+from products.models import ItemVariant
+from sales.serializers import SaleCreateSerializer
+from sales.services import ingestion
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark sales after timing them."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark offline sale ingestion throughput (sales/second)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=200, help='Sales per upload')
+        parser.add_argument('--lines', type=int, default=5, help='Lines per sale')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Sales per ingestion transaction')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by('username').first()
+        location = Location.objects.filter(is_active=True).first()
+        variants = list(ItemVariant.objects.filter(is_active=True)[:max(options['lines'] * 4, 1)])
+        if not user or not location or not variants:
+            raise CommandError('Benchmark needs an active user, location and at least one item variant')
+
+        sales = [
+            self._build_sale(user, location, variants, index, options['lines'])
+            for index in range(options['sales'])
+        ]
+        self.stdout.write(
+            f'Uploading {len(sales)} sales x {options["lines"]} lines '
+            f'(chunk size {options["chunk_size"]})\n'
+        )
+        self.stdout.write(f'{"mode":>9} {"queries":>8} {"seconds":>8} {"sales/s":>9}')
+
+        for mode, runner in (('per-sale', self._per_sale), ('batch', self._batch)):
+            queries, elapsed = self._run(sales, runner, options)
+            rate = len(sales) / elapsed if elapsed else 0
+            self.stdout.write(f'{mode:>9} {queries:>8} {elapsed:>8.2f} {rate:>9.1f}')
+
+        # A retry of the same upload must not insert anything
+        queries, elapsed, statuses = self._retry(sales, options)
+        self.stdout.write(
+            self.style.SUCCESS(f'Retry of the same batch: {queries} queries, {elapsed:.2f}s, statuses {statuses}')
+        )
+
+    def _build_sale(self, user, location, variants, index, lines):
+        items = []
+        for line in range(lines):
+            variant = variants[(index + line) % len(variants)]
+            items.append({
+                'product': str(variant.id),
+                'quantity': '1.000',
+                'unit_price': str(variant.default_price or Decimal('10.00')),
+                'discount_amount': '0.00',
+                'tax_rate': '5.00',
+            })
+        return {
+            'idempotency_key': str(uuid.uuid4()),
+            'client_sale_number': f'OFF-{index + 1:06d}',
+            'company': str(location.company_id) if location.company_id else None,
+            'sale_type': 'cash',
+            'cashier': user.id,
+            'location': str(location.id),
+            'status': 'completed',
+            'items': items,
+            'payments': [{'payment_method': 'cash', 'amount': '1.00', 'status': 'completed'}],
+        }
+
+    def _per_sale(self, sales, options):
+        for sale in sales:
+            payload = {key: value for key, value in sale.items() if key not in ingestion.OFFLINE_FIELDS}
+            serializer = SaleCreateSerializer(data=payload)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    def _batch(self, sales, options):
+        results = ingestion.ingest(sales, chunk_size=options['chunk_size'])
+        failed = [result for result in results if result['status'] != 'created']
+        if failed:
+            raise CommandError(f'Batch ingestion failed: {failed[0]}')
+
+    def _run(self, sales, runner, options):
+        """Run one upload mode; return (queries, seconds)."""
+        elapsed = 0.0
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    runner(sales, options)
+                    elapsed = time.perf_counter() - start
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return len(context.captured_queries), elapsed
+
+    def _retry(self, sales, options):
+        """Ingest, then time re-sending the same batch."""
+        statuses = {}
+        elapsed = 0.0
+        try:
+            with transaction.atomic():
+                ingestion.ingest(sales, chunk_size=options['chunk_size'])
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    results = ingestion.ingest(sales, chunk_size=options['chunk_size'])
+                    elapsed = time.perf_counter() - start
+                for result in results:
+                    statuses[result['status']] = statuses.get(result['status'], 0) + 1
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return len(context.captured_queries), elapsed, statuses
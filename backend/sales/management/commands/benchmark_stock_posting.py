@@ -0,0 +1,118 @@
+"""
+Django management command to benchmark sale-to-stock posting against basket
+size, comparing the set-based pipeline with per-row StockMovement saves.
+
+Every run happens inside a transaction that is rolled back, so the command
+can be pointed at a development database without changing stock.
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Inventory, StockMovement
+from products.models import ItemVariant
+from sales.services import stock_posting
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark stock changes after timing them."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sale-to-stock posting query count and latency against basket size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,40,80,150',
+            help='Comma-separated basket sizes (distinct variants) to benchmark'
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Postings per basket size')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        variants = list(ItemVariant.objects.filter(is_active=True).values_list('id', flat=True)[:max(sizes)])
+        if not variants:
+            raise CommandError('Benchmark needs at least one active item variant')
+
+        self.stdout.write(
+            f'Benchmarking stock posting with up to {len(variants)} variants, '
+            f'{options["runs"]} runs per size\n'
+        )
+        self.stdout.write(
+            f'{"lines":>6} {"mode":>9} {"queries":>8} {"median ms":>10} {"p95 ms":>8}'
+        )
+
+        for size in sizes:
+            basket = variants[:size]
+            for mode, runner in (('pipeline', self._post_pipeline), ('per-row', self._post_per_row)):
+                query_counts = []
+                timings = []
+                for _ in range(options['runs']):
+                    queries, elapsed = self._run(basket, runner)
+                    query_counts.append(queries)
+                    timings.append(elapsed)
+
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(round(len(timings) * 0.95)) - 1)]
+                self.stdout.write(
+                    f'{len(basket):>6} {mode:>9} {max(query_counts):>8} '
+                    f'{statistics.median(timings):>10.2f} {p95:>8.2f}'
+                )
+
+    def _ensure_inventory(self, basket):
+        """Stock every basket variant so the per-row path never underflows (rolled back later)."""
+        Inventory.objects.filter(product_id__in=basket).update(current_stock=F('current_stock') + 1000)
+        tracked = set(Inventory.objects.filter(product_id__in=basket).values_list('product_id', flat=True))
+        Inventory.objects.bulk_create([
+            Inventory(
+                product_id=variant_id,
+                current_stock=1000,
+                available_stock=1000,
+                cost_price=Decimal('1.00'),
+                selling_price=Decimal('1.00')
+            )
+            for variant_id in basket
+            if variant_id not in tracked
+        ])
+
+    def _post_pipeline(self, basket):
+        stock_posting.apply_stock_changes(
+            {variant_id: -1 for variant_id in basket},
+            movement_type='sale',
+            reference_number='BENCHMARK'
+        )
+
+    def _post_per_row(self, basket):
+        for inventory in Inventory.objects.filter(product_id__in=basket).select_related('company'):
+            StockMovement.objects.create(
+                inventory=inventory,
+                company=inventory.company,
+                movement_type='sale',
+                quantity_change=-1,
+                reference_number='BENCHMARK'
+            )
+
+    def _run(self, basket, runner):
+        """Post one basket with ``runner``; return (queries, ms)."""
+        elapsed = 0.0
+        try:
+            with transaction.atomic():
+                self._ensure_inventory(basket)
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    runner(basket)
+                    elapsed = (time.perf_counter() - start) * 1000
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return len(context.captured_queries), elapsed
@@ -0,0 +1,63 @@
+"""
+Django management command to drain the sale-to-stock posting queue.
+
+Completed sales with no ``stock_posted_at`` are posted to inventory oldest
+first, one transaction per sale. Several workers may run at once: each sale
+is claimed with a conditional UPDATE, so it is posted exactly once.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from sales.services import stock_posting
+
+
+class Command(BaseCommand):
+    help = 'Post completed sales to inventory (drains the SALE_STOCK_POSTING queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Sales fetched per round-trip')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after posting this many sales (0 = no limit)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new sales instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        posted = movements = 0
+        while True:
+            batch_posted, batch_movements = self._drain(options, posted)
+            posted += batch_posted
+            movements += batch_movements
+            limit_reached = options['limit'] and posted >= options['limit']
+            if not options['loop'] or limit_reached:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Posted {posted} sales ({movements} stock movements)'))
+
+    def _drain(self, options, already_posted):
+        posted = movements = 0
+        while True:
+            batch_size = options['batch_size']
+            if options['limit']:
+                batch_size = min(batch_size, options['limit'] - already_posted - posted)
+                if batch_size <= 0:
+                    break
+            sales = list(
+                stock_posting.pending_sales().only('id', 'sale_number', 'status', 'cashier_id')[:batch_size]
+            )
+            if not sales:
+                break
+
+            claimed = 0
+            for sale in sales:
+                created = stock_posting.post_sale(sale)
+                if created is None:
+                    # Claimed by another worker in the meantime
+                    continue
+                claimed += 1
+                movements += len(created)
+                self.stdout.write(f'{sale.sale_number}: {len(created)} movements')
+            posted += claimed
+            if not claimed:
+                break
+        return posted, movements
@@ -0,0 +1,100 @@
+"""
+Django management command to verify POS session ledgers against the raw
+sale and payment rows, optionally repairing any drift.
+"""
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from sales.models import POSSession, POSSessionLedger
+from sales.services import session_ledger
+
+
+LEDGER_FIELDS = ['sale_count', 'subtotal_amount', 'tax_amount', 'discount_amount', 'gross_amount']
+
+
+def _normalise_tenders(tender_totals):
+    return {
+        method: (entry.get('count', 0), Decimal(str(entry.get('amount', '0'))))
+        for method, entry in (tender_totals or {}).items()
+        if entry.get('count', 0) or Decimal(str(entry.get('amount', '0')))
+    }
+
+
+class Command(BaseCommand):
+    help = 'Verify POS session ledgers against raw sales and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', help='Session number or ID to check (default: all)')
+        parser.add_argument('--status', choices=['open', 'closed'], help='Only check sessions in this status')
+        parser.add_argument('--batch-size', type=int, default=500, help='Sessions compared per round-trip')
+        parser.add_argument('--fix', action='store_true', help='Rebuild mismatched or missing ledgers')
+
+    def handle(self, *args, **options):
+        sessions = POSSession.objects.order_by('opened_at')
+        if options['session']:
+            lookup = Q(session_number=options['session'])
+            if self._is_uuid(options['session']):
+                lookup |= Q(id=options['session'])
+            sessions = sessions.filter(lookup)
+        if options['status']:
+            sessions = sessions.filter(status=options['status'])
+
+        session_ids = list(sessions.values_list('id', flat=True))
+        checked = mismatched = missing = fixed = 0
+
+        for start in range(0, len(session_ids), options['batch_size']):
+            batch = session_ids[start:start + options['batch_size']]
+            expected = session_ledger.raw_totals(batch)
+            ledgers = {ledger.session_id: ledger for ledger in POSSessionLedger.objects.filter(session_id__in=batch)}
+
+            for session_id in batch:
+                checked += 1
+                ledger = ledgers.get(session_id)
+                if ledger is None:
+                    missing += 1
+                    differences = ['ledger missing']
+                else:
+                    differences = self._compare(ledger, expected[session_id])
+                    if differences:
+                        mismatched += 1
+
+                if not differences:
+                    continue
+                self.stdout.write(self.style.WARNING(f'{session_id}: ' + '; '.join(differences)))
+                if options['fix']:
+                    with transaction.atomic():
+                        session_ledger.rebuild(session_id)
+                    fixed += 1
+
+        summary = f'Checked {checked} sessions: {mismatched} mismatched, {missing} without ledger'
+        if options['fix']:
+            summary += f', {fixed} rebuilt'
+        style = self.style.SUCCESS if not (mismatched or missing) or options['fix'] else self.style.ERROR
+        self.stdout.write(style(summary))
+
+    def _compare(self, ledger, expected):
+        differences = []
+        for field in LEDGER_FIELDS:
+            actual = getattr(ledger, field)
+            if actual != expected[field]:
+                differences.append(f'{field} ledger={actual} raw={expected[field]}')
+        actual_tenders = _normalise_tenders(ledger.tender_totals)
+        expected_tenders = _normalise_tenders(expected['tender_totals'])
+        for method in sorted(set(actual_tenders) | set(expected_tenders)):
+            if actual_tenders.get(method) != expected_tenders.get(method):
+                differences.append(
+                    f'tender {method} ledger={actual_tenders.get(method)} raw={expected_tenders.get(method)}'
+                )
+        return differences
+
+    @staticmethod
+    def _is_uuid(value):
+        try:
+            uuid.UUID(str(value))
+            return True
+        except ValueError:
+            return False
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:33
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_company_logo'),
+        ('sales', '0009_alter_dayclose_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('business_date', models.DateField(help_text='Business date the sequence belongs to')),
+                ('document_type', models.CharField(choices=[('sale', 'Sale'), ('session', 'POS Session')], max_length=20)),
+                ('last_value', models.PositiveBigIntegerField(default=0, help_text='Last number handed out (or reserved) for this sequence')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='organization.company')),
+                ('location', models.ForeignKey(help_text='Location this sequence numbers documents for', on_delete=django.db.models.deletion.PROTECT, related_name='document_sequences', to='organization.location')),
+            ],
+            options={
+                'db_table': 'document_sequences',
+                'ordering': ['-business_date', 'document_type'],
+                'unique_together': {('location', 'business_date', 'document_type')},
+            },
+        ),
+    ]
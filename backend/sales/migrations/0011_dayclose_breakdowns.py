@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:35
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_document_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dayclose',
+            name='cashier_breakdown',
+            field=models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Sale count and amount per cashier'),
+        ),
+        migrations.AddField(
+            model_name='dayclose',
+            name='hourly_breakdown',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Sale count and amount per hour of the day'),
+        ),
+        migrations.AddField(
+            model_name='dayclose',
+            name='tender_breakdown',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Count and amount per payment method'),
+        ),
+        migrations.AddField(
+            model_name='dayclose',
+            name='terminal_breakdown',
+            field=models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Sale count and amount per terminal'),
+        ),
+    ]
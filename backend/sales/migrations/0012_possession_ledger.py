@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0011_dayclose_breakdowns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='POSSessionLedger',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='sales.possession')),
+                ('sale_count', models.PositiveIntegerField(default=0, help_text='Completed sales in the session')),
+                ('subtotal_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of total_amount of completed sales', max_digits=18)),
+                ('tender_totals', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Completed payment count and amount per payment method')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'pos_session_ledgers',
+            },
+        ),
+    ]
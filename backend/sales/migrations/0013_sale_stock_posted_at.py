@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def mark_existing_sales_posted(apps, schema_editor):
+    """
+    Sales completed before stock posting existed never consumed stock; mark
+    them posted so the posting queue does not replay history.
+    """
+    Sale = apps.get_model('sales', 'Sale')
+    Sale.objects.filter(status='completed', stock_posted_at__isnull=True).update(
+        stock_posted_at=Coalesce(F('completed_at'), F('sale_date'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('organization', '0003_company_logo'),
+        ('pos_masters', '0009_alter_terminaldepartmentmapping_department'),
+        ('sales', '0012_possession_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='stock_posted_at',
+            field=models.DateTimeField(blank=True, help_text="When the sale's lines were posted to inventory (empty = not yet posted)", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', 'stock_posted_at'], name='sales_status_adb5fc_idx'),
+        ),
+        migrations.RunPython(mark_existing_sales_posted, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0013_sale_stock_posted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='client_sale_number',
+            field=models.CharField(blank=True, help_text='Number the till gave the sale while offline', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='client_sold_at',
+            field=models.DateTimeField(blank=True, help_text='When the till rang up the sale while offline', null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client-generated key making offline uploads safe to retry', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_search_token'),
+        ('sales', '0014_sale_offline_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerPurchaseRollup',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='purchase_rollup', serialize=False, to='customers.customer')),
+                ('purchase_count', models.PositiveIntegerField(default=0, help_text='Completed and partially refunded sales')),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of total_amount of completed and partially refunded sales', max_digits=18)),
+                ('refund_count', models.PositiveIntegerField(default=0, help_text='Fully refunded sales')),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('credit_outstanding', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text="Completed credit-tender payments on the customer's purchases", max_digits=18)),
+                ('first_purchase_at', models.DateTimeField(blank=True, null=True)),
+                ('last_purchase_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'customer_purchase_rollups',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0015_customer_purchase_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_number',
+            field=models.CharField(db_index=True, help_text='Auto-generated: SALE-YYYYMMDD-LOC-NNNN (business date, location code, sequence)', max_length=50, unique=True),
+        ),
+    ]
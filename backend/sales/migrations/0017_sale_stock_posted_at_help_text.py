@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0016_sale_number_help_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='stock_posted_at',
+            field=models.DateTimeField(blank=True, help_text='When the sale was settled against inventory: posted, or skipped while posting was off (empty = pending, or reversed)', null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:25
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_search_token'),
+        ('sales', '0017_sale_stock_posted_at_help_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerpurchaserollup',
+            name='credit_outstanding',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text="Completed credit-tender payments on the customer's purchases, less credit settlements", max_digits=18),
+        ),
+        migrations.CreateModel(
+            name='CreditSettlement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('upi', 'UPI'), ('wallet', 'Wallet'), ('cheque', 'Cheque')], default='cash', max_length=20)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('notes', models.TextField(blank=True)),
+                ('settled_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='credit_settlements', to='customers.customer')),
+                ('received_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_settlements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'credit_settlements',
+                'ordering': ['-settled_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos_masters', '0010_sync_tombstone'),
+        ('sales', '0018_credit_settlement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_number',
+            field=models.CharField(db_index=True, help_text='SALE-YYYYMMDD-LOC-NNNN (business date, location code, sequence): allocated by the server, or issued by the terminal from a reserved block', max_length=50, unique=True),
+        ),
+        migrations.CreateModel(
+            name='DocumentNumberBlock',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_type', models.CharField(choices=[('sale', 'Sale'), ('session', 'POS Session')], max_length=20)),
+                ('first_value', models.PositiveBigIntegerField()),
+                ('last_value', models.PositiveBigIntegerField()),
+                ('reserved_at', models.DateTimeField(auto_now_add=True)),
+                ('day_open', models.ForeignKey(help_text='Day Open whose location and business date the numbers belong to', on_delete=django.db.models.deletion.CASCADE, related_name='number_blocks', to='sales.dayopen')),
+                ('reserved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='document_number_blocks', to=settings.AUTH_USER_MODEL)),
+                ('terminal', models.ForeignKey(blank=True, help_text='Terminal allowed to issue the numbers (empty = any terminal at the location)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='number_blocks', to='pos_masters.terminal')),
+            ],
+            options={
+                'db_table': 'document_number_blocks',
+                'ordering': ['day_open', 'document_type', 'first_value'],
+                'indexes': [models.Index(fields=['day_open', 'document_type', 'first_value'], name='number_blocks_lookup_idx')],
+            },
+        ),
+    ]
@@ -2,10 +2,11 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from decimal import Decimal
 import uuid
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from pos_masters.models import SettlementReason
 from organization.models import Company
 from products.models import ItemVariant
@@ -47,7 +48,7 @@ class Sale(models.Model):
         max_length=50,
         unique=True,
         db_index=True,
-        help_text="Auto-generated: SALE-YYYYMMDD-XXXX"
+        help_text="SALE-YYYYMMDD-LOC-NNNN (business date, location code, sequence): allocated by the server, or issued by the terminal from a reserved block"
     )
     sale_type = models.CharField(
         max_length=20,
@@ -109,8 +110,24 @@ class Sale(models.Model):
     # Metadata
     sale_date = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    stock_posted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the sale was settled against inventory: posted, or skipped while posting was off (empty = pending, or reversed)"
+    )
     notes = models.TextField(blank=True)
     
+    # Offline upload
+    idempotency_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="Client-generated key making offline uploads safe to retry"
+    )
+    client_sale_number = models.CharField(max_length=50, blank=True, help_text="Number the till gave the sale while offline")
+    client_sold_at = models.DateTimeField(null=True, blank=True, help_text="When the till rang up the sale while offline")
+    
     # Audit
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -123,6 +140,7 @@ class Sale(models.Model):
             models.Index(fields=['sale_date']),
             models.Index(fields=['status', 'sale_date']),
             models.Index(fields=['location', 'sale_date']),
+            models.Index(fields=['status', 'stock_posted_at']),
         ]
         unique_together = ['company', 'sale_number']
     
@@ -131,57 +149,30 @@ class Sale(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.sale_number:
-            self.sale_number = self.generate_sale_number()
+            self.sale_number = self.generate_sale_number(
+                location=self.location,
+                terminal=self.terminal_id
+            )
         super().save(*args, **kwargs)
     
+    def get_paid_amount(self):
+        """Total of completed payments recorded against this sale."""
+        return self.payments.filter(status='completed').aggregate(
+            total=models.Sum('amount')
+        )['total'] or Decimal('0.00')
+    
     @classmethod
-    def generate_sale_number(cls, day_open=None):
-        """Generate unique sale number from Day Open sequence or fallback."""
-        from django.utils import timezone
-        
-        # Try to get from Day Open if provided or find active one
-        if not day_open and hasattr(cls, 'location'):
-            try:
-                # This will be set during creation via serializer
-                day_open = getattr(cls, '_day_open_for_sequence', None)
-            except:
-                pass
-        
-        if day_open:
-            # Use Day Open's next_sale_number sequence
-            sale_number = day_open.next_sale_number
-            
-            # Extract and increment the number
-            parts = sale_number.split('-')
-            if len(parts) == 3:
-                try:
-                    current_num = int(parts[-1])
-                    new_num = current_num + 1
-                    # Update Day Open's next sequence
-                    day_open.next_sale_number = f'{parts[0]}-{parts[1]}-{new_num:04d}'
-                    day_open.save(update_fields=['next_sale_number'])
-                except ValueError:
-                    # Fallback if parsing fails
-                    pass
-            
-            return sale_number
-        
-        # Fallback: Generate based on today's date
-        today = date.today()
-        date_str = today.strftime('%Y%m%d')
-        prefix = f'SALE-{date_str}-'
-        
-        last_sale = cls.objects.filter(
-            sale_number__startswith=prefix
-        ).order_by('-sale_number').first()
-        
-        if last_sale:
-            last_num = int(last_sale.sale_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+    def generate_sale_number(cls, day_open=None, location=None, terminal=None):
+        """
+        Allocate the next sale number from the location's business-date
+        sequence (see DocumentSequence). The business date is the given Day
+        Open's, else the location's active Day Open's, else today's.
+        """
+        from .services import numbering
         
-        return f'{prefix}{new_num:04d}'
+        location = location or (day_open.location if day_open else None)
+        business_date = numbering.business_date_for(location, day_open)
+        return numbering.next_number(location, business_date, 'sale', terminal=terminal)
 
 
 class SaleItem(models.Model):
@@ -332,54 +323,153 @@ class POSSession(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.session_number:
-            self.session_number = self.generate_session_number()
+            self.session_number = self.generate_session_number(
+                location=self.location,
+                terminal=self.terminal_id
+            )
         super().save(*args, **kwargs)
     
     @classmethod
-    def generate_session_number(cls, day_open=None):
-        """Generate unique session number from Day Open sequence or fallback."""
-        # Try to get from Day Open if provided
-        if not day_open:
-            try:
-                day_open = getattr(cls, '_day_open_for_sequence', None)
-            except:
-                pass
-        
-        if day_open:
-            # Use Day Open's next_session_number sequence
-            session_number = day_open.next_session_number
-            
-            # Extract and increment the number
-            parts = session_number.split('-')
-            if len(parts) == 3:
-                try:
-                    current_num = int(parts[-1])
-                    new_num = current_num + 1
-                    # Update Day Open's next sequence
-                    day_open.next_session_number = f'{parts[0]}-{parts[1]}-{new_num:04d}'
-                    day_open.save(update_fields=['next_session_number'])
-                except ValueError:
-                    # Fallback if parsing fails
-                    pass
-            
-            return session_number
-        
-        # Fallback: Generate based on today's date
-        today = date.today()
-        date_str = today.strftime('%Y%m%d')
-        prefix = f'SES-{date_str}-'
-        
-        last_session = cls.objects.filter(
-            session_number__startswith=prefix
-        ).order_by('-session_number').first()
-        
-        if last_session:
-            last_num = int(last_session.session_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+    def generate_session_number(cls, day_open=None, location=None, terminal=None):
+        """
+        Allocate the next session number from the location's business-date
+        sequence (see DocumentSequence).
+        """
+        from .services import numbering
         
-        return f'{prefix}{new_num:04d}'
+        location = location or (day_open.location if day_open else None)
+        business_date = numbering.business_date_for(location, day_open)
+        return numbering.next_number(location, business_date, 'session', terminal=terminal)
+
+
+class POSSessionLedger(models.Model):
+    """
+    Running totals for a POS session.
+    
+    Updated in the same transaction as each sale and payment (see
+    sales.services.session_ledger), so close, summary and interim settlement
+    read one row instead of re-aggregating the session's sales and payments.
+    """
+    
+    session = models.OneToOneField(
+        POSSession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ledger'
+    )
+    sale_count = models.PositiveIntegerField(default=0, help_text="Completed sales in the session")
+    subtotal_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    tax_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    discount_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    gross_amount = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Sum of total_amount of completed sales"
+    )
+    tender_totals = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Completed payment count and amount per payment method"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'pos_session_ledgers'
+    
+    def __str__(self):
+        return f"Ledger - {self.session_id} ({self.sale_count} sales, {self.gross_amount})"
+    
+    def tender_amount(self, payment_method):
+        """Completed payment amount recorded for a payment method."""
+        return Decimal(str(self.tender_totals.get(payment_method, {}).get('amount', '0.00')))
+    
+    def tender_count(self, payment_method):
+        """Completed payment count recorded for a payment method."""
+        return self.tender_totals.get(payment_method, {}).get('count', 0)
+
+
+class CustomerPurchaseRollup(models.Model):
+    """
+    Lifetime purchase totals for a customer.
+    
+    Updated in the same transaction as each sale and payment (see
+    sales.services.customer_rollup), so customer status, history and the
+    credit check at the till read one row instead of aggregating sales.
+    """
+    
+    customer = models.OneToOneField(
+        'customers.Customer',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='purchase_rollup'
+    )
+    purchase_count = models.PositiveIntegerField(default=0, help_text="Completed and partially refunded sales")
+    lifetime_spend = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Sum of total_amount of completed and partially refunded sales"
+    )
+    refund_count = models.PositiveIntegerField(default=0, help_text="Fully refunded sales")
+    refunded_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    credit_outstanding = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Completed credit-tender payments on the customer's purchases, less credit settlements"
+    )
+    first_purchase_at = models.DateTimeField(null=True, blank=True)
+    last_purchase_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'customer_purchase_rollups'
+    
+    def __str__(self):
+        return f"Purchases - {self.customer_id} ({self.purchase_count} sales, {self.lifetime_spend})"
+
+
+class CreditSettlement(models.Model):
+    """
+    A repayment against a customer's credit account.
+    
+    Lowers the customer's outstanding credit (see
+    sales.services.customer_rollup); credit-tender payments raise it.
+    """
+    
+    PAYMENT_METHODS = [choice for choice in Payment.PAYMENT_METHODS if choice[0] != 'credit']
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    customer = models.ForeignKey(
+        'customers.Customer',
+        on_delete=models.PROTECT,
+        related_name='credit_settlements'
+    )
+    amount = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))]
+    )
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='cash')
+    reference_number = models.CharField(max_length=100, blank=True)
+    notes = models.TextField(blank=True)
+    received_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='credit_settlements'
+    )
+    settled_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'credit_settlements'
+        ordering = ['-settled_at']
+    
+    def __str__(self):
+        return f"Credit settlement - {self.customer_id} ({self.amount})"
 
 
 class DayOpen(models.Model):
@@ -455,6 +545,99 @@ class DayOpen(models.Model):
         self.save()
 
 
+class DocumentSequence(models.Model):
+    """
+    Per-location, per-business-date document number counter.
+    
+    ``last_value`` is only ever advanced with an atomic ``UPDATE ... SET
+    last_value = last_value + n`` (see sales.services.numbering), so
+    concurrent tills never read-modify-write the same number. Terminals can
+    reserve a block of numbers at once and hand them out locally.
+    """
+    
+    DOCUMENT_TYPES = [
+        ('sale', 'Sale'),
+        ('session', 'POS Session'),
+    ]
+    
+    PREFIXES = {
+        'sale': 'SALE',
+        'session': 'SES',
+    }
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='document_sequences', null=True, blank=True)
+    location = models.ForeignKey(
+        'organization.Location',
+        on_delete=models.PROTECT,
+        related_name='document_sequences',
+        help_text="Location this sequence numbers documents for"
+    )
+    business_date = models.DateField(help_text="Business date the sequence belongs to")
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
+    last_value = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Last number handed out (or reserved) for this sequence"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        ordering = ['-business_date', 'document_type']
+        unique_together = [['location', 'business_date', 'document_type']]
+    
+    def __str__(self):
+        return f"{self.get_document_type_display()} - {self.location_id} - {self.business_date} ({self.last_value})"
+
+
+class DocumentNumberBlock(models.Model):
+    """
+    A range of document numbers reserved for a terminal to issue itself,
+    e.g. while offline.
+    
+    Values come from the Day Open's DocumentSequence, so the server never
+    hands them out again. A sale whose number falls inside a block keeps
+    that number (see sales.services.numbering.claim_numbers).
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    day_open = models.ForeignKey(
+        'DayOpen',
+        on_delete=models.CASCADE,
+        related_name='number_blocks',
+        help_text="Day Open whose location and business date the numbers belong to"
+    )
+    terminal = models.ForeignKey(
+        'pos_masters.Terminal',
+        on_delete=models.CASCADE,
+        related_name='number_blocks',
+        null=True,
+        blank=True,
+        help_text="Terminal allowed to issue the numbers (empty = any terminal at the location)"
+    )
+    document_type = models.CharField(max_length=20, choices=DocumentSequence.DOCUMENT_TYPES)
+    first_value = models.PositiveBigIntegerField()
+    last_value = models.PositiveBigIntegerField()
+    reserved_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='document_number_blocks'
+    )
+    reserved_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'document_number_blocks'
+        ordering = ['day_open', 'document_type', 'first_value']
+        indexes = [
+            models.Index(fields=['day_open', 'document_type', 'first_value'], name='number_blocks_lookup_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_document_type_display()} {self.first_value}-{self.last_value} ({self.day_open_id})"
+
+
 class DayClose(models.Model):
     """
     Day Close model - Store level day end process
@@ -520,6 +703,30 @@ class DayClose(models.Model):
     )
     total_sessions = models.IntegerField(default=0, help_text="Number of sessions closed")
     total_items_sold = models.IntegerField(default=0, help_text="Total items sold")
+    tender_breakdown = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Count and amount per payment method"
+    )
+    terminal_breakdown = models.JSONField(
+        default=list,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Sale count and amount per terminal"
+    )
+    cashier_breakdown = models.JSONField(
+        default=list,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Sale count and amount per cashier"
+    )
+    hourly_breakdown = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Sale count and amount per hour of the day"
+    )
     
     # Document number sequences reset
     next_sale_number = models.CharField(
@@ -608,14 +815,10 @@ class DayClose(models.Model):
                 "Please complete all deferred settlements before closing the day."
             )
         
-        # Consolidate sales data
-        from sales.models import Sale, POSSession
+        # Consolidate sales data with one aggregate query per metric
+        from .services.consolidation import consolidate_day
         
-        sales = Sale.objects.filter(
-            location=self.location,
-            sale_date__date=self.business_date,
-            status='completed'
-        )
+        consolidation = consolidate_day(self.location, self.business_date)
         
         sessions = POSSession.objects.filter(
             cashier__pos_location=self.location,
@@ -623,20 +826,23 @@ class DayClose(models.Model):
             status='closed'
         )
         
-        self.total_transactions = sales.count()
-        self.total_sales_amount = sum(sale.total_amount for sale in sales)
+        self.total_transactions = consolidation['total_transactions']
+        self.total_sales_amount = consolidation['total_sales_amount']
         self.total_sessions = sessions.count()
-        self.total_items_sold = sum(
-            sale.items.count() for sale in sales
-        )
+        self.total_items_sold = consolidation['total_items_sold']
+        self.tender_breakdown = consolidation['tender_breakdown']
+        self.terminal_breakdown = consolidation['terminal_breakdown']
+        self.cashier_breakdown = consolidation['cashier_breakdown']
+        self.hourly_breakdown = consolidation['hourly_breakdown']
         
         # Calculate next business date (next day)
         next_date = self.business_date + timedelta(days=1)
-        next_date_str = next_date.strftime('%Y%m%d')
         
-        # Reset document number sequences for next business date
-        self.next_sale_number = f'SALE-{next_date_str}-0001'
-        self.next_session_number = f'SES-{next_date_str}-0001'
+        # Document numbers restart with the next business date's sequences
+        from .services import numbering
+        next_numbers = numbering.peek_next_numbers(self.location, next_date)
+        self.next_sale_number = next_numbers['sale']
+        self.next_session_number = next_numbers['session']
         
         # Mark as completed
         self.status = 'completed'
@@ -648,6 +854,11 @@ class DayClose(models.Model):
             'total_transactions': self.total_transactions,
             'total_sales_amount': float(self.total_sales_amount),
             'total_sessions': self.total_sessions,
+            'total_items_sold': self.total_items_sold,
+            'tender_breakdown': self.tender_breakdown,
+            'terminal_breakdown': self.terminal_breakdown,
+            'cashier_breakdown': self.cashier_breakdown,
+            'hourly_breakdown': self.hourly_breakdown,
             'next_sale_number': self.next_sale_number,
             'next_session_number': self.next_session_number,
         }
@@ -1,10 +1,10 @@
 from rest_framework import serializers
-from .models import Sale, SaleItem, Payment, POSSession, DayOpen, DayClose
+from .models import Sale, SaleItem, Payment, CreditSettlement, POSSession, DayOpen, DayClose
+from .services import checkout, customer_rollup, numbering
 from products.models import ItemVariant
 from customers.models import Customer
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.utils import timezone
 from decimal import Decimal
 import uuid
 
@@ -22,9 +22,42 @@ except ImportError:
     SettlementReason = None
 
 
+class BasketVariantField(serializers.PrimaryKeyRelatedField):
+    """
+    Product field that resolves variants from a basket-wide prefetch
+    (``context['variant_cache']``) before falling back to a per-line query.
+    """
+    
+    def to_internal_value(self, data):
+        cache = self.context.get('variant_cache')
+        if cache is not None:
+            variant = cache.get(str(data))
+            if variant is not None:
+                return variant
+        return super().to_internal_value(data)
+
+
+class BatchCachedRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Related field that, during batch ingestion, resolves each (model, pk)
+    once per batch through ``context['related_cache']``. Without that
+    context key it behaves exactly like PrimaryKeyRelatedField.
+    """
+    
+    def to_internal_value(self, data):
+        cache = self.context.get('related_cache')
+        if cache is None:
+            return super().to_internal_value(data)
+        key = (self.get_queryset().model._meta.label, str(data))
+        if key not in cache:
+            cache[key] = super().to_internal_value(data)
+        return cache[key]
+
+
 class SaleItemSerializer(serializers.ModelSerializer):
     """Serializer for sale line items."""
     
+    product = BasketVariantField(queryset=ItemVariant.objects.all())
     product_name = serializers.CharField(source='product.variant_name', read_only=True)
     product_barcode = serializers.CharField(source='product.barcode', read_only=True)
     product_sku = serializers.CharField(source='product.sku_code', read_only=True)
@@ -122,6 +155,22 @@ class PaymentSerializer(serializers.ModelSerializer):
             self.fields['sale'].allow_null = True
 
 
+class CreditSettlementSerializer(serializers.ModelSerializer):
+    """Serializer for customer credit settlements."""
+    
+    customer_name = serializers.CharField(source='customer.full_name', read_only=True)
+    payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
+    received_by_name = serializers.CharField(source='received_by.username', read_only=True, default=None)
+    
+    class Meta:
+        model = CreditSettlement
+        fields = [
+            'id', 'customer', 'customer_name', 'amount', 'payment_method', 'payment_method_display',
+            'reference_number', 'notes', 'received_by', 'received_by_name', 'settled_at'
+        ]
+        read_only_fields = ['id', 'received_by', 'settled_at']
+
+
 class SaleSerializer(serializers.ModelSerializer):
     """Serializer for sales transactions."""
     
@@ -142,19 +191,23 @@ class SaleSerializer(serializers.ModelSerializer):
             'delivery_type', 'delivery_address',
             'subtotal', 'tax_amount', 'discount_amount',
             'total_amount', 'status', 'status_display',
-            'sale_date', 'completed_at', 'notes',
+            'sale_date', 'completed_at', 'stock_posted_at', 'notes',
+            'client_sale_number', 'client_sold_at', 'idempotency_key',
             'items', 'payments',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'sale_number', 'subtotal', 'tax_amount', 'total_amount',
-            'sale_date', 'created_at', 'updated_at'
+            'sale_date', 'stock_posted_at', 'client_sale_number', 'client_sold_at',
+            'idempotency_key', 'created_at', 'updated_at'
         ]
 
 
 class SaleCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating new sales with line items and payments."""
     
+    serializer_related_field = BatchCachedRelatedField
+    
     items = SaleItemSerializer(many=True, read_only=False)
     payments = PaymentSerializer(many=True, required=False, read_only=False)
     discount_percentage = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, default=0, write_only=True, help_text="Bill-level discount percentage")
@@ -171,19 +224,53 @@ class SaleCreateSerializer(serializers.ModelSerializer):
             'sale_date', 'completed_at', 'created_at', 'updated_at',
             'items', 'payments'
         ]
-        read_only_fields = ['id', 'sale_number', 'subtotal', 'tax_amount', 'discount_amount', 'total_amount', 
+        read_only_fields = ['id', 'subtotal', 'tax_amount', 'discount_amount', 'total_amount', 
                            'sale_date', 'completed_at', 'created_at', 'updated_at']
+        extra_kwargs = {
+            'sale_number': {
+                'required': False,
+                'help_text': "Number the terminal issued from a reserved block (omit to have one allocated)"
+            },
+        }
+        # sale_number is unique on its own (UniqueValidator above); the
+        # (company, sale_number) check would make it a required field
+        validators = []
     
-    @transaction.atomic
-    def create(self, validated_data):
-        """Create sale with items and payments in a transaction."""
-        # Import here to avoid circular imports
-        from .models import DayOpen
-        
-        items_data = validated_data.pop('items')
-        payments_data = validated_data.pop('payments', [])
-        
-        # Get location from multiple sources
+    @staticmethod
+    def basket_product_ids(data):
+        """Valid product UUIDs referenced by a sale payload's items."""
+        items = data.get('items') if hasattr(data, 'get') else None
+        product_ids = set()
+        if not isinstance(items, list):
+            return product_ids
+        for item in items:
+            if not isinstance(item, dict) or not item.get('product'):
+                continue
+            try:
+                product_ids.add(uuid.UUID(str(item['product'])))
+            except ValueError:
+                # Invalid ids are reported by the field itself
+                continue
+        return product_ids
+    
+    def to_internal_value(self, data):
+        """Resolve every basket product in one query before field validation."""
+        # A batch may have prefetched the variants already; only fetch the rest
+        cache = self.context.setdefault('variant_cache', {})
+        missing = {pk for pk in self.basket_product_ids(data) if str(pk) not in cache}
+        if missing:
+            cache.update(
+                (str(variant.pk), variant)
+                for variant in ItemVariant.objects.filter(pk__in=missing)
+            )
+        return super().to_internal_value(data)
+    
+    def resolve_location(self, validated_data):
+        """
+        Determine the sale's location from (in order) the payload, the POS
+        session, the cashier's POS location, the request session and finally
+        the first active location.
+        """
         location = validated_data.get('location')
         
         # Try to get location from pos_session if provided
@@ -236,137 +323,78 @@ class SaleCreateSerializer(serializers.ModelSerializer):
                 'location': 'Unable to determine location. Please ensure a location is assigned to the POS session, terminal, or user.'
             })
         
-        # Set location in validated_data
+        return location
+    
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create sale with items and payments in a transaction."""
+        # Import here to avoid circular imports
+        from .models import DayOpen
+        
+        items_data = validated_data.pop('items')
+        payments_data = validated_data.pop('payments', [])
+        
+        # Get location from multiple sources
+        location = self.resolve_location(validated_data)
         validated_data['location'] = location
         
-        # Find active Day Open for sequence generation
-        day_open = None
-        try:
+        allocate_number = None
+        if validated_data.get('sale_number'):
+            # Issued by the terminal from a block reserved on the Day Open
+            try:
+                numbering.claim_number(
+                    validated_data['sale_number'], location, 'sale', terminal=validated_data.get('terminal')
+                )
+            except ValueError as e:
+                raise serializers.ValidationError({'sale_number': str(e)})
+        else:
+            # Active Day Open supplies the business date for the number sequence
             day_open = DayOpen.objects.filter(
                 location=location,
                 is_active=True
             ).first()
-        except Exception:
-            pass
-        
-        # Generate sale number from Day Open sequence if available
-        if day_open:
-            try:
-                sale_number = Sale.generate_sale_number(day_open=day_open)
-                validated_data['sale_number'] = sale_number
-            except Exception as e:
-                # Fallback: generate sale number without Day Open
-                validated_data['sale_number'] = f"SALE-{timezone.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
-        else:
-            # Generate sale number without Day Open (fallback)
-            validated_data['sale_number'] = f"SALE-{timezone.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+            
+            # Allocated from the per-location/business-date counter as the
+            # checkout's last write (see checkout.save_sale)
+            def allocate_number():
+                return Sale.generate_sale_number(
+                    day_open=day_open,
+                    location=location,
+                    terminal=validated_data.get('terminal')
+                )
         
         # Remove discount_percentage as it's not a model field (write-only)
         discount_percentage = validated_data.pop('discount_percentage', 0)
         
-        # Create the sale
-        sale = Sale.objects.create(**validated_data)
-        
-        # Create sale items
-        total_subtotal = Decimal('0.00')
-        total_tax = Decimal('0.00')
-        
-        for item_data in items_data:
-            try:
-                product = item_data['product']
-                quantity = Decimal(str(item_data['quantity']))
-                
-                # Get unit_price
-                unit_price = item_data.get('unit_price')
-                if unit_price is None:
-                    unit_price = getattr(product, 'default_price', Decimal('0.00'))
-                else:
-                    unit_price = Decimal(str(unit_price))
-                
-                discount_amount = Decimal(str(item_data.get('discount_amount', 0)))
-                
-                # Get tax rate
-                tax_rate_val = item_data.get('tax_rate')
-                if tax_rate_val is None:
-                    tax_rate = Decimal('0.00')
-                else:
-                    tax_rate = Decimal(str(tax_rate_val))
-                
-                # Ensure all values are Decimal
-                if not isinstance(unit_price, Decimal):
-                    unit_price = Decimal(str(unit_price))
-                if not isinstance(discount_amount, Decimal):
-                    discount_amount = Decimal(str(discount_amount))
-                if not isinstance(tax_rate, Decimal):
-                    tax_rate = Decimal(str(tax_rate))
-                
-                # Calculate amounts
-                subtotal = quantity * unit_price
-                taxable_amount = subtotal - discount_amount
-                tax_amount = (taxable_amount * tax_rate) / Decimal('100')
-                line_total = taxable_amount + tax_amount
-                
-                # Create item (SaleItem model has: quantity, unit_price, discount_amount, tax_amount, line_total)
-                SaleItem.objects.create(
-                    sale=sale,
-                    product=product,
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    discount_amount=discount_amount,
-                    tax_amount=tax_amount,
-                    line_total=line_total
-                )
-                
-                total_subtotal += subtotal
-                total_tax += tax_amount
-            except Exception as e:
-                # Rollback transaction on error
-                raise serializers.ValidationError({
-                    'items': f'Error creating sale item: {str(e)}'
-                })
-        
-        # Update sale totals
-        sale.subtotal = total_subtotal
-        sale.tax_amount = total_tax
-        
-        # Apply bill-level discount from discount_percentage if provided
-        if discount_percentage and discount_percentage > 0:
-            sale.discount_amount = (sale.subtotal * Decimal(str(discount_percentage))) / Decimal('100')
-        else:
-            sale.discount_amount = Decimal('0.00')
+        # Compute every line and the header totals in memory so the sale
+        # header is written once and items/payments go in one bulk INSERT each
+        try:
+            items, total_subtotal, total_tax = checkout.build_sale_items(items_data)
+        except Exception as e:
+            raise serializers.ValidationError({
+                'items': f'Error creating sale item: {str(e)}'
+            })
         
-        # Calculate final total
-        sale.total_amount = (
-            sale.subtotal +
-            sale.tax_amount -
-            sale.discount_amount
-        )
+        try:
+            payments = checkout.build_payments(payments_data)
+        except Exception as e:
+            raise serializers.ValidationError({
+                'payments': f'Error creating payment: {str(e)}'
+            })
         
-        # Mark as completed if status is completed
-        if sale.status == 'completed':
-            from django.utils import timezone
-            sale.completed_at = timezone.now()
+        checkout.apply_totals(validated_data, total_subtotal, total_tax, discount_percentage)
         
-        sale.save()
+        # Credit tender is checked against the customer's rollup at the till
+        if validated_data.get('status') in customer_rollup.PURCHASE_STATUSES:
+            customer_rollup.check_credit(validated_data.get('customer'), payments)
         
-        # Create payments if provided
-        for payment_data in payments_data:
-            try:
-                # Create a copy to avoid modifying the original dict
-                payment_dict = payment_data.copy()
-                # Remove change_amount as it's not a model field (write-only)
-                payment_dict.pop('change_amount', None)
-                # Remove sale from payment_dict if present (will be set automatically)
-                payment_dict.pop('sale', None)
-                # Ensure amount is Decimal
-                if 'amount' in payment_dict:
-                    payment_dict['amount'] = Decimal(str(payment_dict['amount']))
-                Payment.objects.create(sale=sale, **payment_dict)
-            except Exception as e:
-                # Rollback transaction on error
-                raise serializers.ValidationError({
-                    'payments': f'Error creating payment: {str(e)}'
-                })
+        try:
+            sale = checkout.save_sale(validated_data, items, payments, allocate_number=allocate_number)
+        except Exception as e:
+            # Rollback transaction on error
+            raise serializers.ValidationError({
+                'items': f'Error creating sale: {str(e)}'
+            })
         
         return sale
 
@@ -504,9 +532,13 @@ class POSSessionSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """Create session using Day Open sequence."""
-        # Generate session number from Day Open sequence
+        # Generate session number from the location's business-date sequence
         if hasattr(self, '_day_open'):
-            validated_data['session_number'] = self.Meta.model.generate_session_number(day_open=self._day_open)
+            validated_data['session_number'] = self.Meta.model.generate_session_number(
+                day_open=self._day_open,
+                location=validated_data.get('location'),
+                terminal=validated_data.get('terminal')
+            )
         
         return super().create(validated_data)
 
@@ -528,6 +560,15 @@ class DayOpenSerializer(serializers.ModelSerializer):
             'notes'
         ]
         read_only_fields = ['id', 'opened_at', 'opened_by', 'location']
+    
+    def to_representation(self, instance):
+        """Show the live next numbers from the document sequence counter."""
+        data = super().to_representation(instance)
+        if instance.is_active and instance.location_id:
+            next_numbers = numbering.peek_next_numbers(instance.location, instance.business_date)
+            data['next_sale_number'] = next_numbers['sale']
+            data['next_session_number'] = next_numbers['session']
+        return data
 
 
 class DayCloseSerializer(serializers.ModelSerializer):
@@ -547,11 +588,13 @@ class DayCloseSerializer(serializers.ModelSerializer):
             'status', 'status_display',
             'checklist_items', 'total_transactions', 'total_sales_amount',
             'total_sessions', 'total_items_sold',
+            'tender_breakdown', 'terminal_breakdown', 'cashier_breakdown', 'hourly_breakdown',
             'next_sale_number', 'next_session_number',
             'notes', 'errors', 'warnings'
         ]
         read_only_fields = [
             'id', 'initiated_at', 'initiated_by', 'location',
             'total_transactions', 'total_sales_amount', 'total_sessions', 'total_items_sold',
+            'tender_breakdown', 'terminal_breakdown', 'cashier_breakdown', 'hourly_breakdown',
             'next_sale_number', 'next_session_number', 'errors', 'warnings'
         ]
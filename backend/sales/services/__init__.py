@@ -0,0 +1 @@
+# Sales services
@@ -0,0 +1,142 @@
+"""
+Batched checkout path for sale creation.
+
+All line and header totals are computed in memory first, so a checkout costs
+one INSERT for the sale header and one bulk INSERT each for items and
+payments, regardless of basket size.
+
+The sale number is allocated last, just before commit: allocating it locks
+the location's DocumentSequence row until commit, and taking that lock last
+keeps tills at one location from queueing behind each other's checkout.
+"""
+import uuid
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Sale, SaleItem, Payment
+from . import customer_rollup, session_ledger, stock_posting
+
+
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+
+
+def to_decimal(value, default=ZERO):
+    """Coerce serializer input (Decimal, float, str or None) to Decimal."""
+    if value is None:
+        return default
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def build_sale_items(items_data):
+    """
+    Build unsaved SaleItem rows from validated item dicts.
+
+    Returns (items, subtotal, tax_total). The sale FK is left unset so the
+    caller can attach the header once it exists.
+    """
+    items = []
+    total_subtotal = ZERO
+    total_tax = ZERO
+
+    for item_data in items_data:
+        product = item_data['product']
+        quantity = to_decimal(item_data['quantity'])
+
+        unit_price = item_data.get('unit_price')
+        if unit_price is None:
+            unit_price = getattr(product, 'default_price', ZERO)
+        unit_price = to_decimal(unit_price)
+
+        discount_amount = to_decimal(item_data.get('discount_amount'))
+        tax_rate = to_decimal(item_data.get('tax_rate'))
+
+        # Tax is charged on the amount after line discount
+        subtotal = quantity * unit_price
+        taxable_amount = subtotal - discount_amount
+        tax_amount = (taxable_amount * tax_rate) / HUNDRED
+        line_total = taxable_amount + tax_amount
+
+        items.append(SaleItem(
+            product=product,
+            quantity=quantity,
+            unit_price=unit_price,
+            discount_amount=discount_amount,
+            tax_amount=tax_amount,
+            line_total=line_total
+        ))
+
+        total_subtotal += subtotal
+        total_tax += tax_amount
+
+    return items, total_subtotal, total_tax
+
+
+def build_payments(payments_data):
+    """Build unsaved Payment rows from validated payment dicts."""
+    payments = []
+    for payment_data in payments_data:
+        payment_dict = dict(payment_data)
+        # change_amount is write-only and sale is attached by the caller
+        payment_dict.pop('change_amount', None)
+        payment_dict.pop('sale', None)
+        if 'amount' in payment_dict:
+            payment_dict['amount'] = to_decimal(payment_dict['amount'])
+        payments.append(Payment(**payment_dict))
+    return payments
+
+
+def apply_totals(sale_data, subtotal, tax_amount, discount_percentage=None):
+    """Fill header totals (and completed_at) on the sale kwargs in place."""
+    discount_percentage = to_decimal(discount_percentage)
+    if discount_percentage > 0:
+        discount_amount = (subtotal * discount_percentage) / HUNDRED
+    else:
+        discount_amount = ZERO
+
+    sale_data['subtotal'] = subtotal
+    sale_data['tax_amount'] = tax_amount
+    sale_data['discount_amount'] = discount_amount
+    sale_data['total_amount'] = subtotal + tax_amount - discount_amount
+
+    if sale_data.get('status') == 'completed' and not sale_data.get('completed_at'):
+        sale_data['completed_at'] = timezone.now()
+    return sale_data
+
+
+def save_sale(sale_data, items, payments, allocate_number=None):
+    """
+    Persist a sale header with its prepared items and payments.
+
+    Must be called inside a transaction; children are written with one bulk
+    INSERT per table. Completed sales are posted to stock in the same
+    transaction (see stock_posting). ``allocate_number``, when given,
+    returns the sale number; it is called after every other write and the
+    number replaces a placeholder on the header and its stock movements.
+    """
+    if allocate_number is not None:
+        # Unique placeholder; never visible outside this transaction
+        sale_data['sale_number'] = f'PENDING-{uuid.uuid4().hex}'
+    sale = Sale.objects.create(**sale_data)
+
+    for item in items:
+        item.sale = sale
+    for payment in payments:
+        payment.sale = sale
+
+    SaleItem.objects.bulk_create(items)
+    if payments:
+        Payment.objects.bulk_create(payments)
+
+    session_ledger.record_checkout(sale, payments)
+    customer_rollup.record_checkout(sale, payments)
+    movements = stock_posting.on_sale_completed(sale, items=items)
+
+    if allocate_number is not None:
+        sale.sale_number = allocate_number()
+        Sale.objects.filter(pk=sale.pk).update(sale_number=sale.sale_number)
+        stock_posting.relabel_movements(sale, movements)
+    return sale
@@ -0,0 +1,95 @@
+"""
+Set-based day consolidation for Day Close.
+
+Every metric is one aggregate query (grouped where a breakdown is needed)
+over the location's completed sales for the business date; no sale rows are
+loaded into Python. Sales belong to the business date they were numbered
+under (the Day Open's), not to the calendar day of ``sale_date``.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractHour
+
+from ..models import Sale, SaleItem
+from . import numbering
+from .tenders import business_day_range, tender_totals
+
+
+ZERO = Decimal('0.00')
+
+# Sale numbers that carry a business date (``numbering.format_number``)
+DATED_NUMBER_REGEX = r'^[A-Z]+-[0-9]{8}-'
+
+
+def completed_sales(location, business_date):
+    """
+    Completed sales of a location for one business date.
+
+    A sale's number carries the business date of the Day Open it was made
+    under, which differs from the calendar day of ``sale_date`` when a day
+    stays open past midnight or offline sales sync later. Sales without such
+    a number (from before date-stamped numbering) fall back to the calendar
+    day. No sale is made before its business date starts, which keeps the
+    ``sale_date`` index usable.
+    """
+    start, end = business_day_range(business_date)
+    prefix = numbering.number_prefix('sale', business_date, location.code)
+    return Sale.objects.filter(
+        location=location,
+        sale_date__gte=start,
+        status='completed'
+    ).filter(
+        Q(sale_number__startswith=prefix)
+        | (Q(sale_date__lt=end) & ~Q(sale_number__regex=DATED_NUMBER_REGEX))
+    )
+
+
+def _grouped(queryset, key, label=None):
+    """Run one GROUP BY over ``key`` returning sale count and amount per group."""
+    fields = [key] + ([label] if label else [])
+    rows = queryset.order_by().values(*fields).annotate(
+        count=Count('id'),
+        amount=Sum('total_amount')
+    ).order_by(key)
+    return [
+        {
+            'id': str(row[key]) if row[key] is not None else None,
+            'label': row[label] if label else None,
+            'count': row['count'],
+            'amount': row['amount'] or ZERO,
+        }
+        for row in rows
+    ]
+
+
+def consolidate_day(location, business_date):
+    """
+    Consolidate a business day: totals plus per-tender, per-terminal,
+    per-cashier and per-hour breakdowns.
+    """
+    sales = completed_sales(location, business_date)
+
+    totals = sales.aggregate(count=Count('id'), amount=Sum('total_amount'))
+    total_items = SaleItem.objects.filter(sale__in=sales).count()
+
+    tender_breakdown = tender_totals(location=location, sales=sales)
+
+    hourly_rows = sales.order_by().annotate(hour=ExtractHour('sale_date')).values('hour').annotate(
+        count=Count('id'),
+        amount=Sum('total_amount')
+    ).order_by('hour')
+    hourly_breakdown = {
+        f"{row['hour']:02d}": {'count': row['count'], 'amount': row['amount'] or ZERO}
+        for row in hourly_rows
+    }
+
+    return {
+        'total_transactions': totals['count'] or 0,
+        'total_sales_amount': totals['amount'] or ZERO,
+        'total_items_sold': total_items,
+        'tender_breakdown': tender_breakdown,
+        'terminal_breakdown': _grouped(sales, 'terminal_id', 'terminal__terminal_code'),
+        'cashier_breakdown': _grouped(sales, 'cashier_id', 'cashier__username'),
+        'hourly_breakdown': hourly_breakdown,
+    }
@@ -0,0 +1,366 @@
+"""
+Incrementally maintained per-customer purchase rollup.
+
+Every write path that changes a customer's sales, credit payments or credit
+settlements calls into this module inside its own transaction, next to the
+session ledger update. The rollup row is locked with SELECT ... FOR UPDATE,
+adjusted by the delta and saved, so customer status, purchase history and
+the credit check at the till read one row. ``backfill_customer_rollups`` builds rollups for
+existing history and verifies them against the raw rows.
+
+What counts:
+
+* completed and partially refunded sales are purchases (count, lifetime
+  spend, first/last purchase time). The refunded part of a partial refund
+  is not recorded on the sale, so its full total stays in the spend;
+* fully refunded sales count as refunds;
+* completed ``credit`` payments on purchases are outstanding credit, less
+  the customer's credit settlements (repayments).
+
+A customer that has no rollup yet gets it built from raw rows on first use.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from ..models import Sale, Payment, CustomerPurchaseRollup, CreditSettlement
+
+
+ZERO = Decimal('0.00')
+
+PURCHASE_STATUSES = ('completed', 'partial_refund')
+REFUND_STATUSES = ('refunded',)
+CREDIT_METHOD = 'credit'
+
+ROLLUP_FIELDS = [
+    'purchase_count', 'lifetime_spend', 'refund_count', 'refunded_amount',
+    'credit_outstanding', 'first_purchase_at', 'last_purchase_at',
+]
+
+
+def _empty():
+    return {
+        'purchase_count': 0,
+        'lifetime_spend': ZERO,
+        'refund_count': 0,
+        'refunded_amount': ZERO,
+        'credit_outstanding': ZERO,
+        'first_purchase_at': None,
+        'last_purchase_at': None,
+    }
+
+
+def _purchase_dates(customer_ids):
+    """{customer_id: (first, last)} purchase times from raw sales."""
+    purchased_at = Coalesce('completed_at', 'sale_date')
+    return {
+        row['customer_id']: (row['first'], row['last'])
+        for row in Sale.objects.filter(
+            customer_id__in=customer_ids,
+            status__in=PURCHASE_STATUSES
+        ).order_by().values('customer_id').annotate(
+            first=Min(purchased_at),
+            last=Max(purchased_at)
+        )
+    }
+
+
+def raw_totals(customer_ids):
+    """
+    Compute rollup values from the raw sale and payment rows.
+
+    Three grouped queries regardless of how many customers are requested.
+    Returns {customer_id: {field: value}}.
+    """
+    customer_ids = list(customer_ids)
+    totals = {customer_id: _empty() for customer_id in customer_ids}
+
+    purchases = Q(status__in=PURCHASE_STATUSES)
+    refunds = Q(status__in=REFUND_STATUSES)
+    purchased_at = Coalesce('completed_at', 'sale_date')
+    sale_rows = Sale.objects.filter(
+        customer_id__in=customer_ids,
+        status__in=PURCHASE_STATUSES + REFUND_STATUSES
+    ).order_by().values('customer_id').annotate(
+        purchase_count=Count('id', filter=purchases),
+        lifetime_spend=Sum('total_amount', filter=purchases),
+        refund_count=Count('id', filter=refunds),
+        refunded_amount=Sum('total_amount', filter=refunds),
+        first_purchase_at=Min(purchased_at, filter=purchases),
+        last_purchase_at=Max(purchased_at, filter=purchases)
+    )
+    for row in sale_rows:
+        entry = totals[row['customer_id']]
+        for field in ROLLUP_FIELDS:
+            if field in row:
+                entry[field] = row[field]
+        entry['lifetime_spend'] = entry['lifetime_spend'] or ZERO
+        entry['refunded_amount'] = entry['refunded_amount'] or ZERO
+
+    credit_rows = Payment.objects.filter(
+        sale__customer_id__in=customer_ids,
+        sale__status__in=PURCHASE_STATUSES,
+        payment_method=CREDIT_METHOD,
+        status='completed'
+    ).order_by().values('sale__customer_id').annotate(amount=Sum('amount'))
+    for row in credit_rows:
+        totals[row['sale__customer_id']]['credit_outstanding'] = row['amount'] or ZERO
+
+    settled_rows = CreditSettlement.objects.filter(
+        customer_id__in=customer_ids
+    ).order_by().values('customer_id').annotate(amount=Sum('amount'))
+    for row in settled_rows:
+        totals[row['customer_id']]['credit_outstanding'] -= row['amount'] or ZERO
+    return totals
+
+
+def sync_last_purchase(rollups):
+    """Mirror last_purchase_at onto Customer.last_purchase_date (filtered on by the customer API)."""
+    from customers.models import Customer
+
+    wanted = {rollup.customer_id: rollup.last_purchase_at for rollup in rollups}
+    stale = [
+        Customer(pk=pk, last_purchase_date=wanted[pk])
+        for pk, current in Customer.objects.filter(pk__in=list(wanted)).values_list('pk', 'last_purchase_date')
+        if current != wanted[pk]
+    ]
+    if stale:
+        Customer.objects.bulk_update(stale, ['last_purchase_date'])
+
+
+def _locked_rollup(customer_id):
+    """
+    Return (rollup, rebuilt) with the rollup row locked for update.
+
+    ``rebuilt`` is True when the rollup was just created from raw rows, which
+    already include the caller's uncommitted changes, so no delta applies.
+    """
+    rollup = CustomerPurchaseRollup.objects.select_for_update().filter(customer_id=customer_id).first()
+    if rollup:
+        return rollup, False
+    try:
+        with transaction.atomic():
+            values = raw_totals([customer_id])[customer_id]
+            return CustomerPurchaseRollup.objects.create(customer_id=customer_id, **values), True
+    except IntegrityError:
+        # Another transaction created it first; its totals exclude our changes
+        return CustomerPurchaseRollup.objects.select_for_update().get(customer_id=customer_id), False
+
+
+def lock(*customer_ids):
+    """
+    Lock the customers' rollups, building any that are missing, ahead of a
+    write: a rollup built after the write would already include it, and
+    the credit check and ``record`` would then count it twice. Locks in
+    id order so concurrent writers cannot deadlock.
+    """
+    for customer_id in sorted({customer_id for customer_id in customer_ids if customer_id}, key=str):
+        _locked_rollup(customer_id)
+
+
+def purchased_at(sale):
+    return sale.completed_at or sale.sale_date
+
+
+def _apply_sale(rollup, sale, sign):
+    """Apply one sale; returns True if the first/last purchase times need recomputing."""
+    if sale.status in REFUND_STATUSES:
+        rollup.refund_count += sign
+        rollup.refunded_amount += sign * (sale.total_amount or ZERO)
+        return False
+    if sale.status not in PURCHASE_STATUSES:
+        return False
+    rollup.purchase_count += sign
+    rollup.lifetime_spend += sign * (sale.total_amount or ZERO)
+
+    when = purchased_at(sale)
+    if sign < 0:
+        # Removing the first or last purchase: the next one is only in the raw rows
+        return when is None or when in (rollup.first_purchase_at, rollup.last_purchase_at)
+    if when is not None:
+        if rollup.first_purchase_at is None or when < rollup.first_purchase_at:
+            rollup.first_purchase_at = when
+        if rollup.last_purchase_at is None or when > rollup.last_purchase_at:
+            rollup.last_purchase_at = when
+    return False
+
+
+def _is_credit(payment):
+    return payment.status == 'completed' and payment.payment_method == CREDIT_METHOD
+
+
+def _apply_payments(rollup, payments, sign):
+    for payment in payments:
+        if _is_credit(payment):
+            rollup.credit_outstanding += sign * payment.amount
+
+
+def record(customer_id, sales_removed=(), sales_added=(), payments_removed=(), payments_added=()):
+    """
+    Apply sale and payment deltas to one customer's rollup under a row lock.
+
+    Removed rows are the pre-write state (subtracted), added rows the
+    post-write state (added). Payments must belong to sales that count as
+    purchases in the same state; only completed credit payments count.
+    Must run in the same transaction as the write it records.
+    """
+    if not customer_id:
+        return
+    with transaction.atomic():
+        rollup, rebuilt = _locked_rollup(customer_id)
+        if rebuilt:
+            sync_last_purchase([rollup])
+            return
+        last_purchase_at = rollup.last_purchase_at
+        stale_dates = False
+        for sale in sales_removed:
+            stale_dates |= _apply_sale(rollup, sale, -1)
+        for sale in sales_added:
+            _apply_sale(rollup, sale, 1)
+        if stale_dates:
+            rollup.first_purchase_at, rollup.last_purchase_at = _purchase_dates([customer_id]).get(
+                customer_id, (None, None)
+            )
+        _apply_payments(rollup, payments_removed, -1)
+        _apply_payments(rollup, payments_added, 1)
+        rollup.save()
+        if rollup.last_purchase_at != last_purchase_at:
+            sync_last_purchase([rollup])
+
+
+def _counts(sale):
+    """Whether ``sale`` is a customer purchase (its credit payments count)."""
+    return sale is not None and bool(sale.customer_id) and sale.status in PURCHASE_STATUSES
+
+
+def _tracked(sale):
+    return sale is not None and bool(sale.customer_id) and sale.status in PURCHASE_STATUSES + REFUND_STATUSES
+
+
+def record_checkout(sale, payments):
+    """Apply a newly created sale and its payments to the customer's rollup."""
+    if _tracked(sale):
+        record(sale.customer_id, sales_added=[sale], payments_added=payments if _counts(sale) else ())
+
+
+def record_sale_change(before, after, payments=None):
+    """
+    Apply a sale update or deletion to the rollup(s) involved.
+
+    ``before`` is a copy of the sale taken before the write and ``after``
+    the saved sale, or None when it was deleted. ``payments`` are the sale's
+    payments; when omitted, its credit payments are loaded only if they
+    start or stop counting.
+    """
+    if not (_tracked(before) or _tracked(after)):
+        return
+    old_customer = before.customer_id if _tracked(before) else None
+    new_customer = after.customer_id if _tracked(after) else None
+
+    credit_moves = _counts(before) != _counts(after) or (_counts(before) and old_customer != new_customer)
+    if payments is None:
+        sale = after if after is not None else before
+        payments = list(sale.payments.filter(status='completed', payment_method=CREDIT_METHOD)) if credit_moves else []
+    old_payments = payments if _counts(before) else ()
+    new_payments = payments if _counts(after) else ()
+
+    if old_customer == new_customer:
+        record(
+            old_customer,
+            sales_removed=[before] if before is not None else [],
+            sales_added=[after] if after is not None else [],
+            payments_removed=old_payments,
+            payments_added=new_payments
+        )
+        return
+    record(old_customer, sales_removed=[before], payments_removed=old_payments)
+    record(new_customer, sales_added=[after], payments_added=new_payments)
+
+
+def _credit_customer(payment):
+    if payment is None or not payment.sale_id or not _counts(payment.sale):
+        return None
+    return payment.sale.customer_id
+
+
+def record_payment_change(before, after):
+    """
+    Apply a payment create (``before`` None), update or delete (``after``
+    None). Only credit payments on purchases touch the rollup.
+    """
+    if not any(payment is not None and _is_credit(payment) for payment in (before, after)):
+        return
+    old_customer = _credit_customer(before)
+    new_customer = _credit_customer(after)
+    if old_customer == new_customer:
+        record(
+            old_customer,
+            payments_removed=[before] if old_customer else (),
+            payments_added=[after] if old_customer else ()
+        )
+        return
+    record(old_customer, payments_removed=[before])
+    record(new_customer, payments_added=[after])
+
+
+def _credit_amount(payments):
+    return sum((payment.amount for payment in payments if _is_credit(payment)), ZERO)
+
+
+def check_credit(customer, payments, released=()):
+    """
+    Refuse a checkout whose credit-tender payments exceed the customer's
+    available credit. ``released`` are credit payments the write replaces
+    (an edited payment's previous state), so only the increase is checked.
+    Reads the customer's rollup under its row lock, so two tills cannot
+    both spend the same headroom; call it inside the checkout transaction,
+    after ``lock`` when the write is already saved.
+    """
+    amount = _credit_amount(payments) - _credit_amount(released)
+    if amount <= ZERO:
+        return
+    if customer is None:
+        raise serializers.ValidationError({'payments': 'Credit payments require a customer'})
+    if not customer.allow_credit:
+        raise serializers.ValidationError({'payments': f'Credit is not allowed for customer {customer.customer_code}'})
+    with transaction.atomic():
+        rollup, _ = _locked_rollup(customer.pk)
+    available = max(customer.credit_limit - rollup.credit_outstanding, ZERO)
+    if amount > available:
+        raise serializers.ValidationError({
+            'payments': f'Credit limit exceeded: {amount} requested, {available} available'
+        })
+
+
+def check_payment_change(before, after):
+    """
+    Check a created (``before`` None) or edited payment against the credit
+    limit of its sale's customer, before the change is recorded.
+    """
+    if after is None or not after.sale_id or after.sale.status not in PURCHASE_STATUSES:
+        return
+    customer = after.sale.customer
+    same_customer = before is not None and customer is not None and _credit_customer(before) == customer.pk
+    check_credit(customer, [after], released=[before] if same_customer else ())
+
+
+def record_settlement(settlement):
+    """
+    Apply a credit settlement to the customer's rollup. Refuses one larger
+    than the customer's outstanding credit; call it in the settlement's
+    transaction.
+    """
+    with transaction.atomic():
+        rollup, rebuilt = _locked_rollup(settlement.customer_id)
+        # A rebuilt rollup already subtracts the new settlement
+        outstanding = rollup.credit_outstanding + (settlement.amount if rebuilt else ZERO)
+        if settlement.amount > outstanding:
+            raise serializers.ValidationError({
+                'amount': f'Settlement exceeds outstanding credit: {settlement.amount} paid, {outstanding} outstanding'
+            })
+        if not rebuilt:
+            rollup.credit_outstanding -= settlement.amount
+            rollup.save(update_fields=['credit_outstanding', 'updated_at'])
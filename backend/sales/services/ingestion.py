@@ -0,0 +1,387 @@
+"""
+Idempotent batch ingestion of sales buffered by offline tills.
+
+Every sale in a batch carries a client-generated ``idempotency_key``. Keys
+already stored on a Sale are answered from that row without re-validating or
+re-inserting anything, so a till can resend a whole batch after a dropped
+connection.
+
+New sales are validated with SaleCreateSerializer against batch-wide caches
+(variants and related rows are fetched once per batch, not once per sale),
+then inserted in chunks: one transaction per chunk, sale numbers reserved as
+one block per location, and one bulk INSERT each for headers, items,
+payments and stock movements. If a chunk fails (e.g. a concurrent upload of
+the same keys), it is retried one sale at a time so only the offending sales
+are reported.
+
+A sale's ``client_sold_at`` (when the till rang it up) becomes its
+sale_date and selects its business date, so a sale made offline yesterday
+lands in yesterday's Day Close and tender totals.
+
+A till that issued the sale a number from a block reserved on the Day Open
+(``sale_number``, or a ``client_sale_number`` in the sale number format)
+keeps that number as the sale_number once it is checked against the block;
+the block's business date then applies. Other sales get a server number.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+
+from products.models import ItemVariant
+
+from ..models import DayOpen, Sale, SaleItem, Payment
+from . import checkout, customer_rollup, numbering, session_ledger, stock_posting
+
+
+OFFLINE_FIELDS = ('idempotency_key', 'client_sale_number', 'client_sold_at')
+
+
+def _result(index, entry, status, sale=None, errors=None):
+    result = {
+        'index': index,
+        'idempotency_key': entry.get('idempotency_key') if isinstance(entry, dict) else None,
+        'client_sale_number': entry.get('client_sale_number', '') if isinstance(entry, dict) else '',
+        'status': status,
+    }
+    if sale is not None:
+        result['sale_id'] = str(sale[0])
+        result['sale_number'] = sale[1]
+    if errors is not None:
+        result['errors'] = errors
+    return result
+
+
+def _existing(keys):
+    """{idempotency_key: (sale_id, sale_number)} for keys already ingested."""
+    return {
+        key: (sale_id, sale_number)
+        for key, sale_id, sale_number in Sale.objects.filter(
+            idempotency_key__in=list(keys)
+        ).values_list('idempotency_key', 'id', 'sale_number')
+    }
+
+
+def _offline_fields(entry):
+    """Validate and strip the offline-only keys from a sale payload."""
+    payload = dict(entry)
+    fields = {name: payload.pop(name, None) for name in OFFLINE_FIELDS}
+    key = fields['idempotency_key']
+    if not isinstance(key, str) or not key.strip() or len(key) > 64:
+        raise drf_serializers.ValidationError({'idempotency_key': 'A key of 1-64 characters is required'})
+    fields['idempotency_key'] = key.strip()
+    fields['client_sale_number'] = str(fields['client_sale_number'] or '')[:50]
+    if fields['client_sold_at']:
+        fields['client_sold_at'] = _client_sold_at(fields['client_sold_at'])
+    return payload, fields
+
+
+def _client_sold_at(value):
+    """
+    Parse the till's sale timestamp. Future times (till clock ahead) are
+    clamped to now; times older than ``settings.SALE_OFFLINE_MAX_AGE_DAYS``
+    are rejected rather than booked into a long-closed day.
+    """
+    sold_at = drf_serializers.DateTimeField().to_internal_value(value)
+    now = timezone.now()
+    if sold_at > now:
+        return now
+    max_age_days = getattr(settings, 'SALE_OFFLINE_MAX_AGE_DAYS', 7)
+    if max_age_days and sold_at < now - timedelta(days=max_age_days):
+        raise drf_serializers.ValidationError({
+            'client_sold_at': f'Sales older than {max_age_days} days cannot be uploaded'
+        })
+    return sold_at
+
+
+def _prepare(serializer, offline):
+    """Turn validated sale data into unsaved header, item and payment rows."""
+    data = dict(serializer.validated_data)
+    items_data = data.pop('items')
+    payments_data = data.pop('payments', [])
+    discount_percentage = data.pop('discount_percentage', 0)
+
+    data['location'] = serializer.resolve_location(data)
+    items, subtotal, tax = checkout.build_sale_items(items_data)
+    payments = checkout.build_payments(payments_data)
+    if offline.get('client_sold_at') and data.get('status') == 'completed':
+        # Completed when the till rang it up, not when it was uploaded
+        data['completed_at'] = offline['client_sold_at']
+    checkout.apply_totals(data, subtotal, tax, discount_percentage)
+    data.update(offline)
+
+    # A number the till issued from a reserved block is kept; others are its own
+    sale_number = data.pop('sale_number', None)
+    if not sale_number and numbering.parse_number(data['client_sale_number']):
+        sale_number = data['client_sale_number']
+    if sale_number and not data['client_sale_number']:
+        data['client_sale_number'] = sale_number
+    return {'data': data, 'items': items, 'payments': payments, 'sale_number': sale_number}
+
+
+def _claim_numbers(prepared):
+    """
+    Check the till-issued numbers of prepared (index, entry, row) sales
+    against their reserved blocks (one query) and reject numbers already
+    stored or repeated in the batch. Sets each claimed row's
+    ``business_date``; returns the rows to insert and {index: errors}.
+    """
+    claiming = [row for row in prepared if row[2]['sale_number']]
+    if not claiming:
+        return prepared, {}
+    claims = numbering.claim_numbers('sale', [
+        (row['sale_number'], row['data']['location'], row['data'].get('terminal'))
+        for _, _, row in claiming
+    ])
+    stored = set(Sale.objects.filter(
+        sale_number__in=[row['sale_number'] for _, _, row in claiming]
+    ).values_list('sale_number', flat=True))
+
+    errors = {}
+    seen = set()
+    for (index, _, row), (business_date, error) in zip(claiming, claims):
+        if error:
+            errors[index] = {'sale_number': [error]}
+        elif row['sale_number'] in stored:
+            errors[index] = {'sale_number': ['A sale with this number already exists']}
+        elif row['sale_number'] in seen:
+            errors[index] = {'sale_number': ['Repeated within this batch']}
+        else:
+            row['business_date'] = business_date
+        seen.add(row['sale_number'])
+    return [row for row in prepared if row[0] not in errors], errors
+
+
+def _business_dates(prepared):
+    """
+    Business date per prepared sale, in order.
+
+    A sale rung up offline belongs to the location's Day Open that was open
+    at ``client_sold_at`` (else that moment's local date); any other sale to
+    the location's active Day Open (else today). Day Opens are read once.
+    """
+    today = timezone.localdate()
+    location_ids = {entry['data']['location'].pk for entry in prepared}
+    sold_dates = [
+        timezone.localdate(entry['data']['client_sold_at'])
+        for entry in prepared if entry['data'].get('client_sold_at')
+    ]
+    day_opens = DayOpen.objects.filter(location_id__in=location_ids)
+    if sold_dates:
+        # Days opened up to a day before the earliest sale can still have been open
+        day_opens = day_opens.filter(Q(is_active=True) | Q(business_date__gte=min(sold_dates) - timedelta(days=1)))
+    else:
+        day_opens = day_opens.filter(is_active=True)
+    by_location = {}
+    for row in day_opens.order_by('-opened_at').values_list(
+        'location_id', 'business_date', 'opened_at', 'closed_at', 'is_active'
+    ):
+        by_location.setdefault(row[0], []).append(row[1:])
+
+    def business_date(location_id, sold_at):
+        for day, opened_at, closed_at, is_active in by_location.get(location_id, ()):
+            if sold_at is None:
+                if is_active:
+                    return day
+            elif opened_at <= sold_at and (closed_at is None or sold_at < closed_at):
+                return day
+        return timezone.localdate(sold_at) if sold_at else today
+
+    return [
+        business_date(entry['data']['location'].pk, entry['data'].get('client_sold_at'))
+        for entry in prepared
+    ]
+
+
+def _insert(prepared):
+    """
+    Insert prepared sales with bulk INSERTs. Must run inside a transaction.
+
+    Returns the saved Sale rows in input order.
+    """
+    locations = {entry['data']['location'].pk: entry['data']['location'] for entry in prepared}
+    business_dates = [
+        entry.get('business_date') or business_date
+        for entry, business_date in zip(prepared, _business_dates(prepared))
+    ]
+
+    # One block of sale numbers per location and business date instead of
+    # one round-trip per sale (till-issued numbers are already reserved)
+    counts = {}
+    for entry, business_date in zip(prepared, business_dates):
+        if entry['sale_number']:
+            continue
+        sequence = (entry['data']['location'].pk, business_date)
+        counts[sequence] = counts.get(sequence, 0) + 1
+    next_values = {}
+    for (location_id, business_date), count in counts.items():
+        first_value, _ = numbering.reserve(locations[location_id], business_date, 'sale', count=count)
+        next_values[location_id, business_date] = first_value
+
+    # Completed sales are marked posted up front and posted together below
+    # ('off' marks them settled without posting; 'queue' leaves them pending)
+    posting_mode = stock_posting.posting_mode()
+    posted_at = timezone.now() if posting_mode != 'queue' else None
+    sales = []
+    for entry, business_date in zip(prepared, business_dates):
+        location = entry['data']['location']
+        sale = Sale(**entry['data'])
+        if entry['sale_number']:
+            sale.sale_number = entry['sale_number']
+        else:
+            value = next_values[location.pk, business_date]
+            next_values[location.pk, business_date] += 1
+            sale.sale_number = numbering.format_number('sale', business_date, location.code, value)
+        if sale.status == 'completed':
+            sale.stock_posted_at = posted_at
+        sales.append(sale)
+    Sale.objects.bulk_create(sales)
+
+    # sale_date is auto_now_add, so the till's timestamp is written after the INSERT
+    sold_offline = [sale for sale in sales if sale.client_sold_at]
+    if sold_offline:
+        Sale.objects.filter(pk__in=[sale.pk for sale in sold_offline]).update(sale_date=F('client_sold_at'))
+        for sale in sold_offline:
+            sale.sale_date = sale.client_sold_at
+
+    all_items = []
+    all_payments = []
+    by_session = {}
+    by_customer = {}
+    for sale, entry in zip(sales, prepared):
+        for item in entry['items']:
+            item.sale = sale
+        for payment in entry['payments']:
+            payment.sale = sale
+        all_items.extend(entry['items'])
+        all_payments.extend(entry['payments'])
+        if sale.pos_session_id:
+            session = by_session.setdefault(sale.pos_session_id, ([], []))
+            session[0].append(sale)
+            session[1].extend(entry['payments'])
+        if sale.customer_id:
+            customer = by_customer.setdefault(sale.customer_id, ([], []))
+            customer[0].append(sale)
+            if sale.status in customer_rollup.PURCHASE_STATUSES:
+                customer[1].extend(entry['payments'])
+    SaleItem.objects.bulk_create(all_items)
+    if all_payments:
+        Payment.objects.bulk_create(all_payments)
+
+    # One ledger update per session touched by the chunk
+    for session_id, (session_sales, session_payments) in by_session.items():
+        session_ledger.record(session_id, sales_added=session_sales, payments_added=session_payments)
+    # ... and one rollup update per customer (offline sales already happened: no credit check)
+    for customer_id, (customer_sales, customer_payments) in by_customer.items():
+        customer_rollup.record(customer_id, sales_added=customer_sales, payments_added=customer_payments)
+    if posting_mode == 'sync':
+        stock_posting.post_new_sales([(sale, entry['items']) for sale, entry in zip(sales, prepared)])
+    return sales
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def ingest(entries, context=None, chunk_size=None):
+    """
+    Validate and insert a batch of offline sales.
+
+    ``entries`` are SaleCreateSerializer payloads plus ``idempotency_key``
+    and optional ``client_sale_number`` / ``client_sold_at``. Returns one
+    result per entry, in order, with status ``created``, ``duplicate`` or
+    ``error``.
+    """
+    from ..serializers import SaleCreateSerializer
+
+    chunk_size = chunk_size or getattr(settings, 'SALE_BATCH_CHUNK_SIZE', 50)
+    results = [None] * len(entries)
+
+    keyed = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results[index] = _result(index, entry, 'error', errors={'non_field_errors': ['Expected a sale object']})
+            continue
+        try:
+            payload, offline = _offline_fields(entry)
+        except drf_serializers.ValidationError as e:
+            results[index] = _result(index, entry, 'error', errors=e.detail)
+            continue
+        if offline['idempotency_key'] in seen:
+            results[index] = _result(
+                index, entry, 'error',
+                errors={'idempotency_key': ['Repeated within this batch']}
+            )
+            continue
+        seen.add(offline['idempotency_key'])
+        keyed.append((index, entry, payload, offline))
+
+    # Retries: answer already-ingested keys without touching them
+    existing = _existing(seen)
+    pending = []
+    for index, entry, payload, offline in keyed:
+        if offline['idempotency_key'] in existing:
+            results[index] = _result(index, entry, 'duplicate', sale=existing[offline['idempotency_key']])
+        else:
+            pending.append((index, entry, payload, offline))
+
+    # Validate against batch-wide caches so shared rows are fetched once
+    context = dict(context or {})
+    context['related_cache'] = {}
+    product_ids = set()
+    for _, _, payload, _ in pending:
+        product_ids |= SaleCreateSerializer.basket_product_ids(payload)
+    context['variant_cache'] = {
+        str(variant.pk): variant
+        for variant in ItemVariant.objects.filter(pk__in=product_ids)
+    }
+
+    prepared = []
+    for index, entry, payload, offline in pending:
+        serializer = SaleCreateSerializer(data=payload, context=context)
+        if not serializer.is_valid():
+            results[index] = _result(index, entry, 'error', errors=serializer.errors)
+            continue
+        try:
+            prepared.append((index, entry, _prepare(serializer, offline)))
+        except drf_serializers.ValidationError as e:
+            results[index] = _result(index, entry, 'error', errors=e.detail)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            results[index] = _result(index, entry, 'error', errors={'non_field_errors': [str(e)]})
+
+    prepared, claim_errors = _claim_numbers(prepared)
+    for index, errors in claim_errors.items():
+        results[index] = _result(index, entries[index], 'error', errors=errors)
+
+    for chunk in _chunks(prepared, chunk_size):
+        try:
+            with transaction.atomic():
+                sales = _insert([row[2] for row in chunk])
+        except (IntegrityError, DatabaseError):
+            # Isolate the failing sale(s): retry the chunk one sale at a time
+            for index, entry, row in chunk:
+                results[index] = _insert_one(index, entry, row)
+            continue
+        for (index, entry, _), sale in zip(chunk, sales):
+            results[index] = _result(index, entry, 'created', sale=(sale.pk, sale.sale_number))
+    return results
+
+
+def _insert_one(index, entry, row):
+    try:
+        with transaction.atomic():
+            sale = _insert([row])[0]
+    except IntegrityError as e:
+        # A concurrent upload may have stored the same key first
+        existing = _existing([row['data']['idempotency_key']])
+        if existing:
+            return _result(index, entry, 'duplicate', sale=existing[row['data']['idempotency_key']])
+        return _result(index, entry, 'error', errors={'non_field_errors': [str(e)]})
+    except DatabaseError as e:
+        return _result(index, entry, 'error', errors={'non_field_errors': [str(e)]})
+    return _result(index, entry, 'created', sale=(sale.pk, sale.sale_number))
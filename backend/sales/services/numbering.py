@@ -0,0 +1,303 @@
+"""
+Contention-free document numbering for sales and POS sessions.
+
+Each (location, business date, document type) has one DocumentSequence row.
+Numbers are reserved with a single atomic ``UPDATE ... SET last_value =
+last_value + n`` followed by a read of the new value inside the same
+transaction, so two tills can never be handed the same number and there is
+no string parsing or ``order_by('-sale_number')`` scan.
+
+Terminals may reserve blocks of N sale numbers (the Day Open
+``reserve-numbers`` endpoint) and issue them locally. Each block is recorded
+as a DocumentNumberBlock, and a sale that arrives with a number inside a
+block reserved for its terminal keeps it (``claim_numbers``), so a receipt
+printed offline matches the stored sale. Server-side blocks for terminals
+are enabled with ``settings.DOCUMENT_SEQUENCE_BLOCK_SIZE``; numbers left
+unused in a block when the process exits or the day ends are skipped, never
+reissued.
+"""
+import datetime
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import DayOpen, DocumentNumberBlock, DocumentSequence
+
+
+NUMBER_WIDTH = 4
+NUMBER_PATTERN = re.compile(r'^(?P<prefix>[A-Z]+)-(?P<date>\d{8})-(?P<location>[^-]+)-(?P<value>\d+)$')
+
+# Document types terminals may issue from reserved blocks
+BLOCK_DOCUMENT_TYPES = ('sale',)
+
+
+def format_number(document_type, business_date, location_code, value):
+    """Format a sequence value, e.g. SALE-20250101-STORE1-0042."""
+    prefix = DocumentSequence.PREFIXES[document_type]
+    return f'{prefix}-{business_date:%Y%m%d}-{location_code}-{value:0{NUMBER_WIDTH}d}'
+
+
+def number_prefix(document_type, business_date, location_code):
+    """Prefix terminals prepend to locally issued block values."""
+    return format_number(document_type, business_date, location_code, 0)[:-NUMBER_WIDTH]
+
+
+def parse_number(number):
+    """
+    (document_type, business_date, location_code, value) of a number in the
+    ``format_number`` layout, or None if it is not one.
+    """
+    match = NUMBER_PATTERN.match(number or '')
+    if not match:
+        return None
+    document_type = next(
+        (name for name, prefix in DocumentSequence.PREFIXES.items() if prefix == match['prefix']), None
+    )
+    try:
+        business_date = datetime.datetime.strptime(match['date'], '%Y%m%d').date()
+    except ValueError:
+        return None
+    value = int(match['value'])
+    if document_type is None or format_number(document_type, business_date, match['location'], value) != number:
+        return None
+    return document_type, business_date, match['location'], value
+
+
+def business_date_for(location, day_open=None):
+    """
+    Business date a document is numbered under: the Day Open's, else the
+    location's active Day Open's, else today (no location or no open day).
+    """
+    if day_open is not None:
+        return day_open.business_date
+    if location is not None:
+        business_date = DayOpen.objects.filter(
+            location=location,
+            is_active=True
+        ).order_by('-business_date').values_list('business_date', flat=True).first()
+        if business_date:
+            return business_date
+    return timezone.localdate()
+
+
+def _sequence_id(location, business_date, document_type):
+    """Return the pk of the sequence row, creating it on first use."""
+    lookup = {
+        'location': location,
+        'business_date': business_date,
+        'document_type': document_type,
+    }
+    sequence_id = DocumentSequence.objects.filter(**lookup).values_list('id', flat=True).first()
+    if sequence_id:
+        return sequence_id
+    try:
+        # Savepoint so a lost creation race does not break the outer transaction
+        with transaction.atomic():
+            return DocumentSequence.objects.create(company_id=location.company_id, **lookup).id
+    except IntegrityError:
+        return DocumentSequence.objects.filter(**lookup).values_list('id', flat=True).get()
+
+
+def reserve(location, business_date, document_type, count=1):
+    """
+    Atomically reserve ``count`` consecutive values.
+
+    Returns (first_value, last_value). The row lock taken by the UPDATE is
+    held until the surrounding transaction commits, so a rolled-back sale
+    also rolls back its number and leaves no gap.
+    """
+    if count < 1:
+        raise ValueError('count must be at least 1')
+    sequence_id = _sequence_id(location, business_date, document_type)
+    with transaction.atomic():
+        DocumentSequence.objects.filter(id=sequence_id).update(
+            last_value=F('last_value') + count,
+            updated_at=timezone.now()
+        )
+        last_value = DocumentSequence.objects.filter(id=sequence_id).values_list('last_value', flat=True).get()
+    return last_value - count + 1, last_value
+
+
+def reserve_block(day_open, document_type, size, terminal=None, reserved_by=None):
+    """
+    Reserve a block of numbers for a terminal to issue without the server,
+    and record it so sales carrying those numbers are accepted.
+    """
+    location, business_date = day_open.location, day_open.business_date
+    with transaction.atomic():
+        first_value, last_value = reserve(location, business_date, document_type, count=size)
+        block = DocumentNumberBlock.objects.create(
+            day_open=day_open,
+            terminal=terminal,
+            document_type=document_type,
+            first_value=first_value,
+            last_value=last_value,
+            reserved_by=reserved_by
+        )
+    return {
+        'id': block.id,
+        'terminal': block.terminal_id,
+        'document_type': document_type,
+        'business_date': business_date,
+        'prefix': number_prefix(document_type, business_date, location.code),
+        'width': NUMBER_WIDTH,
+        'first_value': first_value,
+        'last_value': last_value,
+        'first_number': format_number(document_type, business_date, location.code, first_value),
+        'last_number': format_number(document_type, business_date, location.code, last_value),
+    }
+
+
+def claim_numbers(document_type, claims):
+    """
+    Check terminal-issued numbers against the blocks reserved for them.
+
+    ``claims`` are (number, location, terminal) tuples. A number must be
+    formatted for its location and fall inside a block of the location's
+    Day Open for the number's business date, reserved for that terminal or
+    for any terminal. One query for all claims. Returns a (business_date,
+    error) pair per claim, exactly one of them None. Uniqueness against
+    stored documents is the caller's check.
+    """
+    parsed = []
+    sequences = set()
+    for number, location, terminal in claims:
+        fields = parse_number(number)
+        if fields is None or fields[0] != document_type or fields[2] != location.code:
+            fields = None
+        else:
+            sequences.add((location.pk, fields[1]))
+        parsed.append(fields)
+
+    blocks = {}
+    if sequences:
+        condition = Q()
+        for location_id, business_date in sequences:
+            condition |= Q(day_open__location_id=location_id, day_open__business_date=business_date)
+        for location_id, business_date, first_value, last_value, terminal_id in DocumentNumberBlock.objects.filter(
+            condition,
+            document_type=document_type
+        ).values_list('day_open__location_id', 'day_open__business_date', 'first_value', 'last_value', 'terminal_id'):
+            blocks.setdefault((location_id, business_date), []).append((first_value, last_value, terminal_id))
+
+    results = []
+    for (number, location, terminal), fields in zip(claims, parsed):
+        if fields is None:
+            results.append((None, f'{number} is not a {document_type} number for location {location.code}'))
+            continue
+        _, business_date, _, value = fields
+        terminal_id = getattr(terminal, 'pk', terminal)
+        if any(
+            first_value <= value <= last_value and block_terminal in (None, terminal_id)
+            for first_value, last_value, block_terminal in blocks.get((location.pk, business_date), ())
+        ):
+            results.append((business_date, None))
+        else:
+            results.append((None, f'{number} is not in a number block reserved for this terminal'))
+    return results
+
+
+def claim_number(number, location, document_type, terminal=None):
+    """Business date of one terminal-issued number; ValueError if it is not in a reserved block."""
+    business_date, error = claim_numbers(document_type, [(number, location, terminal)])[0]
+    if error:
+        raise ValueError(error)
+    return business_date
+
+
+class _BlockCache:
+    """In-process per-terminal ranges of already reserved values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def take(self, key):
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block:
+                return None
+            value = block[0]
+            if value >= block[1]:
+                del self._blocks[key]
+            else:
+                block[0] = value + 1
+            return value
+
+    def put(self, key, first_value, last_value):
+        if first_value > last_value:
+            return
+        with self._lock:
+            self._blocks[key] = [first_value, last_value]
+
+    def remaining(self, key_filter=None):
+        """Count reserved-but-unissued values, optionally for matching keys."""
+        with self._lock:
+            return sum(
+                block[1] - block[0] + 1
+                for key, block in self._blocks.items()
+                if key_filter is None or key_filter(key)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+block_cache = _BlockCache()
+
+
+def next_value(location, business_date, document_type, terminal=None, block_size=None):
+    """
+    Return the next integer value for the sequence.
+
+    With a terminal and a block size above 1, values come from the
+    terminal's local block and the database is only touched once per block.
+    A fresh block is published to the cache only after its reservation
+    commits, so a rolled-back reservation is never reused locally.
+    """
+    if block_size is None:
+        block_size = getattr(settings, 'DOCUMENT_SEQUENCE_BLOCK_SIZE', 1)
+    terminal_id = getattr(terminal, 'pk', terminal)
+    if not terminal_id or block_size <= 1:
+        return reserve(location, business_date, document_type)[0]
+
+    key = (location.pk, business_date, document_type, str(terminal_id))
+    value = block_cache.take(key)
+    if value is not None:
+        return value
+
+    first_value, last_value = reserve(location, business_date, document_type, count=block_size)
+    transaction.on_commit(lambda: block_cache.put(key, first_value + 1, last_value))
+    return first_value
+
+
+def next_number(location, business_date, document_type, terminal=None):
+    """Allocate and format the next document number for a location."""
+    if location is None:
+        # No location to scope a sequence to; fall back to a random suffix
+        prefix = DocumentSequence.PREFIXES[document_type]
+        return f'{prefix}-{business_date:%Y%m%d}-{str(uuid.uuid4())[:8].upper()}'
+    value = next_value(location, business_date, document_type, terminal=terminal)
+    return format_number(document_type, business_date, location.code, value)
+
+
+def peek_next_numbers(location, business_date):
+    """Next sale and session numbers for display; does not reserve anything."""
+    last_values = dict(
+        DocumentSequence.objects.filter(
+            location=location,
+            business_date=business_date
+        ).values_list('document_type', 'last_value')
+    )
+    return {
+        document_type: format_number(
+            document_type, business_date, location.code, last_values.get(document_type, 0) + 1
+        )
+        for document_type, _ in DocumentSequence.DOCUMENT_TYPES
+    }
@@ -0,0 +1,194 @@
+"""
+Incrementally maintained POS session ledger.
+
+Every write path that changes a session's completed sales or completed
+payments calls into this module inside its own transaction. The ledger row
+is locked with SELECT ... FOR UPDATE, adjusted by the delta and saved, so
+readers get running totals in O(1). ``reconcile_session_ledgers`` verifies
+the ledger against the raw rows.
+
+A session that has no ledger yet (e.g. one opened before the ledger existed)
+gets it rebuilt from raw rows on first use.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+
+from ..models import Sale, Payment, POSSessionLedger
+
+
+ZERO = Decimal('0.00')
+
+SALE_FIELDS = {
+    'subtotal_amount': 'subtotal',
+    'tax_amount': 'tax_amount',
+    'discount_amount': 'discount_amount',
+    'gross_amount': 'total_amount',
+}
+
+
+def raw_totals(session_ids):
+    """
+    Compute ledger values from the raw sale and payment rows.
+
+    Two grouped queries regardless of how many sessions are requested.
+    Returns {session_id: {field: value, ..., 'tender_totals': {...}}}.
+    """
+    session_ids = list(session_ids)
+    totals = {
+        session_id: {
+            'sale_count': 0,
+            'subtotal_amount': ZERO,
+            'tax_amount': ZERO,
+            'discount_amount': ZERO,
+            'gross_amount': ZERO,
+            'tender_totals': {},
+        }
+        for session_id in session_ids
+    }
+
+    sale_rows = Sale.objects.filter(
+        pos_session_id__in=session_ids,
+        status='completed'
+    ).order_by().values('pos_session_id').annotate(
+        sale_count=Count('id'),
+        **{field: Sum(source) for field, source in SALE_FIELDS.items()}
+    )
+    for row in sale_rows:
+        entry = totals[row['pos_session_id']]
+        entry['sale_count'] = row['sale_count']
+        for field in SALE_FIELDS:
+            entry[field] = row[field] or ZERO
+
+    payment_rows = Payment.objects.filter(
+        sale__pos_session_id__in=session_ids,
+        status='completed'
+    ).order_by().values('sale__pos_session_id', 'payment_method').annotate(
+        count=Count('id'),
+        amount=Sum('amount')
+    )
+    for row in payment_rows:
+        totals[row['sale__pos_session_id']]['tender_totals'][row['payment_method']] = {
+            'count': row['count'],
+            'amount': row['amount'] or ZERO,
+        }
+    return totals
+
+
+def rebuild(session_id):
+    """Recompute a session's ledger from raw rows and save it."""
+    values = raw_totals([session_id])[session_id]
+    ledger, _ = POSSessionLedger.objects.update_or_create(session_id=session_id, defaults=values)
+    return ledger
+
+
+def _locked_ledger(session_id):
+    """
+    Return (ledger, rebuilt) with the ledger row locked for update.
+
+    ``rebuilt`` is True when the ledger was just created from raw rows, which
+    already include the caller's uncommitted changes, so no delta applies.
+    """
+    ledger = POSSessionLedger.objects.select_for_update().filter(session_id=session_id).first()
+    if ledger:
+        return ledger, False
+    try:
+        with transaction.atomic():
+            values = raw_totals([session_id])[session_id]
+            return POSSessionLedger.objects.create(session_id=session_id, **values), True
+    except IntegrityError:
+        # Another transaction created it first; its totals exclude our changes
+        return POSSessionLedger.objects.select_for_update().get(session_id=session_id), False
+
+
+def _apply_sale(ledger, sale, sign):
+    ledger.sale_count += sign
+    for field, source in SALE_FIELDS.items():
+        setattr(ledger, field, getattr(ledger, field) + sign * (getattr(sale, source) or ZERO))
+
+
+def _apply_payments(ledger, payments, sign):
+    tenders = ledger.tender_totals
+    for payment in payments:
+        if payment.status != 'completed':
+            continue
+        entry = tenders.setdefault(payment.payment_method, {'count': 0, 'amount': ZERO})
+        entry['count'] += sign
+        entry['amount'] = Decimal(str(entry['amount'])) + sign * payment.amount
+        if entry['count'] <= 0 and not entry['amount']:
+            del tenders[payment.payment_method]
+
+
+def record(session_id, sales_removed=(), sales_added=(), payments_removed=(), payments_added=()):
+    """
+    Apply sale and payment deltas to one session's ledger under a row lock.
+
+    Removed rows are the pre-write state (subtracted), added rows the
+    post-write state (added); only completed sales and payments count.
+    Must run in the same transaction as the write it records.
+    """
+    if not session_id:
+        return
+    with transaction.atomic():
+        ledger, rebuilt = _locked_ledger(session_id)
+        if rebuilt:
+            return
+        for sale in sales_removed:
+            if sale.status == 'completed':
+                _apply_sale(ledger, sale, -1)
+        for sale in sales_added:
+            if sale.status == 'completed':
+                _apply_sale(ledger, sale, 1)
+        _apply_payments(ledger, payments_removed, -1)
+        _apply_payments(ledger, payments_added, 1)
+        ledger.save()
+
+
+def record_checkout(sale, payments):
+    """Apply a newly created sale and its payments to the session ledger."""
+    record(sale.pos_session_id, sales_added=[sale], payments_added=payments)
+
+
+def record_sale_change(before, after, payments=()):
+    """
+    Apply a sale update or deletion to the ledger(s) involved.
+
+    ``before`` is a copy of the sale taken before the write and ``after``
+    the saved sale, or None when it was deleted. ``payments`` are the sale's
+    payments; they move with the sale if it changes session and are removed
+    with it when it is deleted.
+    """
+    old_session = before.pos_session_id if before is not None else None
+    new_session = after.pos_session_id if after is not None else None
+    if old_session == new_session:
+        record(
+            old_session,
+            sales_removed=[before] if before is not None else [],
+            sales_added=[after] if after is not None else [],
+            payments_removed=payments if after is None else ()
+        )
+        return
+    record(old_session, sales_removed=[before] if before is not None else [], payments_removed=payments)
+    record(new_session, sales_added=[after] if after is not None else [], payments_added=payments)
+
+
+def get_ledger(session):
+    """Return the session's ledger, rebuilding it from raw rows if missing."""
+    ledger = POSSessionLedger.objects.filter(session=session).first()
+    if ledger is None:
+        with transaction.atomic():
+            ledger, _ = _locked_ledger(session.pk)
+    return ledger
+
+
+def tender_breakdown(ledger, payment_methods):
+    """Per-method {'label', 'amount', 'count'} dict for every payment method."""
+    return {
+        method: {
+            'label': label,
+            'amount': ledger.tender_amount(method),
+            'count': ledger.tender_count(method),
+        }
+        for method, label in payment_methods
+    }
@@ -0,0 +1,311 @@
+"""
+Sale-to-stock posting pipeline.
+
+A completed sale consumes stock for each of its lines. Posting locks the
+affected Inventory rows in primary-key order (so concurrent postings of
+overlapping baskets cannot deadlock), applies every delta with one UPDATE
+built from CASE/F expressions and writes the StockMovement rows with one bulk
+INSERT, so the cost is constant in basket size.
+
+``settings.SALE_STOCK_POSTING`` selects when posting happens:
+
+- ``sync``: inside the transaction that completes the sale
+- ``queue``: completed sales without ``stock_posted_at`` form the queue,
+  drained by ``manage.py post_sale_stock``
+- ``off``: sales never touch stock; they are stamped as settled when
+  completed, so switching to ``queue`` later does not replay them
+
+Cancelling or deleting a posted sale reverses exactly the movements it
+posted (``reverse_sale``); a sale stamped without posting reverses nothing.
+
+Inventory is tracked in whole units, so line quantities are summed per
+variant and rounded half-up. Stock is floored at zero; any shortfall is noted
+on the movement row.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from inventory.models import Inventory, StockMovement
+
+from ..models import Sale, SaleItem
+
+
+POSTING_MODES = ('sync', 'queue', 'off')
+UNIT = Decimal('1')
+
+
+def posting_mode():
+    """Configured posting mode, defaulting to synchronous posting."""
+    mode = getattr(settings, 'SALE_STOCK_POSTING', 'sync')
+    return mode if mode in POSTING_MODES else 'sync'
+
+
+def sale_units(items):
+    """
+    Whole units sold per variant, {variant_id: units}.
+
+    ``items`` are SaleItem instances or (variant_id, quantity) pairs.
+    """
+    quantities = {}
+    for item in items:
+        if isinstance(item, SaleItem):
+            product_id, quantity = item.product_id, item.quantity
+        else:
+            product_id, quantity = item
+        quantities[product_id] = quantities.get(product_id, Decimal('0')) + Decimal(str(quantity or 0))
+    return {
+        product_id: int(quantity.quantize(UNIT, rounding=ROUND_HALF_UP))
+        for product_id, quantity in quantities.items()
+        if quantity.quantize(UNIT, rounding=ROUND_HALF_UP)
+    }
+
+
+def _stock_status(inventory, stock):
+    if stock == 0:
+        return 'out_of_stock'
+    if stock <= inventory.min_stock_level:
+        return 'low_stock'
+    return 'in_stock'
+
+
+def apply_stock_changes(changes, movement_type, reference_number='', reason='', created_by_id=None):
+    """
+    Apply signed per-variant quantity changes to Inventory.
+
+    ``changes`` maps variant IDs to unit deltas (negative = outgoing).
+    Variants without an Inventory row are not stock tracked and are skipped.
+    Must run inside a transaction. Costs three queries: lock, UPDATE and
+    bulk INSERT. Returns the created StockMovement rows.
+    """
+    return apply_stock_documents([{
+        'changes': changes,
+        'movement_type': movement_type,
+        'reference_number': reference_number,
+        'reason': reason,
+        'created_by_id': created_by_id,
+    }])
+
+
+def apply_stock_documents(documents):
+    """
+    Apply several documents' stock changes in one pass.
+
+    Each document is a dict with ``changes`` ({variant_id: delta}) and the
+    ``movement_type``, ``reference_number``, ``reason`` and
+    ``created_by_id`` of its movement rows. Documents are applied in order,
+    each getting its own movement rows, but the whole set still costs one
+    lock, one UPDATE and one bulk INSERT. Must run inside a transaction.
+    """
+    documents = [
+        dict(document, changes={pk: change for pk, change in document['changes'].items() if change})
+        for document in documents
+    ]
+    product_ids = {product_id for document in documents for product_id in document['changes']}
+    if not product_ids:
+        return []
+
+    # Lock in a fixed order so two postings never wait on each other in a cycle
+    inventories = list(
+        Inventory.objects.select_for_update().filter(
+            product_id__in=product_ids
+        ).order_by('pk').only(
+            'id', 'company_id', 'product_id', 'current_stock', 'reserved_stock',
+            'min_stock_level', 'cost_price'
+        )
+    )
+    if not inventories:
+        return []
+    by_product = {inventory.product_id: inventory for inventory in inventories}
+
+    # Walk the documents against the locked stock levels
+    stock = {inventory.pk: inventory.current_stock for inventory in inventories}
+    movements = []
+    for document in documents:
+        for product_id, requested in document['changes'].items():
+            inventory = by_product.get(product_id)
+            if inventory is None:
+                continue
+            before = stock[inventory.pk]
+            after = max(0, before + requested)
+            stock[inventory.pk] = after
+
+            shortfall = (before + requested) - after
+            movements.append(StockMovement(
+                inventory_id=inventory.pk,
+                company_id=inventory.company_id,
+                movement_type=document['movement_type'],
+                quantity_change=after - before,
+                quantity_before=before,
+                quantity_after=after,
+                unit_cost=inventory.cost_price,
+                reference_number=(document.get('reference_number') or '')[:50],
+                reason=document.get('reason', ''),
+                notes=f'{-shortfall} unit(s) short of requested {requested:+d}' if shortfall else '',
+                created_by_id=document.get('created_by_id'),
+            ))
+
+    # Rows sharing a net delta (typically -1) share one WHEN branch, keeping
+    # the CASE small however many lines are posted
+    by_change = {}
+    by_status = {}
+    for inventory in inventories:
+        change = stock[inventory.pk] - inventory.current_stock
+        by_change.setdefault(change, []).append(inventory.pk)
+        by_status.setdefault(_stock_status(inventory, stock[inventory.pk]), []).append(inventory.pk)
+
+    def new_stock(change):
+        return Greatest(F('current_stock') + Value(change), Value(0))
+
+    now = timezone.now()
+    Inventory.objects.filter(pk__in=list(stock)).update(
+        current_stock=Case(
+            *[When(pk__in=pks, then=new_stock(change)) for change, pks in by_change.items()],
+            default=F('current_stock'),
+            output_field=IntegerField()
+        ),
+        available_stock=Case(
+            *[
+                When(pk__in=pks, then=Greatest(new_stock(change) - F('reserved_stock'), Value(0)))
+                for change, pks in by_change.items()
+            ],
+            default=F('available_stock'),
+            output_field=IntegerField()
+        ),
+        status=Case(
+            *[When(pk__in=pks, then=Value(stock_status)) for stock_status, pks in by_status.items()],
+            default=F('status')
+        ),
+        last_movement_date=now,
+        updated_at=now,
+    )
+    return StockMovement.objects.bulk_create(movements)
+
+
+def sale_document(sale, items):
+    """Stock document consuming a sale's lines."""
+    return {
+        'changes': {product_id: -units for product_id, units in sale_units(items).items()},
+        'movement_type': 'sale',
+        'reference_number': sale.sale_number,
+        'reason': f'Sale {sale.sale_number}',
+        'created_by_id': sale.cashier_id,
+    }
+
+
+def relabel_movements(sale, movements):
+    """Point movements posted for ``sale`` at its sale_number, assigned after posting."""
+    if not movements:
+        return
+    document = sale_document(sale, ())
+    StockMovement.objects.filter(pk__in=[movement.pk for movement in movements]).update(
+        reference_number=document['reference_number'],
+        reason=document['reason']
+    )
+
+
+def post_sale(sale, items=None):
+    """
+    Post a completed sale's lines to inventory exactly once.
+
+    The sale is claimed with a conditional UPDATE on ``stock_posted_at``, so
+    concurrent callers (checkout, workers) cannot post it twice. ``items``
+    may be passed when the lines are already in memory; otherwise they are
+    read with one query. Returns the movement rows, or None when the sale was
+    not pending.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        claimed = Sale.objects.filter(
+            pk=sale.pk,
+            status='completed',
+            stock_posted_at__isnull=True
+        ).update(stock_posted_at=now)
+        if not claimed:
+            return None
+        sale.stock_posted_at = now
+
+        if items is None:
+            items = SaleItem.objects.filter(sale_id=sale.pk).values_list('product_id', 'quantity')
+        return apply_stock_documents([sale_document(sale, items)])
+
+
+def post_new_sales(sales_with_items):
+    """
+    Post sales inserted in the current transaction, in one pass.
+
+    For bulk inserts (offline upload): callers set ``stock_posted_at`` on
+    the completed sales before inserting them, so no claim is needed. Takes
+    (sale, items) pairs; only sales marked posted are applied.
+    """
+    return apply_stock_documents([
+        sale_document(sale, items)
+        for sale, items in sales_with_items
+        if sale.status == 'completed' and sale.stock_posted_at
+    ])
+
+
+def skip_sale(sale):
+    """Stamp a completed sale as settled without touching stock (``off`` mode)."""
+    now = timezone.now()
+    if Sale.objects.filter(pk=sale.pk, status='completed', stock_posted_at__isnull=True).update(stock_posted_at=now):
+        sale.stock_posted_at = now
+
+
+def on_sale_completed(sale, items=None):
+    """
+    Hook for every path that completes a sale: posts now in ``sync`` mode,
+    stamps the sale in ``off`` mode and leaves it queued in ``queue`` mode.
+    """
+    if sale.status != 'completed':
+        return None
+    mode = posting_mode()
+    if mode == 'off':
+        skip_sale(sale)
+        return None
+    if mode != 'sync':
+        return None
+    return post_sale(sale, items=items)
+
+
+def reverse_sale(sale, created_by_id=None):
+    """
+    Return the stock a posted sale consumed, exactly once.
+
+    The posting is released with a conditional UPDATE clearing
+    ``stock_posted_at`` (the sale is no longer completed, so it does not
+    re-enter the queue), then the net of the sale's own movements (its
+    postings less earlier reversals) is negated, so units clamped by a
+    shortfall are not handed back. Call it before
+    saving the cancelled sale. Returns the movement rows, or None when the
+    sale was not posted.
+    """
+    with transaction.atomic():
+        released = Sale.objects.filter(pk=sale.pk, stock_posted_at__isnull=False).update(stock_posted_at=None)
+        sale.stock_posted_at = None
+        if not released:
+            return None
+
+        posted = StockMovement.objects.filter(
+            movement_type__in=('sale', 'return'),
+            reference_number=sale.sale_number[:50]
+        ).order_by().values_list('inventory__product_id').annotate(units=Sum('quantity_change'))
+        return apply_stock_documents([{
+            'changes': {product_id: -units for product_id, units in posted},
+            'movement_type': 'return',
+            'reference_number': sale.sale_number,
+            'reason': f'Reversal of sale {sale.sale_number}',
+            'created_by_id': created_by_id or sale.cashier_id,
+        }])
+
+
+def pending_sales():
+    """Completed sales still waiting to be posted, oldest first."""
+    return Sale.objects.filter(
+        status='completed',
+        stock_posted_at__isnull=True
+    ).order_by('completed_at', 'sale_date')
@@ -0,0 +1,99 @@
+"""
+Tender (payment method) breakdown shared by dashboards, Day Close and
+reporting.
+
+Every method's amount and count comes from a single GROUP BY over completed
+payments. Dashboard callers poll this every few seconds, so results are kept
+in the Django cache for ``settings.TENDER_BREAKDOWN_CACHE_TTL`` seconds.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from ..models import Payment
+
+
+ZERO = Decimal('0.00')
+CACHE_PREFIX = 'sales:tender-breakdown'
+
+
+def business_day_range(business_date):
+    """Aware [start, end) datetimes covering a business date, index friendly."""
+    start = timezone.make_aware(datetime.combine(business_date, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _payments(location=None, terminal=None, date_from=None, date_to=None, sale_status='completed', sales=None):
+    payments = Payment.objects.filter(status='completed')
+    if sales is not None:
+        payments = payments.filter(sale__in=sales)
+    if sale_status:
+        payments = payments.filter(sale__status=sale_status)
+    if location:
+        payments = payments.filter(sale__location=location)
+    if terminal:
+        payments = payments.filter(sale__terminal=terminal)
+    if date_from:
+        payments = payments.filter(sale__sale_date__gte=business_day_range(date_from)[0])
+    if date_to:
+        payments = payments.filter(sale__sale_date__lt=business_day_range(date_to)[1])
+    return payments
+
+
+def tender_totals(location=None, terminal=None, date_from=None, date_to=None, sale_status='completed',
+                  sales=None):
+    """
+    {payment_method: {'count', 'amount'}} for methods with payments.
+
+    Dates are inclusive calendar days of ``sale_date``; ``sales`` (a Sale
+    queryset) narrows to those sales instead, e.g. a Day Close's. Location
+    and terminal accept instances or primary keys. Uncached, one query.
+    """
+    rows = _payments(location, terminal, date_from, date_to, sale_status, sales).order_by().values(
+        'payment_method'
+    ).annotate(
+        count=Count('id'),
+        amount=Sum('amount')
+    ).order_by('payment_method')
+    return {
+        row['payment_method']: {'count': row['count'], 'amount': row['amount'] or ZERO}
+        for row in rows
+    }
+
+
+def tender_breakdown(location=None, terminal=None, date_from=None, date_to=None,
+                     sale_status='completed', use_cache=True):
+    """
+    Zero-filled {payment_method: {'label', 'amount', 'count'}} for every
+    method in Payment.PAYMENT_METHODS (plus any unknown stored methods).
+    """
+    cache_key = None
+    ttl = getattr(settings, 'TENDER_BREAKDOWN_CACHE_TTL', 5)
+    if use_cache and ttl > 0:
+        cache_key = ':'.join(str(part) for part in (
+            CACHE_PREFIX,
+            getattr(location, 'pk', location),
+            getattr(terminal, 'pk', terminal),
+            date_from,
+            date_to,
+            sale_status,
+        ))
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    totals = tender_totals(location, terminal, date_from, date_to, sale_status)
+    breakdown = {}
+    for method, label in Payment.PAYMENT_METHODS:
+        entry = totals.pop(method, {'count': 0, 'amount': ZERO})
+        breakdown[method] = {'label': label, 'amount': entry['amount'], 'count': entry['count']}
+    for method, entry in totals.items():
+        breakdown[method] = {'label': method, 'amount': entry['amount'], 'count': entry['count']}
+
+    if cache_key:
+        cache.set(cache_key, breakdown, ttl)
+    return breakdown
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    SaleViewSet, SaleItemViewSet, PaymentViewSet, POSSessionViewSet,
+    SaleViewSet, SaleItemViewSet, PaymentViewSet, CreditSettlementViewSet, POSSessionViewSet,
     DayOpenViewSet, DayCloseViewSet
 )
 
@@ -9,6 +9,7 @@ router = DefaultRouter()
 router.register(r'sales', SaleViewSet, basename='sale')
 router.register(r'sale-items', SaleItemViewSet, basename='saleitem')
 router.register(r'payments', PaymentViewSet, basename='payment')
+router.register(r'credit-settlements', CreditSettlementViewSet, basename='creditsettlement')
 router.register(r'pos-sessions', POSSessionViewSet, basename='possession')
 router.register(r'day-opens', DayOpenViewSet, basename='dayopen')
 router.register(r'day-closes', DayCloseViewSet, basename='dayclose')
@@ -5,20 +5,35 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Sum, Count, Q
 from django.conf import settings
 from decimal import Decimal, InvalidOperation
 from datetime import date, datetime
+import copy
+import uuid
 
-from .models import Sale, SaleItem, Payment, POSSession, DayOpen, DayClose
-from pos_masters.models import SettlementReason
+from .models import Sale, SaleItem, Payment, POSSession, DayOpen, DayClose, CreditSettlement
+from .services import customer_rollup, ingestion, numbering, session_ledger, stock_posting, tenders
+from pos_masters.models import SettlementReason, Terminal
 from .serializers import (
     SaleSerializer, SaleCreateSerializer,
-    SaleItemSerializer, PaymentSerializer,
+    SaleItemSerializer, PaymentSerializer, CreditSettlementSerializer,
     POSSessionSerializer, DayOpenSerializer, DayCloseSerializer
 )
 
 
+def _uuid_param(request, name):
+    """Optional UUID query parameter; ValueError naming it when malformed."""
+    value = request.query_params.get(name) or None
+    if value is None:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name} id') from None
+
+
 class SaleViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing sales transactions.
@@ -60,6 +75,64 @@ class SaleViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(response_serializer.data)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
     
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Ingest sales buffered by an offline till.
+        
+        Body: {"sales": [...]} where each sale is a normal sale payload plus
+        ``idempotency_key`` (required, unique per sale) and optionally
+        ``client_sale_number`` and ``client_sold_at``. Resending a batch is
+        safe: sales whose key was already ingested come back as
+        ``duplicate`` with their server sale number.
+        """
+        sales = request.data.get('sales') if hasattr(request.data, 'get') else None
+        if not isinstance(sales, list) or not sales:
+            return Response(
+                {'error': 'sales must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_size = getattr(settings, 'SALE_BATCH_MAX_SIZE', 500)
+        if len(sales) > max_size:
+            return Response(
+                {'error': f'A batch may contain at most {max_size} sales'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = ingestion.ingest(sales, context=self.get_serializer_context())
+        summary = {
+            outcome: sum(1 for result in results if result['status'] == outcome)
+            for outcome in ('created', 'duplicate', 'error')
+        }
+        return Response({'results': results, 'summary': summary})
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Keep the POS session ledger, customer rollup and stock in step with edited sales."""
+        before = copy.copy(serializer.instance)
+        customer = serializer.validated_data.get('customer', before.customer)
+        customer_rollup.lock(before.customer_id, customer.pk if customer else None)
+        sale = serializer.save()
+        payments = list(sale.payments.all())
+        if before.status not in customer_rollup.PURCHASE_STATUSES and sale.status in customer_rollup.PURCHASE_STATUSES:
+            customer_rollup.check_credit(sale.customer, payments)
+        session_ledger.record_sale_change(before, sale, payments=payments)
+        customer_rollup.record_sale_change(before, sale, payments=payments)
+        if before.status != 'completed':
+            stock_posting.on_sale_completed(sale)
+        elif sale.status == 'cancelled':
+            stock_posting.reverse_sale(sale, created_by_id=self.request.user.pk)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Remove a deleted sale (and its cascaded payments) from the ledger, rollup and stock."""
+        payments = list(instance.payments.all())
+        before = copy.copy(instance)
+        stock_posting.reverse_sale(instance, created_by_id=self.request.user.pk)
+        instance.delete()
+        session_ledger.record_sale_change(before, None, payments=payments)
+        customer_rollup.record_sale_change(before, None, payments=payments)
+    
     @action(detail=False, methods=['get'])
     def suspended(self, request):
         """Get all suspended (draft) sales."""
@@ -112,9 +185,16 @@ class SaleViewSet(viewsets.ModelViewSet):
             )
         
         # Complete the sale
+        before = copy.copy(sale)
         sale.status = 'completed'
         sale.completed_at = timezone.now()
-        sale.save()
+        with transaction.atomic():
+            payments = list(sale.payments.all())
+            customer_rollup.check_credit(sale.customer, payments)
+            sale.save()
+            session_ledger.record_sale_change(before, sale)
+            customer_rollup.record_sale_change(before, sale, payments=payments)
+            stock_posting.on_sale_completed(sale)
         
         serializer = self.get_serializer(sale)
         return Response(serializer.data)
@@ -131,47 +211,62 @@ class SaleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        before = copy.copy(sale)
         sale.status = 'cancelled'
         sale.reason_code = reason_code
-        sale.save()
+        with transaction.atomic():
+            stock_posting.reverse_sale(sale, created_by_id=request.user.pk)
+            sale.save()
+            session_ledger.record_sale_change(before, sale)
+            customer_rollup.record_sale_change(before, sale)
         
         serializer = self.get_serializer(sale)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def today_summary(self, request):
-        """Get today's sales summary."""
-        today = timezone.now().date()
+        """
+        Get today's sales summary.
         
+        Optional ``location`` and ``terminal`` query params narrow the
+        summary to one store or till.
+        """
+        today = timezone.localdate()
+        try:
+            location = _uuid_param(request, 'location')
+            terminal = _uuid_param(request, 'terminal')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        start, end = tenders.business_day_range(today)
         today_sales = Sale.objects.filter(
-            sale_date__date=today,
+            sale_date__gte=start,
+            sale_date__lt=end,
             status='completed'
         )
+        if location:
+            today_sales = today_sales.filter(location_id=location)
+        if terminal:
+            today_sales = today_sales.filter(terminal_id=terminal)
         
+        # Item quantity is aggregated separately: joining items into the
+        # sales aggregate would repeat total_amount once per line
         summary = today_sales.aggregate(
             total_sales=Sum('total_amount'),
-            total_transactions=Count('id'),
-            total_items=Sum('items__quantity')
+            total_transactions=Count('id')
         )
+        summary['total_items'] = SaleItem.objects.filter(
+            sale__in=today_sales
+        ).aggregate(total=Sum('quantity'))['total']
         
-        # Payment method breakdown
-        from .models import Payment
-        payments = Payment.objects.filter(
-            sale__sale_date__date=today,
-            sale__status='completed',
-            status='completed'
+        # Payment method breakdown (single GROUP BY, short-TTL cached)
+        payment_summary = tenders.tender_breakdown(
+            location=location,
+            terminal=terminal,
+            date_from=today,
+            date_to=today
         )
         
-        payment_summary = {}
-        for method, label in Payment.PAYMENT_METHODS:
-            amount = payments.filter(payment_method=method).aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            payment_summary[method] = {
-                'label': label,
-                'amount': amount
-            }
-        
         return Response({
             'date': today,
             'summary': summary,
@@ -204,6 +299,43 @@ class PaymentViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['sale', 'payment_method', 'status']
     
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """Record the new payment in its sale's session ledger and customer rollup."""
+        sale = serializer.validated_data.get('sale')
+        customer_rollup.lock(sale.customer_id if sale else None)
+        payment = serializer.save()
+        customer_rollup.check_payment_change(None, payment)
+        if payment.sale_id:
+            session_ledger.record(payment.sale.pos_session_id, payments_added=[payment])
+        customer_rollup.record_payment_change(None, payment)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Move an edited payment's amount between ledger tenders."""
+        before = copy.copy(serializer.instance)
+        sale = serializer.validated_data.get('sale', before.sale)
+        customer_rollup.lock(before.sale.customer_id if before.sale_id else None, sale.customer_id if sale else None)
+        old_session = before.sale.pos_session_id if before.sale_id else None
+        payment = serializer.save()
+        customer_rollup.check_payment_change(before, payment)
+        new_session = payment.sale.pos_session_id if payment.sale_id else None
+        if old_session == new_session:
+            session_ledger.record(new_session, payments_removed=[before], payments_added=[payment])
+        else:
+            session_ledger.record(old_session, payments_removed=[before])
+            session_ledger.record(new_session, payments_added=[payment])
+        customer_rollup.record_payment_change(before, payment)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Remove a deleted payment from its session ledger and customer rollup."""
+        session_id = instance.sale.pos_session_id if instance.sale_id else None
+        before = copy.copy(instance)
+        instance.delete()
+        session_ledger.record(session_id, payments_removed=[before])
+        customer_rollup.record_payment_change(before, None)
+    
     def get_queryset(self):
         """Filter payments by sale if provided."""
         queryset = super().get_queryset()
@@ -213,6 +345,28 @@ class PaymentViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+class CreditSettlementViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for customer credit repayments.
+    
+    Settlements lower the customer's outstanding credit and cannot be
+    edited or deleted once recorded; a correction is a new settlement.
+    """
+    
+    queryset = CreditSettlement.objects.all().select_related('customer', 'received_by')
+    serializer_class = CreditSettlementSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['customer', 'payment_method']
+    http_method_names = ['get', 'post', 'head', 'options']
+    
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """Record the settlement against the customer's outstanding credit."""
+        settlement = serializer.save(received_by=self.request.user)
+        customer_rollup.record_settlement(settlement)
+
+
 class POSSessionViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing POS sessions.
@@ -291,23 +445,10 @@ class POSSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate session summary
-        completed_sales = session.sales.filter(status='completed')
-        
-        session.total_sales = completed_sales.aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
-        
-        # Calculate cash payments
-        cash_payments = Payment.objects.filter(
-            sale__pos_session=session,
-            payment_method='cash',
-            status='completed'
-        )
-        
-        total_cash_payments = cash_payments.aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
+        # Session summary from the running ledger
+        ledger = session_ledger.get_ledger(session)
+        session.total_sales = ledger.gross_amount
+        total_cash_payments = ledger.tender_amount('cash')
         
         # Expected cash
         session.expected_cash = session.opening_cash + total_cash_payments
@@ -354,35 +495,43 @@ class POSSessionViewSet(viewsets.ModelViewSet):
     def summary(self, request, pk=None):
         """Get detailed session summary."""
         session = self.get_object()
+        ledger = session_ledger.get_ledger(session)
         
-        # Sales breakdown
-        sales = session.sales.filter(status='completed')
-        sales_summary = sales.aggregate(
-            total_amount=Sum('total_amount'),
-            count=Count('id')
-        )
-        
-        # Payment method breakdown
-        payments = Payment.objects.filter(
-            sale__pos_session=session,
-            status='completed'
-        )
-        
-        payment_breakdown = {}
-        for method, label in Payment.PAYMENT_METHODS:
-            amount = payments.filter(payment_method=method).aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            payment_breakdown[method] = {
-                'label': label,
-                'amount': amount
-            }
+        # Sales and payment method breakdown from the running ledger
+        sales_summary = {
+            'total_amount': ledger.gross_amount,
+            'count': ledger.sale_count
+        }
+        payment_breakdown = session_ledger.tender_breakdown(ledger, Payment.PAYMENT_METHODS)
         
         return Response({
             'session': self.get_serializer(session).data,
             'sales_summary': sales_summary,
             'payment_breakdown': payment_breakdown
         })
+    
+    @action(detail=True, methods=['get'])
+    def ledger(self, request, pk=None):
+        """
+        Running totals for the session (used by interim settlement).
+        
+        Reads the session ledger row only; expected cash is opening cash
+        plus completed cash tenders.
+        """
+        session = self.get_object()
+        ledger = session_ledger.get_ledger(session)
+        
+        return Response({
+            'session': session.id,
+            'sale_count': ledger.sale_count,
+            'subtotal_amount': ledger.subtotal_amount,
+            'tax_amount': ledger.tax_amount,
+            'discount_amount': ledger.discount_amount,
+            'gross_amount': ledger.gross_amount,
+            'expected_cash': session.opening_cash + ledger.tender_amount('cash'),
+            'payment_breakdown': session_ledger.tender_breakdown(ledger, Payment.PAYMENT_METHODS),
+            'updated_at': ledger.updated_at
+        })
 
 
 class DayOpenViewSet(viewsets.ModelViewSet):
@@ -486,10 +635,10 @@ class DayOpenViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate next document sequences
-        date_str = business_date.strftime('%Y%m%d')
-        next_sale_number = f'SALE-{date_str}-0001'
-        next_session_number = f'SES-{date_str}-0001'
+        # First document numbers of the day from the location's sequences
+        next_numbers = numbering.peek_next_numbers(user_location, business_date)
+        next_sale_number = next_numbers['sale']
+        next_session_number = next_numbers['session']
         
         # Get notes from request
         notes = request.data.get('notes', '').strip()
@@ -537,6 +686,59 @@ class DayOpenViewSet(viewsets.ModelViewSet):
         day_open.close_day_open()
         serializer = self.get_serializer(day_open)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'], url_path='reserve-numbers')
+    def reserve_numbers(self, request, pk=None):
+        """
+        Reserve a block of sale numbers for a terminal.
+        
+        The terminal issues numbers from the returned range locally
+        (prefix + zero-padded value) without further round-trips, e.g. while
+        running in offline mode, and sends each as the sale's
+        ``sale_number`` (or ``client_sale_number`` in a batch upload). The
+        block is tied to ``terminal`` when given, else to any terminal at
+        the Day Open's location.
+        """
+        day_open = self.get_object()
+        
+        if not day_open.is_active:
+            return Response(
+                {'error': 'Day open is closed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        document_type = request.data.get('document_type', 'sale')
+        if document_type not in numbering.BLOCK_DOCUMENT_TYPES:
+            return Response(
+                {'document_type': f'Must be one of: {", ".join(numbering.BLOCK_DOCUMENT_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        terminal = None
+        terminal_id = request.data.get('terminal')
+        if terminal_id:
+            try:
+                terminal = Terminal.objects.get(pk=terminal_id, location_id=day_open.location_id)
+            except (Terminal.DoesNotExist, ValueError, ValidationError):
+                return Response(
+                    {'terminal': 'Not a terminal at this Day Open\'s location'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            block_size = int(request.data.get('block_size', 100))
+        except (TypeError, ValueError):
+            block_size = 0
+        if not 1 <= block_size <= 10000:
+            return Response(
+                {'block_size': 'Must be an integer between 1 and 10000'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        block = numbering.reserve_block(
+            day_open, document_type, block_size, terminal=terminal, reserved_by=request.user
+        )
+        return Response(block, status=status.HTTP_201_CREATED)
 
 
 class DayCloseViewSet(viewsets.ModelViewSet):
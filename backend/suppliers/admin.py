@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from utils import stats as dashboard_stats
 from .models import Supplier
 
 
@@ -166,36 +167,42 @@ class SupplierAdmin(admin.ModelAdmin):
     def activate_suppliers(self, request, queryset):
         """Activate selected suppliers."""
         updated = queryset.update(is_active=True)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'{updated} suppliers were successfully activated.')
     activate_suppliers.short_description = 'Activate selected suppliers'
     
     def deactivate_suppliers(self, request, queryset):
         """Deactivate selected suppliers."""
         updated = queryset.update(is_active=False)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'{updated} suppliers were successfully deactivated.')
     deactivate_suppliers.short_description = 'Deactivate selected suppliers'
     
     def make_preferred(self, request, queryset):
         """Make selected suppliers preferred."""
         updated = queryset.update(is_preferred=True)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'{updated} suppliers were granted preferred status.')
     make_preferred.short_description = 'Grant preferred status'
     
     def remove_preferred(self, request, queryset):
         """Remove preferred status from selected suppliers."""
         updated = queryset.update(is_preferred=False)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'Preferred status removed from {updated} suppliers.')
     remove_preferred.short_description = 'Remove preferred status'
     
     def verify_suppliers(self, request, queryset):
         """Verify selected suppliers."""
         updated = queryset.update(is_verified=True)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'{updated} suppliers were verified.')
     verify_suppliers.short_description = 'Verify suppliers'
     
     def unverify_suppliers(self, request, queryset):
         """Unverify selected suppliers."""
         updated = queryset.update(is_verified=False)
+        dashboard_stats.invalidate('suppliers')
         self.message_user(request, f'{updated} suppliers were unverified.')
     unverify_suppliers.short_description = 'Unverify suppliers'
     
@@ -5,61 +5,6 @@ class SuppliersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'suppliers'
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def ready(self):
+        from .services.stats import register_dashboards
+        register_dashboards()
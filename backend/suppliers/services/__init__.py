@@ -0,0 +1 @@
+# Suppliers services
@@ -0,0 +1,46 @@
+"""Supplier dashboard counters (``/api/suppliers/stats/``), see utils.stats."""
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from utils import stats
+
+from ..models import Supplier
+
+
+def _aggregates():
+    first_day_of_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    aggregates = {
+        'total_suppliers': Count('id'),
+        'active_suppliers': Count('id', filter=Q(is_active=True)),
+        'preferred_suppliers': Count('id', filter=Q(is_preferred=True)),
+        'verified_suppliers': Count('id', filter=Q(is_verified=True)),
+        'new_suppliers_this_month': Count('id', filter=Q(created_at__gte=first_day_of_month)),
+        'average_lead_time': Avg('lead_time_days'),
+        'total_credit_limit': Sum('credit_limit'),
+        'average_discount_percentage': Avg('discount_percentage'),
+    }
+    for supplier_type, _ in Supplier.SUPPLIER_TYPES:
+        aggregates[f'type:{supplier_type}'] = Count('id', filter=Q(supplier_type=supplier_type))
+    return aggregates
+
+
+def _build(values, extra):
+    data = {key: value for key, value in values.items() if not key.startswith('type:')}
+    data.update({
+        'inactive_suppliers': values['total_suppliers'] - values['active_suppliers'],
+        'unverified_suppliers': values['total_suppliers'] - values['verified_suppliers'],
+        # Only types that have suppliers, as the former GROUP BY returned
+        'suppliers_by_type': {
+            key.split(':', 1)[1]: count
+            for key, count in values.items()
+            if key.startswith('type:') and count
+        },
+        'average_lead_time': round(values['average_lead_time'] or 0, 1),
+        'total_credit_limit': values['total_credit_limit'] or 0,
+        'average_discount_percentage': round(values['average_discount_percentage'] or 0, 2),
+    })
+    return data
+
+
+def register_dashboards():
+    stats.register(stats.Dashboard('suppliers', Supplier, _aggregates, _build))
@@ -4,10 +4,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Supplier
+from utils import stats as dashboard_stats
+from masters.services import exports
+from masters.services.exports import Column
 from .serializers import (
     SupplierListSerializer,
     SupplierDetailSerializer,
@@ -57,6 +60,38 @@ class SupplierViewSet(viewsets.ModelViewSet):
     ]
     ordering = ['company_name']
     
+    # Export columns (``export`` action)
+    export_name = 'suppliers'
+    export_columns = [
+        Column('Supplier Code', 'supplier_code'),
+        Column('Company Name', 'company_name'),
+        Column('Trade Name', 'trade_name'),
+        Column('Supplier Type', 'supplier_type'),
+        Column('Contact Person', 'contact_person'),
+        Column('Contact Title', 'contact_title'),
+        Column('Email', 'email'),
+        Column('Phone', 'phone'),
+        Column('Mobile', 'mobile'),
+        Column('Website', 'website'),
+        Column('Address Line 1', 'address_line_1'),
+        Column('Address Line 2', 'address_line_2'),
+        Column('City', 'city'),
+        Column('State', 'state'),
+        Column('Postal Code', 'postal_code'),
+        Column('Country', 'country'),
+        Column('Tax ID', 'tax_id'),
+        Column('Payment Terms', 'payment_terms'),
+        Column('Credit Limit', 'credit_limit'),
+        Column('Discount %', 'discount_percentage'),
+        Column('Lead Time (days)', 'lead_time_days'),
+        Column('Minimum Order Amount', 'minimum_order_amount'),
+        Column('Active', 'is_active'),
+        Column('Preferred', 'is_preferred'),
+        Column('Verified', 'is_verified'),
+        Column('Last Order', 'last_order_date'),
+        Column('Created At', 'created_at'),
+    ]
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
         if self.action == 'list':
@@ -126,53 +161,9 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def stats(self, request):
         """Get supplier statistics."""
         try:
-            # Calculate statistics
-            total_suppliers = Supplier.objects.count()
-            active_suppliers = Supplier.objects.filter(is_active=True).count()
-            inactive_suppliers = total_suppliers - active_suppliers
-            preferred_suppliers = Supplier.objects.filter(is_preferred=True).count()
-            verified_suppliers = Supplier.objects.filter(is_verified=True).count()
-            unverified_suppliers = total_suppliers - verified_suppliers
-            
-            # New suppliers this month
-            first_day_of_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            new_suppliers_this_month = Supplier.objects.filter(
-                created_at__gte=first_day_of_month
-            ).count()
-            
-            # Suppliers by type
-            suppliers_by_type = dict(
-                Supplier.objects.values_list('supplier_type').annotate(
-                    count=Count('id')
-                )
-            )
-            
-            # Performance metrics
-            avg_lead_time = Supplier.objects.aggregate(
-                avg=Avg('lead_time_days')
-            )['avg'] or 0
-            
-            total_credit_limit = Supplier.objects.aggregate(
-                total=Sum('credit_limit')
-            )['total'] or 0
-            
-            avg_discount = Supplier.objects.aggregate(
-                avg=Avg('discount_percentage')
-            )['avg'] or 0
-            
-            stats_data = {
-                'total_suppliers': total_suppliers,
-                'active_suppliers': active_suppliers,
-                'inactive_suppliers': inactive_suppliers,
-                'preferred_suppliers': preferred_suppliers,
-                'verified_suppliers': verified_suppliers,
-                'unverified_suppliers': unverified_suppliers,
-                'new_suppliers_this_month': new_suppliers_this_month,
-                'suppliers_by_type': suppliers_by_type,
-                'average_lead_time': round(avg_lead_time, 1),
-                'total_credit_limit': total_credit_limit,
-                'average_discount_percentage': round(avg_discount, 2)
-            }
+            # All counters from one conditional-aggregation query, cached until
+            # the next supplier write (see suppliers.services.stats)
+            stats_data = dashboard_stats.get('suppliers')
             
             serializer = SupplierStatsSerializer(stats_data)
             return Response(serializer.data)
@@ -258,6 +249,8 @@ class SupplierViewSet(viewsets.ModelViewSet):
             
             # Apply updates
             updated_count = suppliers.update(**updates)
+            # update() sends no signals
+            dashboard_stats.invalidate('suppliers')
             
             return Response({
                 'message': f'Successfully updated {updated_count} suppliers',
@@ -394,16 +387,24 @@ class SupplierViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """Export suppliers data (placeholder for future implementation)."""
-        # This can be enhanced to export to CSV, Excel, etc.
-        suppliers = self.filter_queryset(self.get_queryset())
-        serializer = SupplierListSerializer(suppliers, many=True)
+        """
+        Export the filtered suppliers as CSV (streamed) or Excel.
         
-        return Response({
-            'message': 'Export functionality will be implemented in future version',
-            'count': suppliers.count(),
-            'sample_data': serializer.data[:5]  # Return first 5 as sample
-        })
+        ``file_format`` is 'csv' (default) or 'xlsx'; ``background=true``
+        (or a very large result) queues an export job instead, answered with
+        202 and polled at ``export/jobs/<job_id>/``.
+        """
+        return exports.export_response(self, request)
+    
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[^/.]+)')
+    def export_job(self, request, job_id=None):
+        """Status of a background supplier export."""
+        return exports.job_status_response(self, request, job_id)
+    
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[^/.]+)/download')
+    def export_download(self, request, job_id=None):
+        """Download the file of a completed supplier export."""
+        return exports.job_download_response(self, request, job_id)
 
 
 
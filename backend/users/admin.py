@@ -92,9 +92,8 @@ if UserLocationMapping:
                 if not request.user.is_superuser:
                     # For non-superusers, only show locations they can access
                     user = request.user
-                    if hasattr(user, 'get_accessible_locations'):
-                        accessible_locations = user.get_accessible_locations()
-                        form.queryset = form.queryset.filter(id__in=accessible_locations)
+                    if hasattr(user, 'location_access'):
+                        form.queryset = user.location_access.filter(form.queryset, field='pk')
                 
                 return form
             return super().formfield_for_foreignkey(db_field, request, **kwargs)
@@ -109,6 +108,8 @@ if UserLocationMapping:
 # Import MenuItemType model for admin interface
 try:
     from .models import MenuItemType, UserPermission, GroupPermission
+    # Queryset updates send no signals; admin actions bump the permissions version themselves
+    from .services import versions
 except ImportError:
     MenuItemType = None
     UserPermission = None
@@ -254,6 +255,7 @@ if MenuItemType:
         def bulk_activate_menu_items(self, request, queryset):
             """Activate selected menu items"""
             updated = queryset.update(is_active=True)
+            versions.bump(versions.PERMISSIONS, versions.MENU)
             self.message_user(
                 request, 
                 f'Successfully activated {updated} menu item(s).', 
@@ -264,6 +266,7 @@ if MenuItemType:
         def bulk_deactivate_menu_items(self, request, queryset):
             """Deactivate selected menu items"""
             updated = queryset.update(is_active=False)
+            versions.bump(versions.PERMISSIONS, versions.MENU)
             self.message_user(
                 request, 
                 f'Successfully deactivated {updated} menu item(s).', 
@@ -379,6 +382,7 @@ if UserPermission:
                 can_edit=False, 
                 can_delete=False
             )
+            versions.bump(versions.PERMISSIONS)
             
             self.message_user(
                 request, 
@@ -406,6 +410,7 @@ if UserPermission:
                 can_edit=True, 
                 can_delete=True
             )
+            versions.bump(versions.PERMISSIONS)
             self.message_user(
                 request, 
                 f'Granted full access to {updated} permission(s).', 
@@ -422,6 +427,7 @@ if UserPermission:
                 can_edit=False, 
                 can_delete=False
             )
+            versions.bump(versions.PERMISSIONS)
             self.message_user(
                 request, 
                 f'Revoked access from {updated} permission(s).', 
@@ -495,6 +501,7 @@ if GroupPermission:
                 can_edit=False, 
                 can_delete=False
             )
+            versions.bump(versions.PERMISSIONS)
             
             self.message_user(
                 request, 
@@ -522,6 +529,7 @@ if GroupPermission:
                 can_edit=True, 
                 can_delete=True
             )
+            versions.bump(versions.PERMISSIONS)
             self.message_user(
                 request, 
                 f'Granted full access to {updated} role permission(s).', 
@@ -538,6 +546,7 @@ if GroupPermission:
                 can_edit=False, 
                 can_delete=False
             )
+            versions.bump(versions.PERMISSIONS)
             self.message_user(
                 request, 
                 f'Revoked access from {updated} role permission(s).', 
@@ -0,0 +1,150 @@
+"""
+Django management command to benchmark the role permissions Excel import on a
+synthetic menu: a full matrix is seeded, exported, edited (every Nth flag
+flipped) and imported again. Reports time and query counts of the old
+row-by-row update_or_create import, the dry-run diff and the diff-and-apply
+import.
+
+Everything runs inside a transaction that is rolled back.
+"""
+import tempfile
+import time
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from openpyxl import load_workbook
+
+from users.models import GroupPermission, MenuItemType
+from users.services import permission_matrix
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated menu and permissions."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the diff-and-apply role permissions import on a synthetic matrix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=300, help='Menu items in the matrix')
+        parser.add_argument('--change-every', type=int, default=10, help='Flip every Nth permission cell')
+        parser.add_argument('--skip-legacy', action='store_true', help='Skip the row-by-row baseline')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._benchmark(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _benchmark(self, options):
+        self._generate(options['menu_items'])
+        cells = options['menu_items'] * len(permission_matrix.ROLE_KEYS) * len(permission_matrix.PERMISSION_FIELDS)
+        self.stdout.write(
+            f'Matrix: {options["menu_items"]} menu items x {len(permission_matrix.ROLE_KEYS)} roles ({cells} flags)\n'
+        )
+
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as handle:
+            self._write_edited_matrix(handle.name, options['change_every'])
+            self.stdout.write(f'{"import":>22} {"seconds":>9} {"queries":>9} {"changed":>9}')
+
+            if not options['skip_legacy']:
+                sid = transaction.savepoint()
+                self._report('row by row', lambda: self._legacy_import(handle.name))
+                transaction.savepoint_rollback(sid)
+
+            self._report(
+                'dry run',
+                lambda: self._changed(permission_matrix.import_workbook(handle.name, dry_run=True))
+            )
+            self._report('diff and apply', lambda: self._changed(permission_matrix.import_workbook(handle.name)))
+            self._report(
+                'unchanged re-import',
+                lambda: self._changed(permission_matrix.import_workbook(handle.name))
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _generate(self, menu_items):
+        MenuItemType.objects.bulk_create([
+            MenuItemType(
+                menu_item_id=f'bench_menu_{index:05d}',
+                display_name=f'Benchmark Menu {index:05d}',
+                menu_type='master',
+                category=f'Benchmark {index % 10}',
+                path=f'/benchmark/{index}',
+            )
+            for index in range(menu_items)
+        ])
+        permission_matrix.plan({
+            role_key: {
+                f'bench_menu_{index:05d}': {
+                    field: (index + position) % 3 == 0
+                    for position, field in enumerate(permission_matrix.PERMISSION_FIELDS)
+                }
+                for index in range(menu_items)
+            }
+            for role_key in permission_matrix.ROLE_KEYS
+        }).apply()
+
+    def _write_edited_matrix(self, path, change_every):
+        with tempfile.TemporaryFile(suffix='.xlsx') as exported:
+            permission_matrix.build_workbook().save(exported)
+            exported.seek(0)
+            book = load_workbook(exported)
+        sheet = book.active
+        position = 0
+        for row in sheet.iter_rows(min_row=2):
+            if not str(row[0].value or '').startswith('Benchmark'):
+                continue
+            for cell in row[len(permission_matrix.FIXED_HEADERS):]:
+                position += 1
+                if change_every and position % change_every == 0:
+                    cell.value = '' if cell.value == permission_matrix.CHECK_MARK else permission_matrix.CHECK_MARK
+        book.save(path)
+
+    def _legacy_import(self, path):
+        """The import as it was: a menu item lookup and update_or_create per row and role."""
+        sheet = load_workbook(path).active
+        columns = {}
+        for index, title in enumerate(next(sheet.iter_rows(max_row=1, values_only=True))):
+            if isinstance(title, str) and ' - ' in title:
+                label, perm_label = title.split(' - ')
+                role_key = {v: k for k, v in permission_matrix.ROLE_LABELS.items()}.get(label)
+                if role_key and perm_label in permission_matrix.PERMISSION_LABELS:
+                    field = permission_matrix.PERMISSION_FIELDS[permission_matrix.PERMISSION_LABELS.index(perm_label)]
+                    columns.setdefault(role_key, {})[field] = index
+
+        written = 0
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            try:
+                menu_item = MenuItemType.objects.get(display_name=row[0])
+            except (MenuItemType.DoesNotExist, MenuItemType.MultipleObjectsReturned):
+                continue
+            for role_key, fields in columns.items():
+                group, _ = Group.objects.get_or_create(name=role_key)
+                GroupPermission.objects.update_or_create(
+                    group=group,
+                    role_key=role_key,
+                    menu_item=menu_item,
+                    defaults={field: row[index] in permission_matrix.TRUE_VALUES for field, index in fields.items()}
+                )
+                written += 1
+        return written
+
+    def _changed(self, report):
+        return report['created'] + report['updated'] + report['deleted']
+
+    def _report(self, label, runner):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            changed = runner()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label:>22} {elapsed:>9.2f} {queries[0]:>9} {changed:>9}')
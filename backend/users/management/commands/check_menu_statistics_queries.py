@@ -0,0 +1,108 @@
+"""
+Django management command guarding the menu statistics endpoint against
+per-item queries.
+
+The endpoint is requested against a small and a large generated menu, each
+time with an empty private cache (cold) and again with it filled (warm).
+Cold requests must run the same number of queries for both menus, within
+``--max-queries``; warm requests must run none. The generated rows are
+created inside a transaction that is rolled back.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from users.models import MenuItemType
+from users.services import permission_matrix
+from users.views import MenuStatisticsView
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard the generated menu."""
+
+
+# A cache private to the check, so it starts empty and leaves the real one alone
+CHECK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'check-menu-statistics-queries',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = 'Check that menu statistics run a constant number of queries, and none when cached'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=5, help='Menu items in the small menu')
+        parser.add_argument('--large', type=int, default=300, help='Menu items in the large menu')
+        parser.add_argument('--max-queries', type=int, default=5, help='Most queries allowed per cold request')
+
+    def handle(self, *args, **options):
+        counts = {}
+        for size in (options['small'], options['large']):
+            counts[size] = self._measure(size)
+
+        self.stdout.write(f'{"menu items":>10} {"cold":>6} {"warm":>6}')
+        for size, (cold, warm) in counts.items():
+            self.stdout.write(f'{size:>10} {cold:>6} {warm:>6}')
+
+        (small_cold, small_warm), (large_cold, large_warm) = counts[options['small']], counts[options['large']]
+        failures = []
+        if small_cold != large_cold:
+            failures.append(f'{small_cold} -> {large_cold} queries as the menu grows')
+        elif large_cold > options['max_queries']:
+            failures.append(f'{large_cold} queries (max {options["max_queries"]})')
+        if small_warm or large_warm:
+            failures.append(f'cached requests ran {max(small_warm, large_warm)} queries')
+
+        if failures:
+            raise CommandError('Query count regression:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Menu statistics run a constant number of queries'))
+
+    def _measure(self, size):
+        counts = []
+        try:
+            with transaction.atomic(), override_settings(CACHES=CHECK_CACHES):
+                cache.clear()
+                user = self._build_menu(size)
+                factory = APIRequestFactory()
+                for _ in ('cold', 'warm'):
+                    request = factory.get('/')
+                    force_authenticate(request, user=user)
+                    with CaptureQueriesContext(connection) as context:
+                        response = MenuStatisticsView.as_view()(request)
+                        response.render()
+                    if response.status_code != 200:
+                        raise CommandError(f'Menu statistics returned HTTP {response.status_code}')
+                    if response.data['overview']['total_menu_items'] < size:
+                        raise CommandError('Menu statistics missed generated menu items')
+                    counts.append(len(context.captured_queries))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return counts
+
+    def _build_menu(self, size):
+        user = User.objects.create_user(username='menu-statistics-check', password=None, role='admin')
+        MenuItemType.objects.bulk_create([
+            MenuItemType(
+                menu_item_id=f'query_check_{index:05d}',
+                display_name=f'Query Check {index}',
+                menu_type=MenuItemType.MENU_TYPE_CHOICES[index % len(MenuItemType.MENU_TYPE_CHOICES)][0],
+                category=f'Query Check {index % 7}',
+                path=f'/query-check/{index}',
+                is_active=index % 4 != 0,
+            )
+            for index in range(size)
+        ])
+        permission_matrix.plan({
+            'posuser': {f'query_check_{index:05d}': {'can_view': True} for index in range(0, size, 2)}
+        }).apply()
+        return user
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_alter_menuitemtype_options_menuitemtype_subcategory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PermissionVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=1, help_text='Incremented on every change in the scope')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Permission Version',
+                'verbose_name_plural': 'Permission Versions',
+                'db_table': 'permission_versions',
+            },
+        ),
+    ]
@@ -51,28 +51,20 @@ class User(AbstractUser):
     def get_accessible_locations(self):
         """
         Get locations this user can access based on their role.
-        Implements role-based location access rules.
+        Implements role-based location access rules:
+        - Admin: all locations
+        - BO Admin / BO User: all locations except headquarters
+        - POS Admin: all POS locations (stores only)
+        - POS User: only assigned POS locations from UserLocationMapping
+        The ids are resolved once and cached (users.services.location_access).
         """
-        from organization.models import Location
-        
-        if self.role == 'admin':
-            # Admin: All locations
-            return Location.objects.filter(is_active=True)
-        elif self.role == 'backofficemanager':
-            # BO Admin: All locations except headquarters
-            return Location.objects.filter(is_active=True).exclude(location_type='headquarters')
-        elif self.role == 'posmanager':
-            # POS Admin: All POS locations (stores only)
-            return Location.objects.filter(is_active=True, location_type='store')
-        elif self.role == 'backofficeuser':
-            # BO User: All locations except headquarters
-            return Location.objects.filter(is_active=True).exclude(location_type='headquarters')
-        elif self.role == 'posuser':
-            # POS User: Only assigned POS location from UserLocationMapping
-            return self.get_pos_user_locations()
-        else:
-            # Default: No access
-            return Location.objects.none()
+        return self.location_access.locations()
+    
+    @property
+    def location_access(self):
+        """Cached accessible-location set of this user (LocationAccess)."""
+        from .services.location_access import location_access
+        return location_access(self)
     
     def get_accessible_location_types(self):
         """
@@ -108,38 +100,15 @@ class User(AbstractUser):
         """
         Check if user can access a specific location based on their role.
         """
-        if not location or not location.is_active:
-            return False
-        
-        accessible_locations = self.get_accessible_locations()
-        return accessible_locations.filter(id=location.id).exists()
+        return self.location_access.allows(location)
     
     def get_default_location(self):
         """
         Get the default location for this user based on their role and mappings.
+        POS users get their default mapped POS location, falling back to the
+        first one; other roles get their first accessible location.
         """
-        if self.role == 'posuser':
-            # For POS users, get their assigned POS location
-            pos_locations = self.get_pos_user_locations()
-            if pos_locations.exists():
-                # Try to get the default mapped location first
-                from .models import UserLocationMapping
-                default_mapping = UserLocationMapping.objects.filter(
-                    user=self,
-                    access_type__in=['pos', 'both'],
-                    is_default=True,
-                    is_active=True
-                ).first()
-                
-                if default_mapping:
-                    return default_mapping.location
-                else:
-                    # Return first available POS location
-                    return pos_locations.first()
-        
-        # For other roles, return first accessible location
-        accessible_locations = self.get_accessible_locations()
-        return accessible_locations.first()
+        return self.location_access.default_location()
 
 
 class MenuItemType(models.Model):
@@ -471,3 +440,23 @@ class UserLocationMapping(models.Model):
         """Override save to run clean validation"""
         self.clean()
         super().save(*args, **kwargs)
+
+
+class PermissionVersion(models.Model):
+    """
+    Monotonic version of a set of access-control data, bumped on every
+    change to it. ``scope`` names the set (e.g. 'permissions' for the menu
+    permissions compiled per user); caches of derived data are keyed by it.
+    """
+    
+    scope = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=1, help_text="Incremented on every change in the scope")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'permission_versions'
+        verbose_name = 'Permission Version'
+        verbose_name_plural = 'Permission Versions'
+    
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
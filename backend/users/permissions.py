@@ -0,0 +1,52 @@
+"""
+DRF permission classes backed by the compiled menu permissions
+(``users.services.menu_permissions``).
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import BasePermission
+
+from .role_permissions import check_superuser_bypass
+
+
+class HasMenuPermission(BasePermission):
+    """
+    Allow a request when the user's effective permissions grant the view's
+    menu item for the request method.
+
+    The view names its menu item in ``menu_item_id`` and may override the
+    flag required per method with ``menu_permissions``, e.g.
+    ``{'POST': 'can_edit'}``. Superusers are always allowed.
+    """
+
+    METHOD_PERMISSIONS = {
+        'GET': 'can_view',
+        'HEAD': 'can_view',
+        'OPTIONS': 'can_view',
+        'POST': 'can_create',
+        'PUT': 'can_edit',
+        'PATCH': 'can_edit',
+        'DELETE': 'can_delete',
+    }
+    message = 'You do not have permission for this menu item.'
+
+    def required_permission(self, request, view):
+        overrides = getattr(view, 'menu_permissions', None) or {}
+        return overrides.get(request.method, self.METHOD_PERMISSIONS.get(request.method))
+
+    def has_permission(self, request, view):
+        menu_item_id = getattr(view, 'menu_item_id', None)
+        if not menu_item_id:
+            raise ImproperlyConfigured(f'{type(view).__name__} uses HasMenuPermission without a menu_item_id')
+
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if check_superuser_bypass(user):
+            return True
+
+        permission = self.required_permission(request, view)
+        if permission is None:
+            return False
+
+        from .services.menu_permissions import permission_map
+        return permission_map(user).allows(menu_item_id, permission)
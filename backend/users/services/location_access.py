@@ -0,0 +1,159 @@
+"""
+Accessible locations per user: the active locations the user's role grants
+(``User.get_accessible_locations``), resolved once into a set of ids and the
+user's default location.
+
+A resolved set is cached per user and role under the current 'locations'
+version (``versions.LOCATIONS``), which every Location and UserLocationMapping
+write bumps (``users.signals``). A role change needs no bump: the role is
+part of the cache key. Access checks are then set lookups, and viewsets
+restrict querysets with one ``IN`` over the cached ids.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versions
+
+
+CACHE_PREFIX = 'users:location_access'
+
+# Roles that reach locations by type rather than through UserLocationMapping
+EXCLUDED_TYPES = {
+    'admin': (),
+    'backofficemanager': ('headquarters',),
+    'backofficeuser': ('headquarters',),
+}
+INCLUDED_TYPES = {
+    'posmanager': ('store',),
+}
+MAPPED_ROLES = ('posuser',)
+POS_ACCESS_TYPES = ('pos', 'both')
+
+
+def _key(user_id, role, version):
+    return f'{CACHE_PREFIX}:{user_id}:{role}:{version}'
+
+
+def _ttl():
+    return getattr(settings, 'PERMISSION_CACHE_TTL', 3600)
+
+
+def _location_id(location):
+    """The id of a Location, or of its id or id string; None if it is neither."""
+    location_id = getattr(location, 'pk', location)
+    if isinstance(location_id, uuid.UUID):
+        return location_id
+    try:
+        return uuid.UUID(str(location_id))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class LocationAccess:
+    """
+    The locations a user can access. ``location_ids`` keeps the Location
+    ordering (company, name); ``default_id`` is the user's default location,
+    or None when they can access none.
+    """
+
+    __slots__ = ('version', 'role', 'location_ids', 'default_id', '_ids')
+
+    def __init__(self, version, role, location_ids, default_id):
+        self.version = version
+        self.role = role
+        self.location_ids = location_ids
+        self.default_id = default_id
+        self._ids = frozenset(location_ids)
+
+    def __contains__(self, location):
+        return _location_id(location) in self._ids
+
+    def __len__(self):
+        return len(self.location_ids)
+
+    def allows(self, location):
+        """Whether the user can access ``location`` (a Location, id or id string)."""
+        if location is None or getattr(location, 'is_active', True) is False:
+            return False
+        return location in self
+
+    def allowed_ids(self, locations):
+        """The ids among ``locations`` (Locations, ids or id strings) the user can access."""
+        return {
+            location_id for location_id in map(_location_id, locations)
+            if location_id in self._ids
+        }
+
+    def filter(self, queryset, field='location'):
+        """
+        ``queryset`` restricted to rows whose ``field`` is an accessible
+        location; pass ``field='pk'`` for a Location queryset.
+        """
+        if not self.location_ids:
+            return queryset.none()
+        return queryset.filter(**{f'{field}__in': self.location_ids})
+
+    def locations(self):
+        """The accessible locations as a Location queryset."""
+        from organization.models import Location
+        return self.filter(Location.objects.all(), field='pk')
+
+    def default_location(self):
+        """The default Location, or None."""
+        if self.default_id is None:
+            return None
+        from organization.models import Location
+        return Location.objects.filter(pk=self.default_id).first()
+
+
+def resolve(user):
+    """(location_ids, default_id) for ``user``, in one query."""
+    from organization.models import Location
+    from ..models import UserLocationMapping
+
+    if user.role in MAPPED_ROLES:
+        # Mapped POS locations; a default mapping decides the default location
+        rows = UserLocationMapping.objects.filter(
+            user_id=user.pk,
+            access_type__in=POS_ACCESS_TYPES,
+            is_active=True,
+            location__is_active=True
+        ).order_by('location__company', 'location__name').values_list('location_id', 'is_default')
+        location_ids, default_id = [], None
+        for location_id, is_default in rows:
+            if location_id not in location_ids:
+                location_ids.append(location_id)
+            if is_default and default_id is None:
+                default_id = location_id
+        return tuple(location_ids), default_id or next(iter(location_ids), None)
+
+    if user.role in EXCLUDED_TYPES:
+        locations = Location.objects.filter(is_active=True).exclude(location_type__in=EXCLUDED_TYPES[user.role])
+    elif user.role in INCLUDED_TYPES:
+        locations = Location.objects.filter(is_active=True, location_type__in=INCLUDED_TYPES[user.role])
+    else:
+        return (), None
+    location_ids = tuple(locations.values_list('id', flat=True))
+    return location_ids, next(iter(location_ids), None)
+
+
+def location_access(user):
+    """
+    The user's LocationAccess: kept on the user object for the rest of the
+    request, then read from the cache, resolved on a miss.
+    """
+    version = versions.current(versions.LOCATIONS)
+    resolved = getattr(user, '_location_access', None)
+    if resolved is not None and resolved.version == version and resolved.role == user.role:
+        return resolved
+
+    key = _key(user.pk, user.role, version)
+    cached = cache.get(key)
+    if cached is None:
+        cached = resolve(user)
+        cache.set(key, cached, _ttl())
+    resolved = LocationAccess(version, user.role, *cached)
+    user._location_access = resolved
+    return resolved
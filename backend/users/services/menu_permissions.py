@@ -0,0 +1,119 @@
+"""
+Compiled menu permissions per user: the user's own UserPermission rows
+merged over the GroupPermission rows of their groups, restricted to active
+menu items.
+
+A compiled map is cached per user under the current 'permissions' version
+(``versions.PERMISSIONS``), which every UserPermission, GroupPermission,
+MenuItemType or group membership change bumps (``users.signals``; bulk
+writes call ``versions.bump`` themselves). Checking a permission is then a
+dict lookup; a warm request runs no queries beyond the version lookup, and
+none at all while the version is cached.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import GroupPermission, MenuItemType, UserPermission
+from . import versions
+from .permission_matrix import PERMISSION_FIELDS
+
+
+CACHE_PREFIX = 'users:menu_permissions'
+
+USER_SOURCE = 'user_permission'
+ROLE_SOURCE = 'role_permission'
+
+# Position of each flag in a compiled entry: (*flags, override, source)
+_FIELD_INDEX = {field: index for index, field in enumerate(PERMISSION_FIELDS)}
+_OVERRIDE = len(PERMISSION_FIELDS)
+_SOURCE = _OVERRIDE + 1
+
+
+def _key(user_id, version):
+    return f'{CACHE_PREFIX}:{user_id}:{version}'
+
+
+def _ttl():
+    return getattr(settings, 'PERMISSION_CACHE_TTL', 3600)
+
+
+class PermissionMap:
+    """
+    A user's effective permissions by menu item id. ``entries`` maps a menu
+    item id to ``(can_access, can_view, can_create, can_edit, can_delete,
+    override, source)``; ``override`` is None for role permissions.
+    """
+
+    __slots__ = ('version', 'entries', 'active_menu_items')
+
+    def __init__(self, version, entries, active_menu_items):
+        self.version = version
+        self.entries = entries
+        self.active_menu_items = active_menu_items
+
+    def __contains__(self, menu_item_id):
+        return menu_item_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def allows(self, menu_item_id, permission='can_access'):
+        """Whether ``permission`` (a PERMISSION_FIELDS name) is granted on the menu item."""
+        entry = self.entries.get(menu_item_id)
+        return entry is not None and entry[_FIELD_INDEX[permission]]
+
+    def get(self, menu_item_id):
+        """The menu item's permissions as a dict, or None."""
+        entry = self.entries.get(menu_item_id)
+        if entry is None:
+            return None
+        permissions = {field: entry[index] for field, index in _FIELD_INDEX.items()}
+        if entry[_SOURCE] == USER_SOURCE:
+            permissions['override'] = entry[_OVERRIDE]
+        permissions['source'] = entry[_SOURCE]
+        return permissions
+
+    def as_dict(self):
+        return {menu_item_id: self.get(menu_item_id) for menu_item_id in self.entries}
+
+
+def compile_permissions(user):
+    """(entries, active_menu_items) for ``user``, in three queries."""
+    active_menu_items = list(MenuItemType.objects.filter(is_active=True).values_list('menu_item_id', flat=True))
+
+    entries = {}
+    user_rows = UserPermission.objects.filter(user_id=user.pk, menu_item__is_active=True).values_list(
+        'menu_item_id', *PERMISSION_FIELDS, 'override'
+    )
+    for menu_item_id, *flags in user_rows:
+        entries[menu_item_id] = (*flags, USER_SOURCE)
+
+    # User permissions take priority; the first role permission of a menu item wins
+    role_rows = GroupPermission.objects.filter(
+        group_id__in=user.groups.values('pk'),
+        menu_item__is_active=True
+    ).order_by('pk').values_list('menu_item_id', *PERMISSION_FIELDS)
+    for menu_item_id, *flags in role_rows:
+        if menu_item_id not in entries:
+            entries[menu_item_id] = (*flags, None, ROLE_SOURCE)
+    return entries, active_menu_items
+
+
+def permission_map(user):
+    """
+    The user's compiled PermissionMap: kept on the user object for the rest
+    of the request, then read from the cache, compiled on a miss.
+    """
+    version = versions.current(versions.PERMISSIONS)
+    compiled = getattr(user, '_menu_permission_map', None)
+    if compiled is not None and compiled.version == version:
+        return compiled
+
+    key = _key(user.pk, version)
+    cached = cache.get(key)
+    if cached is None:
+        cached = compile_permissions(user)
+        cache.set(key, cached, _ttl())
+    compiled = PermissionMap(version, *cached)
+    user._menu_permission_map = compiled
+    return compiled
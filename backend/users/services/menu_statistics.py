@@ -0,0 +1,81 @@
+"""
+Menu statistics for the admin dashboard (``MenuStatisticsView``).
+
+The menu breakdown comes from one GROUP BY over (category, menu_type,
+is_active), folded in Python into the overview, per-category and per-type
+counts. It is cached under the 'menu' version; the permission counts are
+cached under the 'permissions' version (``users.services.versions``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from ..models import GroupPermission, MenuItemType, UserPermission
+from . import versions
+
+
+CACHE_PREFIX = 'users:menu_statistics'
+
+
+def _ttl():
+    return getattr(settings, 'PERMISSION_CACHE_TTL', 3600)
+
+
+def _cached(name, scope, compute):
+    key = f'{CACHE_PREFIX}:{name}:{versions.current(scope)}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, _ttl())
+    return value
+
+
+def _counter():
+    return {'total': 0, 'active': 0, 'inactive': 0}
+
+
+def menu_breakdown():
+    """Overview, by_category and by_menu_type counts from one grouped query."""
+    rows = MenuItemType.objects.order_by().values_list('category', 'menu_type', 'is_active').annotate(
+        count=Count('id')
+    )
+    total = active = 0
+    by_category, by_menu_type = {}, {}
+    for category, menu_type, is_active, count in rows:
+        state = 'active' if is_active else 'inactive'
+        for breakdown, key in ((by_category, category or 'Other'), (by_menu_type, menu_type or 'UNKNOWN')):
+            counter = breakdown.setdefault(key, _counter())
+            counter['total'] += count
+            counter[state] += count
+        total += count
+        if is_active:
+            active += count
+
+    return {
+        'overview': {
+            'total_menu_items': total,
+            'active_menu_items': active,
+            'inactive_menu_items': total - active,
+            'active_percentage': round((active / total * 100) if total > 0 else 0, 1)
+        },
+        'by_category': by_category,
+        'by_menu_type': by_menu_type,
+    }
+
+
+def permission_counts():
+    user_permissions = UserPermission.objects.count()
+    group_permissions = GroupPermission.objects.count()
+    return {
+        'user_permissions': user_permissions,
+        'group_permissions': group_permissions,
+        'total_permissions': user_permissions + group_permissions
+    }
+
+
+def statistics():
+    """The menu statistics document, without the timestamp."""
+    return {
+        **_cached('menu', versions.MENU, menu_breakdown),
+        'permissions': _cached('permissions', versions.PERMISSIONS, permission_counts),
+    }
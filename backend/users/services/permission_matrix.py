@@ -0,0 +1,392 @@
+"""
+Role permission matrix: every menu item against every role's GroupPermission
+flags, as exchanged with administrators in the role permissions workbook.
+
+The matrix is loaded with one query for the menu items and one for the
+permissions of all roles (rather than one per role), and written with the
+write-only sheet of ``utils.spreadsheets``.
+
+Changes to the matrix (an imported workbook, the bulk role permission
+endpoint, a role template) go through ``plan``: the wanted flags are diffed
+in memory against the current rows of the affected roles, and ``Plan.apply``
+writes only the differences with one bulk_create, one bulk_update and at
+most one delete, then bumps the permissions version once. A plan's
+``report`` doubles as a dry-run diff. ``plan_users`` does the same for
+per-user UserPermission overrides (the bulk user permission endpoint).
+"""
+from collections import namedtuple
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from utils import spreadsheets
+
+from ..models import GroupPermission, MenuItemType, User, UserPermission
+from . import versions
+
+
+ROLE_KEYS = [key for key, _ in User.ROLE_CHOICES]
+ROLE_LABELS = dict(User.ROLE_CHOICES)
+
+PERMISSION_FIELDS = ['can_access', 'can_view', 'can_create', 'can_edit', 'can_delete']
+PERMISSION_LABELS = ['Access', 'View', 'Create', 'Edit', 'Delete']
+
+# UserPermission rows also carry the override flag
+USER_PERMISSION_FIELDS = PERMISSION_FIELDS + ['override']
+
+FIXED_HEADERS = ['Menu Item', 'Category', 'Subcategory']
+CHECK_MARK = '✓'
+
+FILE_NAME = 'role_permissions_template.xlsx'
+
+BATCH_SIZE = 500
+
+# Cell values read as a granted permission
+TRUE_VALUES = (CHECK_MARK, 'YES', True, 1)
+
+# One GroupPermission write; before/after are flag tuples in PERMISSION_FIELDS order
+Change = namedtuple('Change', 'action role_key menu_item_id before after')
+
+# A parsed workbook: the ``plan`` input, Menu Item names matching no or several
+# menu items, and the ids of the latter (never deleted by a replacing import)
+Upload = namedtuple('Upload', 'wanted unmatched ambiguous ambiguous_ids')
+
+
+def headers():
+    """Column titles: the menu item columns, then '<Role> - <Permission>' per role."""
+    return FIXED_HEADERS + [
+        f'{ROLE_LABELS[role_key]} - {label}'
+        for role_key in ROLE_KEYS
+        for label in PERMISSION_LABELS
+    ]
+
+
+def menu_items():
+    """(menu_item_id, display_name, category, transaction_subtype) rows in sheet order."""
+    return MenuItemType.objects.order_by('category', 'display_name').values_list(
+        'menu_item_id', 'display_name', 'category', 'transaction_subtype'
+    )
+
+
+def load_permissions(role_keys=ROLE_KEYS):
+    """{role_key: {menu_item_id: (can_access, ..., can_delete)}} in one query."""
+    matrix = {role_key: {} for role_key in role_keys}
+    rows = GroupPermission.objects.filter(role_key__in=role_keys).order_by('pk').values_list(
+        'role_key', 'menu_item_id', *PERMISSION_FIELDS
+    )
+    for role_key, menu_item_id, *flags in rows:
+        matrix[role_key][menu_item_id] = tuple(flags)
+    return matrix
+
+
+def build_workbook():
+    """The role permissions workbook, one row per menu item."""
+    book = spreadsheets.workbook()
+    sheet = spreadsheets.Sheet(book, 'Role Permissions', widths=[30, 25, 20], freeze='D2')
+    sheet.row(headers(), style='header_rotated')
+
+    permissions = load_permissions()
+    blank = (False,) * len(PERMISSION_FIELDS)
+    flag_styles = ['check'] * (len(ROLE_KEYS) * len(PERMISSION_FIELDS))
+    for menu_item_id, display_name, category, subtype in menu_items().iterator():
+        values = [display_name, category or '', subtype or '']
+        for role_key in ROLE_KEYS:
+            flags = permissions[role_key].get(menu_item_id, blank)
+            values.extend(CHECK_MARK if flag else '' for flag in flags)
+        sheet.row(values, styles=['bordered'] * len(FIXED_HEADERS) + flag_styles)
+    return book
+
+
+def export_response():
+    """The role permissions workbook as a file download."""
+    return spreadsheets.workbook_response(build_workbook(), FILE_NAME)
+
+
+def _flags(values):
+    return {field: flag for field, flag in zip(PERMISSION_FIELDS, values)}
+
+
+def _granted(value):
+    return value in TRUE_VALUES
+
+
+class Plan:
+    """
+    The GroupPermission writes that bring the given roles to the wanted
+    flags. ``changes`` lists the creates, updates and deletes; rows already
+    matching are only counted in ``unchanged``.
+    """
+
+    def __init__(self, roles):
+        self.roles = roles
+        self.changes = []
+        self.unchanged = 0
+        self.unknown = []
+        self.ambiguous = []
+        self._update_pks = {}
+        self._delete_pks = []
+
+    def count(self, action):
+        return sum(1 for change in self.changes if change.action == action)
+
+    def report(self):
+        """Summary and per-row diff of the plan."""
+        return {
+            'roles': self.roles,
+            'created': self.count('create'),
+            'updated': self.count('update'),
+            'deleted': self.count('delete'),
+            'unchanged': self.unchanged,
+            'unknown_menu_items': self.unknown,
+            'ambiguous_menu_items': self.ambiguous,
+            'changes': [
+                {
+                    'action': change.action,
+                    'role_key': change.role_key,
+                    'menu_item_id': change.menu_item_id,
+                    'before': _flags(change.before) if change.before is not None else None,
+                    'after': _flags(change.after) if change.after is not None else None,
+                }
+                for change in self.changes
+            ],
+        }
+
+    @transaction.atomic
+    def apply(self):
+        """Write the plan; returns ``report()``."""
+        if not self.changes:
+            return self.report()
+        with versions.batch(versions.PERMISSIONS):
+            self._write()
+        return self.report()
+
+    def _write(self):
+        groups = _groups(self.roles)
+        now = timezone.now()
+        creates, updates = [], []
+        for change in self.changes:
+            if change.action == 'create':
+                creates.append(GroupPermission(
+                    group=groups[change.role_key],
+                    role_key=change.role_key,
+                    menu_item_id=change.menu_item_id,
+                    **_flags(change.after)
+                ))
+            elif change.action == 'update':
+                updates.append(GroupPermission(
+                    pk=self._update_pks[change.role_key, change.menu_item_id],
+                    role_key=change.role_key,
+                    updated_at=now,
+                    **_flags(change.after)
+                ))
+
+        if creates:
+            GroupPermission.objects.bulk_create(creates, batch_size=BATCH_SIZE)
+        if updates:
+            GroupPermission.objects.bulk_update(
+                updates, PERMISSION_FIELDS + ['role_key', 'updated_at'], batch_size=BATCH_SIZE
+            )
+        if self._delete_pks:
+            GroupPermission.objects.filter(pk__in=self._delete_pks).delete()
+
+
+def _groups(role_keys):
+    """{role_key: Group}, creating missing groups (each role has a group of the same name)."""
+    groups = {group.name: group for group in Group.objects.filter(name__in=role_keys)}
+    missing = [Group(name=role_key) for role_key in role_keys if role_key not in groups]
+    if missing:
+        Group.objects.bulk_create(missing, ignore_conflicts=True)
+        groups = {group.name: group for group in Group.objects.filter(name__in=role_keys)}
+    return groups
+
+
+def plan(wanted, replace=False, keep=()):
+    """
+    Diff ``wanted`` -- {role_key: {menu_item_id: {field: bool}}} -- against
+    the current permissions of its roles. Fields left out of a menu item's
+    dict keep their current value (False for new rows); menu items left out
+    of a role are kept, or deleted with ``replace`` unless listed in
+    ``keep``. Unknown menu item ids are skipped and listed in the plan.
+    """
+    roles = list(wanted)
+    result = Plan(roles)
+    requested = {menu_item_id for items in wanted.values() for menu_item_id in items}
+    known = set(MenuItemType.objects.filter(menu_item_id__in=requested).values_list('menu_item_id', flat=True))
+    result.unknown = sorted(requested - known)
+
+    # Rows are unique per (group, menu item); each role's group is named after it
+    current = {}
+    rows = GroupPermission.objects.filter(group__name__in=roles).values_list(
+        'pk', 'group__name', 'role_key', 'menu_item_id', *PERMISSION_FIELDS
+    )
+    for pk, role_key, stored_role_key, menu_item_id, *flags in rows:
+        current[role_key, menu_item_id] = (pk, stored_role_key, tuple(flags))
+
+    for role_key in roles:
+        items = wanted[role_key]
+        for menu_item_id in sorted(items):
+            if menu_item_id not in known:
+                continue
+            fields = items[menu_item_id]
+            existing = current.get((role_key, menu_item_id))
+            before = existing[2] if existing else None
+            after = tuple(
+                bool(fields[field]) if field in fields else (before[index] if before else False)
+                for index, field in enumerate(PERMISSION_FIELDS)
+            )
+            if existing is None:
+                result.changes.append(Change('create', role_key, menu_item_id, None, after))
+            elif after != before or existing[1] != role_key:
+                result.changes.append(Change('update', role_key, menu_item_id, before, after))
+                result._update_pks[role_key, menu_item_id] = existing[0]
+            else:
+                result.unchanged += 1
+
+        if replace:
+            for (current_role, menu_item_id), (pk, _, flags) in sorted(current.items()):
+                if current_role == role_key and menu_item_id not in items and menu_item_id not in keep:
+                    result.changes.append(Change('delete', role_key, menu_item_id, flags, None))
+                    result._delete_pks.append(pk)
+    return result
+
+
+class UserPlan:
+    """
+    The UserPermission rows to create and update so the given users get the
+    wanted flags; rows already matching are only counted in ``unchanged``.
+    """
+
+    def __init__(self, created_by=None):
+        self.created_by = created_by
+        self.creates = []
+        self.updates = []
+        self.unchanged = 0
+
+    def report(self):
+        return {'created': len(self.creates), 'updated': len(self.updates), 'unchanged': self.unchanged}
+
+    @transaction.atomic
+    def apply(self):
+        """Write the plan; returns ``report()``."""
+        if not (self.creates or self.updates):
+            return self.report()
+        with versions.batch(versions.PERMISSIONS):
+            if self.creates:
+                UserPermission.objects.bulk_create(self.creates, batch_size=BATCH_SIZE)
+            if self.updates:
+                UserPermission.objects.bulk_update(
+                    self.updates, USER_PERMISSION_FIELDS + ['created_by', 'updated_at'], batch_size=BATCH_SIZE
+                )
+        return self.report()
+
+
+def plan_users(wanted, created_by=None):
+    """
+    Diff ``wanted`` -- {user_id: {menu_item_id: {field: bool}}} over
+    ``USER_PERMISSION_FIELDS`` -- against the users' current UserPermission
+    rows, with one query each for users, menu items and permissions. Fields
+    left out are False; unknown users and menu items are skipped. Written
+    rows get ``created_by``.
+    """
+    result = UserPlan(created_by)
+    users = set(User.objects.filter(pk__in=list(wanted)).values_list('pk', flat=True))
+    requested = {menu_item_id for items in wanted.values() for menu_item_id in items}
+    known = set(MenuItemType.objects.filter(menu_item_id__in=requested).values_list('menu_item_id', flat=True))
+
+    current = {}
+    rows = UserPermission.objects.filter(user_id__in=users).values_list(
+        'pk', 'user_id', 'menu_item_id', *USER_PERMISSION_FIELDS
+    )
+    for pk, user_id, menu_item_id, *flags in rows:
+        current[user_id, menu_item_id] = (pk, tuple(flags))
+
+    now = timezone.now()
+    for user_id, items in wanted.items():
+        if user_id not in users:
+            continue
+        for menu_item_id in sorted(items):
+            if menu_item_id not in known:
+                continue
+            after = tuple(bool(items[menu_item_id].get(field, False)) for field in USER_PERMISSION_FIELDS)
+            flags = dict(zip(USER_PERMISSION_FIELDS, after))
+            existing = current.get((user_id, menu_item_id))
+            if existing is None:
+                result.creates.append(UserPermission(
+                    user_id=user_id, menu_item_id=menu_item_id, created_by=created_by, **flags
+                ))
+            elif existing[1] != after:
+                result.updates.append(UserPermission(
+                    pk=existing[0], created_by=created_by, updated_at=now, **flags
+                ))
+            else:
+                result.unchanged += 1
+    return result
+
+
+def read_workbook(source):
+    """
+    Parse a role permissions workbook (the ``build_workbook`` layout) into an
+    ``Upload``. Menu items are matched by display name; only the
+    role/permission columns present in the header are read.
+    """
+    book = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = book.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+
+        roles_by_label = {label: role_key for role_key, label in ROLE_LABELS.items()}
+        columns = {}
+        for index, title in enumerate(header):
+            if not isinstance(title, str) or ' - ' not in title:
+                continue
+            parts = title.split(' - ')
+            if len(parts) != 2:
+                continue
+            role_key = roles_by_label.get(parts[0].strip())
+            perm_label = parts[1].strip()
+            if role_key and perm_label in PERMISSION_LABELS:
+                field = PERMISSION_FIELDS[PERMISSION_LABELS.index(perm_label)]
+                columns.setdefault(role_key, {})[field] = index
+
+        sheet_rows = [(row[0], row) for row in rows if row and row[0]]
+    finally:
+        book.close()
+
+    names = {name for name, _ in sheet_rows}
+    ids_by_name = {}
+    for menu_item_id, display_name in MenuItemType.objects.filter(display_name__in=names).values_list(
+        'menu_item_id', 'display_name'
+    ):
+        ids_by_name.setdefault(display_name, []).append(menu_item_id)
+
+    wanted = {role_key: {} for role_key in columns}
+    unmatched, ambiguous, ambiguous_ids = set(), set(), set()
+    for name, row in sheet_rows:
+        matches = ids_by_name.get(name, [])
+        if len(matches) != 1:
+            (ambiguous if matches else unmatched).add(str(name))
+            ambiguous_ids.update(matches)
+            continue
+        for role_key, fields in columns.items():
+            wanted[role_key][matches[0]] = {
+                field: _granted(row[index] if index < len(row) else None)
+                for field, index in fields.items()
+            }
+    return Upload(wanted, sorted(unmatched), sorted(ambiguous), ambiguous_ids)
+
+
+def import_workbook(source, dry_run=False, replace=False):
+    """
+    Plan (and unless ``dry_run``, apply) the permissions in an uploaded
+    workbook; returns the plan report. With ``replace``, permissions of the
+    imported roles for menu items missing from the sheet are deleted.
+    """
+    upload = read_workbook(source)
+    result = plan(upload.wanted, replace=replace, keep=upload.ambiguous_ids)
+    result.unknown = upload.unmatched
+    result.ambiguous = upload.ambiguous
+    report = result.report() if dry_run else result.apply()
+    report['dry_run'] = dry_run
+    return report
@@ -0,0 +1,100 @@
+"""
+Version counters of access-control data (PermissionVersion rows, one per
+scope). Caches of data derived from a scope are keyed by its version, so a
+change never has to find and delete cached entries: ``bump`` moves the
+version on and the next lookup misses.
+
+The current version is itself cached for ``settings.PERMISSION_VERSION_TTL``
+seconds and dropped when the bumping transaction commits. With a cache shared
+between processes a bump is seen everywhere at once; with a per-process cache
+other processes see it within that TTL.
+
+Model signals call ``changed`` once per row; bulk writes run inside
+``batch`` so the scope is bumped once for all their rows.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from ..models import PermissionVersion
+
+
+CACHE_PREFIX = 'users:version'
+
+# Menu permissions (UserPermission, GroupPermission, MenuItemType, group membership)
+PERMISSIONS = 'permissions'
+# Menu items alone (MenuItemType)
+MENU = 'menu'
+# Location access (Location, UserLocationMapping)
+LOCATIONS = 'locations'
+
+_batches = threading.local()
+
+
+def _key(scope):
+    return f'{CACHE_PREFIX}:{scope}'
+
+
+def _ttl():
+    return getattr(settings, 'PERMISSION_VERSION_TTL', 10)
+
+
+def current(scope):
+    """The scope's version (0 before its first change)."""
+    key = _key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = PermissionVersion.objects.filter(scope=scope).values_list('version', flat=True).first() or 0
+        cache.set(key, version, _ttl())
+    return version
+
+
+def bump(*scopes):
+    """
+    Increment the version of each scope. Runs inside the caller's
+    transaction; the cached versions are dropped once it commits.
+    """
+    rows = PermissionVersion.objects.filter(scope__in=scopes)
+    missing = set(scopes) - set(rows.values_list('scope', flat=True))
+    if missing:
+        # Created at 0 and bumped below with the rest, so concurrent first writes both count
+        PermissionVersion.objects.bulk_create(
+            [PermissionVersion(scope=scope, version=0) for scope in missing],
+            ignore_conflicts=True
+        )
+    rows.update(version=F('version') + 1)
+
+    keys = [_key(scope) for scope in scopes]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def changed(*scopes):
+    """Bump ``scopes`` for a single change, except those with an open ``batch``."""
+    batched = getattr(_batches, 'scopes', ())
+    scopes = [scope for scope in scopes if scope not in batched]
+    if scopes:
+        bump(*scopes)
+
+
+@contextmanager
+def batch(*scopes):
+    """
+    Bump ``scopes`` once when the block exits instead of on every change
+    inside it. A block that fails outside a transaction may have written
+    some rows, so it bumps too; inside one, its writes are rolled back.
+    """
+    outer = getattr(_batches, 'scopes', frozenset())
+    _batches.scopes = outer | set(scopes)
+    try:
+        yield
+    except Exception:
+        _batches.scopes = outer
+        if not transaction.get_connection().in_atomic_block:
+            bump(*scopes)
+        raise
+    _batches.scopes = outer
+    bump(*scopes)
@@ -0,0 +1,68 @@
+"""
+Bump the 'permissions' version (``users.services.versions``) on every change
+that affects compiled menu permissions (``users.services.menu_permissions``):
+UserPermission, GroupPermission and MenuItemType writes and group membership.
+MenuItemType writes also bump the 'menu' version (menu statistics), and
+Location and UserLocationMapping writes the 'locations' version (accessible
+locations, ``users.services.location_access``).
+
+Queryset ``update()`` and ``bulk_create``/``bulk_update`` send no signals;
+code that uses them on these models runs inside ``versions.batch``, which
+also collapses the per-row signals of a bulk delete into one bump.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .models import GroupPermission, MenuItemType, UserLocationMapping, UserPermission
+
+
+MEMBERSHIP_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+def bump_permissions_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    from .services import versions
+    versions.changed(versions.PERMISSIONS)
+
+
+def bump_menu_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    from .services import versions
+    versions.changed(versions.PERMISSIONS, versions.MENU)
+
+
+def bump_locations_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    from .services import versions
+    versions.changed(versions.LOCATIONS)
+
+
+def bump_on_membership_change(sender, action, **kwargs):
+    if action in MEMBERSHIP_ACTIONS:
+        bump_permissions_version(sender)
+
+
+def connect_permission_versions():
+    for model in (UserPermission, GroupPermission):
+        name = model.__name__.lower()
+        post_save.connect(bump_permissions_version, sender=model, dispatch_uid=f'users.versions.{name}_save')
+        post_delete.connect(bump_permissions_version, sender=model, dispatch_uid=f'users.versions.{name}_delete')
+    post_save.connect(bump_menu_version, sender=MenuItemType, dispatch_uid='users.versions.menuitemtype_save')
+    post_delete.connect(bump_menu_version, sender=MenuItemType, dispatch_uid='users.versions.menuitemtype_delete')
+    m2m_changed.connect(
+        bump_on_membership_change,
+        sender=get_user_model().groups.through,
+        dispatch_uid='users.versions.group_membership'
+    )
+
+
+def connect_location_versions():
+    from organization.models import Location
+
+    for model in (Location, UserLocationMapping):
+        name = model.__name__.lower()
+        post_save.connect(bump_locations_version, sender=model, dispatch_uid=f'users.versions.{name}_save')
+        post_delete.connect(bump_locations_version, sender=model, dispatch_uid=f'users.versions.{name}_delete')
@@ -5,10 +5,6 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 import json
 from .serializers import (
     UserSerializer, 
@@ -36,7 +32,6 @@ except (ImportError, AttributeError) as e:
     RolePOSFunctionMapping = None
     POSFunctionSerializer = None
     RolePOSFunctionMappingSerializer = None
-from django.contrib.auth.models import Group
 from .role_permissions import apply_role_template_to_user, get_role_permissions
 
 User = get_user_model()
@@ -244,42 +239,14 @@ class BulkUserPermissionView(APIView):
         serializer = BulkUserPermissionSerializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
         
-        created_count = 0
-        updated_count = 0
-        
+        # Later entries for the same user extend or override earlier ones
+        from .services import permission_matrix
+        wanted = {}
         for item in serializer.validated_data:
-            user_id = item['user_id']
-            permissions_data = item['permissions']
-            
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
-                continue
-            
-            for menu_item_id, perms in permissions_data.items():
-                try:
-                    menu_item = MenuItemType.objects.get(menu_item_id=menu_item_id)
-                except MenuItemType.DoesNotExist:
-                    continue
-                
-                permission, created = UserPermission.objects.update_or_create(
-                    user=user,
-                    menu_item=menu_item,
-                    defaults={
-                    'can_access': perms.get('can_access', False),
-                    'can_view': perms.get('can_view', False),
-                    'can_create': perms.get('can_create', False),
-                    'can_edit': perms.get('can_edit', False),
-                    'can_delete': perms.get('can_delete', False),
-                        'override': perms.get('override', False),
-                        'created_by': request.user,
-                    }
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+            wanted.setdefault(item['user_id'], {}).update(item['permissions'])
+        report = permission_matrix.plan_users(wanted, created_by=request.user).apply()
+        created_count = report['created']
+        updated_count = report['updated'] + report['unchanged']
         
         return Response({
             'message': 'Permissions updated successfully',
@@ -592,40 +559,16 @@ class BulkRolePermissionView(APIView):
         serializer = BulkRolePermissionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        permissions_data = serializer.validated_data['permissions']
-        created_count = 0
-        updated_count = 0
-        
-        for role_perm_data in permissions_data:
-            role_key = role_perm_data['role_key']
-            role_permissions = role_perm_data['permissions']
-            
-            # Get or create Django Group for this role
-            group, _ = Group.objects.get_or_create(name=role_key)
-            
-            for menu_item_id, perms in role_permissions.items():
-                try:
-                    menu_item = MenuItemType.objects.get(menu_item_id=menu_item_id)
-                except MenuItemType.DoesNotExist:
-                    continue
-                
-                permission, created = GroupPermission.objects.update_or_create(
-                    group=group,
-                    role_key=role_key,
-                    menu_item=menu_item,
-                    defaults={
-                        'can_access': perms.get('can_access', False),
-                        'can_view': perms.get('can_view', False),
-                        'can_create': perms.get('can_create', False),
-                        'can_edit': perms.get('can_edit', False),
-                        'can_delete': perms.get('can_delete', False),
-                    }
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+        from .services import permission_matrix
+        wanted = {}
+        for role_perm_data in serializer.validated_data['permissions']:
+            wanted.setdefault(role_perm_data['role_key'], {}).update({
+                menu_item_id: {field: perms.get(field, False) for field in permission_matrix.PERMISSION_FIELDS}
+                for menu_item_id, perms in role_perm_data['permissions'].items()
+            })
+        report = permission_matrix.plan(wanted).apply()
+        created_count = report['created']
+        updated_count = report['updated'] + report['unchanged']
         
         return Response({
             'message': 'Role permissions updated successfully',
@@ -671,36 +614,16 @@ class ApplyRoleTemplateToRoleView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get or create Django Group for this role
-        group, _ = Group.objects.get_or_create(name=role_key)
-        
-        created_count = 0
-        updated_count = 0
-        
-        for menu_item_id, perms in template_permissions.items():
-            try:
-                menu_item = MenuItemType.objects.get(menu_item_id=menu_item_id)
-            except MenuItemType.DoesNotExist:
-                # Skip hidden menu items that don't exist in database
-                continue
-            
-            permission, created = GroupPermission.objects.update_or_create(
-                group=group,
-                role_key=role_key,
-                menu_item=menu_item,
-                defaults={
-                    'can_access': perms.get('can_access', False),
-                    'can_view': perms.get('can_view', False),
-                    'can_create': perms.get('can_create', False),
-                    'can_edit': perms.get('can_edit', False),
-                    'can_delete': perms.get('can_delete', False),
-                }
-            )
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        # Hidden menu items that don't exist in database are skipped
+        from .services import permission_matrix
+        report = permission_matrix.plan({
+            role_key: {
+                menu_item_id: {field: perms.get(field, False) for field in permission_matrix.PERMISSION_FIELDS}
+                for menu_item_id, perms in template_permissions.get('menu_items', {}).items()
+            }
+        }).apply()
+        created_count = report['created']
+        updated_count = report['updated'] + report['unchanged']
         
         return Response({
             'message': f'Role template "{template_to_apply}" applied successfully to role "{role_key}"',
@@ -724,112 +647,20 @@ class ExportRolePermissionsExcelView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get all menu items from database
-        menu_items = MenuItemType.objects.all().order_by('category', 'display_name')
-        
-        # Get all role keys
-        role_keys = ['admin', 'posmanager', 'posuser', 'backofficemanager', 'backofficeuser']
-        role_labels = {
-            'admin': 'Administrator',
-            'posmanager': 'POS Manager',
-            'posuser': 'POS User',
-            'backofficemanager': 'Back Office Manager',
-            'backofficeuser': 'Back Office User',
-        }
-        
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Role Permissions"
-        
-        # Define styles
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        role_header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Create header row
-        headers = ['Menu Item', 'Category', 'Subcategory']
-        permission_cols = ['Access', 'View', 'Create', 'Edit', 'Delete']
-        
-        # Add role columns (5 permissions per role)
-        for role_key in role_keys:
-            for perm in permission_cols:
-                headers.append(f"{role_labels[role_key]} - {perm}")
-        
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = border
-            cell.alignment = Alignment(horizontal='center', vertical='center', text_rotation=90)
-        
-        # Set column widths
-        ws.column_dimensions['A'].width = 30
-        ws.column_dimensions['B'].width = 25
-        ws.column_dimensions['C'].width = 20
-        
-        # Get permissions for all roles
-        role_permissions = {}
-        for role_key in role_keys:
-            try:
-                perms = GroupPermission.objects.filter(role_key=role_key).select_related('menu_item')
-                role_permissions[role_key] = {}
-                for perm in perms:
-                    if perm.menu_item:
-                        role_permissions[role_key][perm.menu_item.menu_item_id] = {
-                            'can_access': perm.can_access,
-                            'can_view': perm.can_view,
-                            'can_create': perm.can_create,
-                            'can_edit': perm.can_edit,
-                            'can_delete': perm.can_delete,
-                        }
-            except Exception as e:
-                role_permissions[role_key] = {}
-        
-        # Write data rows
-        row_num = 2
-        for menu_item in menu_items:
-            ws.cell(row=row_num, column=1, value=menu_item.display_name).border = border
-            ws.cell(row=row_num, column=2, value=menu_item.category or '').border = border
-            ws.cell(row=row_num, column=3, value=(menu_item.transaction_subtype or '')).border = border
-            
-            col_num = 4
-            for role_key in role_keys:
-                perms = role_permissions[role_key].get(menu_item.menu_item_id, {})
-                for perm_key in ['can_access', 'can_view', 'can_create', 'can_edit', 'can_delete']:
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.value = '✓' if perms.get(perm_key, False) else ''
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    cell.border = border
-                    col_num += 1
-            
-            row_num += 1
-        
-        # Freeze panes (first 3 columns)
-        ws.freeze_panes = 'D2'
-        
-        # Create HTTP response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="role_permissions_template.xlsx"'
-        
-        wb.save(response)
-        return response
+        from .services import permission_matrix
+        return permission_matrix.export_response()
 
 
 class ImportRolePermissionsExcelView(APIView):
     """
     Import role permissions from Excel file.
     Expects an Excel file with the same format as exported template.
+    
+    Only permissions that differ from the current matrix are written.
+    Options (form fields or query parameters):
+    - dry_run=true: return the diff without writing anything
+    - replace=true: also delete the imported roles' permissions for menu
+      items missing from the sheet
     """
     permission_classes = [permissions.IsAuthenticated]
     
@@ -847,93 +678,32 @@ class ImportRolePermissionsExcelView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        def option(name):
+            value = request.data.get(name, request.query_params.get(name, ''))
+            return str(value).lower() in ('1', 'true', 'yes')
+        
         try:
-            from openpyxl import load_workbook
-            
-            excel_file = request.FILES['file']
-            wb = load_workbook(excel_file)
-            ws = wb.active
-            
-            # Parse headers to understand role structure
-            headers = [cell.value for cell in ws[1]]
-            
-            # Extract role-permission mapping from headers
-            role_permission_map = {}
-            role_keys = ['admin', 'posmanager', 'posuser', 'backofficemanager', 'backofficeuser']
-            role_labels = {
-                'Administrator': 'admin',
-                'POS Manager': 'posmanager',
-                'POS User': 'posuser',
-                'Back Office Manager': 'backofficemanager',
-                'Back Office User': 'backofficeuser',
-            }
-            permission_keys = ['can_access', 'can_view', 'can_create', 'can_edit', 'can_delete']
-            permission_labels = ['Access', 'View', 'Create', 'Edit', 'Delete']
-            
-            # Find column indices for each role-permission combination
-            for col_idx, header in enumerate(headers, 1):
-                if header and isinstance(header, str) and ' - ' in header:
-                    parts = header.split(' - ')
-                    if len(parts) == 2:
-                        role_label, perm_label = parts
-                        role_key = role_labels.get(role_label.strip())
-                        perm_idx = permission_labels.index(perm_label.strip()) if perm_label.strip() in permission_labels else -1
-                        
-                        if role_key and perm_idx >= 0:
-                            perm_key = permission_keys[perm_idx]
-                            if role_key not in role_permission_map:
-                                role_permission_map[role_key] = {}
-                            role_permission_map[role_key][perm_key] = col_idx
-            
-            # Process data rows
-            imported_count = 0
-            updated_count = 0
-            
-            for row_idx in range(2, ws.max_row + 1):
-                menu_item_name = ws.cell(row=row_idx, column=1).value
-                if not menu_item_name:
-                    continue
-                
-                # Find menu item by display_name
-                try:
-                    menu_item = MenuItemType.objects.get(display_name=menu_item_name)
-                except MenuItemType.DoesNotExist:
-                    continue
-                
-                # Process each role
-                for role_key, perm_map in role_permission_map.items():
-                    perms = {}
-                    for perm_key, col_idx in perm_map.items():
-                        cell_value = ws.cell(row=row_idx, column=col_idx).value
-                        perms[perm_key] = (cell_value == '✓' or cell_value == 'YES' or cell_value == True or cell_value == 1)
-                    
-                    # Get or create Django Group
-                    group, _ = Group.objects.get_or_create(name=role_key)
-                    
-                    # Create or update GroupPermission
-                    permission, created = GroupPermission.objects.update_or_create(
-                        group=group,
-                        role_key=role_key,
-                        menu_item=menu_item,
-                        defaults=perms
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        updated_count += 1
-            
-            return Response({
-                'message': 'Role permissions imported successfully',
-                'imported': imported_count,
-                'updated': updated_count,
-            }, status=status.HTTP_200_OK)
-            
+            from .services import permission_matrix
+            report = permission_matrix.import_workbook(
+                request.FILES['file'],
+                dry_run=option('dry_run'),
+                replace=option('replace')
+            )
         except Exception as e:
             return Response(
                 {'error': f'Error importing Excel file: {str(e)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        if report['dry_run']:
+            message = 'Role permissions import checked (dry run, nothing saved)'
+        else:
+            message = 'Role permissions imported successfully'
+        return Response({
+            'message': message,
+            'imported': report['created'],
+            **report,
+        }, status=status.HTTP_200_OK)
 
 
 # POS Function Management Viewsets
@@ -1145,39 +915,43 @@ class MenuVisibilityView(APIView):
             data = request.data
             updated_count = 0
             
-            # Handle bulk activation/deactivation
-            if 'activate_all' in data:
-                MenuItemType.objects.all().update(is_active=True)
-                updated_count = MenuItemType.objects.count()
+            from .services import versions
             
-            elif 'deactivate_all' in data:
-                MenuItemType.objects.all().update(is_active=False)
-                updated_count = MenuItemType.objects.count()
+            # Queryset updates send no signals: bump the permissions and menu versions once for the whole change
+            with versions.batch(versions.PERMISSIONS, versions.MENU):
+                # Handle bulk activation/deactivation
+                if 'activate_all' in data:
+                    MenuItemType.objects.all().update(is_active=True)
+                    updated_count = MenuItemType.objects.count()
             
-            # Handle individual item updates
-            elif 'items' in data:
-                items_data = data['items']
-                for item_data in items_data:
-                    try:
-                        menu_item = MenuItemType.objects.get(id=item_data['id'])
-                        menu_item.is_active = item_data.get('is_active', menu_item.is_active)
-                        menu_item.save()
-                        updated_count += 1
-                    except MenuItemType.DoesNotExist:
-                        continue
+                elif 'deactivate_all' in data:
+                    MenuItemType.objects.all().update(is_active=False)
+                    updated_count = MenuItemType.objects.count()
+            
+                # Handle individual item updates
+                elif 'items' in data:
+                    items_data = data['items']
+                    for item_data in items_data:
+                        try:
+                            menu_item = MenuItemType.objects.get(id=item_data['id'])
+                            menu_item.is_active = item_data.get('is_active', menu_item.is_active)
+                            menu_item.save()
+                            updated_count += 1
+                        except MenuItemType.DoesNotExist:
+                            continue
             
-            # Handle category-level updates
-            elif 'categories' in data:
-                categories_data = data['categories']
-                for category_name, category_data in categories_data.items():
-                    try:
-                        # Update all items in this category
-                        MenuItemType.objects.filter(
-                            category=category_name
-                        ).update(is_active=category_data.get('is_active', True))
-                        updated_count += MenuItemType.objects.filter(category=category_name).count()
-                    except Exception:
-                        continue
+                # Handle category-level updates
+                elif 'categories' in data:
+                    categories_data = data['categories']
+                    for category_name, category_data in categories_data.items():
+                        try:
+                            # Update all items in this category
+                            MenuItemType.objects.filter(
+                                category=category_name
+                            ).update(is_active=category_data.get('is_active', True))
+                            updated_count += MenuItemType.objects.filter(category=category_name).count()
+                        except Exception:
+                            continue
             
             return Response({
                 'message': f'Successfully updated {updated_count} menu items',
@@ -1204,61 +978,14 @@ class UserMenuPermissionsView(APIView):
         user = request.user
         
         try:
-            # Get currently active menu items
-            active_menu_items = MenuItemType.objects.filter(is_active=True)
-            active_menu_ids = [str(item.id) for item in active_menu_items]
-            active_menu_item_ids = [item.menu_item_id for item in active_menu_items]
-            
-            # Get user's direct permissions
-            user_permissions = UserPermission.objects.filter(
-                user=user,
-                menu_item__is_active=True
-            ).select_related('menu_item')
-            
-            # Get user's role permissions (group permissions)
-            user_groups = user.groups.all()
-            role_permissions = GroupPermission.objects.filter(
-                group__in=user_groups,
-                menu_item__is_active=True
-            ).select_related('menu_item')
-            
-            # Merge permissions with global visibility
-            final_permissions = {}
-            
-            # Process user permissions (highest priority)
-            for perm in user_permissions:
-                if perm.menu_item and perm.menu_item.menu_item_id in active_menu_item_ids:
-                    menu_item_id = perm.menu_item.menu_item_id
-                    final_permissions[menu_item_id] = {
-                        'can_access': perm.can_access,
-                        'can_view': perm.can_view,
-                        'can_create': perm.can_create,
-                        'can_edit': perm.can_edit,
-                        'can_delete': perm.can_delete,
-                        'override': perm.override,
-                        'source': 'user_permission'
-                    }
-            
-            # Process role permissions (lower priority, only if no user permission)
-            for perm in role_permissions:
-                if perm.menu_item and perm.menu_item.menu_item_id in active_menu_item_ids:
-                    menu_item_id = perm.menu_item.menu_item_id
-                    
-                    # Skip if user already has direct permission
-                    if menu_item_id not in final_permissions:
-                        final_permissions[menu_item_id] = {
-                            'can_access': perm.can_access,
-                            'can_view': perm.can_view,
-                            'can_create': perm.can_create,
-                            'can_edit': perm.can_edit,
-                            'can_delete': perm.can_delete,
-                            'source': 'role_permission'
-                        }
+            # Compiled and cached per permissions version (user permissions over role permissions)
+            from .services.menu_permissions import permission_map
+            compiled = permission_map(user)
             
             return Response({
-                'permissions': final_permissions,
-                'active_menu_items': active_menu_item_ids,
-                'total_permissions': len(final_permissions),
+                'permissions': compiled.as_dict(),
+                'active_menu_items': compiled.active_menu_items,
+                'total_permissions': len(compiled),
                 'user_role': user.role,
                 'timestamp': timezone.now().isoformat(),
             })
@@ -1287,53 +1014,10 @@ class MenuStatisticsView(APIView):
             )
         
         try:
-            all_menu_items = MenuItemType.objects.all()
-            active_menu_items = all_menu_items.filter(is_active=True)
-            
-            # Statistics by category
-            category_stats = {}
-            for item in all_menu_items:
-                category = item.category or 'Other'
-                if category not in category_stats:
-                    category_stats[category] = {'total': 0, 'active': 0, 'inactive': 0}
-                
-                category_stats[category]['total'] += 1
-                if item.is_active:
-                    category_stats[category]['active'] += 1
-                else:
-                    category_stats[category]['inactive'] += 1
-            
-            # Statistics by menu type
-            menu_type_stats = {}
-            for item in all_menu_items:
-                menu_type = item.menu_type or 'UNKNOWN'
-                if menu_type not in menu_type_stats:
-                    menu_type_stats[menu_type] = {'total': 0, 'active': 0, 'inactive': 0}
-                
-                menu_type_stats[menu_type]['total'] += 1
-                if item.is_active:
-                    menu_type_stats[menu_type]['active'] += 1
-                else:
-                    menu_type_stats[menu_type]['inactive'] += 1
-            
-            # Permission statistics
-            user_permission_count = UserPermission.objects.count()
-            group_permission_count = GroupPermission.objects.count()
-            
+            # One grouped query, cached per menu/permissions version
+            from .services.menu_statistics import statistics
             return Response({
-                'overview': {
-                    'total_menu_items': all_menu_items.count(),
-                    'active_menu_items': active_menu_items.count(),
-                    'inactive_menu_items': all_menu_items.count() - active_menu_items.count(),
-                    'active_percentage': round((active_menu_items.count() / all_menu_items.count() * 100) if all_menu_items.count() > 0 else 0, 1)
-                },
-                'by_category': category_stats,
-                'by_menu_type': menu_type_stats,
-                'permissions': {
-                    'user_permissions': user_permission_count,
-                    'group_permissions': group_permission_count,
-                    'total_permissions': user_permission_count + group_permission_count
-                },
+                **statistics(),
                 'last_updated': timezone.now().isoformat(),
             })
             
@@ -1464,29 +1148,33 @@ class SyncUserLocationMappingsView(APIView):
         # If user_id not provided, sync all users
         target_user_id = user_id or request.data.get('user_id')
         
+        # One locations version bump per sync instead of one per mapping written
+        from .services import versions
         if target_user_id:
             # Sync specific user
             try:
                 target_user = User.objects.get(id=target_user_id)
-                result = self.sync_user_mappings(target_user)
-                return Response(result)
             except User.DoesNotExist:
                 return Response(
                     {'error': 'User not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            with versions.batch(versions.LOCATIONS):
+                result = self.sync_user_mappings(target_user)
+            return Response(result)
         else:
             # Sync all users
             users = User.objects.all()
             results = []
-            for user in users:
-                result = self.sync_user_mappings(user)
-                results.append({
-                    'user_id': str(user.id),
-                    'username': user.username,
-                    'role': user.role,
-                    'result': result
-                })
+            with versions.batch(versions.LOCATIONS):
+                for user in users:
+                    result = self.sync_user_mappings(user)
+                    results.append({
+                        'user_id': str(user.id),
+                        'username': user.username,
+                        'role': user.role,
+                        'result': result
+                    })
             
             return Response({
                 'message': 'All users synced successfully',
@@ -1499,11 +1187,12 @@ class SyncUserLocationMappingsView(APIView):
         from organization.models import Location
         
         # Get accessible locations based on role
-        accessible_locations = user.get_accessible_locations()
+        access = user.location_access
+        accessible_locations = access.locations()
         
         # Remove existing mappings that are no longer accessible
         UserLocationMapping.objects.filter(user=user).exclude(
-            location__in=accessible_locations
+            location_id__in=access.location_ids
         ).delete()
         
         created_count = 0
@@ -1565,7 +1254,7 @@ class SyncUserLocationMappingsView(APIView):
         
         return {
             'message': f'User {user.username} synced successfully',
-            'accessible_locations': accessible_locations.count(),
+            'accessible_locations': len(access),
             'created': created_count,
             'updated': updated_count,
         }
@@ -1641,42 +1330,45 @@ class BulkUserLocationMappingView(APIView):
         
         # Import UserLocationMapping model
         from .models import UserLocationMapping
+        from organization.models import Location
         
-        for mapping_data in mappings_data:
-            try:
-                user = User.objects.get(id=mapping_data['user_id'])
-                location = None  # Will be set below
-                access_type = mapping_data['access_type']
-                is_active = mapping_data.get('is_active', True)
-                is_default = mapping_data.get('is_default', False)
+        # One locations version bump for the whole batch instead of one per mapping
+        from .services import versions
+        with versions.batch(versions.LOCATIONS):
+            for mapping_data in mappings_data:
+                try:
+                    user = User.objects.get(id=mapping_data['user_id'])
+                    location = None  # Will be set below
+                    access_type = mapping_data['access_type']
+                    is_active = mapping_data.get('is_active', True)
+                    is_default = mapping_data.get('is_default', False)
                 
-                # Get location by ID
-                from organization.models import Location
-                location = Location.objects.get(id=mapping_data['location_id'])
+                    # Get location by ID
+                    location = Location.objects.get(id=mapping_data['location_id'])
                 
-                # Create or update mapping
-                mapping, created = UserLocationMapping.objects.update_or_create(
-                    user=user,
-                    location=location,
-                    access_type=access_type,
-                    defaults={
-                        'is_active': is_active,
-                        'is_default': is_default,
-                        'created_by': request.user,
-                    }
-                )
+                    # Create or update mapping
+                    mapping, created = UserLocationMapping.objects.update_or_create(
+                        user=user,
+                        location=location,
+                        access_type=access_type,
+                        defaults={
+                            'is_active': is_active,
+                            'is_default': is_default,
+                            'created_by': request.user,
+                        }
+                    )
                 
-                if created:
-                    created_count += 1
-                else:
-                    # Update existing mapping
-                    mapping.is_active = is_active
-                    mapping.is_default = is_default
-                    mapping.save()
-                    updated_count += 1
+                    if created:
+                        created_count += 1
+                    else:
+                        # Update existing mapping
+                        mapping.is_active = is_active
+                        mapping.is_default = is_default
+                        mapping.save()
+                        updated_count += 1
                     
-            except (User.DoesNotExist, Location.DoesNotExist) as e:
-                continue  # Skip invalid mappings
+                except (User.DoesNotExist, Location.DoesNotExist) as e:
+                    continue  # Skip invalid mappings
         
         return Response({
             'message': 'User-location mappings updated successfully',
@@ -0,0 +1,173 @@
+"""
+Shared writer for generated Excel files (upload templates, permission
+matrices).
+
+Workbooks are openpyxl write-only workbooks: each appended row is
+serialised straight to a temporary file instead of being kept as cell
+objects. Cells are styled with the named styles in ``STYLES``, registered
+once per workbook, rather than with a Font/Fill/Border object per cell;
+the file then carries one style record per name instead of one per cell.
+
+Write-only sheets are written top to bottom, and column widths and frozen
+panes must be set before the first row, so ``Sheet`` takes them up front.
+
+``cached_file`` keeps a generated file on disk under
+``settings.SPREADSHEET_CACHE_DIR`` keyed by a version string: a file whose
+inputs have not changed is served without being rebuilt.
+"""
+import glob
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.hyperlink import Hyperlink
+
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_thin = Side(style='thin')
+_border = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+_banner_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+_banner_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
+_text_font = Font(name='Calibri', size=11, color='333333')
+_center = Alignment(horizontal='center', vertical='center')
+_left = Alignment(horizontal='left', vertical='center')
+
+# name -> NamedStyle keyword arguments
+STYLES = {
+    'banner': dict(font=_banner_font, fill=_banner_fill, alignment=_center),
+    'header': dict(font=_banner_font, fill=_banner_fill, alignment=_center, border=_border),
+    'header_rotated': dict(
+        font=_banner_font, fill=_banner_fill, border=_border,
+        alignment=Alignment(horizontal='center', vertical='center', text_rotation=90)
+    ),
+    'title': dict(font=Font(name='Calibri', size=16, bold=True, color='366092')),
+    'section': dict(font=Font(name='Calibri', size=14, bold=True, color='366092')),
+    'subtitle': dict(font=Font(name='Calibri', size=12, bold=True)),
+    'instruction': dict(font=_text_font, alignment=_left),
+    'hyperlink': dict(font=Font(name='Calibri', size=11, color='0563C1', underline='single')),
+    'cell': dict(font=_text_font, alignment=_left, border=_border),
+    'required': dict(font=Font(name='Calibri', size=11, bold=True, color='FF0000'), alignment=_left, border=_border),
+    'note': dict(font=Font(name='Calibri', size=10, italic=True, color='666666')),
+    'bordered': dict(border=_border),
+    'check': dict(alignment=_center, border=_border),
+}
+
+
+def workbook():
+    """An empty write-only workbook with ``STYLES`` registered."""
+    book = Workbook(write_only=True)
+    for name, options in STYLES.items():
+        book.add_named_style(NamedStyle(name=name, **options))
+    return book
+
+
+class Sheet:
+    """
+    A write-only worksheet written row by row.
+
+    widths -- column widths, first column first (None skips a column)
+    freeze -- top-left cell of the scrolling area, e.g. 'D2'
+    """
+
+    def __init__(self, book, title, widths=(), freeze=None):
+        self.worksheet = book.create_sheet(title=title)
+        for index, width in enumerate(widths, 1):
+            if width:
+                self.worksheet.column_dimensions[get_column_letter(index)].width = width
+        if freeze:
+            self.worksheet.freeze_panes = freeze
+        self.current_row = 0
+
+    def cell(self, value, style=None):
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        if style:
+            cell.style = style
+        return cell
+
+    def link(self, text, location, tooltip=None, style='hyperlink'):
+        """A cell linking to ``location`` (e.g. "'Customers'!A1") in this workbook."""
+        cell = self.cell(text, style)
+        cell.hyperlink = Hyperlink(ref=f'A{self.current_row + 1}', location=location, tooltip=tooltip)
+        return cell
+
+    def row(self, values=(), style=None, styles=None):
+        """
+        Append a row; returns its number. ``style`` applies to every value,
+        ``styles`` (a list) per column, None leaving a cell unstyled. Cells
+        made with ``cell``/``link`` are written as they are.
+        """
+        cells = []
+        for index, value in enumerate(values):
+            cell_style = styles[index] if styles and index < len(styles) else style
+            if isinstance(value, Cell) or not cell_style:
+                cells.append(value)
+            else:
+                cells.append(self.cell(value, cell_style))
+        self.worksheet.append(cells)
+        self.current_row += 1
+        return self.current_row
+
+    def skip_to(self, row):
+        """Write blank rows until the next row is ``row``."""
+        while self.current_row < row - 1:
+            self.row()
+
+    def merge(self, row, first_column, last_column):
+        self.worksheet.merged_cells.add(
+            f'{get_column_letter(first_column)}{row}:{get_column_letter(last_column)}{row}'
+        )
+
+
+def cache_dir():
+    return str(getattr(settings, 'SPREADSHEET_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'spreadsheet_cache')))
+
+
+def cached_file(name, version, build):
+    """
+    Path of ``<name>-<version>.xlsx`` in the cache directory, written with
+    ``build()`` (returning a workbook) if it is not there yet. Files of other
+    versions of ``name`` are removed once the new one is in place.
+    """
+    directory = cache_dir()
+    path = os.path.join(directory, f'{name}-{version}.xlsx')
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    # Concurrent builders each write their own file; the last rename wins
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        build().save(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    for stale in glob.glob(os.path.join(glob.escape(directory), f'{glob.escape(name)}-*.xlsx')):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def file_response(path, filename):
+    """Stream a generated file as an attachment."""
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=CONTENT_TYPE)
+
+
+def workbook_response(book, filename):
+    """Save ``book`` to a temporary file and stream it as an attachment."""
+    # Removed from disk as soon as FileResponse closes it
+    handle = tempfile.TemporaryFile(suffix='.xlsx')
+    book.save(handle)
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=filename, content_type=CONTENT_TYPE)
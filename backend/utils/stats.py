@@ -0,0 +1,133 @@
+"""
+Shared engine for the admin dashboard statistics endpoints.
+
+A Dashboard declares its counters as aggregate expressions over one model
+(conditional counts are ``Count('id', filter=Q(...))``), so all of them come
+back from a single ``aggregate()`` query. Breakdowns that need a GROUP BY
+(e.g. locations per company) are extra queries declared with ``extra``.
+
+Results are cached in the Django cache under a generation number that every
+save/delete of a ``depends_on`` model bumps once its transaction commits,
+so a write never leaves a stale dashboard behind and a reader that raced a
+write can only store under the old generation. Queryset ``update()`` calls
+send no signals: call ``invalidate(name)`` after them.
+
+``refresh()`` recomputes and stores dashboards ahead of time; the
+``refresh_dashboard_stats`` command runs it from cron. Precomputing only
+helps other processes with a shared cache backend (Redis, Memcached).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+CACHE_PREFIX = 'dashboard-stats'
+
+_dashboards = {}
+
+
+class Dashboard:
+    """
+    name        -- cache/registry name ('customers', 'suppliers', ...)
+    model       -- model the counters aggregate over
+    aggregates  -- callable returning {key: aggregate expression}; called on
+                   every computation so time-relative filters stay current
+    build       -- callable(values, extra) -> response dict
+    extra       -- optional callable returning further values (GROUP BY queries)
+    depends_on  -- models whose writes invalidate the dashboard
+    """
+
+    def __init__(self, name, model, aggregates, build, extra=None, depends_on=None, timeout=None):
+        self.name = name
+        self.model = model
+        self.aggregates = aggregates
+        self.build = build
+        self.extra = extra
+        self.depends_on = tuple(depends_on or (model,))
+        self.timeout = timeout
+
+    def compute(self):
+        values = self.model.objects.aggregate(**self.aggregates())
+        extra = self.extra() if self.extra else {}
+        return self.build(values, extra)
+
+
+def _timeout(dashboard):
+    if dashboard.timeout is not None:
+        return dashboard.timeout
+    return getattr(settings, 'DASHBOARD_STATS_TTL', 300)
+
+
+def _generation_key(name):
+    return f'{CACHE_PREFIX}:{name}:generation'
+
+
+def _generation(name):
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock so an evicted counter never reuses an old generation
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _data_key(name, generation):
+    return f'{CACHE_PREFIX}:{name}:{generation}'
+
+
+def register(dashboard):
+    """Register ``dashboard`` and invalidate it on writes of its models."""
+    _dashboards[dashboard.name] = dashboard
+
+    def handler(sender, raw=False, **kwargs):
+        if not raw:
+            invalidate(dashboard.name)
+
+    # Signals hold weak references by default: keep the handler alive
+    dashboard.handler = handler
+    for model in dashboard.depends_on:
+        uid = f'stats.{dashboard.name}.{model._meta.label_lower}'
+        post_save.connect(handler, sender=model, dispatch_uid=f'{uid}.save')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'{uid}.delete')
+    return dashboard
+
+
+def dashboards():
+    return dict(_dashboards)
+
+
+def get(name, use_cache=True):
+    """The dashboard's values, from the cache when current."""
+    dashboard = _dashboards[name]
+    if not use_cache:
+        return dashboard.compute()
+    key = _data_key(name, _generation(name))
+    data = cache.get(key)
+    if data is None:
+        data = dashboard.compute()
+        cache.set(key, data, _timeout(dashboard))
+    return data
+
+
+def invalidate(name):
+    """Drop the cached values once the current transaction commits."""
+    def bump():
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            _generation(name)
+    transaction.on_commit(bump)
+
+
+def refresh(names=None):
+    """Recompute and cache the given dashboards (all by default); returns their names."""
+    names = list(names or _dashboards)
+    for name in names:
+        dashboard = _dashboards[name]
+        cache.set(_data_key(name, _generation(name)), dashboard.compute(), _timeout(dashboard))
+    return names